@@ -1,36 +1,35 @@
 #!/bin/bash
 
-# Essential Python packages installation script
-echo "📦 Installing essential Python packages..."
+# Python packages: the core tier now, the ml and extras tiers on first import.
+#
+# See scripts/lazy_install.py. The core tier is installed from a local
+# wheelhouse keyed by the requirements hash and skipped outright when its
+# stamp matches, so this is near-instant on every start after the first.
+# With --prefetch, the wheels of the lazy tiers are downloaded in the
+# background so their first import installs offline.
 
-# Essential packages for data science classroom
-PYTHON_PACKAGES="pandas numpy openpyxl xlsxwriter seaborn statsmodels scikit-learn matplotlib jupyter jupyterlab"
+cd "$(dirname "$0")/.." || exit 1
 
-# Install packages
-pip install --user $PYTHON_PACKAGES
+# The cache lives on the /workspaces volume, which survives rebuilds
+if [ -z "$CLASSROOM_CACHE_DIR" ] && [ -w /workspaces ]; then
+    export CLASSROOM_CACHE_DIR=/workspaces/.cache/data-management-classroom
+fi
 
-echo "✅ Essential Python packages installation complete!"
+echo "📦 Installing core Python packages..."
+if ! python3 scripts/lazy_install.py install core; then
+    echo "⚠️ Core package installation failed"
+    exit 1
+fi
 
-# Quick verification
-echo "🔍 Verifying installations..."
-python3 -c "
-import sys
-packages = ['pandas', 'numpy', 'openpyxl', 'xlsxwriter', 'seaborn', 'statsmodels', 'sklearn', 'matplotlib', 'jupyter']
-failed = []
-for pkg in packages:
-    try:
-        if pkg == 'sklearn':
-            __import__('sklearn')
-        else:
-            __import__(pkg)
-        print(f'✅ {pkg}')
-    except ImportError:
-        print(f'❌ {pkg}')
-        failed.append(pkg)
+# Install the ml and extras tiers when they are first imported
+python3 scripts/lazy_install.py enable
 
-if failed:
-    print(f'⚠️ Failed packages: {failed}')
-    sys.exit(1)
-else:
-    print('🎉 All essential Python packages installed successfully!')
-"
+if [ "$1" = "--prefetch" ]; then
+    CACHE_DIR="${CLASSROOM_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/data-management-classroom}"
+    mkdir -p "$CACHE_DIR"
+    nohup nice python3 scripts/lazy_install.py wheels ml extras \
+        > "$CACHE_DIR/wheelhouse-prefetch.log" 2>&1 &
+    echo "💤 ml and extras wheels are prefetched in the background ($CACHE_DIR/wheelhouse-prefetch.log)"
+fi
+
+echo "✅ Core Python packages ready (ml and extras install on first import)"
@@ -1,5 +1,19 @@
 #!/bin/bash
 
+# R packages for the classroom, installed once into a cached library.
+#
+# The library is keyed by a hash of the package list, the R version and
+# the platform, and lives under the classroom cache directory
+# (CLASSROOM_CACHE_DIR, default /workspaces/.cache/data-management-classroom
+# so it survives rebuilds, or ~/.cache/data-management-classroom). R's
+# default user library is a symlink to it, so a container start with an
+# unchanged package list only has to check the link; CRAN is contacted
+# (and packages compiled) only when the key changes.
+#
+# Usage:
+#   bash .devcontainer/install_r_packages.sh           # install or reuse the cache
+#   bash .devcontainer/install_r_packages.sh --check   # exit 0 if the cache is ready
+
 echo "📊 Installing R packages for data science classroom..."
 
 # Check if R is available
@@ -8,31 +22,60 @@ if ! command -v R &> /dev/null; then
     exit 1
 fi
 
-# Essential R packages for data science and database work
+# Core packages needed for the classroom
+ESSENTIAL_PACKAGES="languageserver jsonlite httr IRkernel"
+# Data science packages
+DATA_PACKAGES="dplyr tidyr ggplot2 readr DBI RPostgreSQL dbplyr knitr rmarkdown"
+
+# The cache lives on the /workspaces volume, which survives rebuilds
+if [ -z "$CLASSROOM_CACHE_DIR" ] && [ -w /workspaces ]; then
+    export CLASSROOM_CACHE_DIR=/workspaces/.cache/data-management-classroom
+fi
+CACHE_DIR="${CLASSROOM_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/data-management-classroom}"
+R_VERSION="$(R --version | head -1)"
+R_KEY="$(printf '%s\n' "$ESSENTIAL_PACKAGES" "$DATA_PACKAGES" "$R_VERSION" "$(uname -m)" \
+    | sha256sum | cut -c1-16)"
+R_LIBRARY="$CACHE_DIR/r-library/$R_KEY"
+USER_LIBRARY="$(R --slave --vanilla -e 'cat(path.expand(Sys.getenv("R_LIBS_USER")))')"
+
+link_library() {
+    mkdir -p "$(dirname "$USER_LIBRARY")"
+    if [ -d "$USER_LIBRARY" ] && [ ! -L "$USER_LIBRARY" ]; then
+        # Packages installed before the cache existed stay around, unused
+        mv "$USER_LIBRARY" "$USER_LIBRARY.before-cache"
+    fi
+    ln -sfn "$R_LIBRARY" "$USER_LIBRARY"
+}
+
+register_kernel() {
+    if ! jupyter kernelspec list 2>/dev/null | grep -qw "ir"; then
+        R --slave --no-restore --no-save -e "IRkernel::installspec(user = TRUE)" &>/dev/null \
+            && echo "✅ R kernel for Jupyter installed" \
+            || echo "⚠️ R kernel installation failed"
+    fi
+}
+
+if [ -f "$R_LIBRARY/.complete" ]; then
+    [ "$1" = "--check" ] && exit 0
+    link_library
+    register_kernel
+    echo "✅ R library cache hit ($R_KEY), nothing to install"
+    exit 0
+fi
+[ "$1" = "--check" ] && exit 1
+
+echo "📦 No cached R library for $R_KEY, installing into $R_LIBRARY"
+# A library left by a failed attempt is completed, not started over
+mkdir -p "$R_LIBRARY"
+
 R --slave --no-restore --no-save -e "
 options(repos = c(CRAN = 'https://cloud.r-project.org/'))
 options(timeout = 120)
+library_dir <- '$R_LIBRARY'
+.libPaths(c(library_dir, .libPaths()))
 
-# Core packages needed for the classroom
-essential_packages <- c(
-    'languageserver',  # For VS Code R support
-    'jsonlite',        # JSON handling
-    'httr',           # HTTP requests
-    'IRkernel'        # Jupyter R kernel
-)
-
-# Data science packages
-data_packages <- c(
-    'dplyr',
-    'tidyr', 
-    'ggplot2',
-    'readr',
-    'DBI',
-    'RPostgreSQL',
-    'dbplyr',
-    'knitr',
-    'rmarkdown'
-)
+essential_packages <- strsplit('$ESSENTIAL_PACKAGES', ' ')[[1]]
+data_packages <- strsplit('$DATA_PACKAGES', ' ')[[1]]
 
 # Function to safely install packages
 safe_install <- function(packages, description) {
@@ -40,8 +83,9 @@ safe_install <- function(packages, description) {
     for (pkg in packages) {
         cat('Installing', pkg, '...')
         tryCatch({
-            if (!require(pkg, character.only = TRUE, quietly = TRUE)) {
-                install.packages(pkg, dependencies = TRUE, quiet = TRUE)
+            if (!requireNamespace(pkg, quietly = TRUE)) {
+                install.packages(pkg, lib = library_dir, dependencies = TRUE,
+                                 quiet = TRUE, Ncpus = parallel::detectCores())
                 cat(' ✅\n')
             } else {
                 cat(' (already installed)\n')
@@ -56,16 +100,27 @@ safe_install <- function(packages, description) {
 safe_install(essential_packages, 'essential')
 safe_install(data_packages, 'data science')
 
+missing <- Filter(function(pkg) !requireNamespace(pkg, quietly = TRUE),
+                  c(essential_packages, data_packages))
+if (length(missing) > 0) {
+    cat('⚠️ Not installed:', missing, '\n')
+    quit(status = 1)
+}
 cat('\n📊 R packages installation completed!\n')
-
-# Try to install Jupyter R kernel
-tryCatch({
-    library(IRkernel)
-    IRkernel::installspec(user = FALSE)
-    cat('✅ R kernel for Jupyter installed\n')
-}, error = function(e) {
-    cat('⚠️ R kernel installation failed\n')
-})
 "
+status=$?
+
+link_library
+if [ $status -ne 0 ]; then
+    echo "⚠️ Some R packages failed; the library is not marked complete"
+    exit 1
+fi
+
+touch "$R_LIBRARY/.complete"
+# Libraries for older package lists or R versions are dead weight
+for old in "$CACHE_DIR"/r-library/*; do
+    [ "$old" != "$R_LIBRARY" ] && rm -rf "$old"
+done
+register_kernel
 
-echo "✅ R packages installation script completed"
\ No newline at end of file
+echo "✅ R packages installation script completed"
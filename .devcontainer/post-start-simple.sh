@@ -67,21 +67,27 @@ if [ -z "$PGDATABASE" ]; then
     echo "✅ Environment variables configured for this session"
 fi
 
-# Verify Python packages
+# Python packages: the core tier from the cached wheelhouse (a no-op when
+# its stamp matches), ml and extras on first import (scripts/lazy_install.py)
 echo "🐍 Verifying Python environment..."
-missing_packages=()
-for package in pandas numpy psycopg2 matplotlib seaborn sklearn sqlalchemy; do
-    if ! python3 -c "import $package" >/dev/null 2>&1; then
-        missing_packages+=("$package")
-    fi
-done
-
-if [ ${#missing_packages[@]} -gt 0 ]; then
-    echo "🔧 Installing missing Python packages: ${missing_packages[*]}"
-    pip install --user --no-cache-dir "${missing_packages[@]}" >/dev/null 2>&1
-    echo "✅ Missing packages installed"
+if [ -f "$(dirname "$0")/install_python_packages.sh" ] && [ -f "$(dirname "$0")/../scripts/lazy_install.py" ]; then
+    bash "$(dirname "$0")/install_python_packages.sh" --prefetch \
+        || echo "⚠️ Core Python packages could not be installed"
 else
-    echo "✅ All Python packages available"
+    missing_packages=()
+    for package in pandas numpy psycopg2 matplotlib seaborn sklearn sqlalchemy; do
+        if ! python3 -c "import $package" >/dev/null 2>&1; then
+            missing_packages+=("$package")
+        fi
+    done
+
+    if [ ${#missing_packages[@]} -gt 0 ]; then
+        echo "🔧 Installing missing Python packages: ${missing_packages[*]}"
+        pip install --user --no-cache-dir "${missing_packages[@]}" >/dev/null 2>&1
+        echo "✅ Missing packages installed"
+    else
+        echo "✅ All Python packages available"
+    fi
 fi
 
 # Create sample data and scripts if they don't exist
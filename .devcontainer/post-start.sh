@@ -1,29 +1,72 @@
 #!/bin/bash
 
 # Post-Start Script - Runs every time the container starts
+#
+# Everything slow is cached or deferred, so a restart takes seconds:
+# - Python: only the core tier is installed, from a wheelhouse keyed by the
+#   requirements hash (skipped when unchanged); ml and extras install on
+#   first import (scripts/lazy_install.py)
+# - R: the package library is cached per package list and R version
+#   (install_r_packages.sh); building it, installing R and the system
+#   libraries R packages compile against run in the background
+# - setup_codespace.sh (apt-get update and installs) only runs again when
+#   the script changes
+# Each phase is timed as a telemetry span: the timings are printed at the
+# end and logged (python scripts/telemetry.py report ranks them).
 echo "🔄 Starting data science environment..."
 
 # Navigate to workspace first
 cd /workspaces/data-management-classroom 2>/dev/null || cd /workspaces
 
-# Quick environment check
-echo "🔍 Quick environment check..."
-if command -v python3 &> /dev/null; then
-    echo "✅ Python available: $(python3 --version)"
+# The cache lives on the /workspaces volume, which survives rebuilds
+if [ -z "$CLASSROOM_CACHE_DIR" ] && [ -w /workspaces ]; then
+    export CLASSROOM_CACHE_DIR=/workspaces/.cache/data-management-classroom
+fi
+CACHE_DIR="${CLASSROOM_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/data-management-classroom}"
+# Stamps for work done inside this container; unlike the cache they must
+# not survive a rebuild
+STATE_DIR="${XDG_STATE_HOME:-$HOME/.local/state}/data-management-classroom"
+mkdir -p "$CACHE_DIR" "$STATE_DIR"
+
+# Every phase is a telemetry span (scripts/telemetry.sh)
+if [ -f "scripts/telemetry.sh" ]; then
+    source scripts/telemetry.sh
 else
-    echo "⚠️ Python not found"
+    telemetry_span() { shift; "$@"; }
+    telemetry_start() { :; }
+    telemetry_end() { :; }
+    telemetry_summary() { :; }
+    telemetry_export() { :; }
 fi
+telemetry_start "total"
 
-if command -v R &> /dev/null; then
-    echo "✅ R available: $(R --version | head -1)"
-else
-    echo "⚠️ R not found - will attempt installation"
-    # Try to install R if missing
-    if command -v apt-get &> /dev/null; then
-        echo "📦 Installing R..."
-        sudo apt-get update -qq && sudo apt-get install -y r-base r-base-dev &>/dev/null || echo "❌ R installation failed"
+check_environment() {
+    echo "🔍 Quick environment check..."
+    if command -v python3 &> /dev/null; then
+        echo "✅ Python available: $(python3 --version)"
+    else
+        echo "⚠️ Python not found"
     fi
-fi
+
+    if command -v R &> /dev/null; then
+        echo "✅ R available: $(R --version | head -1)"
+    else
+        echo "⚠️ R not found - will be installed in the background"
+    fi
+}
+
+# Function to wait for a service to be ready
+wait_for_service() {
+    local service_name="$1"
+    local check_command="$2"
+    local max_wait="${3:-60}"
+    local wait_time=0
+
+    echo "⏳ Waiting for $service_name to be ready..."
+    until eval "$check_command" &> /dev/null; do
+        if [ $wait_time -ge $max_wait ]; then
+            echo "❌ $service_name did not become ready within ${max_wait}s"
+            return 1
         fi
         sleep 5
         wait_time=$((wait_time + 5))
@@ -33,70 +76,83 @@ fi
     return 0
 }
 
-# Ensure all scripts are executable
-chmod +x scripts/*.sh scripts/*.py 2>/dev/null || true
-chmod +x .devcontainer/*.sh 2>/dev/null || true
-
-# Install essential packages
-echo "📦 Installing essential Python and R packages..."
 
-# Install system dependencies first
-if [ -f ".devcontainer/install_system_deps.sh" ]; then
-    echo "🔧 Installing system dependencies..."
-    ./.devcontainer/install_system_deps.sh
-else
-    echo "⚠️ System dependencies installer not found"
-fi
-
-# Install Python packages
-if [ -f ".devcontainer/install_python_packages.sh" ]; then
-    echo "🐍 Installing Python packages..."
-    ./.devcontainer/install_python_packages.sh
-else
-    echo "⚠️ Python package installer not found"
-fi
+install_python_packages() {
+    # Core tier now, ml and extras on first import; their wheels are
+    # prefetched in the background
+    if [ -f ".devcontainer/install_python_packages.sh" ]; then
+        echo "🐍 Installing Python packages..."
+        ./.devcontainer/install_python_packages.sh --prefetch
+    else
+        echo "⚠️ Python package installer not found"
+    fi
+}
 
-# Install R packages
-if [ -f ".devcontainer/install_r_packages.sh" ]; then
-    echo "📊 Installing R packages..."
-    ./.devcontainer/install_r_packages.sh
-else
-    echo "⚠️ R package installer not found"
-fi
+install_r_packages() {
+    if [ ! -f ".devcontainer/install_r_packages.sh" ]; then
+        echo "⚠️ R package installer not found"
+        return 1
+    fi
+    # Cache hit: just link the cached library
+    if command -v R &> /dev/null && ./.devcontainer/install_r_packages.sh --check &>/dev/null; then
+        ./.devcontainer/install_r_packages.sh
+        return
+    fi
+    # Cache miss: installing R, the system libraries and compiling the
+    # packages takes minutes, so it runs in the background
+    echo "📊 Building the R library in the background ($CACHE_DIR/r-install.log)"
+    nohup bash -c '
+        if ! command -v R &> /dev/null; then
+            echo "📦 Installing R..."
+            sudo apt-get update -qq && sudo apt-get install -y r-base r-base-dev || exit 1
+        fi
+        ./.devcontainer/install_system_deps.sh
+        ./.devcontainer/install_r_packages.sh
+    ' > "$CACHE_DIR/r-install.log" 2>&1 &
+}
 
-# Check if we're in a GitHub Codespace
-if [ -n "$CODESPACE_NAME" ]; then
-    echo "📡 Detected GitHub Codespace: $CODESPACE_NAME"
-    echo "🔧 Configuring for Codespace environment..."
-    
-    # Run the Codespace-specific setup script first
-    if [ -f ".devcontainer/setup_codespace.sh" ]; then
-        echo "🚀 Running Codespace setup script..."
-        chmod +x .devcontainer/setup_codespace.sh
-        ./.devcontainer/setup_codespace.sh
-    else
+setup_codespace() {
+    # apt-get update and package installs: only when the script changed
+    # since it last ran in this container
+    if [ ! -f ".devcontainer/setup_codespace.sh" ]; then
         echo "⚠️ setup_codespace.sh not found, proceeding with manual setup..."
+        return
     fi
-    
-    # In Codespaces, Docker might not be available, so set up local PostgreSQL
-    echo "🗄️ Setting up local PostgreSQL for Codespace..."
-    
-    # Install PostgreSQL server if not already installed
-    if ! command -v postgres &> /dev/null; then
-        echo "📦 Installing PostgreSQL server..."
-        sudo apt-get update -qq
-        sudo apt-get install -y postgresql postgresql-contrib
+    local key
+    key=$(sha256sum .devcontainer/setup_codespace.sh | cut -c1-16)
+    if [ "$(cat "$STATE_DIR/setup_codespace" 2>/dev/null)" = "$key" ]; then
+        echo "⏭️ Codespace setup already done in this container"
+        return
     fi
-    
-    # Start PostgreSQL
-    echo "🚀 Starting PostgreSQL service..."
-    sudo service postgresql start
-    
-    # Configure PostgreSQL for easy classroom use
-    echo "🔧 Configuring PostgreSQL for classroom environment..."
-    
-    # Create student user and database
-    sudo -u postgres psql << 'EOF' 2>/dev/null || true
+    echo "🚀 Running Codespace setup script..."
+    chmod +x .devcontainer/setup_codespace.sh
+    ./.devcontainer/setup_codespace.sh && echo "$key" > "$STATE_DIR/setup_codespace"
+}
+
+start_database() {
+    if [ -n "$CODESPACE_NAME" ]; then
+        echo "📡 Detected GitHub Codespace: $CODESPACE_NAME"
+        echo "🔧 Configuring for Codespace environment..."
+
+        # In Codespaces, Docker might not be available, so set up local PostgreSQL
+        echo "🗄️ Setting up local PostgreSQL for Codespace..."
+
+        # Install PostgreSQL server if not already installed
+        if ! command -v postgres &> /dev/null; then
+            echo "📦 Installing PostgreSQL server..."
+            sudo apt-get update -qq
+            sudo apt-get install -y postgresql postgresql-contrib
+        fi
+
+        # Start PostgreSQL
+        echo "🚀 Starting PostgreSQL service..."
+        sudo service postgresql start
+
+        # Configure PostgreSQL for easy classroom use
+        echo "🔧 Configuring PostgreSQL for classroom environment..."
+
+        # Create student user and database
+        sudo -u postgres psql << 'EOF' 2>/dev/null || true
 -- Create student user if it doesn't exist
 DO $$
 BEGIN
@@ -126,73 +182,100 @@ WHERE NOT EXISTS (SELECT FROM pg_database WHERE datname = 'classroom_db');
 \q
 EOF
 
-    echo "✅ PostgreSQL configured for classroom use"
-    
-    # Set up database credentials for Codespace
-    cat > ~/.pg_credentials << 'EOF'
+        echo "✅ PostgreSQL configured for classroom use"
+
+        # Per-role statement/idle timeouts and memory limits (see scripts/governor.py)
+        if [ -f "scripts/governor.py" ]; then
+            (set -o pipefail
+             python3 scripts/governor.py apply --sql \
+                 | sudo -u postgres psql -q -v ON_ERROR_STOP=1) \
+                || echo "⚠️ Query limits could not be applied"
+        fi
+
+        # Sample databases come from a snapshot instead of replaying the SQL
+        if [ -f "scripts/snapshot.py" ] && python3 -c "import psycopg2" 2>/dev/null; then
+            echo "📦 Restoring sample databases from snapshot..."
+            PGUSER=student PGPASSWORD=student_password PGHOST=localhost \
+                python3 scripts/snapshot.py ensure || echo "⚠️ Snapshot restore failed, use scripts/load_databases.sh load-all"
+        fi
+
+        # Set up database credentials for Codespace
+        cat > ~/.pg_credentials << 'EOF'
 export PGUSER=student
 export PGPASSWORD=student_password
 export PGHOST=localhost
 export PGPORT=5432
 export PGDATABASE=postgres
 EOF
-    chmod 600 ~/.pg_credentials
-    
-elif command -v docker &> /dev/null; then
-    echo "🐳 Setting up PostgreSQL container..."
-    
-    # Check if container already exists and is running
-    if docker ps | grep -q "classroom-db"; then
-        echo "✅ PostgreSQL container already running"
-    else
-        # Remove any stopped container
-        docker rm -f classroom-db 2>/dev/null || true
-        
-        # Start fresh PostgreSQL container
-        echo "🚀 Starting new PostgreSQL container..."
-        docker run -d --name classroom-db -p 5432:5432 \
-            -e POSTGRES_USER=student \
-            -e POSTGRES_PASSWORD=student_password \
-            -e POSTGRES_DB=postgres \
-            -e POSTGRES_INITDB_ARGS="--auth-host=scram-sha-256 --auth-local=scram-sha-256" \
-            postgres:15
-        
-        # Wait for PostgreSQL to be ready
-        if wait_for_service "PostgreSQL" "docker exec classroom-db pg_isready -U student" 120; then
-            echo "🎉 PostgreSQL is ready and accepting connections!"
-            
-            # Load sample data if available
-            if [ -f "databases/sample.sql" ]; then
-                echo "📊 Loading sample database..."
-                docker exec -i classroom-db psql -U student -d postgres < databases/sample.sql 2>/dev/null || true
-            fi
+        chmod 600 ~/.pg_credentials
+
+    elif command -v docker &> /dev/null; then
+        echo "🐳 Setting up PostgreSQL container..."
+
+        # Check if container already exists and is running
+        if docker ps | grep -q "classroom-db"; then
+            echo "✅ PostgreSQL container already running"
+        elif docker start classroom-db &>/dev/null; then
+            # A stopped container keeps its data: no initdb, no reload
+            wait_for_service "PostgreSQL" "docker exec classroom-db pg_isready -U student" 120
         else
-            echo "⚠️ PostgreSQL setup may have issues, but continuing..."
+            # Start fresh PostgreSQL container
+            echo "🚀 Starting new PostgreSQL container..."
+            docker run -d --name classroom-db -p 5432:5432 \
+                -e POSTGRES_USER=student \
+                -e POSTGRES_PASSWORD=student_password \
+                -e POSTGRES_DB=postgres \
+                -e POSTGRES_INITDB_ARGS="--auth-host=scram-sha-256 --auth-local=scram-sha-256" \
+                postgres:15
+
+            # Wait for PostgreSQL to be ready
+            if wait_for_service "PostgreSQL" "docker exec classroom-db pg_isready -U student" 120; then
+                echo "🎉 PostgreSQL is ready and accepting connections!"
+
+                # Per-role statement/idle timeouts and memory limits, as the
+                # container's bootstrap superuser (POSTGRES_USER): only a
+                # superuser can set temp_file_limit
+                if [ -f "scripts/governor.py" ]; then
+                    python3 scripts/governor.py apply --sql \
+                        | docker exec -i classroom-db sh -c \
+                            'psql -q -v ON_ERROR_STOP=1 -U "${POSTGRES_USER:-postgres}" -d postgres' \
+                        || echo "⚠️ Query limits could not be applied"
+                fi
+
+                # Load sample data if available
+                if [ -f "databases/sample.sql" ]; then
+                    echo "📊 Loading sample database..."
+                    docker exec -i classroom-db psql -U student -d postgres < databases/sample.sql 2>/dev/null || true
+                fi
+            else
+                echo "⚠️ PostgreSQL setup may have issues, but continuing..."
+            fi
         fi
-    fi
-    
-    # Set up database credentials for Docker
-    cat > ~/.pg_credentials << 'EOF'
+
+        # Set up database credentials for Docker
+        cat > ~/.pg_credentials << 'EOF'
 export PGUSER=student
 export PGPASSWORD=student_password
 export PGHOST=localhost
 export PGPORT=5432
 export PGDATABASE=postgres
 EOF
-    chmod 600 ~/.pg_credentials
-else
-    echo "⚠️ Docker not available, skipping PostgreSQL setup"
-    echo "💡 You can still work with Python and R for data analysis"
-fi
+        chmod 600 ~/.pg_credentials
+    else
+        echo "⚠️ Docker not available, skipping PostgreSQL setup"
+        echo "💡 You can still work with Python and R for data analysis"
+    fi
+}
 
-# Add to bashrc if not already there
-if ! grep -q "source ~/.pg_credentials" ~/.bashrc; then
-    echo "source ~/.pg_credentials 2>/dev/null || true" >> ~/.bashrc
-fi
+configure_shell() {
+    # Add to bashrc if not already there
+    if ! grep -q "source ~/.pg_credentials" ~/.bashrc; then
+        echo "source ~/.pg_credentials 2>/dev/null || true" >> ~/.bashrc
+    fi
 
-# Create helpful aliases (only add if not already present)
-if ! grep -q "# Data Science Environment Aliases" ~/.bashrc; then
-    cat >> ~/.bashrc << 'EOF'
+    # Create helpful aliases (only add if not already present)
+    if ! grep -q "# Data Science Environment Aliases" ~/.bashrc; then
+        cat >> ~/.bashrc << 'EOF'
 
 # Data Science Environment Aliases
 alias jlab='jupyter lab --ip=0.0.0.0 --port=8888 --no-browser --allow-root'
@@ -207,18 +290,22 @@ alias dbstop='docker stop classroom-db'
 alias testenv='python scripts/test.py'
 alias quicktest='python ~/test_environment.py'
 EOF
-fi
+    fi
+}
 
-# Run our comprehensive test
-echo "🧪 Running environment tests..."
-if [ -f "scripts/test.py" ]; then
-    python scripts/test.py
-else
-    echo "⚠️ Test script not found - run setup.sh first"
-fi
+run_environment_tests() {
+    # Run our comprehensive test
+    echo "🧪 Running environment tests..."
+    if [ -f "scripts/test.py" ]; then
+        python scripts/test.py
+    else
+        echo "⚠️ Test script not found - run setup.sh first"
+    fi
+}
 
-# Create a quick test script for students
-cat > ~/test_environment.py << 'EOF'
+create_student_test() {
+    # Create a quick test script for students
+    cat > ~/test_environment.py << 'EOF'
 #!/usr/bin/env python3
 """Quick environment test for students"""
 import sys
@@ -281,7 +368,23 @@ else:
     print("⚠️ Some components need attention - check the setup guide")
 EOF
 
-chmod +x ~/test_environment.py
+    chmod +x ~/test_environment.py
+}
+
+# Ensure all scripts are executable
+chmod +x scripts/*.sh scripts/*.py 2>/dev/null || true
+chmod +x .devcontainer/*.sh 2>/dev/null || true
+
+telemetry_span "environment check" check_environment
+telemetry_span "python packages" install_python_packages
+telemetry_span "r packages" install_r_packages
+if [ -n "$CODESPACE_NAME" ]; then
+    telemetry_span "codespace setup" setup_codespace
+fi
+telemetry_span "database" start_database
+telemetry_span "shell config" configure_shell
+telemetry_span "environment tests" run_environment_tests
+telemetry_span "student test script" create_student_test
 
 echo ""
 echo "🎉 Post-start setup complete!"
@@ -327,3 +430,9 @@ else
     echo "   📝 Test connection: python scripts/test_connection.py"
 fi
 echo "   📖 Full guide: cat DATABASE_PASSWORDS.md"
+
+echo ""
+echo "⏱️ Post-start phases:"
+telemetry_summary
+telemetry_end "total"
+telemetry_export
@@ -5,8 +5,34 @@
 CREATE SCHEMA IF NOT EXISTS dashboard;
 SET search_path TO dashboard, public;
 
--- Database inventory view
-CREATE OR REPLACE VIEW database_inventory AS
+-- Earlier versions created database_inventory and cross_database_summary as
+-- plain views; they are materialized views now (see below)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'dashboard' AND viewname = 'database_inventory') THEN
+        DROP VIEW dashboard.database_inventory;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'dashboard' AND viewname = 'cross_database_summary') THEN
+        DROP VIEW dashboard.cross_database_summary;
+    END IF;
+END
+$$;
+
+-- Tables and views of a schema. Partitions of a partitioned table (see
+-- scripts/partition_tables.py) are part of their parent, not tables of
+-- their own, so only the parent is counted.
+CREATE OR REPLACE FUNCTION table_count(schema_name TEXT)
+RETURNS BIGINT AS $$
+    SELECT COUNT(*)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = schema_name
+      AND c.relkind IN ('r', 'p', 'v', 'f')
+      AND NOT c.relispartition;
+$$ LANGUAGE sql STABLE;
+
+-- Database inventory view (exact counts, scans every listed table)
+CREATE OR REPLACE VIEW database_inventory_exact AS
 SELECT 
     'Sample' as database_name,
     'public' as schema_name,
@@ -20,7 +46,7 @@ UNION ALL
 SELECT 
     'Northwind' as database_name,
     'northwind' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'northwind') as table_count,
+    table_count('northwind') as table_count,
     COALESCE((SELECT COUNT(*) FROM northwind.products), 0) as record_count,
     'E-commerce database' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'northwind')
@@ -30,7 +56,7 @@ UNION ALL
 SELECT 
     'AdventureWorks' as database_name,
     'adventureworks' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'adventureworks') as table_count,
+    table_count('adventureworks') as table_count,
     COALESCE((SELECT COUNT(*) FROM adventureworks.product), 0) as record_count,
     'Microsoft enterprise sample' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'adventureworks')
@@ -40,7 +66,7 @@ UNION ALL
 SELECT 
     'WorldWideImporters' as database_name,
     'wwi' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'wwi') as table_count,
+    table_count('wwi') as table_count,
     COALESCE((SELECT COUNT(*) FROM wwi.customers), 0) as record_count,
     'Modern Microsoft sample' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'wwi')
@@ -50,7 +76,7 @@ UNION ALL
 SELECT 
     'Chinook' as database_name,
     'chinook' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'chinook') as table_count,
+    table_count('chinook') as table_count,
     COALESCE((SELECT COUNT(*) FROM chinook.track), 0) as record_count,
     'Digital music store' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'chinook')
@@ -60,7 +86,7 @@ UNION ALL
 SELECT 
     'Sakila' as database_name,
     'sakila' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'sakila') as table_count,
+    table_count('sakila') as table_count,
     COALESCE((SELECT COUNT(*) FROM sakila.film), 0) as record_count,
     'DVD rental store' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'sakila')
@@ -70,13 +96,13 @@ UNION ALL
 SELECT 
     'HR Employees' as database_name,
     'hr' as schema_name,
-    (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'hr') as table_count,
+    table_count('hr') as table_count,
     COALESCE((SELECT COUNT(*) FROM hr.employees), 0) as record_count,
     'HR and hierarchical data' as description
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'hr');
 
--- Cross-database analytics view
-CREATE OR REPLACE VIEW cross_database_summary AS
+-- Cross-database analytics view (exact counts, scans every listed table)
+CREATE OR REPLACE VIEW cross_database_summary_exact AS
 SELECT 
     'Customer Analysis' as analysis_type,
     'Northwind' as source_database,
@@ -175,17 +201,120 @@ SELECT
 FROM hr.employees
 WHERE EXISTS (SELECT 1 FROM information_schema.schemata WHERE schema_name = 'hr');
 
+-- Materialized copies of the exact views. Reading them costs an index scan
+-- no matter how large the sample tables are; refresh them with
+-- refresh_dashboard() or scripts/refresh_dashboard.py
+CREATE MATERIALIZED VIEW IF NOT EXISTS database_inventory AS
+SELECT * FROM database_inventory_exact;
+
+CREATE UNIQUE INDEX IF NOT EXISTS database_inventory_name_idx
+    ON database_inventory (database_name);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS cross_database_summary AS
+SELECT * FROM cross_database_summary_exact;
+
+CREATE UNIQUE INDEX IF NOT EXISTS cross_database_summary_key_idx
+    ON cross_database_summary (analysis_type, source_database, metric);
+
+-- Estimated inventory from planner statistics (pg_class.reltuples, falling
+-- back to pg_stat_user_tables.n_live_tup for tables never analyzed).
+-- Always current to the last ANALYZE/autovacuum and never scans a table.
+CREATE OR REPLACE VIEW database_inventory_estimate AS
+SELECT
+    d.database_name,
+    d.schema_name,
+    (SELECT COUNT(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+     WHERE n.nspname = d.schema_name AND c.relkind IN ('r', 'p', 'v', 'm')
+       AND NOT c.relispartition
+       AND (d.schema_name <> 'public' OR c.relname = d.table_name)) as table_count,
+    COALESCE(
+        CASE WHEN c.reltuples >= 0 THEN c.reltuples::BIGINT END,
+        s.n_live_tup,
+        0
+    ) as record_count,
+    d.description
+FROM (VALUES
+    (1, 'Sample', 'public', 'students', 'Basic learning database'),
+    (2, 'Northwind', 'northwind', 'products', 'E-commerce database'),
+    (3, 'AdventureWorks', 'adventureworks', 'product', 'Microsoft enterprise sample'),
+    (4, 'WorldWideImporters', 'wwi', 'customers', 'Modern Microsoft sample'),
+    (5, 'Chinook', 'chinook', 'track', 'Digital music store'),
+    (6, 'Sakila', 'sakila', 'film', 'DVD rental store'),
+    (7, 'HR Employees', 'hr', 'employees', 'HR and hierarchical data')
+) AS d(sort_order, database_name, schema_name, table_name, description)
+JOIN pg_namespace n ON n.nspname = d.schema_name
+JOIN pg_class c ON c.relnamespace = n.oid AND c.relname = d.table_name
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+ORDER BY d.sort_order;
+
+-- Refresh bookkeeping: one row per refresh, with the change counter that
+-- was current at the time so unchanged data can be skipped next time
+CREATE TABLE IF NOT EXISTS refresh_log (
+    refresh_id SERIAL PRIMARY KEY,
+    view_name TEXT NOT NULL,
+    change_token BIGINT NOT NULL,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    duration_ms NUMERIC(12,3) NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS refresh_log_view_idx
+    ON refresh_log (view_name, refreshed_at DESC);
+
+-- Total row changes recorded by the statistics collector for the sample
+-- schemas, plus the tables' relfilenodes: TRUNCATE, VACUUM FULL and
+-- rewriting ALTERs bump no counter but give the table a new filenode.
+-- It changes whenever data is modified, so an unchanged token means the
+-- materialized views are still up to date.
+CREATE OR REPLACE FUNCTION change_token()
+RETURNS BIGINT AS $$
+    SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)::BIGINT
+         + COALESCE(SUM(pg_relation_filenode(relid)::BIGINT), 0)::BIGINT
+         + COUNT(*)
+    FROM pg_stat_user_tables
+    WHERE schemaname IN ('public', 'northwind', 'adventureworks', 'wwi', 'chinook', 'sakila', 'hr');
+$$ LANGUAGE sql STABLE;
+
+-- Refresh the materialized dashboard views if the data changed since the
+-- last refresh (or always, with force => true). Returns the refreshed views.
+CREATE OR REPLACE FUNCTION refresh_dashboard(force BOOLEAN DEFAULT FALSE)
+RETURNS TABLE(view_name TEXT, duration_ms NUMERIC) AS $$
+DECLARE
+    token BIGINT := dashboard.change_token();
+    mv TEXT;
+    started TIMESTAMP;
+BEGIN
+    FOREACH mv IN ARRAY ARRAY['database_inventory', 'cross_database_summary'] LOOP
+        IF force OR NOT EXISTS (
+            SELECT 1 FROM dashboard.refresh_log l
+            WHERE l.view_name = mv
+              AND l.change_token = token
+              AND l.refresh_id = (SELECT MAX(refresh_id) FROM dashboard.refresh_log WHERE refresh_log.view_name = mv)
+        ) THEN
+            started := clock_timestamp();
+            EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY dashboard.%I', mv);
+            view_name := mv;
+            duration_ms := ROUND((EXTRACT(EPOCH FROM clock_timestamp() - started) * 1000)::NUMERIC, 3);
+            INSERT INTO dashboard.refresh_log (view_name, change_token, duration_ms)
+            VALUES (mv, token, duration_ms);
+            RETURN NEXT;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
 -- Schema overview view
 CREATE OR REPLACE VIEW schema_overview AS
 SELECT 
-    schemaname as schema_name,
+    n.nspname as schema_name,
     COUNT(*) as table_count,
-    string_agg(tablename, ', ' ORDER BY tablename) as table_names
-FROM pg_tables 
-WHERE schemaname IN ('public', 'northwind', 'adventureworks', 'wwi', 'chinook', 'sakila', 'hr')
-GROUP BY schemaname
+    string_agg(c.relname::TEXT, ', ' ORDER BY c.relname) as table_names
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+  AND n.nspname IN ('public', 'northwind', 'adventureworks', 'wwi', 'chinook', 'sakila', 'hr')
+GROUP BY n.nspname
 ORDER BY 
-    CASE schemaname
+    CASE n.nspname
         WHEN 'public' THEN 1
         WHEN 'northwind' THEN 2
         WHEN 'adventureworks' THEN 3
@@ -197,37 +326,46 @@ ORDER BY
     END;
 
 -- Create a function to get database statistics
-CREATE OR REPLACE FUNCTION get_database_stats()
+-- Row counts are planner estimates by default; pass exact => true to count
+-- every table (slow on scaled-up data). A partitioned table is one row with
+-- the rows and size of all its partitions.
+DROP FUNCTION IF EXISTS get_database_stats();
+CREATE OR REPLACE FUNCTION get_database_stats(exact BOOLEAN DEFAULT FALSE)
 RETURNS TABLE(
     schema_name TEXT,
     table_name TEXT,
     row_count BIGINT,
     size_bytes BIGINT
 ) AS $$
+DECLARE
+    t RECORD;
 BEGIN
-    RETURN QUERY
-    SELECT 
-        t.schemaname::TEXT,
-        t.tablename::TEXT,
-        CASE 
-            WHEN t.schemaname = 'public' AND t.tablename = 'students' THEN 
-                (SELECT COUNT(*) FROM public.students)
-            WHEN t.schemaname = 'northwind' AND t.tablename = 'products' THEN 
-                (SELECT COUNT(*) FROM northwind.products)
-            WHEN t.schemaname = 'adventureworks' AND t.tablename = 'product' THEN 
-                (SELECT COUNT(*) FROM adventureworks.product)
-            WHEN t.schemaname = 'chinook' AND t.tablename = 'track' THEN 
-                (SELECT COUNT(*) FROM chinook.track)
-            WHEN t.schemaname = 'sakila' AND t.tablename = 'film' THEN 
-                (SELECT COUNT(*) FROM sakila.film)
-            WHEN t.schemaname = 'hr' AND t.tablename = 'employees' THEN 
-                (SELECT COUNT(*) FROM hr.employees)
-            ELSE 0
-        END AS row_count,
-        pg_total_relation_size(t.schemaname||'.'||t.tablename)::BIGINT as size_bytes
-    FROM pg_tables t
-    WHERE t.schemaname IN ('public', 'northwind', 'adventureworks', 'wwi', 'chinook', 'sakila', 'hr')
-    ORDER BY t.schemaname, t.tablename;
+    FOR t IN
+        SELECT n.nspname, c.relname, p.estimate, p.size_bytes
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        CROSS JOIN LATERAL (
+            SELECT SUM(COALESCE(CASE WHEN l.reltuples >= 0 THEN l.reltuples::BIGINT END, s.n_live_tup, 0))::BIGINT AS estimate,
+                   SUM(pg_total_relation_size(l.oid))::BIGINT AS size_bytes
+            FROM pg_partition_tree(c.oid) tree
+            JOIN pg_class l ON l.oid = tree.relid
+            LEFT JOIN pg_stat_user_tables s ON s.relid = l.oid
+            WHERE tree.isleaf
+        ) p
+        WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+          AND n.nspname IN ('public', 'northwind', 'adventureworks', 'wwi', 'chinook', 'sakila', 'hr')
+        ORDER BY n.nspname, c.relname
+    LOOP
+        schema_name := t.nspname;
+        table_name := t.relname;
+        IF exact THEN
+            EXECUTE format('SELECT COUNT(*) FROM %I.%I', t.nspname, t.relname) INTO row_count;
+        ELSE
+            row_count := COALESCE(t.estimate, 0);
+        END IF;
+        size_bytes := COALESCE(t.size_bytes, 0);
+        RETURN NEXT;
+    END LOOP;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -284,11 +422,14 @@ GRANT EXECUTE ON ALL FUNCTIONS IN SCHEMA dashboard TO vscode;
 -- Display instructions
 SELECT 'Dashboard views created successfully!' as status;
 SELECT 'Available views in dashboard schema:' as info;
-SELECT 'database_inventory - Overview of all loaded databases' as view_1;
-SELECT 'cross_database_summary - Cross-database analytics' as view_2;
+SELECT 'database_inventory - Overview of all loaded databases (materialized)' as view_1;
+SELECT 'cross_database_summary - Cross-database analytics (materialized)' as view_2;
 SELECT 'schema_overview - Schema and table summary' as view_3;
 SELECT 'sample_queries - Example queries for learning' as view_4;
+SELECT 'database_inventory_estimate - Live overview from planner statistics' as view_5;
+SELECT 'database_inventory_exact / cross_database_summary_exact - Exact counts (slow on large data)' as view_6;
 SELECT 'get_database_stats() - Function for detailed statistics' as function_1;
+SELECT 'refresh_dashboard() - Refresh the materialized views if data changed' as function_2;
 
 -- Sample usage
 SELECT 'Sample usage:' as usage_info;
@@ -297,3 +438,5 @@ SELECT 'SELECT * FROM dashboard.cross_database_summary;' as usage_2;
 SELECT 'SELECT * FROM dashboard.schema_overview;' as usage_3;
 SELECT 'SELECT * FROM dashboard.sample_queries WHERE difficulty = ''Beginner'';' as usage_4;
 SELECT 'SELECT * FROM dashboard.get_database_stats();' as usage_5;
+SELECT 'SELECT * FROM dashboard.get_database_stats(exact => true);' as usage_6;
+SELECT 'SELECT * FROM dashboard.refresh_dashboard();' as usage_7;
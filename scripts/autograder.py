@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Autograder for the SQL assignments.
+
+Instead of re-running every student notebook top to bottom, only the
+answer cells are extracted and run. An answer cell is a code cell whose
+first line is a marker naming the question:
+
+    -- ANSWER: q1                    # a SQL cell (may follow %%sql)
+    SELECT ...
+
+    # ANSWER: q2                     # a Python cell; the value of its
+    df = read_query("SELECT ...")    # last expression is the answer
+    df[df.amount > 5]
+
+Python answer cells of one notebook share a namespace (in notebook order)
+that already holds pd, np, read_query and conn.
+
+Submissions are graded in a process pool. Every worker opens one
+read-only connection (default_transaction_read_only, statement_timeout)
+and keeps it for all the submissions it grades. Each answer is reduced to
+a digest that ignores row order, column order and column names: columns
+are normalized (numbers as rounded floats, text as strings), rows are
+hashed with pandas.util.hash_pandas_object, and the sorted row hashes are
+hashed again. Only digests travel back to the parent process.
+
+The reference answers come from the solution notebook (default:
+assignments/<assignment>/solution.ipynb). They are computed once and
+cached under ~/.cache/data-management-classroom/autograder/, keyed by the
+solution cells, the database and the change counters of its tables, so
+a rerun after new submissions arrive only grades those.
+
+Submissions run as code: grade with a role that can only read the sample
+data.
+
+Usage:
+    python scripts/autograder.py assignment-01 submissions/
+    python scripts/autograder.py assignment-01 submissions/ --jobs 16 \\
+        --report grades.csv
+    python scripts/autograder.py assignment-01 alice.ipynb --solution key.ipynb
+"""
+
+import argparse
+import ast
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+import db
+import query_cache
+from query import read_query
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSIGNMENTS_DIR = os.path.join(REPO_DIR, 'assignments')
+CACHE_DIR = os.path.join(os.path.dirname(db.CACHE_FILE), 'autograder')
+
+JOBS = os.cpu_count() or 4
+STATEMENT_TIMEOUT = '30s'
+# Wall-clock limit for all answer cells of one submission, in seconds
+SUBMISSION_TIMEOUT = 120
+FLOAT_DECIMALS = 6
+
+MARKER = re.compile(r'^\s*(?:#|--)\s*ANSWER:\s*(\S+)\s*$', re.IGNORECASE)
+CELL_MAGIC = re.compile(r'^\s*%%sql\b.*$')
+
+_worker_conn = None
+_worker_params = None
+
+
+class SubmissionTimeout(Exception):
+    pass
+
+
+def load_notebook(path):
+    """
+    Parse a notebook file.
+
+    Tolerates a Markdown code fence around the JSON (```json ... ```), as
+    left behind by copying a notebook out of a rendered page.
+    """
+    with open(path, encoding='utf-8') as handle:
+        text = handle.read().strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    return json.loads(text)
+
+
+def answer_cells(notebook):
+    """
+    [(question, kind, source)] for the answer cells of a notebook.
+
+    kind is 'sql' or 'python'. A question answered twice keeps the last
+    cell, as re-running the notebook would.
+    """
+    answers = {}
+    for cell in notebook.get('cells', []):
+        if cell.get('cell_type') != 'code':
+            continue
+        source = cell.get('source', '')
+        if isinstance(source, list):
+            source = ''.join(source)
+        lines = source.splitlines()
+        kind = 'python'
+        if lines and CELL_MAGIC.match(lines[0]):
+            kind = 'sql'
+            lines = lines[1:]
+        match = MARKER.match(lines[0]) if lines else None
+        if not match:
+            continue
+        if lines[0].lstrip().startswith('--'):
+            kind = 'sql'
+        answers.pop(match.group(1), None)
+        answers[match.group(1)] = (kind, '\n'.join(lines[1:]))
+    return [(question, kind, body) for question, (kind, body) in answers.items()]
+
+
+def as_frame(value):
+    """Turn an answer value into a DataFrame (None if there is no answer)."""
+    if value is None:
+        return None
+    if isinstance(value, pd.DataFrame):
+        return value
+    if isinstance(value, pd.Series):
+        return value.to_frame()
+    if isinstance(value, (list, tuple)) and value and \
+            isinstance(value[0], (list, tuple)):
+        return pd.DataFrame.from_records(list(value))
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return pd.DataFrame({0: list(value)})
+    return pd.DataFrame({0: [value]})
+
+
+def _normalize_column(series, decimals=FLOAT_DECIMALS):
+    """A column as float64 (numbers) or str (everything else), NULLs unified."""
+    if series.isna().all():
+        return pd.Series(np.nan, index=series.index, dtype='float64')
+    if pd.api.types.is_bool_dtype(series):
+        return series.astype('float64')
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64').round(decimals)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('string').fillna('<NULL>')
+    values = series.dropna()
+    if len(values) and values.map(
+            lambda v: isinstance(v, (int, float, Decimal))
+            and not isinstance(v, bool)).all():
+        return pd.to_numeric(series.map(
+            lambda v: None if v is None else float(v)),
+            errors='coerce').round(decimals)
+    return series.map(lambda v: '<NULL>' if v is None or v is pd.NA
+                      or (isinstance(v, float) and np.isnan(v))
+                      else str(v))
+
+
+def frame_digest(df, decimals=FLOAT_DECIMALS):
+    """
+    Order-insensitive digest of a result set.
+
+    Row order, column order and column names do not matter; the values do
+    (floats compared to decimals places).
+    """
+    normalized = pd.DataFrame(
+        {i: _normalize_column(df.iloc[:, i], decimals)
+         for i in range(df.shape[1])})
+    # Canonical column order: by a digest of each column's sorted values
+    column_keys = []
+    for i in normalized.columns:
+        hashes = np.sort(pd.util.hash_pandas_object(
+            normalized[i], index=False).to_numpy())
+        column_keys.append((hashlib.sha256(hashes.tobytes()).hexdigest(), i))
+    normalized = normalized[[i for _, i in sorted(column_keys)]]
+
+    digest = hashlib.sha256(f'{df.shape[1]}:'.encode())
+    if len(normalized) and df.shape[1]:
+        rows = np.sort(pd.util.hash_pandas_object(
+            normalized, index=False).to_numpy())
+        digest.update(rows.tobytes())
+    return digest.hexdigest()
+
+
+def summarize(df):
+    return {'digest': frame_digest(df), 'rows': len(df), 'columns': df.shape[1]}
+
+
+def run_cell(conn, kind, source, namespace):
+    """Run one answer cell and return its result as a DataFrame."""
+    if kind == 'sql':
+        return read_query(source, conn=conn)
+    tree = ast.parse(source)
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, '<answer>', 'exec'), namespace)
+    if last is None:
+        return None
+    return as_frame(eval(compile(last, '<answer>', 'eval'), namespace))
+
+
+def grade_cells(conn, cells):
+    """{question: summary or {'error': message}} for a notebook's answer cells."""
+    namespace = {'pd': pd, 'np': np, 'conn': conn,
+                 'read_query': lambda sql, params=None:
+                     read_query(sql, params, conn=conn)}
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()), \
+            contextlib.redirect_stderr(io.StringIO()):
+        for question, kind, source in cells:
+            try:
+                df = run_cell(conn, kind, source, namespace)
+                results[question] = (summarize(df) if df is not None
+                                     else {'error': 'no result'})
+            except SubmissionTimeout:
+                raise
+            except Exception as e:  # student code can raise anything
+                results[question] = {
+                    'error': f'{type(e).__name__}: {str(e).strip()}'[:300]}
+            finally:
+                if not conn.closed:
+                    conn.rollback()
+    return results
+
+
+def read_only_connection(params):
+    options = ('-c default_transaction_read_only=on '
+               f'-c statement_timeout={STATEMENT_TIMEOUT}')
+    conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT,
+                            options=options, **params)
+    conn.set_session(readonly=True)
+    return conn
+
+
+def _init_worker(params):
+    global _worker_conn, _worker_params
+    _worker_params = params
+    _worker_conn = read_only_connection(params)
+
+
+def _on_alarm(signum, frame):
+    raise SubmissionTimeout()
+
+
+def _grade_submission(path):
+    """Worker: grade one notebook with the worker's connection."""
+    global _worker_conn
+    started = time.perf_counter()
+    try:
+        cells = answer_cells(load_notebook(path))
+    except (OSError, ValueError) as e:
+        return path, {'error': f'unreadable notebook: {e}'}, 0.0
+
+    if _worker_conn.closed:
+        _worker_conn = read_only_connection(_worker_params)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.alarm(SUBMISSION_TIMEOUT)
+    try:
+        results = grade_cells(_worker_conn, cells)
+    except SubmissionTimeout:
+        _worker_conn.cancel()
+        results = {'error': f'timed out after {SUBMISSION_TIMEOUT}s'}
+    finally:
+        signal.alarm(0)
+    return path, results, time.perf_counter() - started
+
+
+def reference_key(conn, params, cells):
+    """Cache key for reference answers: solution cells, database, table counters."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(cells).encode())
+    digest.update(json.dumps([params.get(k) for k in
+                              ('host', 'port', 'dbname')]).encode())
+    with conn.cursor() as cursor:
+        cursor.execute(query_cache.SCHEMA_TOKENS_SQL)
+        digest.update(json.dumps(sorted(cursor.fetchall())).encode())
+    conn.rollback()
+    return digest.hexdigest()
+
+
+def reference_answers(assignment, solution, params, refresh=False):
+    """{question: summary} from the solution notebook, cached on disk."""
+    cells = answer_cells(load_notebook(solution))
+    if not cells:
+        raise ValueError(f"{solution} has no answer cells")
+    conn = read_only_connection(params)
+    try:
+        key = reference_key(conn, params, cells)
+        path = os.path.join(CACHE_DIR, f'{assignment}-{key[:16]}.json')
+        if not refresh and os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle), True
+        answers = grade_cells(conn, cells)
+    finally:
+        conn.close()
+
+    failed = {q: r['error'] for q, r in answers.items() if 'error' in r}
+    if failed:
+        raise ValueError(f"solution cells failed: {failed}")
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(answers, handle, indent=2, sort_keys=True)
+    return answers, False
+
+
+def score(results, reference):
+    """(points, feedback) of a submission's results against the reference."""
+    if 'error' in results and not isinstance(results['error'], dict):
+        return 0, {'notebook': results['error']}
+    points = 0
+    feedback = {}
+    for question, expected in reference.items():
+        got = results.get(question)
+        if got is None:
+            feedback[question] = 'no answer cell'
+        elif 'error' in got:
+            feedback[question] = got['error']
+        elif got['digest'] == expected['digest']:
+            points += 1
+            feedback[question] = 'correct'
+        else:
+            feedback[question] = (f"wrong result: {got['rows']} rows x "
+                                  f"{got['columns']} columns, expected "
+                                  f"{expected['rows']} x {expected['columns']}")
+    return points, feedback
+
+
+def find_submissions(paths, solution):
+    """Notebook files given directly or found under directories."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                found += [os.path.join(root, name) for name in sorted(files)
+                          if name.endswith('.ipynb')
+                          and '.ipynb_checkpoints' not in root]
+        else:
+            found.append(path)
+    solution = os.path.abspath(solution)
+    return [path for path in found if os.path.abspath(path) != solution]
+
+
+def student_name(path, base_paths):
+    """Student label: the path below the submissions directory."""
+    for base in base_paths:
+        if os.path.isdir(base):
+            relative = os.path.relpath(path, base)
+            if not relative.startswith('..'):
+                return relative
+    return os.path.basename(path)
+
+
+def write_report(path, rows, questions):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['submission', 'points', 'total', *questions])
+        for name, points, feedback in rows:
+            writer.writerow([name, points, len(questions),
+                             *(feedback.get(q, feedback.get('notebook', ''))
+                               for q in questions)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Grade assignment notebooks against a solution notebook")
+    parser.add_argument('assignment', help='assignment name, e.g. assignment-01')
+    parser.add_argument('submissions', nargs='+',
+                        help='submission notebooks or directories of them')
+    parser.add_argument('--solution', metavar='PATH',
+                        help='solution notebook (default: '
+                             'assignments/<assignment>/solution.ipynb)')
+    parser.add_argument('--jobs', '-j', type=int, default=JOBS,
+                        help=f'worker processes (default: {JOBS})')
+    parser.add_argument('--report', metavar='PATH',
+                        help='write grades and feedback as CSV')
+    parser.add_argument('--refresh', action='store_true',
+                        help='recompute the cached reference answers')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    solution = args.solution or os.path.join(
+        ASSIGNMENTS_DIR, args.assignment, 'solution.ipynb')
+    print(f"📝 Grading {args.assignment}")
+    print("=" * 50)
+    try:
+        params = db.params_from_args(args)
+        reference, cached = reference_answers(args.assignment, solution,
+                                              params, args.refresh)
+    except (OSError, ValueError, psycopg2.Error) as e:
+        print(f"❌ Reference answers: {e}")
+        return 1
+    questions = sorted(reference)
+    print(f"🔑 {len(questions)} questions from {solution}"
+          f"{' (cached)' if cached else ''}")
+
+    submissions = find_submissions(args.submissions, solution)
+    if not submissions:
+        print("❌ No submissions found")
+        return 1
+    print(f"🚀 {len(submissions)} submissions, {args.jobs} workers")
+
+    started = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                             initargs=(params,)) as executor:
+        futures = [executor.submit(_grade_submission, path)
+                   for path in submissions]
+        for future in as_completed(futures):
+            path, results, seconds = future.result()
+            points, feedback = score(results, reference)
+            name = student_name(path, args.submissions)
+            rows.append((name, points, feedback))
+            icon = '✅' if points == len(questions) else '⚠️'
+            print(f"   {icon} {name:<40} {points}/{len(questions)} "
+                  f"({seconds:.1f}s)")
+
+    rows.sort()
+    elapsed = time.perf_counter() - started
+    mean = sum(points for _, points, _ in rows) / len(rows)
+    print(f"\n📊 {len(rows)} graded in {elapsed:.1f}s, "
+          f"mean {mean:.2f}/{len(questions)}")
+    if args.report:
+        write_report(args.report, rows, questions)
+        print(f"📝 Grades written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the canonical queries of every sample schema.
+
+Each query in canonical_queries.py is run a few times to warm the cache,
+then timed over --iterations runs. The result records latency percentiles
+(p50/p95/p99, min, mean), the row count, and the shared buffer hits and
+reads from one EXPLAIN (ANALYZE, BUFFERS) run.
+
+With --scale the schemas are regenerated with generate_data.py at every
+listed scale factor before they are benchmarked (this REPLACES the data
+in those schemas). Without it the data currently loaded is benchmarked
+under the label "current".
+
+Results are written as JSON. With --baseline the run is compared with a
+stored result file and the script exits with 1 when a query got slower
+than the threshold, in p50 latency or in buffers touched (the buffer
+counts do not depend on machine load, so they catch plan regressions
+reliably).
+
+Usage:
+    python scripts/benchmark.py                              # current data
+    python scripts/benchmark.py --save-baseline              # store baseline
+    python scripts/benchmark.py --baseline scripts/benchmarks/baseline.json
+    python scripts/benchmark.py --schema sakila --scale 1 10 --iterations 20
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import psycopg2
+
+import db
+from canonical_queries import QUERIES, iter_queries
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmarks')
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+# Database file (databases/<name>.sql) behind each schema, for --scale
+SCHEMA_DATABASES = {
+    'hr': 'hr_employees',
+    'wwi': 'worldwideimporters',
+}
+
+WARMUP = 2
+ITERATIONS = 10
+# A query regresses when it is this much slower than the baseline...
+THRESHOLD = 0.25
+# ...and at least this many milliseconds slower (sub-ms noise is ignored)
+MIN_REGRESSION_MS = 1.0
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def buffer_counts(cursor, sql):
+    """Shared buffer hits and reads of one EXPLAIN (ANALYZE, BUFFERS) run."""
+    cursor.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + sql)
+    plan = cursor.fetchone()[0][0]['Plan']
+    return {'shared_hit': plan.get('Shared Hit Blocks', 0),
+            'shared_read': plan.get('Shared Read Blocks', 0)}
+
+
+def run_query(cursor, sql, iterations=ITERATIONS, warmup=WARMUP):
+    """Time a query and return its benchmark record."""
+    for _ in range(warmup):
+        cursor.execute(sql)
+        cursor.fetchall()
+
+    timings = []
+    rows = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        rows = len(cursor.fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'rows': rows,
+        'iterations': iterations,
+        'min_ms': min(timings),
+        'mean_ms': statistics.fmean(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        **buffer_counts(cursor, sql),
+    }
+
+
+def run_suite(conn, schemas, iterations=ITERATIONS, warmup=WARMUP):
+    """{"schema.name": record} for every canonical query of the schemas."""
+    results = {}
+    with conn.cursor() as cursor:
+        for schema, name, sql in iter_queries(schemas):
+            key = f'{schema}.{name}'
+            try:
+                results[key] = run_query(cursor, sql, iterations, warmup)
+            except psycopg2.Error as e:
+                conn.rollback()
+                results[key] = {'error': str(e).strip()}
+                print(f"   ❌ {key}: {e}")
+                continue
+            record = results[key]
+            print(f"   {key:<40} p50 {record['p50_ms']:>9.2f} ms   "
+                  f"p95 {record['p95_ms']:>9.2f} ms   "
+                  f"{record['shared_hit'] + record['shared_read']:>8} buffers")
+            # Read-only transaction; don't hold a snapshot across queries
+            conn.rollback()
+    return results
+
+
+def generate(schemas, scale, args):
+    """Regenerate the schemas at a scale factor with generate_data.py."""
+    import generate_data
+
+    databases = [SCHEMA_DATABASES.get(schema, schema) for schema in schemas]
+    argv = [*databases, '--scale', str(scale)]
+    for option in ('host', 'port', 'user', 'dbname'):
+        value = getattr(args, option)
+        if value:
+            argv += [f'--{option}', value]
+    return generate_data.main(argv) == 0
+
+
+def compare(current, baseline, threshold=THRESHOLD,
+            min_ms=MIN_REGRESSION_MS):
+    """
+    List of regressions of current against baseline.
+
+    Only scale factors and queries present in both runs are compared.
+    """
+    regressions = []
+    for scale, queries in current['scales'].items():
+        old_queries = baseline.get('scales', {}).get(scale, {})
+        for key, new in queries.items():
+            old = old_queries.get(key)
+            if not old or 'error' in old or 'error' in new:
+                continue
+            if (new['p50_ms'] > old['p50_ms'] * (1 + threshold)
+                    and new['p50_ms'] - old['p50_ms'] >= min_ms):
+                regressions.append(
+                    f"{scale} {key}: p50 {old['p50_ms']:.2f} -> "
+                    f"{new['p50_ms']:.2f} ms")
+            old_buffers = old['shared_hit'] + old['shared_read']
+            new_buffers = new['shared_hit'] + new['shared_read']
+            if new_buffers > old_buffers * (1 + threshold) + 10:
+                regressions.append(
+                    f"{scale} {key}: buffers {old_buffers} -> {new_buffers}")
+    return regressions
+
+
+def write_json(data, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(data, handle, indent=2, sort_keys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the canonical queries of the sample schemas")
+    parser.add_argument('--schema', action='append', choices=sorted(QUERIES),
+                        help='schema to benchmark (repeatable, default: all)')
+    parser.add_argument('--scale', type=float, nargs='+',
+                        help='regenerate the schemas at these scale factors '
+                             '(replaces their data)')
+    parser.add_argument('--iterations', type=int, default=ITERATIONS,
+                        help=f'timed runs per query (default: {ITERATIONS})')
+    parser.add_argument('--warmup', type=int, default=WARMUP,
+                        help=f'untimed runs per query (default: {WARMUP})')
+    parser.add_argument('--output', metavar='PATH',
+                        help='results file (default: '
+                             'scripts/benchmarks/results/<time>.json)')
+    parser.add_argument('--baseline', metavar='PATH',
+                        help='compare with this results file and fail on '
+                             'regressions')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'also store the results as {BASELINE_FILE}')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help=f'allowed slowdown as a fraction '
+                             f'(default: {THRESHOLD})')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    schemas = args.schema or list(QUERIES)
+    started = time.strftime('%Y-%m-%dT%H:%M:%S')
+    report = {
+        'started': started,
+        'host': platform.node(),
+        'iterations': args.iterations,
+        'schemas': schemas,
+        'scales': {},
+    }
+
+    print("⏱️ Query Benchmark")
+    print("=" * 50)
+    for scale in args.scale or [None]:
+        label = 'current' if scale is None else f'x{scale:g}'
+        if scale is not None:
+            print(f"\n🏭 Generating data at scale factor {scale:g}...")
+            if not generate(schemas, scale, args):
+                print("❌ Data generation failed")
+                return 1
+
+        print(f"\n📊 Scale {label}")
+        try:
+            conn = db.connect(**db.overrides_from_args(args))
+        except psycopg2.Error as e:
+            print(f"❌ Could not connect: {e}")
+            return 1
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version()")
+                report['server'] = cursor.fetchone()[0]
+            report['scales'][label] = run_suite(conn, schemas,
+                                                args.iterations, args.warmup)
+        finally:
+            conn.close()
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, 'results', started.replace(':', '') + '.json')
+    write_json(report, output)
+    print(f"\n📝 Results written to {output}")
+    if args.save_baseline:
+        write_json(report, BASELINE_FILE)
+        print(f"📌 Baseline saved to {BASELINE_FILE}")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding='utf-8') as handle:
+                baseline = json.load(handle)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read baseline: {e}")
+            return 1
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) against "
+                  f"{args.baseline}:")
+            for regression in regressions:
+                print(f"   {regression}")
+            return 1
+        print(f"\n✅ No regressions against {args.baseline}")
+
+    errors = sum('error' in record for queries in report['scales'].values()
+                 for record in queries.values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Parallel bulk loader for the sample databases.
+
+Each databases/*.sql file is split into three phases:
+  1. pre-data  - CREATE SCHEMA / CREATE TABLE (with inline REFERENCES removed)
+  2. data      - multi-row INSERT ... VALUES blocks streamed with COPY FROM STDIN
+  3. post-data - foreign keys, indexes, views and grants
+
+Independent schemas are loaded in a process pool; dashboard.sql depends on
+all of them and is loaded last.
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import psycopg2
+
+import db
+
+DATABASES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'databases'
+)
+
+# Schemas with no dependencies on each other, loaded in parallel
+INDEPENDENT_DATABASES = [
+    'sample',
+    'northwind',
+    'adventureworks',
+    'worldwideimporters',
+    'chinook',
+    'sakila',
+    'hr_employees',
+]
+
+# Loaded after everything above because its views read every schema
+DEPENDENT_DATABASES = ['dashboard']
+
+INLINE_REFERENCES = re.compile(
+    r'\s+REFERENCES\s+(\w+(?:\.\w+)?)\s*\(([^)]*)\)', re.IGNORECASE
+)
+CREATE_TABLE = re.compile(
+    r'^CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+(?:\.\w+)?)\s*\(',
+    re.IGNORECASE
+)
+INSERT_VALUES = re.compile(
+    r'^INSERT\s+INTO\s+(\w+(?:\.\w+)?)\s*\(([^)]*)\)\s*VALUES\s*(.*)$',
+    re.IGNORECASE | re.DOTALL
+)
+NUMBER = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+
+def split_statements(sql):
+    """Split a SQL script into statements, honouring quotes and $$ bodies."""
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        char = sql[i]
+        if char == '-' and sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if char in ("'", '"'):
+            end = i + 1
+            while end < length:
+                if sql[end] == char:
+                    if end + 1 < length and sql[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if char == '$':
+            match = re.match(r'\$\w*\$', sql[i:])
+            if match:
+                tag = match.group(0)
+                end = sql.find(tag, i + len(tag))
+                end = length if end == -1 else end + len(tag)
+                current.append(sql[i:end])
+                i = end
+                continue
+        if char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+            i += 1
+            continue
+        current.append(char)
+        i += 1
+
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def parse_values(text):
+    """
+    Parse the tuples of a VALUES list into Python rows.
+
+    Only plain literals are supported (quoted strings, numbers, NULL and
+    booleans). Returns None for anything else so the caller can fall back
+    to running the INSERT as-is.
+    """
+    rows = []
+    i = 0
+    length = len(text)
+
+    def skip_space(pos):
+        while pos < length and text[pos].isspace():
+            pos += 1
+        return pos
+
+    i = skip_space(i)
+    while i < length:
+        if text[i] != '(':
+            return None
+        i += 1
+        row = []
+        while True:
+            i = skip_space(i)
+            if i >= length:
+                return None
+            if text[i] == "'":
+                end = i + 1
+                chunks = []
+                while True:
+                    quote = text.find("'", end)
+                    if quote == -1:
+                        return None
+                    chunks.append(text[end:quote])
+                    if quote + 1 < length and text[quote + 1] == "'":
+                        chunks.append("'")
+                        end = quote + 2
+                        continue
+                    break
+                row.append(''.join(chunks))
+                i = quote + 1
+            else:
+                match = re.match(r"[^,()\s]+", text[i:])
+                if not match:
+                    return None
+                token = match.group(0)
+                upper = token.upper()
+                if upper == 'NULL':
+                    row.append(None)
+                elif upper in ('TRUE', 'FALSE'):
+                    row.append(upper == 'TRUE')
+                elif NUMBER.match(token):
+                    row.append(token)
+                else:
+                    return None
+                i += len(token)
+            i = skip_space(i)
+            if i < length and text[i] == ',':
+                i += 1
+                continue
+            if i < length and text[i] == ')':
+                i += 1
+                break
+            return None
+        rows.append(row)
+        i = skip_space(i)
+        if i < length and text[i] == ',':
+            i = skip_space(i + 1)
+            continue
+        if i < length:
+            return None
+    return rows
+
+
+def copy_escape(value):
+    """Render one value in PostgreSQL COPY text format."""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+
+def rows_to_copy_buffer(rows):
+    """Turn parsed rows into an in-memory COPY text stream."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_escape(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def strip_inline_references(statement):
+    """
+    Remove column-level REFERENCES clauses from a CREATE TABLE statement.
+
+    Returns the rewritten statement and a list of ALTER TABLE statements
+    that add the same foreign keys once the data is in place.
+    """
+    match = CREATE_TABLE.match(statement)
+    if not match:
+        return statement, []
+    table = match.group(1)
+    body_start = match.end()
+    body_end = statement.rfind(')')
+    body = statement[body_start:body_end]
+
+    columns = []
+    depth = 0
+    current = []
+    for char in body:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            columns.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    columns.append(''.join(current))
+
+    foreign_keys = []
+    rewritten = []
+    for column in columns:
+        reference = INLINE_REFERENCES.search(column)
+        name = column.split()[0] if column.split() else ''
+        if reference and name.upper() not in ('PRIMARY', 'FOREIGN',
+                                              'CONSTRAINT', 'UNIQUE'):
+            foreign_keys.append(
+                f'ALTER TABLE {table} ADD FOREIGN KEY ({name}) '
+                f'REFERENCES {reference.group(1)}({reference.group(2)})'
+            )
+            column = INLINE_REFERENCES.sub('', column)
+        rewritten.append(column)
+
+    new_statement = (statement[:body_start] + ','.join(rewritten)
+                     + statement[body_end:])
+    return new_statement, foreign_keys
+
+
+def plan_load(sql):
+    """
+    Split a SQL script into pre-data, data and post-data steps.
+
+    Every step is a tuple of (kind, payload) where kind is 'sql' or 'copy'.
+    """
+    pre_data, data, post_data = [], [], []
+    for statement in split_statements(sql):
+        upper = statement.lstrip().upper()
+        if upper.startswith('SELECT'):
+            # Status banners such as "SELECT '... loaded successfully!'"
+            continue
+        if upper.startswith(('CREATE SCHEMA', 'SET ')):
+            pre_data.append(('sql', statement))
+        elif CREATE_TABLE.match(statement):
+            table_sql, foreign_keys = strip_inline_references(statement)
+            pre_data.append(('sql', table_sql))
+            post_data.extend(('sql', fk) for fk in foreign_keys)
+        elif upper.startswith('INSERT'):
+            match = INSERT_VALUES.match(statement)
+            rows = parse_values(match.group(3)) if match else None
+            if rows is None:
+                data.append(('sql', statement))
+            else:
+                columns = ', '.join(c.strip() for c in match.group(2).split(','))
+                data.append(('copy', (match.group(1), columns, rows)))
+        else:
+            # ALTER TABLE ... FOREIGN KEY, CREATE INDEX, views, functions,
+            # grants: everything that is cheaper to build after the data
+            post_data.append(('sql', statement))
+    return pre_data, data, post_data
+
+
+def load_file(sql_path, params):
+    """Load one SQL file in a single transaction. Runs in a worker process."""
+    name = os.path.basename(sql_path)[:-len('.sql')]
+    started = time.perf_counter()
+    result = {'name': name, 'rows': 0, 'errors': [], 'seconds': 0.0}
+
+    with open(sql_path, encoding='utf-8') as handle:
+        pre_data, data, post_data = plan_load(handle.read())
+
+    conn = psycopg2.connect(options=db.MAINTENANCE_OPTIONS, **params)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET synchronous_commit TO off")
+        for kind, payload in pre_data + data + post_data:
+            # Each step gets a savepoint so one bad statement behaves like
+            # psql -f: it is reported and the rest of the file still loads
+            cursor.execute("SAVEPOINT step")
+            try:
+                if kind == 'copy':
+                    table, columns, rows = payload
+                    cursor.copy_expert(
+                        f"COPY {table} ({columns}) FROM STDIN",
+                        rows_to_copy_buffer(rows)
+                    )
+                    result['rows'] += len(rows)
+                else:
+                    cursor.execute(payload)
+                cursor.execute("RELEASE SAVEPOINT step")
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT step")
+                first_line = (payload if kind == 'sql'
+                              else f"COPY {payload[0]}").splitlines()[0]
+                result['errors'].append(f"{first_line[:60]}: "
+                                        f"{str(e).strip().splitlines()[0]}")
+        conn.commit()
+
+        # Fresh planner statistics for the tables we just filled
+        copied = sorted({payload[0] for kind, payload in data
+                         if kind == 'copy'})
+        if copied:
+            conn.autocommit = True
+            cursor.execute(f"ANALYZE {', '.join(copied)}")
+        cursor.close()
+    finally:
+        conn.close()
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def print_result(result):
+    """Print one load result in the same style as the other scripts."""
+    status = "✅" if not result['errors'] else "⚠️"
+    print(f"{status} {result['name']}: {result['rows']} rows "
+          f"in {result['seconds']:.2f}s")
+    for error in result['errors']:
+        print(f"    ❌ {error}")
+
+
+def bulk_load(names, params, jobs=None, databases_dir=DATABASES_DIR):
+    """Load the named databases, independent ones in parallel."""
+    independent = [n for n in names if n not in DEPENDENT_DATABASES]
+    dependent = [n for n in names if n in DEPENDENT_DATABASES]
+    results = []
+
+    missing = [n for n in names
+               if not os.path.exists(os.path.join(databases_dir, f"{n}.sql"))]
+    for name in missing:
+        print(f"❌ Database file not found: {name}.sql")
+    independent = [n for n in independent if n not in missing]
+    dependent = [n for n in dependent if n not in missing]
+
+    if independent:
+        workers = jobs or min(len(independent), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(load_file,
+                            os.path.join(databases_dir, f"{n}.sql"),
+                            params): n
+                for n in independent
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'name': futures[future], 'rows': 0,
+                              'errors': [str(e)], 'seconds': 0.0}
+                print_result(result)
+                results.append(result)
+
+    for name in dependent:
+        try:
+            result = load_file(os.path.join(databases_dir, f"{name}.sql"),
+                               params)
+        except Exception as e:
+            result = {'name': name, 'rows': 0, 'errors': [str(e)],
+                      'seconds': 0.0}
+        print_result(result)
+        results.append(result)
+
+    return results, missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('databases', nargs='*',
+                        help='databases to load (default: all)')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='parallel worker processes')
+    parser.add_argument('--databases-dir', default=DATABASES_DIR)
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    names = args.databases or INDEPENDENT_DATABASES + DEPENDENT_DATABASES
+    try:
+        params = db.params_from_args(args)
+    except psycopg2.Error as e:
+        print(f"❌ Cannot connect to database: {e}")
+        return 1
+
+    print("🚀 Bulk loading sample databases")
+    print("=" * 50)
+    started = time.perf_counter()
+    results, missing = bulk_load(names, params, args.jobs, args.databases_dir)
+    elapsed = time.perf_counter() - started
+
+    total_rows = sum(r['rows'] for r in results)
+    failed = [r for r in results if r['errors']]
+    print("=" * 50)
+    print(f"📊 Loaded {total_rows} rows from {len(results)} files "
+          f"in {elapsed:.2f}s")
+    if failed or missing:
+        print(f"⚠️ {len(failed) + len(missing)} files reported errors")
+        return 1
+    print("🎉 All databases loaded successfully!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
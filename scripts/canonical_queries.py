@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Canonical queries for the sample schemas.
+
+A small, fixed set of the lookups, joins, aggregates, window functions
+and top-N queries the assignments run against each schema. The index
+advisor uses them to find filter columns and to time plans before and
+after indexing, and benchmark.py tracks their latency over time; keep
+them free of hard-coded ids and dates so they work at any scale factor.
+
+Usage:
+    from canonical_queries import QUERIES
+
+    for schema, queries in QUERIES.items():
+        for name, sql in queries.items():
+            ...
+"""
+
+QUERIES = {
+    'sakila': {
+        'customer_rentals': """
+            SELECT r.rental_id, r.rental_date, f.title
+            FROM sakila.rental r
+            JOIN sakila.inventory i ON i.inventory_id = r.inventory_id
+            JOIN sakila.film f ON f.film_id = i.film_id
+            WHERE r.customer_id = (SELECT min(customer_id) FROM sakila.customer)
+        """,
+        'recent_payments': """
+            SELECT p.payment_id, p.amount, p.payment_date
+            FROM sakila.payment p
+            WHERE p.payment_date >= (SELECT max(payment_date) FROM sakila.payment)
+                                    - INTERVAL '1 day'
+        """,
+        'film_cast': """
+            SELECT a.first_name, a.last_name
+            FROM sakila.film_actor fa
+            JOIN sakila.actor a ON a.actor_id = fa.actor_id
+            WHERE fa.film_id = (SELECT min(film_id) FROM sakila.film)
+        """,
+        'rentals_per_store': """
+            SELECT i.store_id, count(*) AS rentals
+            FROM sakila.rental r
+            JOIN sakila.inventory i ON i.inventory_id = r.inventory_id
+            GROUP BY i.store_id
+        """,
+        'top_customers': """
+            SELECT c.customer_id, c.first_name, c.last_name, sum(p.amount) AS spent
+            FROM sakila.payment p
+            JOIN sakila.customer c ON c.customer_id = p.customer_id
+            GROUP BY c.customer_id, c.first_name, c.last_name
+            ORDER BY spent DESC
+            LIMIT 10
+        """,
+        'rental_gaps': """
+            SELECT customer_id, rental_date,
+                   rental_date - lag(rental_date) OVER (
+                       PARTITION BY customer_id ORDER BY rental_date) AS gap
+            FROM sakila.rental
+            WHERE customer_id <= (SELECT min(customer_id) + 100
+                                  FROM sakila.customer)
+        """,
+    },
+    'chinook': {
+        'invoice_lines': """
+            SELECT il.invoice_line_id, t.name, il.unit_price, il.quantity
+            FROM chinook.invoice_line il
+            JOIN chinook.track t ON t.track_id = il.track_id
+            WHERE il.invoice_id = (SELECT min(invoice_id) FROM chinook.invoice)
+        """,
+        'playlist_tracks': """
+            SELECT t.name
+            FROM chinook.playlist_track pt
+            JOIN chinook.track t ON t.track_id = pt.track_id
+            WHERE pt.playlist_id = (SELECT min(playlist_id) FROM chinook.playlist)
+        """,
+        'sales_by_genre': """
+            SELECT g.name, sum(il.unit_price * il.quantity) AS revenue
+            FROM chinook.invoice_line il
+            JOIN chinook.track t ON t.track_id = il.track_id
+            JOIN chinook.genre g ON g.genre_id = t.genre_id
+            GROUP BY g.name
+        """,
+        'top_tracks': """
+            SELECT t.track_id, t.name, sum(il.quantity) AS sold
+            FROM chinook.invoice_line il
+            JOIN chinook.track t ON t.track_id = il.track_id
+            GROUP BY t.track_id, t.name
+            ORDER BY sold DESC, t.track_id
+            LIMIT 10
+        """,
+        'customer_running_total': """
+            SELECT customer_id, invoice_date, total,
+                   sum(total) OVER (PARTITION BY customer_id
+                                    ORDER BY invoice_date) AS running_total
+            FROM chinook.invoice
+        """,
+    },
+    'northwind': {
+        'customer_orders': """
+            SELECT o.order_id, o.order_date, sum(od.unit_price * od.quantity)
+            FROM northwind.orders o
+            JOIN northwind.order_details od ON od.order_id = o.order_id
+            WHERE o.customer_id = (SELECT min(customer_id) FROM northwind.customers)
+            GROUP BY o.order_id, o.order_date
+        """,
+        'recent_orders': """
+            SELECT order_id, customer_id, order_date
+            FROM northwind.orders
+            WHERE order_date >= (SELECT max(order_date) FROM northwind.orders) - 30
+        """,
+        'product_rank': """
+            SELECT c.category_name, p.product_name, p.unit_price,
+                   rank() OVER (PARTITION BY p.category_id
+                                ORDER BY p.unit_price DESC) AS price_rank
+            FROM northwind.products p
+            JOIN northwind.categories c ON c.category_id = p.category_id
+        """,
+    },
+    'adventureworks': {
+        'customer_orders': """
+            SELECT h.sales_order_id, h.order_date, h.total_due
+            FROM adventureworks.sales_order_header h
+            WHERE h.customer_id = (SELECT min(customer_id)
+                                   FROM adventureworks.customer)
+        """,
+        'product_sales': """
+            SELECT p.name, sum(d.line_total) AS revenue
+            FROM adventureworks.sales_order_detail d
+            JOIN adventureworks.product p ON p.product_id = d.product_id
+            GROUP BY p.name
+        """,
+        'top_orders': """
+            SELECT sales_order_id, customer_id, total_due
+            FROM adventureworks.sales_order_header
+            ORDER BY total_due DESC
+            LIMIT 10
+        """,
+    },
+    'wwi': {
+        'order_lines': """
+            SELECT ol.order_line_id, si.stock_item_name, ol.quantity
+            FROM wwi.order_lines ol
+            JOIN wwi.stock_items si ON si.stock_item_id = ol.stock_item_id
+            WHERE ol.order_id = (SELECT min(order_id) FROM wwi.orders)
+        """,
+        'recent_invoices': """
+            SELECT invoice_id, customer_id, invoice_date
+            FROM wwi.invoices
+            WHERE invoice_date >= (SELECT max(invoice_date) FROM wwi.invoices) - 7
+        """,
+    },
+    'hr': {
+        'department_staff': """
+            SELECT e.first_name, e.last_name, j.job_title
+            FROM hr.employees e
+            JOIN hr.jobs j ON j.job_id = e.job_id
+            WHERE e.department_id = (SELECT min(department_id) FROM hr.departments)
+        """,
+        'salary_band': """
+            SELECT e.employee_id, e.salary, j.min_salary, j.max_salary
+            FROM hr.employees e
+            JOIN hr.jobs j ON j.job_id = e.job_id
+            WHERE e.salary > j.max_salary * 0.9
+        """,
+        'salary_rank': """
+            SELECT department_id, employee_id, salary,
+                   dense_rank() OVER (PARTITION BY department_id
+                                      ORDER BY salary DESC) AS salary_rank
+            FROM hr.employees
+        """,
+    },
+}
+
+
+def iter_queries(schemas=None):
+    """Yield (schema, name, sql) for the given schemas (default: all)."""
+    for schema, queries in QUERIES.items():
+        if schemas and schema not in schemas:
+            continue
+        for name, sql in queries.items():
+            yield schema, name, sql
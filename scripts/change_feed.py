@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+"""
+Change feed from the sample schemas into the processed outputs.
+
+Instead of re-reading whole tables after a few rows changed, the feed
+follows PostgreSQL logical decoding (the test_decoding plugin shipped
+with the server) through a replication slot:
+
+- `setup` checks wal_level, gives tables without a primary key REPLICA
+  IDENTITY FULL (so their updates and deletes can be matched) and creates
+  the slot; with --export it then re-exports the Parquet copies, so every
+  change after that point reaches them
+- `run` reads committed inserts, updates, deletes and truncates in
+  batches of whole transactions, collapses them per row and applies them
+  to the Parquet export in shared-data/parquet: only the files holding a
+  changed key are rewritten, new rows go into a new part file of their
+  year partition. Each batch is also appended to
+  data/processed/changes/<schema>/<table>/ as a change log for other
+  derived datasets
+- after a batch is applied, its last LSN is written to
+  data/processed/changes/_checkpoint.json and only then confirmed to the
+  slot, so a crash replays at most one batch (applying is idempotent)
+
+A table whose changes can't be applied row by row (no copy yet, a column
+change, an unchanged TOAST value, a DELETE without key) is re-exported
+in full instead. Changes to partitions are applied to their root table.
+
+The slot keeps WAL on the server until the feed confirms it: run `drop`
+when the feed is no longer used. The role needs the REPLICATION
+attribute (or superuser), and wal_level must be logical.
+
+Usage:
+    python scripts/change_feed.py setup --export
+    python scripts/change_feed.py run                  # apply what is pending
+    python scripts/change_feed.py run --follow --interval 10
+    python scripts/change_feed.py status
+    python scripts/change_feed.py drop
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import db
+import export_parquet
+from export_parquet import EXPORT_DIR, REPO_DIR
+from ingest import COMPRESSION, load_manifest, save_manifest
+
+SLOT = os.environ.get('CHANGE_FEED_SLOT', 'classroom_feed')
+CHANGES_DIR = os.path.join(REPO_DIR, 'data', 'processed', 'changes')
+CHECKPOINT_NAME = '_checkpoint.json'
+# Changes read per batch (rounded up to whole transactions)
+BATCH_CHANGES = 20_000
+
+# Session settings for decoding: timestamps as UTC, so they parse the same
+# way as the exported values
+SESSION_OPTIONS = f'{db.MAINTENANCE_OPTIONS} -c TimeZone=UTC -c DateStyle=ISO'
+
+UNCHANGED = object()
+
+BARE_NAME = re.compile(r'[^.,\[\s:]+')
+CHANGE_LINE = re.compile(
+    r'^table (.+?): (INSERT|UPDATE|DELETE|TRUNCATE):(?: (.*))?$', re.DOTALL)
+
+PEEK_SQL = """
+    SELECT lsn::text, data
+    FROM pg_logical_slot_peek_changes(%s, NULL, %s, 'include-xids', '0',
+                                      'skip-empty-xacts', '1')
+"""
+
+# Primary key columns and partition roots of the sample tables
+KEYS_SQL = """
+    SELECT n.nspname, c.relname,
+           coalesce((SELECT array_agg(a.attname::text ORDER BY k.ord)
+                     FROM pg_index i
+                     CROSS JOIN LATERAL unnest(i.indkey)
+                          WITH ORDINALITY AS k(attnum, ord)
+                     JOIN pg_attribute a ON a.attrelid = i.indrelid
+                                        AND a.attnum = k.attnum
+                     WHERE i.indrelid = c.oid AND i.indisprimary),
+                    '{}'),
+           rn.nspname, r.relname, c.relkind
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class r ON r.oid = pg_partition_root(c.oid)
+    JOIN pg_namespace rn ON rn.oid = r.relnamespace
+    WHERE n.nspname = ANY(%s) AND c.relkind IN ('r', 'p')
+"""
+
+SLOT_SQL = """
+    SELECT plugin, active, confirmed_flush_lsn::text,
+           pg_wal_lsn_diff(pg_current_wal_lsn(), confirmed_flush_lsn)::bigint
+    FROM pg_replication_slots WHERE slot_name = %s
+"""
+
+
+class Reexport(Exception):
+    """The changes of a table can't be applied row by row."""
+
+
+def lsn_int(lsn):
+    high, low = lsn.split('/')
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def _identifier(text, i):
+    """(name, end) of a possibly double-quoted identifier at text[i]."""
+    if text.startswith('"', i):
+        parts = []
+        j = i + 1
+        while True:
+            k = text.index('"', j)
+            parts.append(text[j:k])
+            if not text.startswith('"', k + 1):
+                return ''.join(parts), k + 1
+            parts.append('"')
+            j = k + 2
+    match = BARE_NAME.match(text, i)
+    return match.group(0), match.end()
+
+
+def split_relations(text):
+    """
+    'schema.table' as printed by test_decoding -> [(schema, table)].
+
+    A TRUNCATE of several tables (TRUNCATE a, b, CASCADE, or a partitioned
+    table and its partitions) lists them all: 's.a, s.b'.
+    """
+    relations = []
+    i = 0
+    while True:
+        schema, end = _identifier(text, i)
+        table, i = _identifier(text, end + 1)
+        relations.append((schema, table))
+        if not text.startswith(', ', i):
+            return relations
+        i += 2
+
+
+def _literal(text, i):
+    """(value, end) of a quoted literal: 'it''s', E'a\\\\b' or B'101'."""
+    escaped = text[i] == 'E'
+    if text[i] in 'EB':
+        i += 1
+    parts = []
+    j = i + 1
+    while True:
+        k = text.index("'", j)
+        parts.append(text[j:k])
+        if not text.startswith("'", k + 1):
+            break
+        parts.append("'")
+        j = k + 2
+    value = ''.join(parts)
+    if escaped:
+        value = value.replace('\\\\', '\\')
+    return value, k + 1
+
+
+def parse_tuple(text):
+    """
+    The column values of a test_decoding change.
+
+    Returns {section: {column: value}} where section is 'old-key' or
+    'new-tuple' (the default). Values are text as PostgreSQL prints them,
+    None for NULL and UNCHANGED for TOAST values the change didn't carry.
+    """
+    sections = {}
+    current = sections.setdefault('new-tuple', {})
+    if not text or text == '(no-tuple-data)':
+        return sections
+    i = 0
+    while i < len(text):
+        if text[i] == ' ':
+            i += 1
+            continue
+        for marker in ('old-key:', 'new-tuple:'):
+            if text.startswith(marker, i):
+                current = sections.setdefault(marker[:-1], {})
+                i += len(marker)
+                break
+        else:
+            name, i = _identifier(text, i)
+            # [type]: - array types print as [integer[]]
+            i = text.index(']:', i) + 2
+            if text.startswith("'", i) or text[i:i + 2] in ("E'", "B'"):
+                value, i = _literal(text, i)
+            else:
+                end = text.find(' ', i)
+                end = len(text) if end < 0 else end
+                value = text[i:end]
+                if value == 'null':
+                    value = None
+                elif value == 'unchanged-toast-datum':
+                    value = UNCHANGED
+                i = end
+            current[name] = value
+    return sections
+
+
+def parse_change(lsn, data):
+    """
+    A decoded line as a list of change dicts: one per table (a TRUNCATE
+    can name several), none for BEGIN/COMMIT.
+    """
+    match = CHANGE_LINE.match(data)
+    if not match:
+        return []
+    op = match.group(2)
+    sections = ({} if op == 'TRUNCATE'
+                else parse_tuple(match.group(3)))
+    return [{'lsn': lsn, 'schema': schema, 'table': table, 'op': op,
+             'old': sections.get('old-key'), 'new': sections.get('new-tuple')}
+            for schema, table in split_relations(match.group(1))]
+
+
+def peek(conn, slot=SLOT, limit=BATCH_CHANGES):
+    """
+    (changes, last LSN) of the next committed transactions in the slot,
+    without consuming them; last LSN is None when nothing is pending.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(PEEK_SQL, (slot, limit))
+        rows = cursor.fetchall()
+    conn.commit()
+    changes = []
+    for lsn, data in rows:
+        changes.extend(parse_change(lsn, data))
+    return changes, (rows[-1][0] if rows else None)
+
+
+def table_keys(conn, schemas):
+    """
+    {(schema, table): (root schema, root table, key columns, kind)}.
+
+    Key columns are the primary key of the table, or of its partition
+    root; an empty list means whole rows identify themselves.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(KEYS_SQL, (list(schemas),))
+        rows = cursor.fetchall()
+    conn.commit()
+    keys = {(schema, table): (root_schema, root_table, list(columns), kind)
+            for schema, table, columns, root_schema, root_table, kind in rows}
+    # Partitions have their own copy of the root's key
+    for name, (root_schema, root_table, columns, kind) in list(keys.items()):
+        root = keys.get((root_schema, root_table))
+        if not columns and root and root[2]:
+            keys[name] = (root_schema, root_table, root[2], kind)
+    return keys
+
+
+def collapse(changes, key_columns):
+    """
+    The net effect of a table's changes, in order.
+
+    Returns (truncated, rows) where rows maps a key to the final row, or
+    None when the row was deleted.
+    """
+    truncated = False
+    rows = {}
+
+    def key_of(values):
+        columns = key_columns or sorted(values)
+        if any(column not in values for column in columns):
+            raise Reexport('change without its key columns')
+        return tuple((column, values[column]) for column in columns)
+
+    for change in changes:
+        op, old, new = change['op'], change['old'], change['new']
+        if op == 'TRUNCATE':
+            truncated = True
+            rows.clear()
+        elif op == 'DELETE':
+            if not new:
+                raise Reexport('DELETE without the old key '
+                               '(REPLICA IDENTITY NOTHING)')
+            rows[key_of(new)] = None
+        else:
+            if any(value is UNCHANGED for value in new.values()):
+                raise Reexport('UPDATE with an unchanged TOAST value')
+            key = key_of(new)
+            if op == 'UPDATE' and old:
+                old_key = key_of(old)
+                if old_key != key:
+                    rows[old_key] = None
+            # Re-inserting moves the row to the end, like the server did
+            rows.pop(key, None)
+            rows[key] = new
+    return truncated, rows
+
+
+def _typed(values, type_):
+    import pyarrow as pa
+
+    return pa.array(values, type=pa.string()).cast(type_)
+
+
+def _key_strings(table, columns):
+    """One string per row joining the key columns, for is_in() lookups."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrays = [pc.cast(table.column(column), pa.string()) for column in columns]
+    arrays = [pc.fill_null(array, '\x00') for array in arrays]
+    if len(arrays) == 1:
+        return arrays[0]
+    return pc.binary_join_element_wise(*arrays, '\x1f')
+
+
+def _write(table, path):
+    import pyarrow.parquet as pq
+
+    partial = f'{path}.{os.getpid()}.tmp'
+    pq.write_table(table, partial, compression=COMPRESSION,
+                   use_dictionary=True)
+    os.replace(partial, path)
+
+
+def apply_to_export(output_dir, entry, truncated, rows, tag):
+    """
+    Apply collapsed changes to one table of the Parquet export.
+
+    Files holding a changed or deleted key are rewritten without those
+    rows; the new versions go into part-<tag>.parquet of their partition.
+    Returns (rows removed, rows written, files touched).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    files = sorted(glob.glob(os.path.join(output_dir, '**', '*.parquet'),
+                             recursive=True))
+    if not files:
+        raise Reexport('no exported files')
+    schema = pq.read_schema(files[0])
+    columns = schema.names
+    upserts = [row for row in rows.values() if row is not None]
+    for row in upserts:
+        if set(row) != set(columns):
+            raise Reexport('columns differ from the export')
+    key_columns = [column for column, _ in next(iter(rows))] if rows else []
+    if any(column not in columns for column in key_columns):
+        raise Reexport('key columns missing from the export')
+
+    try:
+        changed = pa.table({
+            column: _typed([row[column] for row in upserts],
+                           schema.field(column).type)
+            for column in columns}, schema=schema)
+        keys = pa.table({
+            column: _typed([dict(key)[column] for key in rows],
+                           schema.field(column).type)
+            for column in key_columns})
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise Reexport(f'values do not convert: {e}') from e
+    wanted = _key_strings(keys, key_columns) if key_columns else None
+
+    removed = 0
+    touched = 0
+    for path in files:
+        if truncated:
+            removed += pq.ParquetFile(path).metadata.num_rows
+            os.remove(path)
+            touched += 1
+            continue
+        if wanted is None or not len(wanted):
+            continue
+        present = _key_strings(pq.read_table(path, columns=key_columns),
+                               key_columns)
+        hit = pc.is_in(present, value_set=wanted)
+        hits = pc.sum(hit).as_py() or 0
+        if not hits:
+            continue
+        _write(pq.read_table(path, schema=schema).filter(pc.invert(hit)),
+               path)
+        removed += hits
+        touched += 1
+
+    if changed.num_rows:
+        name = f'part-{tag}.parquet'
+        partition_by = entry.get('partition_by')
+        if partition_by:
+            column = partition_by[:-len('_year')]
+            years = pc.year(changed.column(column))
+            for year in pc.unique(years).to_pylist():
+                mask = pc.is_null(years) if year is None else pc.equal(years, year)
+                value = '__HIVE_DEFAULT_PARTITION__' if year is None else year
+                directory = os.path.join(output_dir, f'{partition_by}={value}')
+                os.makedirs(directory, exist_ok=True)
+                _write(changed.filter(mask), os.path.join(directory, name))
+                touched += 1
+        else:
+            _write(changed, os.path.join(output_dir, name))
+            touched += 1
+    elif truncated:
+        # Keep one (empty) file so the table can still be read
+        _write(changed, os.path.join(output_dir, f'part-{tag}.parquet'))
+    return removed, changed.num_rows, touched
+
+
+def write_change_log(changes, schema, table, tag, changes_dir=CHANGES_DIR):
+    """Append a table's raw changes as data/processed/changes/... Parquet."""
+    import pyarrow as pa
+
+    columns = []
+    for change in changes:
+        for values in (change['old'] or {}, change['new'] or {}):
+            columns.extend(c for c in values if c not in columns)
+    records = {'_lsn': [], '_op': [], '_old_key': []}
+    records.update({column: [] for column in columns})
+    for change in changes:
+        values = change['new'] or {}
+        records['_lsn'].append(change['lsn'])
+        records['_op'].append(change['op'][0])
+        records['_old_key'].append(json.dumps(change['old']) if change['old']
+                                   else None)
+        for column in columns:
+            value = values.get(column)
+            records[column].append(None if value is UNCHANGED else value)
+    directory = os.path.join(changes_dir, schema, table)
+    os.makedirs(directory, exist_ok=True)
+    _write(pa.table({name: pa.array(values, type=pa.string())
+                     for name, values in records.items()}),
+           os.path.join(directory, f'{tag}.parquet'))
+
+
+def load_checkpoint(changes_dir=CHANGES_DIR):
+    try:
+        with open(os.path.join(changes_dir, CHECKPOINT_NAME),
+                  encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_checkpoint(checkpoint, changes_dir=CHANGES_DIR):
+    os.makedirs(changes_dir, exist_ok=True)
+    path = os.path.join(changes_dir, CHECKPOINT_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as handle:
+        json.dump(checkpoint, handle, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def reexport(conn, params, schema, table, manifest, output=EXPORT_DIR):
+    """Export one table in full and record it in the manifest."""
+    tables = export_parquet.list_tables(conn, {schema: {table}})
+    if not tables:
+        return None
+    info = tables[0]
+    output_dir = os.path.join(output, schema, table)
+    os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+    result = export_parquet.export_table(params, schema, table, output_dir,
+                                         info['estimate'])
+    manifest[f'{schema}.{table}'] = export_parquet.manifest_entry(
+        info, result, output)
+    return result
+
+
+def apply_batch(conn, params, changes, keys, output=EXPORT_DIR,
+                changes_dir=CHANGES_DIR):
+    """
+    Apply one batch of changes; returns {table: summary line}.
+
+    Changes are grouped by (root) table, collapsed per row and applied to
+    the export; the manifest tokens of the touched tables are refreshed so
+    export_parquet.py doesn't export them again.
+    """
+    tag = f"{lsn_int(changes[-1]['lsn']):016X}"
+    by_table = {}
+    for change in changes:
+        name = (change['schema'], change['table'])
+        root_schema, root_table, _, _ = keys.get(name, (*name, [], None))
+        by_table.setdefault((root_schema, root_table), []).append(change)
+
+    manifest = load_manifest(output)
+    summary = {}
+    for (schema, table), table_changes in by_table.items():
+        key = f'{schema}.{table}'
+        write_change_log(table_changes, schema, table, tag, changes_dir)
+        entry = manifest.get(key)
+        if entry is None:
+            summary[key] = f"{len(table_changes)} changes logged (no Parquet copy)"
+            continue
+        output_dir = os.path.join(output, schema, table)
+        key_columns = keys.get((schema, table), (None, None, [], None))[2]
+        try:
+            # Only some partitions may have been truncated
+            if any(change['op'] == 'TRUNCATE'
+                   and (change['schema'], change['table']) != (schema, table)
+                   for change in table_changes):
+                raise Reexport('TRUNCATE of a partition')
+            truncated, rows = collapse(table_changes, key_columns)
+            removed, written, touched = apply_to_export(
+                output_dir, entry, truncated, rows, tag)
+        except Reexport as e:
+            result = reexport(conn, params, schema, table, manifest, output)
+            summary[key] = (f"{len(table_changes)} changes, re-exported "
+                            f"({e}; {result['rows']:,} rows)" if result
+                            else f"{len(table_changes)} changes, table is gone")
+            continue
+        entry['rows'] = max(0, entry.get('rows', 0) - removed) + written
+        entry['files'] = len(glob.glob(
+            os.path.join(output_dir, '**', '*.parquet'), recursive=True))
+        entry['bytes'] = sum(
+            os.path.getsize(path) for path in glob.glob(
+                os.path.join(output_dir, '**', '*.parquet'), recursive=True))
+        entry['changed_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        summary[key] = (f"{len(table_changes)} changes: {removed:,} rows "
+                        f"replaced or deleted, {written:,} written, "
+                        f"{touched} file(s)"
+                        + (" after TRUNCATE" if truncated else ""))
+
+    touched = {}
+    for name in by_table:
+        if f'{name[0]}.{name[1]}' in manifest:
+            touched.setdefault(name[0], set()).add(name[1])
+    if touched:
+        for info in export_parquet.list_tables(conn, touched):
+            manifest[f"{info['schema']}.{info['table']}"]['token'] = info['token']
+        save_manifest(manifest, output)
+    return summary
+
+
+def confirm(conn, slot, lsn):
+    """Let the slot release the WAL up to lsn."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_replication_slot_advance(%s, %s::pg_lsn)",
+                       (slot, lsn))
+    conn.commit()
+
+
+def _is_sample(relations, change):
+    if change['schema'] not in relations:
+        return False
+    tables = relations[change['schema']]
+    return tables is None or change['table'] in tables
+
+
+def run(conn, params, slot=SLOT, batch=BATCH_CHANGES, output=EXPORT_DIR,
+        changes_dir=CHANGES_DIR):
+    """Apply every pending change; returns the number of changes applied."""
+    relations = export_parquet.sample_relations()
+    schemas = list(relations)
+    keys = table_keys(conn, schemas)
+    checkpoint = load_checkpoint(changes_dir)
+    applied = 0
+    while True:
+        changes, last_lsn = peek(conn, slot, batch)
+        if last_lsn is None:
+            break
+        # Applied before a crash but not yet confirmed to the slot
+        done = lsn_int(checkpoint.get('lsn', '0/0'))
+        changes = [change for change in changes
+                   if lsn_int(change['lsn']) > done
+                   and _is_sample(relations, change)]
+        if changes:
+            if any((c['schema'], c['table']) not in keys for c in changes):
+                keys = table_keys(conn, schemas)
+            started = time.perf_counter()
+            summary = apply_batch(conn, params, changes, keys, output,
+                                  changes_dir)
+            elapsed = time.perf_counter() - started
+            for table, line in sorted(summary.items()):
+                print(f"   ✅ {table:<36} {line}")
+            print(f"   📦 {len(changes):,} changes up to {last_lsn} "
+                  f"in {elapsed:.2f}s")
+            applied += len(changes)
+        checkpoint = {
+            'slot': slot,
+            'lsn': last_lsn,
+            'changes': checkpoint.get('changes', 0) + len(changes),
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        save_checkpoint(checkpoint, changes_dir)
+        confirm(conn, slot, last_lsn)
+    return applied
+
+
+def setup(conn, slot=SLOT):
+    """Prepare the sample tables and create the slot; False if impossible."""
+    with conn.cursor() as cursor:
+        cursor.execute("SHOW wal_level")
+        wal_level = cursor.fetchone()[0]
+        if wal_level != 'logical':
+            print(f"❌ wal_level is {wal_level}; as a superuser run")
+            print("   ALTER SYSTEM SET wal_level = logical;")
+            print("   and restart PostgreSQL (sudo service postgresql restart)")
+            return False
+
+        schemas = list(export_parquet.sample_relations())
+        for (schema, table), (_, _, columns, kind) in sorted(
+                table_keys(conn, schemas).items()):
+            if not columns and kind == 'r':
+                cursor.execute(pgsql.SQL('ALTER TABLE {} REPLICA IDENTITY FULL')
+                               .format(pgsql.Identifier(schema, table)))
+                print(f"   🔑 {schema}.{table}: no primary key, "
+                      f"REPLICA IDENTITY FULL")
+        conn.commit()
+
+        cursor.execute(SLOT_SQL, (slot,))
+        if cursor.fetchone():
+            print(f"✅ Slot {slot} already exists")
+        else:
+            cursor.execute("SELECT lsn::text FROM "
+                           "pg_create_logical_replication_slot(%s, "
+                           "'test_decoding')", (slot,))
+            print(f"✅ Slot {slot} created at {cursor.fetchone()[0]}")
+        conn.commit()
+    return True
+
+
+def status(conn, slot=SLOT, changes_dir=CHANGES_DIR):
+    with conn.cursor() as cursor:
+        cursor.execute(SLOT_SQL, (slot,))
+        row = cursor.fetchone()
+    conn.commit()
+    if not row:
+        print(f"❌ No slot {slot} (run: python scripts/change_feed.py setup)")
+        return False
+    plugin, active, confirmed, behind = row
+    checkpoint = load_checkpoint(changes_dir)
+    print(f"🔁 Slot {slot} ({plugin}{', in use' if active else ''})")
+    print(f"   confirmed up to {confirmed}, "
+          f"{(behind or 0) / 1e6:.1f} MB of WAL pending")
+    if checkpoint:
+        print(f"   checkpoint {checkpoint['lsn']}, "
+              f"{checkpoint.get('changes', 0):,} changes applied, "
+              f"last at {checkpoint.get('updated_at')}")
+    return True
+
+
+def drop(conn, slot=SLOT, changes_dir=CHANGES_DIR):
+    with conn.cursor() as cursor:
+        cursor.execute(SLOT_SQL, (slot,))
+        if cursor.fetchone():
+            cursor.execute("SELECT pg_drop_replication_slot(%s)", (slot,))
+            print(f"🗑️ Slot {slot} dropped")
+        else:
+            print(f"   No slot {slot}")
+    conn.commit()
+    # The change log stays; its checkpoint belonged to the slot
+    try:
+        os.remove(os.path.join(changes_dir, CHECKPOINT_NAME))
+    except OSError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply changes in the sample schemas to the processed outputs")
+    parser.add_argument('command', choices=['setup', 'run', 'status', 'drop'])
+    parser.add_argument('--slot', default=SLOT,
+                        help=f'replication slot (default: {SLOT})')
+    parser.add_argument('--batch', type=int, default=BATCH_CHANGES,
+                        help=f'changes per batch (default: {BATCH_CHANGES:,})')
+    parser.add_argument('--follow', action='store_true',
+                        help='keep applying changes as they arrive')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='seconds between polls with --follow (default: 5)')
+    parser.add_argument('--export', action='store_true',
+                        help='setup: re-export the Parquet copies once the '
+                             'slot exists')
+    parser.add_argument('--output', default=EXPORT_DIR,
+                        help='Parquet export (default: shared-data/parquet)')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    try:
+        params = db.params_from_args(args)
+        conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT,
+                                options=SESSION_OPTIONS, **params)
+    except psycopg2.Error as e:
+        print(f"❌ Cannot connect to database: {e}")
+        return 1
+
+    try:
+        if args.command == 'setup':
+            if not setup(conn, args.slot):
+                return 1
+            if args.export:
+                print("📦 Exporting the Parquet copies...")
+                _, _, failed, _ = export_parquet.export(params,
+                                                        output=args.output,
+                                                        force=True)
+                return 1 if failed else 0
+            return 0
+        if args.command == 'status':
+            return 0 if status(conn, args.slot) else 1
+        if args.command == 'drop':
+            drop(conn, args.slot)
+            return 0
+
+        print(f"🔁 Applying changes from slot {args.slot}")
+        while True:
+            applied = run(conn, params, args.slot, args.batch, args.output)
+            if not args.follow:
+                print(f"✅ {applied:,} changes applied" if applied
+                      else "💤 No pending changes")
+                return 0
+            time.sleep(args.interval)
+    except psycopg2.Error as e:
+        print(f"❌ {str(e).strip()}")
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+In-process DuckDB engine over the Parquet export of the sample schemas.
+
+Read-only analytics (aggregates, rollups, the dashboard summaries) don't
+need the PostgreSQL server: export_parquet.py keeps Parquet copies of
+every sample table in shared-data/parquet, and this module runs the same
+SQL over them with DuckDB, a vectorized columnar engine, in the notebook
+process itself.
+
+- every exported table becomes a DuckDB view over its Parquet files
+  (schema-qualified as in PostgreSQL, partition columns hidden), and the
+  views defined in databases/*.sql are recreated on top of them
+- a small dialect shim covers the PostgreSQL behaviour the classroom SQL
+  relies on: integer division, NULLS FIRST for descending sorts, psycopg2
+  parameters (%s and %(name)s), unconstrained NUMERIC casts (DuckDB would
+  round them to 3 decimals; they become DOUBLE) and to_char() on dates
+  and timestamps
+- anything that needs the live server (catalog tables, writes, extensions)
+  still has to run on PostgreSQL
+
+The data is as fresh as the last export; run export_parquet.py first.
+
+Usage:
+    from query import read_query
+
+    df = read_query("SELECT * FROM hr.department_summary", engine='duckdb')
+
+    python scripts/columnar.py "SELECT rating, count(*) FROM sakila.film GROUP BY 1"
+    python scripts/columnar.py --benchmark --iterations 5
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+
+import bulk_load
+from export_parquet import EXPORT_DIR
+from ingest import load_manifest
+from query_cache import SQL_TOKENS
+
+SETTINGS = {
+    # 5 / 2 is 2 in PostgreSQL
+    'integer_division': True,
+    # PostgreSQL sorts NULLs last ascending and first descending
+    'default_null_order': 'nulls_last_on_asc_first_on_desc',
+}
+
+# to_char() format patterns -> strftime, longest first
+TO_CHAR_PATTERNS = [
+    ('HH24', '%H'), ('HH12', '%I'), ('YYYY', '%Y'), ('Month', '%B'),
+    ('Mon', '%b'), ('Day', '%A'), ('Dy', '%a'), ('MM', '%m'), ('DD', '%d'),
+    ('MI', '%M'), ('SS', '%S'), ('YY', '%y'), ('AM', '%p'), ('PM', '%p'),
+]
+
+DIALECT_RULES = [
+    (re.compile(r'::\s*(?:numeric|decimal)\b(?!\s*\()', re.IGNORECASE),
+     '::DOUBLE'),
+    (re.compile(r'\bAS\s+(?:numeric|decimal)\s*\)', re.IGNORECASE),
+     'AS DOUBLE)'),
+]
+PARAMETER = re.compile(r'%\((\w+)\)s|%s|%%')
+CREATE_VIEW = re.compile(
+    r'^CREATE\s+(?:OR\s+REPLACE\s+)?(MATERIALIZED\s+)?VIEW\s+'
+    r'(?:IF\s+NOT\s+EXISTS\s+)?(\w+(?:\.\w+)?)\s+AS\s+(.*)$',
+    re.IGNORECASE | re.DOTALL)
+SEARCH_PATH = re.compile(r'^SET\s+search_path\s+TO\s+(\w+)', re.IGNORECASE)
+# DuckDB names an unaliased count(*) column "count_star()" and sum(x)
+# "sum(x)"; PostgreSQL calls them "count" and "sum"
+FUNCTION_COLUMN = re.compile(r'^(\w+)\(.*\)$', re.DOTALL)
+
+# Analytics queries for --benchmark, on top of canonical_queries.py
+BENCHMARK_QUERIES = {
+    'sakila.revenue_by_month': """
+        SELECT date_trunc('month', payment_date) AS month,
+               count(*) AS payments, sum(amount) AS revenue
+        FROM sakila.payment
+        GROUP BY 1
+    """,
+    'sakila.rentals_by_rating': """
+        SELECT f.rating, count(*) AS rentals, avg(f.rental_rate) AS avg_rate
+        FROM sakila.rental r
+        JOIN sakila.inventory i ON i.inventory_id = r.inventory_id
+        JOIN sakila.film f ON f.film_id = i.film_id
+        GROUP BY f.rating
+    """,
+    'adventureworks.sales_by_territory': """
+        SELECT t.name, count(*) AS orders, sum(h.total_due) AS revenue
+        FROM adventureworks.sales_order_header h
+        JOIN adventureworks.sales_territory t ON t.territory_id = h.territory_id
+        GROUP BY t.name
+    """,
+    'chinook.revenue_by_country': """
+        SELECT billing_country, count(*) AS invoices, sum(total) AS revenue
+        FROM chinook.invoice
+        GROUP BY billing_country
+    """,
+}
+
+_lock = threading.Lock()
+_databases = {}
+
+
+def translate(sql, params=None):
+    """
+    PostgreSQL SQL -> DuckDB SQL.
+
+    String literals, quoted identifiers and comments are left alone by the
+    rewrite rules. Parameter placeholders are rewritten only when params
+    are given, and everywhere in the text, as psycopg2 does.
+    """
+    if params is not None:
+        sql = PARAMETER.sub(
+            lambda m: f'${m.group(1)}' if m.group(1)
+            else '?' if m.group() == '%s' else '%', sql)
+    pieces = []
+    literals = []
+    for match in SQL_TOKENS.finditer(sql):
+        if match.lastgroup in ('string', 'ident'):
+            literals.append(match.group())
+            pieces.append(f'\0{len(literals) - 1}\0')
+        else:
+            pieces.append(match.group())
+    text = ''.join(pieces)
+    for pattern, replacement in DIALECT_RULES:
+        text = pattern.sub(replacement, text)
+    return re.sub('\0(\\d+)\0', lambda m: literals[int(m.group(1))], text)
+
+
+def to_char_macro():
+    """to_char(value, format) for dates and timestamps, as a DuckDB macro."""
+    expression = 'format'
+    for pattern, replacement in TO_CHAR_PATTERNS:
+        expression = f"replace({expression}, '{pattern}', '{replacement}')"
+    return (f"CREATE OR REPLACE MACRO to_char(value, format) AS "
+            f"strftime(value, {expression})")
+
+
+def sql_views(databases_dir=bulk_load.DATABASES_DIR):
+    """[(schema, name, select)] for the views in databases/*.sql, in load order."""
+    names = bulk_load.INDEPENDENT_DATABASES + bulk_load.DEPENDENT_DATABASES
+    views = []
+    for name in names:
+        path = os.path.join(databases_dir, f'{name}.sql')
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as handle:
+            statements = bulk_load.split_statements(handle.read())
+        schema = 'public'
+        for statement in statements:
+            match = SEARCH_PATH.match(statement)
+            if match:
+                schema = match.group(1).lower()
+            match = CREATE_VIEW.match(statement)
+            if match:
+                view = match.group(2).lower()
+                view_schema, _, view = view.rpartition('.')
+                views.append((view_schema or schema, view,
+                              match.group(3).rstrip().rstrip(';')))
+    return views
+
+
+def build(export_dir=EXPORT_DIR):
+    """
+    A DuckDB database with views over the export and the sample views.
+
+    Returns (connection, tables, skipped views).
+    """
+    import duckdb
+
+    manifest = load_manifest(export_dir)
+    if not manifest:
+        raise FileNotFoundError(
+            f"no Parquet export in {export_dir}; run export_parquet.py")
+    conn = duckdb.connect()
+    # GLOBAL, so the per-thread cursors get them too
+    for name, value in SETTINGS.items():
+        conn.execute(f"SET GLOBAL {name} = {value!r}" if isinstance(value, str)
+                     else f"SET GLOBAL {name} = {str(value).lower()}")
+    conn.execute(to_char_macro())
+
+    tables = set()
+    for key, entry in sorted(manifest.items()):
+        directory = os.path.join(export_dir, entry['schema'], entry['table'])
+        if not glob.glob(os.path.join(directory, '**', '*.parquet'),
+                         recursive=True):
+            continue
+        hidden = (f" EXCLUDE ({quote(entry['partition_by'])})"
+                  if entry.get('partition_by') else '')
+        pattern = os.path.join(directory, '**', '*.parquet').replace("'", "''")
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(entry['schema'])}")
+        conn.execute(
+            f"CREATE OR REPLACE VIEW {quote(entry['schema'])}."
+            f"{quote(entry['table'])} AS SELECT *{hidden} FROM "
+            f"read_parquet('{pattern}', hive_partitioning = true)")
+        tables.add(key)
+
+    skipped = {}
+    for schema, view, select in sql_views():
+        if f'{schema}.{view}' in tables:
+            continue  # materialized view exported as data
+        try:
+            conn.execute(f"CREATE SCHEMA IF NOT EXISTS {quote(schema)}")
+            conn.execute(f"USE {quote(schema)}")
+            conn.execute(f"CREATE OR REPLACE VIEW {quote(view)} AS "
+                         f"{translate(select)}")
+        except duckdb.Error as e:
+            skipped[f'{schema}.{view}'] = str(e).splitlines()[0]
+        finally:
+            conn.execute("USE memory.main")
+    return conn, tables, skipped
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def database(export_dir=EXPORT_DIR, refresh=False):
+    """
+    The process-wide (connection, tables, skipped views) for export_dir.
+
+    The database is built on first use (it only holds views, so this
+    takes milliseconds); refresh=True rebuilds it after a new export.
+    """
+    key = (os.getpid(), os.path.abspath(export_dir))
+    with _lock:
+        if refresh or key not in _databases:
+            _databases[key] = build(export_dir)
+        return _databases[key]
+
+
+def connect(export_dir=EXPORT_DIR, refresh=False):
+    """Cursor on the process-wide DuckDB database (one per thread)."""
+    return database(export_dir, refresh)[0].cursor()
+
+
+def read_query(sql, params=None, export_dir=EXPORT_DIR):
+    """Run a PostgreSQL query with DuckDB and return a DataFrame."""
+    cursor = connect(export_dir)
+    try:
+        if params is None:
+            cursor.execute(translate(sql))
+        else:
+            cursor.execute(translate(sql, params), params)
+        df = cursor.df()
+    finally:
+        cursor.close()
+    df.columns = [postgres_column_name(name) for name in df.columns]
+    return df
+
+
+def postgres_column_name(name):
+    match = FUNCTION_COLUMN.match(name)
+    if not match:
+        return name
+    return 'count' if match.group(1) == 'count_star' else match.group(1)
+
+
+def time_query(run, iterations):
+    """(median ms, result) of iterations runs after one warm-up run."""
+    result = run()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def benchmark(schemas=None, iterations=5, export_dir=EXPORT_DIR, **overrides):
+    """[{name, postgres_ms, duckdb_ms, same}] for the analytics queries."""
+    from autograder import frame_digest
+    import query as pg_query
+    from canonical_queries import iter_queries
+
+    _, tables, _ = database(export_dir)
+    exported = {key.split('.')[0] for key in tables}
+    queries = [(f'{schema}.{name}', sql)
+               for schema, name, sql in iter_queries(schemas)]
+    queries += [(name, sql) for name, sql in BENCHMARK_QUERIES.items()
+                if not schemas or name.split('.')[0] in schemas]
+
+    results = []
+    for name, sql in queries:
+        if name.split('.')[0] not in exported:
+            continue
+        record = {'name': name}
+        try:
+            record['postgres_ms'], expected = time_query(
+                lambda: pg_query.read_query(sql, **overrides), iterations)
+            record['duckdb_ms'], got = time_query(
+                lambda: read_query(sql, export_dir=export_dir), iterations)
+        except Exception as e:  # either engine may reject a query
+            record['error'] = str(e).strip().splitlines()[0]
+            results.append(record)
+            print(f"   ❌ {name}: {record['error']}")
+            continue
+        # Sums of NUMERIC are exact in PostgreSQL and float in Parquet
+        record['same'] = frame_digest(expected, 2) == frame_digest(got, 2)
+        results.append(record)
+        print(f"   {'✅' if record['same'] else '⚠️'} {name:<40} "
+              f"PG {record['postgres_ms']:>9.1f} ms   "
+              f"DuckDB {record['duckdb_ms']:>8.1f} ms   "
+              f"x{record['postgres_ms'] / max(record['duckdb_ms'], 0.001):.1f}")
+    return results
+
+
+def main(argv=None):
+    import db
+
+    parser = argparse.ArgumentParser(
+        description="Run queries with DuckDB over the Parquet export")
+    parser.add_argument('sql', nargs='?', help='query to run')
+    parser.add_argument('--export-dir', default=EXPORT_DIR,
+                        help='Parquet export (default: shared-data/parquet)')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='time the analytics queries on both engines')
+    parser.add_argument('--schema', action='append',
+                        help='schema to benchmark (repeatable, default: all)')
+    parser.add_argument('--iterations', type=int, default=5,
+                        help='timed runs per query and engine (default: 5)')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    try:
+        import duckdb
+    except ImportError:
+        print("❌ duckdb is not installed (pip install duckdb)")
+        return 1
+    try:
+        _, tables, skipped = database(args.export_dir)
+    except (OSError, duckdb.Error) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.benchmark:
+        print("⏱️ PostgreSQL vs DuckDB")
+        print("=" * 50)
+        print(f"🦆 {len(tables)} tables from {os.path.relpath(args.export_dir)}")
+        for view, error in skipped.items():
+            print(f"   ⏭️ view {view}: {error}")
+        results = benchmark(args.schema, args.iterations, args.export_dir,
+                            **db.overrides_from_args(args))
+        timed = [r for r in results if 'error' not in r]
+        if timed:
+            total_pg = sum(r['postgres_ms'] for r in timed)
+            total_duck = sum(r['duckdb_ms'] for r in timed)
+            print(f"\n📊 {len(timed)} queries: PG {total_pg:.0f} ms, DuckDB "
+                  f"{total_duck:.0f} ms (x{total_pg / max(total_duck, 0.001):.1f}), "
+                  f"{sum(r['same'] for r in timed)} identical results")
+        return 1 if len(timed) < len(results) else 0
+
+    if not args.sql:
+        parser.error("give a query or --benchmark")
+    try:
+        df = read_query(args.sql, export_dir=args.export_dir)
+    except duckdb.Error as e:
+        print(f"❌ {e}")
+        return 1
+    print(df.to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
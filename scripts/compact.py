@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Memory-compact DataFrames for query results and CSV files.
+
+By default pandas stores text as Python objects (about 50 bytes plus the
+characters per value) and every number as 64 bits, so a join carrying
+country, genre or rating columns takes many times the size of its data.
+The helpers here pick the tightest dtypes instead:
+
+- query results keep the column types PostgreSQL reports in the cursor
+  description (query.ARROW_TYPES): integers stay integers (nullable Int*
+  where they hold NULLs instead of turning into float64), boolean stays
+  boolean, real stays float32, and dates and timestamps become datetime64
+  instead of objects
+- integer columns are then downcast to the smallest type that holds
+  their values
+- text becomes a categorical when a sample of its values shows few
+  distinct ones (ingest.CATEGORY_RATIO), otherwise a pyarrow-backed string
+  column; `categories` forces columns either way
+
+query.read_query(..., compact=True) builds the DataFrame this way straight
+from the streamed Arrow batches, and read_csv() does the same for a CSV
+(with the dtypes ingest.infer_dtypes() derives from a sample). With
+report=True both also measure what the default DataFrame would have
+taken, one chunk at a time, and print the saving per column.
+
+Usage:
+    from query import read_query
+    df = read_query("SELECT * FROM sakila.rental r JOIN ...",
+                    compact=True, report=True)
+
+    import compact
+    df = compact.read_csv('data/raw/sample.csv', report=True)
+    df = compact.compact_frame(pd.read_sql(...))   # an existing DataFrame
+
+    python scripts/compact.py "SELECT * FROM chinook.track"
+    python scripts/compact.py data/raw/sample.csv
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import db
+import ingest
+
+SAMPLE_ROWS = ingest.SAMPLE_ROWS
+# Distinct text values are only worth a categorical up to this many
+MAX_CATEGORIES = 10_000
+
+STRING_DTYPE = pd.StringDtype('pyarrow')
+INT_DTYPES = [pd.Int8Dtype(), pd.Int16Dtype(), pd.Int32Dtype(), pd.Int64Dtype()]
+
+
+def _arrow_dtype(arrow_type):
+    """pandas dtype for a pyarrow type (None keeps the default conversion)."""
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return STRING_DTYPE
+    if pa.types.is_boolean(arrow_type):
+        return pd.BooleanDtype()
+    for dtype in INT_DTYPES:
+        if arrow_type == pa.from_numpy_dtype(dtype.numpy_dtype):
+            return dtype
+    return None
+
+
+def downcast_int(series):
+    """
+    Series as the smallest integer dtype holding its values.
+
+    Nullable (Int8 ... Int64) if the column has NULLs, otherwise the numpy
+    type, which needs no mask.
+    """
+    values = series.dropna()
+    nullable = len(values) < len(series)
+    if values.empty:
+        return series.astype(INT_DTYPES[0])
+    low, high = int(values.min()), int(values.max())
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype.numpy_dtype)
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype if nullable else dtype.numpy_dtype)
+    return series
+
+
+def is_categorical(values, sample_rows=SAMPLE_ROWS):
+    """
+    Whether a text column should be a categorical, judged from a sample.
+
+    values may be a pandas Series or a pyarrow (chunked) array; only the
+    first sample_rows values are looked at.
+    """
+    sample = values[:sample_rows]
+    if not isinstance(sample, pd.Series):
+        sample = sample.to_pandas()
+    if sample.empty:
+        return False
+    distinct = sample.nunique(dropna=True)
+    return (distinct <= MAX_CATEGORIES
+            and distinct / len(sample) <= ingest.CATEGORY_RATIO)
+
+
+def _text_columns(categories, columns, decide):
+    """{column: True if categorical} for the text columns."""
+    categories = categories or {}
+    if not isinstance(categories, dict):
+        categories = dict.fromkeys(categories, True)
+    return {column: categories.get(column, decide(column))
+            for column in columns}
+
+
+def arrow_to_frame(batches, categories=None, sample_rows=SAMPLE_ROWS):
+    """
+    DataFrame with compact dtypes from pyarrow RecordBatches.
+
+    categories: column names that must be categoricals, or a dict of
+    column -> bool to force text columns either way; the other text
+    columns are decided by sampling (sample_rows=0 turns that off).
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_batches(batches)
+    text = [field.name for field in table.schema
+            if pa.types.is_string(field.type)
+            or pa.types.is_large_string(field.type)]
+    columns = {name: table.column(name) for name in text}
+    categorical = _text_columns(
+        categories, text,
+        lambda column: bool(sample_rows)
+        and is_categorical(columns[column], sample_rows))
+    for column, as_category in categorical.items():
+        if as_category:
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column,
+                                     table.column(column).dictionary_encode())
+
+    df = table.to_pandas(types_mapper=_arrow_dtype, date_as_object=False,
+                         split_blocks=True, self_destruct=True)
+    del table
+    for column in df.columns:
+        dtype = df[column].dtype
+        if dtype in INT_DTYPES:
+            df[column] = downcast_int(df[column])
+        elif dtype == pd.BooleanDtype() and not df[column].hasnans:
+            df[column] = df[column].astype(bool)
+    return df
+
+
+def compact_frame(df, categories=None, sample_rows=SAMPLE_ROWS):
+    """
+    Copy of an existing DataFrame with compact dtypes.
+
+    For frames that were built some other way (pd.read_sql, pd.read_csv):
+    the types are inferred from the values, not the database.
+    """
+    result = {}
+    text = [column for column in df.columns
+            if pd.api.types.is_object_dtype(df[column])
+            or pd.api.types.is_string_dtype(df[column])]
+    categorical = _text_columns(
+        categories, text,
+        lambda column: bool(sample_rows)
+        and is_categorical(df[column], sample_rows))
+    for column in df.columns:
+        series = df[column]
+        if column in categorical:
+            inferred = pd.api.types.infer_dtype(series, skipna=True)
+            if inferred in ('date', 'datetime'):
+                result[column] = pd.to_datetime(series)
+            elif inferred not in ('string', 'empty'):
+                result[column] = series
+            elif categorical[column]:
+                result[column] = series.astype('category')
+            else:
+                result[column] = series.astype(STRING_DTYPE)
+        elif pd.api.types.is_bool_dtype(series):
+            result[column] = series
+        elif pd.api.types.is_integer_dtype(series):
+            result[column] = downcast_int(series)
+        elif pd.api.types.is_float_dtype(series) and series.notna().any() \
+                and (series.dropna() % 1 == 0).all():
+            # Integer columns with NULLs come back from pd.read_sql as floats
+            result[column] = downcast_int(series.astype(pd.Int64Dtype()))
+        else:
+            result[column] = series
+    return pd.DataFrame(result, index=df.index)
+
+
+def read_csv(path, categories=None, sample_rows=SAMPLE_ROWS, report=False,
+             **kwargs):
+    """
+    pd.read_csv() with the compact dtypes of a sample of the file.
+
+    Uses ingest.infer_dtypes() (categoricals for low-cardinality text,
+    nullable integers and booleans), with pyarrow strings for the other
+    text columns and integers downcast after reading.
+    """
+    overrides = None
+    if categories is not None:
+        if not isinstance(categories, dict):
+            categories = dict.fromkeys(categories, True)
+        overrides = {column: 'category' if as_category else 'string'
+                     for column, as_category in categories.items()}
+    dtypes = ingest.infer_dtypes(path, sample_rows or SAMPLE_ROWS, overrides)
+    forced = overrides or {}
+    dtypes = {column: STRING_DTYPE if dtype == 'string' or (
+                  dtype == 'category' and not sample_rows
+                  and column not in forced) else dtype
+              for column, dtype in dtypes.items()}
+    before = None
+    if report:
+        before = pd.Series(dtype='int64')
+        for chunk in pd.read_csv(path, chunksize=ingest.CHUNK_ROWS, **kwargs):
+            before = before.add(frame_memory(chunk), fill_value=0)
+    df = pd.read_csv(path, dtype=dtypes, **kwargs)
+    for column in df.columns:
+        if pd.api.types.is_integer_dtype(df[column].dtype):
+            df[column] = downcast_int(df[column])
+    if report:
+        print_memory_report(before, df)
+    return df
+
+
+def frame_memory(df):
+    """Bytes per column (deep, so Python strings are counted)."""
+    return df.memory_usage(deep=True, index=False)
+
+
+def default_memory(batch):
+    """Bytes per column of a RecordBatch as a default DataFrame."""
+    return frame_memory(pd.DataFrame(batch.to_pydict()))
+
+
+def memory_report(before, df):
+    """DataFrame of bytes before/after and dtype per column, with a total."""
+    after = frame_memory(df)
+    report = pd.DataFrame({
+        'dtype': df.dtypes.astype(str),
+        'before': before.reindex(after.index).fillna(0).astype('int64'),
+        'after': after,
+    })
+    report.loc['total'] = ['', int(report['before'].sum()),
+                           int(report['after'].sum())]
+    report['ratio'] = (report['before'] / report['after'].clip(lower=1)).round(1)
+    return report
+
+
+def _size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:,.0f} {unit}" if unit == 'B' else f"{size:,.1f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GB"
+
+
+def print_memory_report(before, df, out=sys.stdout):
+    report = memory_report(before, df)
+    for column, row in report.iterrows():
+        if column == 'total':
+            continue
+        print(f"   {str(column):<28} {row['dtype']:<16} "
+              f"{_size(row['before']):>10} -> {_size(row['after']):>10}",
+              file=out)
+    total = report.loc['total']
+    print(f"🗜️ {len(df):,} rows: {_size(total['before'])} -> "
+          f"{_size(total['after'])} ({total['ratio']}x smaller)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load a query result or CSV with compact dtypes and "
+                    "show the memory saved")
+    parser.add_argument('source', help='a query, or the path of a CSV file')
+    parser.add_argument('--category', action='append', default=[],
+                        help='column that must be a categorical (repeatable)')
+    parser.add_argument('--string', action='append', default=[],
+                        help='column that must stay a string (repeatable)')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                        help=f'rows sampled for the categorical decision '
+                             f'(default: {SAMPLE_ROWS:,}; 0 = none)')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+    categories = {**dict.fromkeys(args.string, False),
+                  **dict.fromkeys(args.category, True)}
+
+    if os.path.isfile(args.source):
+        read_csv(args.source, categories, args.sample_rows, report=True)
+        return 0
+
+    import psycopg2
+    import query
+
+    try:
+        query.read_query(args.source, compact=True, categories=categories,
+                         sample_rows=args.sample_rows, report=True,
+                         **db.overrides_from_args(args))
+        return 0
+    except psycopg2.Error as e:
+        print(f"❌ Query failed: {e}")
+        return 1
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Shared database connection helpers for the classroom scripts.
+
+- connection parameters come from the PG* environment variables
+  (PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE)
+- the credential fallbacks (student with/without password, vscode) are
+  probed once per process, and the working one is remembered on disk so
+  later script runs skip the probing
+- connections come from a psycopg2 ThreadedConnectionPool and are handed
+  out with the get_conn() context manager
+
+Usage:
+    from db import get_conn
+
+    with get_conn() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version();")
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'data-management-classroom', 'db_credentials.json'
+)
+
+# Connection attempts, in order, when PG* variables don't settle it
+CREDENTIAL_ATTEMPTS = [
+    {
+        "name": "Codespace setup (student with password)",
+        "params": {
+            "host": "localhost",
+            "dbname": "postgres",
+            "user": "student",
+            "password": "student_password",
+            "port": "5432",
+        }
+    },
+    {
+        "name": "Local setup (student without password)",
+        "params": {
+            "host": "localhost",
+            "dbname": "postgres",
+            "user": "student",
+            "port": "5432",
+        }
+    },
+    {
+        "name": "Current user authentication",
+        "params": {
+            "dbname": "postgres",
+            "user": "vscode",
+            "port": "5432",
+        }
+    },
+]
+
+ENV_PARAMS = {
+    'PGHOST': 'host',
+    'PGPORT': 'port',
+    'PGUSER': 'user',
+    'PGPASSWORD': 'password',
+    'PGDATABASE': 'dbname',
+}
+
+# Database the sample schemas are loaded into (see load_databases.sh); not
+# PGDATABASE, which the devcontainer points at postgres for the shell
+SAMPLE_DBNAME = os.environ.get('SAMPLE_DBNAME', 'student_db')
+
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', '1'))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', '5'))
+
+# Session options for maintenance work (loads, snapshots, index builds)
+# that must not hit the per-role limits set by governor.py
+MAINTENANCE_OPTIONS = ('-c statement_timeout=0 '
+                       '-c idle_in_transaction_session_timeout=0')
+
+_lock = threading.Lock()
+_credentials = None
+_pools = {}
+_engines = {}
+
+
+def env_params():
+    """Connection parameters set through PG* environment variables."""
+    return {key: os.environ[var] for var, key in ENV_PARAMS.items()
+            if os.environ.get(var)}
+
+
+def credential_attempts():
+    """All attempts to try, environment first when PGUSER is set."""
+    attempts = []
+    env = env_params()
+    if 'user' in env:
+        attempts.append({"name": "Environment (PG* variables)",
+                         "params": env})
+    for attempt in CREDENTIAL_ATTEMPTS:
+        # PG* values such as PGHOST or PGDATABASE still apply to fallbacks
+        attempts.append({"name": attempt["name"],
+                         "params": {**attempt["params"], **env,
+                                    "user": attempt["params"]["user"]}})
+    return attempts
+
+
+def _read_cache():
+    try:
+        with open(CACHE_FILE, encoding='utf-8') as handle:
+            return json.load(handle).get('name')
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(name):
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        with open(CACHE_FILE, 'w', encoding='utf-8') as handle:
+            json.dump({'name': name}, handle)
+    except OSError:
+        pass
+
+
+def _try_connect(params):
+    conn = psycopg2.connect(connect_timeout=CONNECT_TIMEOUT, **params)
+    conn.close()
+
+
+def resolve_credentials(refresh=False, on_attempt=None):
+    """
+    Return (name, params) for the first credential set that connects.
+
+    The result is cached for the life of the process; the name of the
+    working attempt is also cached on disk and tried first next time.
+    on_attempt(name, error) is called for every attempt that is probed,
+    with error=None on success. Raises the last error if nothing works.
+    """
+    global _credentials
+    with _lock:
+        if _credentials is not None and not refresh:
+            return _credentials
+
+        attempts = credential_attempts()
+        cached = None if refresh else _read_cache()
+        attempts.sort(key=lambda a: a["name"] != cached)
+
+        last_error = None
+        for attempt in attempts:
+            try:
+                _try_connect(attempt["params"])
+            except psycopg2.Error as e:
+                last_error = e
+                if on_attempt:
+                    on_attempt(attempt["name"], e)
+                continue
+            if on_attempt:
+                on_attempt(attempt["name"], None)
+            if attempt["name"] != cached:
+                _write_cache(attempt["name"])
+            _credentials = (attempt["name"], dict(attempt["params"]))
+            return _credentials
+
+        raise last_error or psycopg2.OperationalError("No credentials to try")
+
+
+def connection_params(**overrides):
+    """Resolved credentials with any non-empty overrides applied."""
+    _, params = resolve_credentials()
+    params = dict(params)
+    params.update({k: v for k, v in overrides.items() if v})
+    return params
+
+
+def connect(**overrides):
+    """Open a standalone connection (for long-running or worker processes)."""
+    return psycopg2.connect(connect_timeout=CONNECT_TIMEOUT,
+                            **connection_params(**overrides))
+
+
+def get_pool(**overrides):
+    """Return the process-wide connection pool for these parameters."""
+    params = connection_params(**overrides)
+    key = (os.getpid(), tuple(sorted(params.items())))
+    with _lock:
+        if key not in _pools:
+            _pools[key] = pool.ThreadedConnectionPool(
+                POOL_MIN, POOL_MAX, connect_timeout=CONNECT_TIMEOUT, **params
+            )
+        return _pools[key]
+
+
+@contextmanager
+def get_conn(autocommit=False, **overrides):
+    """
+    Borrow a pooled connection.
+
+    Commits when the block finishes, rolls back if it raises, and always
+    returns the connection to the pool.
+    """
+    connection_pool = get_pool(**overrides)
+    conn = connection_pool.getconn()
+    broken = False
+    try:
+        conn.autocommit = autocommit
+        yield conn
+        if not autocommit:
+            conn.commit()
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        broken = bool(conn.closed)
+        raise
+    finally:
+        connection_pool.putconn(conn, close=broken)
+
+
+def get_engine(**overrides):
+    """SQLAlchemy engine sharing the resolved credentials (for pandas)."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.engine import URL
+
+    params = connection_params(**overrides)
+    key = (os.getpid(), tuple(sorted(params.items())))
+    with _lock:
+        if key not in _engines:
+            url = URL.create(
+                'postgresql+psycopg2',
+                username=params.get('user'),
+                password=params.get('password'),
+                host=params.get('host'),
+                port=int(params['port']) if params.get('port') else None,
+                database=params.get('dbname'),
+            )
+            _engines[key] = create_engine(
+                url, pool_size=POOL_MAX, pool_pre_ping=True,
+                connect_args={'connect_timeout': CONNECT_TIMEOUT}
+            )
+        return _engines[key]
+
+
+def close_all():
+    """Close every pool and engine opened by this process."""
+    with _lock:
+        for connection_pool in _pools.values():
+            connection_pool.closeall()
+        for engine in _engines.values():
+            engine.dispose()
+        _pools.clear()
+        _engines.clear()
+
+
+def add_connection_args(parser, default_dbname=None):
+    """Add the standard --host/--port/--user/--dbname options."""
+    parser.add_argument('--host')
+    parser.add_argument('--port')
+    parser.add_argument('--user')
+    parser.add_argument('--dbname', default=default_dbname)
+
+
+def overrides_from_args(args):
+    """Connection overrides given on the command line."""
+    return {'host': args.host, 'port': args.port,
+            'user': args.user, 'dbname': args.dbname}
+
+
+def params_from_args(args):
+    """Resolved connection parameters with the CLI options applied."""
+    return connection_params(**overrides_from_args(args))
+
+
+if __name__ == "__main__":
+    name, params = resolve_credentials(refresh=True)
+    print(f"✅ Connected via {name}")
+    for key in ('host', 'port', 'dbname', 'user'):
+        print(f"   {key}: {params.get(key, '(default)')}")
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Columnar export of the sample schemas to Parquet for analytics work.
+
+Every table (and materialized view) of the schemas defined in
+databases/*.sql is written to shared-data/parquet/<schema>/<table>/, so
+notebooks can read it with pandas or pyarrow, with column pruning and
+predicate pushdown, instead of pulling whole tables out of PostgreSQL
+again and again:
+
+- tables are exported in parallel, one worker process and connection per
+  table; rows are streamed out with COPY ... TO STDOUT (FORMAT csv) and
+  parsed into typed Arrow batches by pyarrow's multithreaded CSV reader,
+  so memory use does not grow with the table size and no Python code
+  runs per row
+- low-cardinality text columns (by pg_stats) are stored as dictionary
+  columns and come back as pandas categoricals; every column also gets
+  Parquet dictionary pages and zstd compression
+- large tables with a date or timestamp column are hive-partitioned by
+  its year (<column>_year=2023/), so a filter on the year only opens the
+  files it needs
+- shared-data/parquet/_manifest.json records a change token per table
+  (relfilenode and insert/update/delete counters of every partition, plus
+  the column definitions); tables whose token has not changed are skipped
+
+Like the query cache, the counters are published by PostgreSQL with a
+delay of a few seconds, so run with --force right after changing data.
+
+Usage:
+    python scripts/export_parquet.py                     # changed tables
+    python scripts/export_parquet.py --schema sakila --jobs 4
+    python scripts/export_parquet.py --force             # everything
+
+    import pandas as pd
+    rentals = pd.read_parquet('shared-data/parquet/sakila/rental',
+                              columns=['rental_id', 'customer_id'],
+                              filters=[('rental_date_year', '=', 2023)])
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import bulk_load
+import db
+import query
+from ingest import CATEGORY_RATIO, COMPRESSION, load_manifest, save_manifest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPORT_DIR = os.path.join(REPO_DIR, 'shared-data', 'parquet')
+
+JOBS = min(os.cpu_count() or 1, 8)
+# Bytes of CSV parsed into one Arrow batch
+BLOCK_SIZE = 16 * 1024 * 1024
+# Tables with at least this many rows are partitioned by year
+PARTITION_MIN_ROWS = 500_000
+# Text columns with at most this many distinct values (and at most
+# CATEGORY_RATIO of the rows) become dictionaries
+DICTIONARY_MAX_DISTINCT = 1000
+# Timestamp columns that record edits rather than events
+AUDIT_COLUMNS = {'last_update', 'modified_date', 'last_edited_when',
+                 'updated_at', 'created_at'}
+
+TEXT_OIDS = {25, 1042, 1043}
+# bytea would come out of COPY in its hex text form; export it as text
+COPY_AS_TEXT_OIDS = {17}
+DATE_OIDS = {1082, 1114, 1184}
+
+CREATE_SCHEMA = re.compile(
+    r'^CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+
+TABLES_SQL = """
+    SELECT n.nspname, c.relname, c.relkind, greatest(c.reltuples, 0)::bigint,
+           (SELECT md5(string_agg(
+                       t.relid::oid || ':' || pg_relation_filenode(t.relid)
+                       || ':' || coalesce(s.n_tup_ins, 0)
+                       || ':' || coalesce(s.n_tup_upd, 0)
+                       || ':' || coalesce(s.n_tup_del, 0), ','
+                       ORDER BY t.relid))
+            FROM (SELECT c.oid AS relid WHERE c.relkind <> 'p'
+                  UNION ALL
+                  SELECT relid FROM pg_partition_tree(c.oid)
+                  WHERE isleaf AND c.relkind = 'p') t
+            LEFT JOIN pg_stat_all_tables s ON s.relid = t.relid),
+           (SELECT md5(string_agg(a.attname || ':'
+                                  || format_type(a.atttypid, a.atttypmod),
+                                  ',' ORDER BY a.attnum))
+            FROM pg_attribute a
+            WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = ANY(%s)
+      AND c.relkind IN ('r', 'p', 'm')
+      AND NOT c.relispartition
+"""
+
+COLUMNS_SQL = """
+    SELECT a.attname, a.atttypid, a.attnotnull, s.n_distinct
+    FROM pg_attribute a
+    LEFT JOIN pg_stats s ON s.schemaname = %s AND s.tablename = %s
+                        AND s.attname = a.attname
+    WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum
+"""
+
+
+def sample_relations(databases_dir=bulk_load.DATABASES_DIR):
+    """
+    {schema: tables} for the objects databases/*.sql defines.
+
+    tables is None when the file creates its own schema (export all of
+    it), or the set of tables the file creates in public.
+    """
+    relations = {}
+    for path in sorted(glob.glob(os.path.join(databases_dir, '*.sql'))):
+        with open(path, encoding='utf-8') as handle:
+            statements = bulk_load.split_statements(handle.read())
+        schema = None
+        tables = set()
+        for statement in statements:
+            match = CREATE_SCHEMA.match(statement)
+            if match:
+                schema = match.group(1).lower()
+            match = bulk_load.CREATE_TABLE.match(statement)
+            if match:
+                tables.add(match.group(1).lower().split('.')[-1])
+        if schema:
+            relations[schema] = None
+        elif tables:
+            relations.setdefault('public', set()).update(tables)
+    return relations
+
+
+def list_tables(conn, relations):
+    """[{schema, table, kind, rows, token}] for the sample relations."""
+    with conn.cursor() as cursor:
+        cursor.execute(TABLES_SQL, (list(relations),))
+        rows = cursor.fetchall()
+    conn.rollback()
+    tables = []
+    for schema, table, kind, estimate, data_token, columns_token in rows:
+        wanted = relations.get(schema)
+        if wanted is not None and table not in wanted:
+            continue
+        tables.append({'schema': schema, 'table': table, 'kind': kind,
+                       'estimate': estimate,
+                       'token': f'{data_token}:{columns_token}'})
+    return tables
+
+
+def plan_columns(cursor, schema, table, estimate):
+    """
+    (statement, column types, dictionary columns, partition column).
+
+    Column types without a fixed Arrow type in query.py are exported as
+    text, so every batch of a table has the same schema.
+    """
+    import pyarrow as pa
+
+    cursor.execute(COLUMNS_SQL, (schema, table,
+                                 pgsql.Identifier(schema, table).as_string(cursor)))
+    select = []
+    types = {}
+    dictionary = []
+    partition_by = None
+    for name, type_oid, not_null, n_distinct in cursor.fetchall():
+        column = pgsql.Identifier(name)
+        type_ = None if type_oid in COPY_AS_TEXT_OIDS else query.arrow_type(type_oid)
+        if type_ is None:
+            select.append(pgsql.SQL('{}::text AS {}').format(column, column))
+            type_ = pa.string()
+        else:
+            select.append(column)
+        types[name] = type_
+        if type_oid in TEXT_OIDS and n_distinct is not None:
+            distinct = n_distinct if n_distinct >= 0 else -n_distinct * estimate
+            if 0 < distinct <= min(DICTIONARY_MAX_DISTINCT,
+                                   CATEGORY_RATIO * estimate):
+                dictionary.append(name)
+        if (partition_by is None and type_oid in DATE_OIDS and not_null
+                and name not in AUDIT_COLUMNS
+                and estimate >= PARTITION_MIN_ROWS):
+            partition_by = name
+    statement = pgsql.SQL('SELECT {} FROM {}').format(
+        pgsql.SQL(', ').join(select), pgsql.Identifier(schema, table))
+    return statement.as_string(cursor), types, dictionary, partition_by
+
+
+def copy_batches(conn, statement, types, block_size=BLOCK_SIZE):
+    """
+    Yield the result of statement as Arrow RecordBatches, via COPY.
+
+    COPY writes CSV into a pipe from a background thread while pyarrow
+    parses it into batches of types. In COPY's CSV an unquoted empty
+    field is NULL and a quoted one is an empty string.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def pump():
+        try:
+            with os.fdopen(write_fd, 'wb') as out, conn.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY ({statement}) TO STDOUT (FORMAT csv)', out)
+        except Exception as e:  # re-raised in the reading thread
+            errors.append(e)
+
+    thread = threading.Thread(target=pump, daemon=True)
+    thread.start()
+    source = os.fdopen(read_fd, 'rb')
+    try:
+        if not source.peek(1):
+            thread.join()
+            if not errors:
+                yield pa.RecordBatch.from_pylist(
+                    [], schema=pa.schema(list(types.items())))
+        else:
+            reader = pcsv.open_csv(
+                source,
+                read_options=pcsv.ReadOptions(column_names=list(types),
+                                              block_size=block_size),
+                convert_options=pcsv.ConvertOptions(
+                    column_types=types, strings_can_be_null=True,
+                    quoted_strings_can_be_null=False,
+                    true_values=['t'], false_values=['f']))
+            yield from reader
+    finally:
+        # Closing the read end stops a COPY the caller no longer wants
+        source.close()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def _encode(batch, dictionary):
+    """Turn the dictionary columns of a RecordBatch into Arrow dictionaries."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not dictionary:
+        return pa.Table.from_batches([batch])
+    arrays = [pc.dictionary_encode(batch.column(i))
+              if field.name in dictionary else batch.column(i)
+              for i, field in enumerate(batch.schema)]
+    return pa.Table.from_arrays(arrays, names=batch.schema.names)
+
+
+class PartitionWriters:
+    """One ParquetWriter per partition directory, opened on first use."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.writers = {}
+        self.files = 0
+
+    def write(self, table, key=''):
+        import pyarrow.parquet as pq
+
+        writer = self.writers.get(key)
+        if writer is None:
+            directory = os.path.join(self.output_dir, key)
+            os.makedirs(directory, exist_ok=True)
+            writer = pq.ParquetWriter(
+                os.path.join(directory, 'part-0.parquet'), table.schema,
+                compression=COMPRESSION, use_dictionary=True)
+            self.writers[key] = writer
+            self.files += 1
+        writer.write_table(table)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+def write_partitioned(writers, table, column):
+    """Split a table by the year of column and write each part."""
+    import pyarrow.compute as pc
+
+    years = pc.year(table.column(column))
+    name = f'{column}_year'
+    for year in pc.unique(years).to_pylist():
+        mask = pc.is_null(years) if year is None else pc.equal(years, year)
+        value = '__HIVE_DEFAULT_PARTITION__' if year is None else year
+        writers.write(table.filter(mask), f'{name}={value}')
+
+
+def export_table(params, schema, table, output_dir, estimate=0):
+    """Export one table to output_dir. Runs in a worker process."""
+    started = time.perf_counter()
+    conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT,
+                            options=db.MAINTENANCE_OPTIONS, **params)
+    temp_dir = os.path.join(os.path.dirname(output_dir),
+                            f'.{os.path.basename(output_dir)}.tmp')
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    writers = PartitionWriters(temp_dir)
+    rows = 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SET TimeZone = 'UTC'")
+            statement, types, dictionary, partition_by = plan_columns(
+                cursor, schema, table, estimate)
+        for batch in copy_batches(conn, statement, types):
+            chunk = _encode(batch, dictionary)
+            if partition_by and chunk.num_rows:
+                write_partitioned(writers, chunk, partition_by)
+            elif not partition_by or not writers.files:
+                writers.write(chunk)
+            rows += chunk.num_rows
+        writers.close()
+        conn.rollback()
+    except Exception:
+        writers.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    finally:
+        conn.close()
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(temp_dir, output_dir)
+    size = sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(output_dir) for name in names)
+    return {
+        'rows': rows,
+        'files': writers.files,
+        'bytes': size,
+        'dictionary': dictionary,
+        'partition_by': f'{partition_by}_year' if partition_by else None,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def manifest_entry(table, result, output=EXPORT_DIR):
+    """The manifest record of a table exported by export_table()."""
+    return {
+        'schema': table['schema'],
+        'table': table['table'],
+        'token': table['token'],
+        'output': os.path.relpath(
+            os.path.join(output, table['schema'], table['table']), REPO_DIR),
+        **result,
+        'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def export(params, schemas=None, output=EXPORT_DIR, jobs=JOBS, force=False):
+    """
+    Export the changed tables; returns (exported, skipped, failed, removed).
+
+    The manifest is saved after every finished table, so an interrupted
+    run keeps what it already exported.
+    """
+    from pyarrow import ArrowException
+
+    relations = sample_relations()
+    if schemas:
+        relations = {s: t for s, t in relations.items() if s in schemas}
+    conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT, **params)
+    try:
+        tables = list_tables(conn, relations)
+    finally:
+        conn.close()
+
+    os.makedirs(output, exist_ok=True)
+    manifest = load_manifest(output)
+    current = {f"{t['schema']}.{t['table']}" for t in tables}
+    removed = []
+    for key, entry in list(manifest.items()):
+        if entry.get('schema') in relations and key not in current:
+            shutil.rmtree(os.path.join(output, entry['schema'], entry['table']),
+                          ignore_errors=True)
+            del manifest[key]
+            removed.append(key)
+
+    todo = []
+    skipped = []
+    for table in tables:
+        key = f"{table['schema']}.{table['table']}"
+        output_dir = os.path.join(output, table['schema'], table['table'])
+        previous = manifest.get(key)
+        if (not force and previous and previous.get('token') == table['token']
+                and os.path.isdir(output_dir)):
+            skipped.append(key)
+        else:
+            todo.append((key, table, output_dir))
+    # Largest first, so the big tables don't start last
+    todo.sort(key=lambda item: -item[1]['estimate'])
+
+    exported = []
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as executor:
+        futures = {}
+        for key, table, output_dir in todo:
+            os.makedirs(os.path.dirname(output_dir), exist_ok=True)
+            futures[executor.submit(export_table, params, table['schema'],
+                                    table['table'], output_dir,
+                                    table['estimate'])] = (key, table)
+        for future in as_completed(futures):
+            key, table = futures[future]
+            try:
+                result = future.result()
+            except (psycopg2.Error, OSError, ValueError, ArrowException) as e:
+                failed.append(key)
+                print(f"   ❌ {key}: {str(e).strip()}")
+                continue
+            manifest[key] = manifest_entry(table, result, output)
+            save_manifest(manifest, output)
+            exported.append(key)
+            extra = ''
+            if result['partition_by']:
+                extra = f", {result['files']} partitions by {result['partition_by']}"
+            print(f"   ✅ {key:<40} {result['rows']:>10,} rows "
+                  f"{result['bytes'] / 1e6:>8.1f} MB ({result['seconds']:.1f}s"
+                  f"{extra})")
+    save_manifest(manifest, output)
+    return exported, skipped, failed, removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export the sample schemas to Parquet")
+    parser.add_argument('--schema', action='append',
+                        help='schema to export (repeatable, default: all '
+                             'defined in databases/*.sql)')
+    parser.add_argument('--output', default=EXPORT_DIR,
+                        help='export directory (default: shared-data/parquet)')
+    parser.add_argument('--jobs', '-j', type=int, default=JOBS,
+                        help=f'tables exported in parallel (default: {JOBS})')
+    parser.add_argument('--force', action='store_true',
+                        help='export every table, changed or not')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    print("📦 Parquet export")
+    print("=" * 50)
+    started = time.perf_counter()
+    try:
+        params = db.params_from_args(args)
+        exported, skipped, failed, removed = export(
+            params, args.schema, args.output, args.jobs, args.force)
+    except psycopg2.Error as e:
+        print(f"❌ Could not list tables: {e}")
+        return 1
+
+    for key in removed:
+        print(f"   🗑️ {key}: no longer in the database, removed")
+    print(f"\n📊 {len(exported)} exported, {len(skipped)} unchanged, "
+          f"{len(failed)} failed in {time.perf_counter() - started:.1f}s")
+    print(f"📁 {os.path.relpath(args.output)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
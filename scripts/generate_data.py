@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Synthetic scale-up generator for the sample schemas (dbgen style).
+
+Rows are derived from the hand-written seed data in databases/*.sql:
+  - lookup tables (no outgoing foreign keys) keep their seed rows
+  - every other table is scaled to seed_rows * scale_factor
+  - plain columns are resampled from the seed values, so the value
+    distributions match the seed rows
+  - foreign keys are drawn so that they always hit an existing parent row
+    and keep the seed's skew across parent rows
+  - dates are spread uniformly over the seed date range (widened to
+    --date-span-days) so time-based queries have something to filter
+
+Tables are generated chunk by chunk with NumPy and streamed into
+PostgreSQL through COPY FROM STDIN, so memory stays bounded no matter
+how large the scale factor is.
+
+Usage:
+    python scripts/generate_data.py sakila --scale 100
+    python scripts/generate_data.py sakila --target rental=10000000
+    python scripts/generate_data.py northwind chinook --scale 10 -j 2
+
+Each generated schema is dropped and recreated, which also drops the
+dashboard views; reload them afterwards with:
+    python scripts/bulk_load.py dashboard
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import psycopg2
+
+import bulk_load
+import db
+
+CHUNK_ROWS = 100_000
+BASE36 = np.array(list('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+
+# Per-schema overrides of the "lookup tables stay fixed" rule:
+# True forces a table to scale, False keeps its seed rows as-is
+SCALE_OVERRIDES = {
+    'northwind': {'customers': True, 'suppliers': True},
+    'sakila': {'store': False, 'staff': False, 'actor': True},
+    'chinook': {'artist': True},
+    'hr_employees': {'job_history': False, 'departments': False},
+    'worldwideimporters': {'people': True},
+}
+
+FOREIGN_KEY = re.compile(
+    r'ALTER\s+TABLE\s+(\w+)\s+ADD\s+(?:CONSTRAINT\s+\w+\s+)?FOREIGN\s+KEY\s*'
+    r'\((\w+)\)\s*REFERENCES\s+(\w+)\s*\((\w+)\)',
+    re.IGNORECASE
+)
+TABLE_PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+TYPE_WIDTH = re.compile(r'CHAR\s*\((\d+)\)', re.IGNORECASE)
+
+
+class TableSpec:
+    """Everything needed to generate one table, derived from the DDL."""
+
+    def __init__(self, name):
+        self.name = name
+        self.types = {}
+        self.widths = {}
+        self.serial = None
+        self.primary_key = []
+        self.unique = set()
+        self.foreign_keys = {}
+        self.columns = []
+        self.seed_rows = []
+        self.scaled = False
+        self.rows = 0
+
+    def seed_column(self, column):
+        """Return the seed values for one column."""
+        index = self.columns.index(column)
+        return [row[index] for row in self.seed_rows]
+
+
+def parse_schema(sql):
+    """Build TableSpecs from a schema file using the bulk loader's planner."""
+    pre_data, data, post_data = bulk_load.plan_load(sql)
+    tables = {}
+
+    for _, statement in pre_data:
+        match = bulk_load.CREATE_TABLE.match(statement)
+        if not match:
+            continue
+        spec = TableSpec(match.group(1))
+        body = statement[match.end():statement.rfind(')')]
+        for line in re.split(r',\s*\n', body):
+            words = line.split()
+            if not words:
+                continue
+            head = words[0].upper()
+            if head == 'PRIMARY':
+                key = TABLE_PRIMARY_KEY.search(line)
+                spec.primary_key = [c.strip() for c in key.group(1).split(',')]
+                continue
+            if head in ('FOREIGN', 'CONSTRAINT', 'UNIQUE', 'CHECK'):
+                continue
+            column = words[0]
+            column_type = words[1].upper() if len(words) > 1 else ''
+            spec.types[column] = column_type
+            width = TYPE_WIDTH.search(line)
+            if width:
+                spec.widths[column] = int(width.group(1))
+            if 'PRIMARY KEY' in line.upper():
+                spec.primary_key = [column]
+                if column_type == 'SERIAL':
+                    spec.serial = column
+            if re.search(r'\bUNIQUE\b', line, re.IGNORECASE):
+                spec.unique.add(column)
+        tables[spec.name] = spec
+
+    for kind, payload in data:
+        if kind != 'copy':
+            continue
+        table, columns, rows = payload
+        if table in tables:
+            tables[table].columns = [c.strip() for c in columns.split(',')]
+            tables[table].seed_rows = rows
+
+    for _, statement in post_data:
+        match = FOREIGN_KEY.search(statement)
+        if match and match.group(1) in tables:
+            child, column, parent, parent_column = match.groups()
+            tables[child].foreign_keys[column] = (parent, parent_column)
+
+    return tables
+
+
+def plan_sizes(tables, scale, overrides):
+    """Decide which tables scale and how many rows each one gets."""
+    for spec in tables.values():
+        outgoing = [p for p, _ in spec.foreign_keys.values() if p != spec.name]
+        spec.scaled = overrides.get(spec.name, bool(outgoing))
+        seed_count = len(spec.seed_rows)
+        if spec.scaled and seed_count:
+            spec.rows = max(seed_count, int(round(seed_count * scale)))
+        else:
+            spec.rows = seed_count
+
+    # Composite keys made of two foreign keys can only hold so many pairs
+    for spec in tables.values():
+        if spec.scaled and len(spec.primary_key) == 2 and all(
+                c in spec.foreign_keys for c in spec.primary_key):
+            first, second = (tables[spec.foreign_keys[c][0]]
+                             for c in spec.primary_key)
+            spec.rows = min(spec.rows, first.rows * second.rows)
+
+
+def base36(values, width):
+    """Vectorised zero-padded base36 encoding of a non-negative int array."""
+    values = np.asarray(values, dtype=np.int64)
+    digits = []
+    for _ in range(width):
+        digits.append(BASE36[values % 36])
+        values = values // 36
+    result = digits[-1].astype(object)
+    for digit in reversed(digits[:-1]):
+        result = result + digit.astype(object)
+    return result
+
+
+class KeyMapper:
+    """Map 0-based row positions of a table to its key values as text."""
+
+    def __init__(self, spec, column):
+        self.spec = spec
+        self.column = column
+        explicit = column in spec.columns
+        if not explicit or (spec.scaled and spec.serial == column):
+            self.mode = 'serial'
+        elif spec.scaled:
+            self.mode = 'unique'
+            self.unique = UniqueText(spec, column)
+        else:
+            self.mode = 'seed'
+            self.values = np.array(
+                [bulk_load.copy_escape(v) for v in spec.seed_column(column)],
+                dtype=object
+            )
+
+    def __call__(self, positions):
+        if self.mode == 'serial':
+            return (positions + 1).astype(str).astype(object)
+        if self.mode == 'unique':
+            return self.unique(positions)
+        return self.values[positions]
+
+    def position_of(self, seed_value):
+        """Position of a seed key value in the parent, or None."""
+        if seed_value is None:
+            return None
+        if self.column not in self.spec.columns:
+            return int(seed_value) - 1
+        seeds = self.spec.seed_column(self.column)
+        return seeds.index(seed_value) if seed_value in seeds else None
+
+
+class UniqueText:
+    """Unique text values: a seed prefix plus a fixed-width base36 suffix."""
+
+    def __init__(self, spec, column):
+        seeds = [str(v) for v in spec.seed_column(column) if v is not None]
+        self.pool = np.array(seeds or ['X'], dtype=object)
+        self.suffix_width = max(1, len(np.base_repr(max(spec.rows - 1, 1), 36)))
+        width = spec.widths.get(column)
+        if width is None:
+            width = max(len(s) for s in self.pool) + self.suffix_width + 1
+        if self.suffix_width > width:
+            raise ValueError(f"{spec.name}.{column} is too narrow for "
+                             f"{spec.rows} unique values")
+        self.prefix_width = width - self.suffix_width
+
+    def __call__(self, positions):
+        prefixes = self.pool[positions % len(self.pool)]
+        suffixes = base36(positions, self.suffix_width)
+        return np.array(
+            [bulk_load.copy_escape(p[:self.prefix_width] + s)
+             for p, s in zip(prefixes, suffixes)],
+            dtype=object
+        )
+
+
+def to_datetime64(value):
+    """Parse a seed date/timestamp literal."""
+    return np.datetime64(str(value).replace(' ', 'T'), 's')
+
+
+def build_generators(spec, tables, date_span_days):
+    """Return one generator function per output column of a scaled table."""
+    generators = []
+    for column in spec.columns:
+        seeds = spec.seed_column(column)
+        null_rate = sum(v is None for v in seeds) / len(seeds)
+        column_type = spec.types.get(column, '')
+
+        if column == spec.serial:
+            generators.append(
+                lambda rng, pos: (pos + 1).astype(str).astype(object))
+        elif column in spec.foreign_keys:
+            generators.append(foreign_key_generator(
+                spec, column, tables, seeds, null_rate))
+        elif column in spec.unique or spec.primary_key == [column]:
+            generators.append(
+                lambda rng, pos, u=UniqueText(spec, column): u(pos))
+        elif column_type.startswith(('DATE', 'TIMESTAMP')) and any(
+                v is not None for v in seeds):
+            generators.append(date_generator(
+                seeds, null_rate, date_span_days,
+                'D' if column_type.startswith('DATE') else 's'))
+        else:
+            pool = np.array([bulk_load.copy_escape(v) for v in seeds],
+                            dtype=object)
+            generators.append(
+                lambda rng, pos, pool=pool:
+                    pool[rng.integers(0, len(pool), len(pos))])
+    return generators
+
+
+def foreign_key_generator(spec, column, tables, seeds, null_rate):
+    """Draw parent keys that exist and follow the seed's skew."""
+    parent_name, parent_column = spec.foreign_keys[column]
+    parent = tables[parent_name]
+    mapper = KeyMapper(parent, parent_column)
+    parent_seed_count = max(len(parent.seed_rows), 1)
+    blocks = max(parent.rows // parent_seed_count, 1)
+
+    composite = (len(spec.primary_key) == 2
+                 and all(c in spec.foreign_keys for c in spec.primary_key))
+    if composite and column == spec.primary_key[0]:
+        # First column of a composite key walks the parent sequentially
+        fanout = math.ceil(spec.rows / max(parent.rows, 1))
+        return lambda rng, pos: mapper(pos // fanout)
+    if composite:
+        # Second column is spread so (first, second) pairs never repeat
+        first_parent = tables[spec.foreign_keys[spec.primary_key[0]][0]]
+        fanout = math.ceil(spec.rows / max(first_parent.rows, 1))
+        return lambda rng, pos: mapper(
+            ((pos // fanout) * 7919 + pos % fanout) % parent.rows)
+
+    positions = [mapper.position_of(v) for v in seeds]
+    pool = np.array([p for p in positions
+                     if p is not None and p < parent_seed_count],
+                    dtype=np.int64)
+
+    def generate(rng, pos):
+        count = len(pos)
+        if len(pool):
+            drawn = pool[rng.integers(0, len(pool), count)]
+            drawn = drawn + parent_seed_count * rng.integers(0, blocks, count)
+            drawn = np.minimum(drawn, parent.rows - 1)
+        else:
+            drawn = rng.integers(0, parent.rows, count)
+        values = mapper(drawn)
+        if null_rate:
+            values[rng.random(count) < null_rate] = '\\N'
+        return values
+
+    return generate
+
+
+def date_generator(seeds, null_rate, span_days, unit):
+    """Uniform dates over the seed range, widened to span_days."""
+    dates = [to_datetime64(v) for v in seeds if v is not None]
+    start = min(dates)
+    end = max(max(dates), start + np.timedelta64(span_days, 'D'))
+    span = int((end - start) / np.timedelta64(1, 's'))
+
+    def generate(rng, pos):
+        count = len(pos)
+        values = start + rng.integers(0, span + 1, count).astype(
+            'timedelta64[s]')
+        text = np.datetime_as_string(values.astype(f'datetime64[{unit}]'))
+        text = np.char.replace(text, 'T', ' ').astype(object)
+        if null_rate:
+            text[rng.random(count) < null_rate] = '\\N'
+        return text
+
+    return generate
+
+
+class ChunkStream:
+    """File-like object that feeds COPY from a generator of text chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.buffer += next(self.chunks)
+            except StopIteration:
+                break
+        if size < 0:
+            data, self.buffer = self.buffer, ''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def seed_columns(spec, tables):
+    """
+    COPY text columns of a table that keeps its seed rows.
+
+    Foreign keys into a scaled parent are mapped through the parent's
+    KeyMapper, since scaling renumbers the parent's keys (hr locations
+    1000, 1100, ... become 1, 2, ...). Seed keys without a parent seed row
+    (hr departments managed by employees the seed doesn't have) are mapped
+    to a fixed row drawn from their value, so they still hit a parent.
+    """
+    columns = []
+    for column in spec.columns:
+        seeds = spec.seed_column(column)
+        parent_name, parent_column = spec.foreign_keys.get(column, (None, None))
+        parent = tables.get(parent_name)
+        values = [bulk_load.copy_escape(v) for v in seeds]
+        if parent is not None and parent.scaled:
+            mapper = KeyMapper(parent, parent_column)
+            for row, value in enumerate(seeds):
+                if value is None:
+                    continue
+                position = mapper.position_of(value)
+                if position is None or not 0 <= position < parent.rows:
+                    position = zlib.crc32(str(value).encode()) % parent.rows
+                values[row] = mapper(np.array([position]))[0]
+        columns.append(values)
+    return columns
+
+
+def table_chunks(spec, tables, seed, date_span_days):
+    """Yield COPY text for a table, CHUNK_ROWS rows at a time."""
+    if not spec.scaled:
+        yield ''.join('\t'.join(row) + '\n'
+                      for row in zip(*seed_columns(spec, tables)))
+        return
+
+    rng = np.random.default_rng([seed, len(spec.name)] + list(
+        spec.name.encode()))
+    generators = build_generators(spec, tables, date_span_days)
+    for start in range(0, spec.rows, CHUNK_ROWS):
+        positions = np.arange(start, min(start + CHUNK_ROWS, spec.rows),
+                              dtype=np.int64)
+        columns = [generate(rng, positions) for generate in generators]
+        yield ''.join('\t'.join(row) + '\n' for row in zip(*columns))
+
+
+def generate_schema(name, scale, targets, params, seed, date_span_days,
+                    databases_dir):
+    """Recreate one schema and stream its generated rows into it."""
+    started = time.perf_counter()
+    with open(os.path.join(databases_dir, f"{name}.sql"),
+              encoding='utf-8') as handle:
+        sql = handle.read()
+    tables = parse_schema(sql)
+    for table, rows in targets.items():
+        if table in tables and tables[table].seed_rows:
+            scale = max(scale, rows / len(tables[table].seed_rows))
+    plan_sizes(tables, scale, SCALE_OVERRIDES.get(name, {}))
+    pre_data, _, post_data = bulk_load.plan_load(sql)
+
+    schema = next((re.search(r'SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)',
+                             s, re.IGNORECASE).group(1)
+                   for _, s in pre_data
+                   if s.upper().startswith('CREATE SCHEMA')), None)
+
+    result = {'name': name, 'rows': 0, 'errors': [], 'seconds': 0.0,
+              'tables': {}}
+    conn = psycopg2.connect(options=db.MAINTENANCE_OPTIONS, **params)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET synchronous_commit TO off")
+        if schema:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        else:
+            for table in tables:
+                cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+        for _, statement in pre_data:
+            cursor.execute(statement.replace(
+                'CREATE TABLE IF NOT EXISTS', 'CREATE TABLE'))
+
+        for spec in tables.values():
+            if not spec.seed_rows:
+                continue
+            stream = ChunkStream(table_chunks(spec, tables, seed,
+                                              date_span_days))
+            cursor.copy_expert(
+                f"COPY {spec.name} ({', '.join(spec.columns)}) FROM STDIN",
+                stream, size=1 << 20
+            )
+            result['tables'][spec.name] = spec.rows
+            result['rows'] += spec.rows
+            if spec.serial:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                    f"COALESCE(MAX({spec.serial}), 1)) FROM {spec.name}",
+                    (spec.name, spec.serial)
+                )
+        conn.commit()
+
+        for _, statement in post_data:
+            cursor.execute("SAVEPOINT step")
+            try:
+                cursor.execute(statement)
+                cursor.execute("RELEASE SAVEPOINT step")
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT step")
+                result['errors'].append(
+                    f"{statement.splitlines()[0][:60]}: "
+                    f"{str(e).strip().splitlines()[0]}")
+        conn.commit()
+
+        if result['tables']:
+            conn.autocommit = True
+            cursor.execute(f"ANALYZE {', '.join(result['tables'])}")
+        cursor.close()
+    finally:
+        conn.close()
+
+    result['seconds'] = time.perf_counter() - started
+    return result
+
+
+def parse_targets(values):
+    """Parse --target table=rows options."""
+    targets = {}
+    for value in values or []:
+        table, _, rows = value.partition('=')
+        targets[table.strip()] = int(rows)
+    return targets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate scaled-up, FK-consistent sample data")
+    parser.add_argument('databases', nargs='+',
+                        help='schemas to generate, e.g. sakila northwind')
+    parser.add_argument('--scale', '-s', type=float, default=10,
+                        help='multiple of the seed row counts (default: 10)')
+    parser.add_argument('--target', action='append', metavar='TABLE=ROWS',
+                        help='raise the scale so TABLE reaches ROWS rows')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='random seed for reproducible output')
+    parser.add_argument('--date-span-days', type=int, default=365,
+                        help='minimum spread of generated dates in days')
+    parser.add_argument('--jobs', '-j', type=int, default=None)
+    parser.add_argument('--databases-dir', default=bulk_load.DATABASES_DIR)
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    try:
+        params = db.params_from_args(args)
+    except psycopg2.Error as e:
+        print(f"❌ Cannot connect to database: {e}")
+        return 1
+    targets = parse_targets(args.target)
+
+    print(f"🏭 Generating synthetic data (scale factor {args.scale:g})")
+    print("=" * 50)
+    started = time.perf_counter()
+    results = []
+    workers = args.jobs or min(len(args.databases), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(generate_schema, name, args.scale, targets, params,
+                        args.seed, args.date_span_days,
+                        args.databases_dir): name
+            for name in args.databases
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'name': futures[future], 'rows': 0,
+                          'errors': [str(e)], 'seconds': 0.0, 'tables': {}}
+            bulk_load.print_result(result)
+            for table, rows in sorted(result['tables'].items(),
+                                      key=lambda item: -item[1])[:5]:
+                print(f"    {table}: {rows:,} rows")
+            results.append(result)
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(r['rows'] for r in results)
+    print("=" * 50)
+    print(f"📊 Generated {total_rows:,} rows in {elapsed:.1f}s "
+          f"({total_rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    if any(r['errors'] for r in results):
+        print("⚠️ Some constraints or views could not be created")
+        return 1
+    print("🎉 Synthetic data generated successfully!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
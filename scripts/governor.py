@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Resource governor for the shared classroom server.
+
+One accidental cross join on sakila or wwi can pin a core and fill the
+disk with temp files for everyone. The governor works on two levels:
+
+- per-role limits (ROLE_LIMITS): statement_timeout,
+  idle_in_transaction_session_timeout, work_mem and temp_file_limit are
+  stored on the student roles with ALTER ROLE ... SET, so they apply to
+  every session whatever client it comes from. setup_database.sh and
+  post-start.sh apply them; provision_students.py applies them to every
+  role it creates. Maintenance scripts (loading, snapshots, index builds)
+  switch the timeouts off for their own sessions with
+  db.MAINTENANCE_OPTIONS.
+- a monitor over pg_stat_activity that lists the running backends and,
+  when asked, cancels queries running longer than --cancel-after and
+  terminates sessions idle in a transaction longer than --terminate-idle.
+
+Previews in query.py are limited on the server as well (the query is
+wrapped in a LIMIT), so SELECT * on a big table never runs to completion.
+
+Changing role settings needs a superuser (temp_file_limit) or CREATEROLE;
+without superuser rights (or pg_signal_backend) the monitor can only
+cancel your own backends.
+
+Commands:
+    apply [--role R]    store the limits on the roles (default: student, vscode)
+    show                show the limits currently stored on roles
+    reset [--role R]    remove the limits again
+    monitor             list backends (optionally cancel runaway ones)
+
+Usage:
+    python scripts/governor.py apply
+    python scripts/governor.py apply --sql | sudo -u postgres psql
+    python scripts/governor.py apply --role alice --set statement_timeout=5min
+    python scripts/governor.py monitor --cancel-after 300 --watch 10
+"""
+
+import argparse
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import db
+
+# Settings stored on every governed role
+ROLE_LIMITS = {
+    'statement_timeout': '2min',
+    'idle_in_transaction_session_timeout': '10min',
+    'work_mem': '32MB',
+    'temp_file_limit': '2GB',
+}
+GOVERNED_ROLES = ['student', 'vscode']
+
+ROLE_SETTINGS_SQL = """
+    SELECT r.rolname, s.setconfig
+    FROM pg_db_role_setting s
+    JOIN pg_roles r ON r.oid = s.setrole
+    WHERE s.setdatabase = 0
+    ORDER BY r.rolname
+"""
+
+BACKENDS_SQL = """
+    SELECT pid, usename, datname, state,
+           extract(epoch FROM now() - query_start) AS query_seconds,
+           extract(epoch FROM now() - state_change) AS state_seconds,
+           wait_event_type, wait_event,
+           regexp_replace(left(query, 120), '\\s+', ' ', 'g') AS query
+    FROM pg_stat_activity
+    WHERE backend_type = 'client backend'
+      AND pid <> pg_backend_pid()
+      AND (%(user)s IS NULL OR usename = %(user)s)
+    ORDER BY query_start NULLS LAST
+"""
+
+
+def parse_setting(text):
+    """'name=value' -> (name, value), for --set."""
+    name, sep, value = text.partition('=')
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    return name.strip(), value.strip()
+
+
+def apply_limits(cursor, role, limits=None):
+    """Store the limits on a role (ALTER ROLE ... SET)."""
+    for name, value in (limits or ROLE_LIMITS).items():
+        cursor.execute(pgsql.SQL("ALTER ROLE {} SET {} = %s").format(
+            pgsql.Identifier(role), pgsql.Identifier(name)), (value,))
+
+
+def limits_script(roles, limits=None):
+    """
+    The apply statements as a psql script, skipping missing roles.
+
+    For setup scripts that can only reach the server through psql (e.g.
+    sudo -u postgres psql), where no Python connection is available.
+    """
+    def literal(value):
+        return "'" + str(value).replace("'", "''") + "'"
+
+    def identifier(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    lines = []
+    for role in roles:
+        settings = ''.join(
+            f"        ALTER ROLE {identifier(role)} SET {identifier(name)} "
+            f"= {literal(value)};\n"
+            for name, value in (limits or ROLE_LIMITS).items())
+        lines.append(
+            f"DO $$\nBEGIN\n"
+            f"    IF EXISTS (SELECT FROM pg_roles WHERE rolname = "
+            f"{literal(role)}) THEN\n{settings}    END IF;\nEND\n$$;\n")
+    return '\n'.join(lines)
+
+
+def reset_limits(cursor, role, names=None):
+    for name in names or ROLE_LIMITS:
+        cursor.execute(pgsql.SQL("ALTER ROLE {} RESET {}").format(
+            pgsql.Identifier(role), pgsql.Identifier(name)))
+
+
+def existing_roles(cursor, roles):
+    cursor.execute("SELECT rolname FROM pg_roles WHERE rolname = ANY(%s)",
+                   (list(roles),))
+    found = {row[0] for row in cursor.fetchall()}
+    return [role for role in roles if role in found]
+
+
+def role_settings(cursor):
+    """{role: {name: value}} of the settings stored on roles."""
+    cursor.execute(ROLE_SETTINGS_SQL)
+    return {role: dict(item.split('=', 1) for item in config)
+            for role, config in cursor.fetchall()}
+
+
+def list_backends(cursor, user=None):
+    cursor.execute(BACKENDS_SQL, {'user': user})
+    columns = [column.name for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def runaway(backends, cancel_after=None, terminate_idle=None):
+    """[(action, backend)] for backends over the limits."""
+    actions = []
+    for backend in backends:
+        if (cancel_after is not None and backend['state'] == 'active'
+                and (backend['query_seconds'] or 0) > cancel_after):
+            actions.append(('cancel', backend))
+        elif (terminate_idle is not None
+                and backend['state'] and backend['state'].startswith('idle in')
+                and (backend['state_seconds'] or 0) > terminate_idle):
+            actions.append(('terminate', backend))
+    return actions
+
+
+def signal_backend(cursor, action, pid):
+    function = 'pg_cancel_backend' if action == 'cancel' else 'pg_terminate_backend'
+    cursor.execute(f"SELECT {function}(%s)", (pid,))
+    return cursor.fetchone()[0]
+
+
+def print_backends(backends):
+    if not backends:
+        print("   (no other client backends)")
+        return
+    print(f"   {'pid':>7}  {'user':<12} {'database':<16} {'state':<20} "
+          f"{'seconds':>8}  query")
+    for backend in backends:
+        seconds = (backend['query_seconds'] if backend['state'] == 'active'
+                   else backend['state_seconds'])
+        state = backend['state'] or '?'
+        if backend['wait_event']:
+            state += f" ({backend['wait_event']})"
+        print(f"   {backend['pid']:>7}  {backend['usename'] or '':<12} "
+              f"{backend['datname'] or '':<16} {state[:20]:<20} "
+              f"{seconds or 0:>8.1f}  {backend['query'] or ''}")
+
+
+def monitor(conn, args):
+    """List backends, signal the runaway ones; repeats with --watch."""
+    while True:
+        with conn.cursor() as cursor:
+            backends = list_backends(cursor, args.only_user)
+            print(f"\n🔎 {time.strftime('%H:%M:%S')}  "
+                  f"{len(backends)} client backends")
+            print_backends(backends)
+            for action, backend in runaway(backends, args.cancel_after,
+                                           args.terminate_idle):
+                try:
+                    done = signal_backend(cursor, action, backend['pid'])
+                except psycopg2.Error as e:
+                    print(f"   ❌ {action} {backend['pid']}: {str(e).strip()}")
+                    continue
+                icon = '🛑' if done else '⚠️'
+                print(f"   {icon} {action} {backend['pid']} "
+                      f"({backend['usename']}): {backend['query']}")
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Per-role query limits and a runaway query monitor")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    apply_parser = commands.add_parser('apply', help='store limits on roles')
+    apply_parser.add_argument('--set', action='append', type=parse_setting,
+                              default=[], metavar='NAME=VALUE',
+                              help='override or add a setting (repeatable)')
+    apply_parser.add_argument('--sql', action='store_true',
+                              help='print the statements for psql instead '
+                                   'of running them')
+    reset_parser = commands.add_parser('reset', help='remove the limits')
+    for sub in (apply_parser, reset_parser):
+        sub.add_argument('--role', action='append',
+                         help=f'role to govern (repeatable, default: '
+                              f'{", ".join(GOVERNED_ROLES)})')
+    commands.add_parser('show', help='show the settings stored on roles')
+    monitor_parser = commands.add_parser('monitor', help='list backends')
+    monitor_parser.add_argument('--cancel-after', type=float, metavar='SECONDS',
+                                help='cancel queries running longer than this')
+    monitor_parser.add_argument('--terminate-idle', type=float,
+                                metavar='SECONDS',
+                                help='terminate sessions idle in a transaction '
+                                     'longer than this')
+    monitor_parser.add_argument('--only-user', metavar='ROLE',
+                                help='only look at backends of this role')
+    monitor_parser.add_argument('--watch', type=float, metavar='SECONDS',
+                                help='repeat every SECONDS until interrupted')
+    for sub in (apply_parser, reset_parser, monitor_parser,
+                commands.choices['show']):
+        db.add_connection_args(sub)
+    args = parser.parse_args(argv)
+
+    if args.command == 'apply' and args.sql:
+        print(limits_script(args.role or GOVERNED_ROLES,
+                            {**ROLE_LIMITS, **dict(args.set)}))
+        return 0
+
+    try:
+        conn = db.connect(**db.overrides_from_args(args))
+    except psycopg2.Error as e:
+        print(f"❌ Could not connect: {e}")
+        return 1
+    conn.autocommit = True
+
+    try:
+        if args.command == 'monitor':
+            print("🚦 Backend monitor")
+            return monitor(conn, args)
+
+        with conn.cursor() as cursor:
+            if args.command == 'show':
+                print("🚦 Settings stored on roles")
+                for role, settings in role_settings(cursor).items():
+                    print(f"   {role}: " + ', '.join(
+                        f'{name}={value}' for name, value in settings.items()))
+                return 0
+
+            roles = args.role or GOVERNED_ROLES
+            present = existing_roles(cursor, roles)
+            for role in sorted(set(roles) - set(present)):
+                print(f"   ⏭️ {role}: no such role")
+            limits = {**ROLE_LIMITS, **dict(args.set)} \
+                if args.command == 'apply' else None
+            failed = 0
+            for role in present:
+                try:
+                    if limits is not None:
+                        apply_limits(cursor, role, limits)
+                    else:
+                        reset_limits(cursor, role)
+                except psycopg2.Error as e:
+                    failed += 1
+                    print(f"   ❌ {role}: {str(e).strip()}")
+                    continue
+                print(f"   ✅ {role}: " + (', '.join(
+                    f'{n}={v}' for n, v in limits.items())
+                    if limits is not None else 'limits removed'))
+            if limits is not None and present:
+                print("💡 New sessions of these roles get the limits")
+            return 1 if failed else 0
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
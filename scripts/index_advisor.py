@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Index and statistics advisor for the sample schemas.
+
+The schema files declare plenty of REFERENCES foreign keys but almost no
+secondary indexes, so joins and ON DELETE checks on the referencing side
+turn into sequential scans once the data grows. This tool:
+
+1. reads pg_catalog for every foreign key whose columns are not the
+   leading columns of an existing index
+2. runs ANALYZE and times every canonical query (canonical_queries.py)
+   with EXPLAIN (ANALYZE, BUFFERS)
+3. proposes indexes for selective filters those plans answer with a
+   sequential scan of a large table
+4. with --apply, creates the proposed indexes (CREATE INDEX CONCURRENTLY,
+   so the tables stay writable), re-analyzes and times the queries again
+
+Without --apply nothing is changed and the proposals are printed as SQL.
+
+Usage:
+    python scripts/index_advisor.py                    # report only
+    python scripts/index_advisor.py --schema sakila    # one schema
+    python scripts/index_advisor.py --apply --json advisor.json
+"""
+
+import argparse
+import json
+import re
+import statistics
+import sys
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import db
+from canonical_queries import iter_queries
+
+SYSTEM_SCHEMAS = ('pg_catalog', 'information_schema', 'pg_toast')
+
+# Filter-column indexes are only worth it on tables at least this big...
+MIN_ROWS = 10_000
+# ...when the filter keeps at most this share of the rows
+MAX_SELECTIVITY = 0.1
+
+SCHEMAS_SQL = """
+    SELECT DISTINCT n.nspname
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p')
+      AND n.nspname <> ALL(%s)
+      AND n.nspname NOT LIKE 'pg_temp%%'
+    ORDER BY 1
+"""
+
+# Foreign keys whose columns are not the leading columns of any index
+UNINDEXED_FKS_SQL = """
+    SELECT n.nspname, c.relname, con.conname,
+           ARRAY(SELECT a.attname
+                 FROM unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+                 JOIN pg_attribute a ON a.attrelid = con.conrelid
+                                    AND a.attnum = k.attnum
+                 ORDER BY k.ord) AS columns,
+           greatest(c.reltuples, 0)::bigint AS rows
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE con.contype = 'f'
+      AND n.nspname = ANY(%s)
+      AND NOT EXISTS (
+          SELECT 1
+          FROM pg_index i
+          WHERE i.indrelid = con.conrelid
+            AND i.indpred IS NULL
+            AND (string_to_array(i.indkey::text, ' ')::int2[])
+                    [1:cardinality(con.conkey)] @> con.conkey
+      )
+    ORDER BY 1, 2, 3
+"""
+
+# Leading column of every index, to skip filter columns already covered
+LEADING_INDEX_COLUMNS_SQL = """
+    SELECT n.nspname, c.relname, a.attname
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE n.nspname = ANY(%s)
+"""
+
+TABLE_INFO_SQL = """
+    SELECT n.nspname, c.relname, greatest(c.reltuples, 0)::bigint,
+           ARRAY(SELECT attname FROM pg_attribute
+                 WHERE attrelid = c.oid AND attnum > 0 AND NOT attisdropped)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p') AND n.nspname = ANY(%s)
+"""
+
+
+def list_schemas(conn):
+    """Every non-system schema that contains tables."""
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMAS_SQL, (list(SYSTEM_SCHEMAS),))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_name(table, columns):
+    name = f"{table}_{'_'.join(columns)}_idx"
+    return name[:63]
+
+
+def proposal(schema, table, columns, reason, rows):
+    return {
+        'schema': schema,
+        'table': table,
+        'columns': list(columns),
+        'index': index_name(table, columns),
+        'reason': reason,
+        'rows': rows,
+    }
+
+
+def unindexed_foreign_keys(conn, schemas):
+    """Index proposals for foreign keys without a supporting index."""
+    with conn.cursor() as cursor:
+        cursor.execute(UNINDEXED_FKS_SQL, (schemas,))
+        return [proposal(schema, table, columns, f'foreign key {conname}', rows)
+                for schema, table, conname, columns, rows in cursor.fetchall()]
+
+
+def _plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from _plan_nodes(child)
+
+
+def filter_columns(conn, schemas, plans, min_rows=MIN_ROWS,
+                   max_selectivity=MAX_SELECTIVITY):
+    """
+    Index proposals for selective filters the canonical queries seq-scan.
+
+    plans are the EXPLAIN ANALYZE plans from time_queries(). A Seq Scan
+    node with a Filter on a table of at least min_rows rows that actually
+    kept at most max_selectivity of them proposes an index on the first
+    table column named in the filter (unless a filter column already
+    leads an index).
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(TABLE_INFO_SQL, (schemas,))
+        tables = {(schema, table): (rows, columns)
+                  for schema, table, rows, columns in cursor.fetchall()}
+        cursor.execute(LEADING_INDEX_COLUMNS_SQL, (schemas,))
+        indexed = set(cursor.fetchall())
+
+    proposals = []
+    for query, plan in plans.items():
+        for node in _plan_nodes(plan):
+            key = (node.get('Schema'), node.get('Relation Name'))
+            if node['Node Type'] != 'Seq Scan' or 'Filter' not in node:
+                continue
+            if key not in tables:
+                continue
+            rows, columns = tables[key]
+            kept = node['Actual Rows'] * node['Actual Loops']
+            if rows < min_rows or kept > rows * max_selectivity:
+                continue
+            used = [column for column in columns
+                    if re.search(r'\b%s\b' % re.escape(column), node['Filter'])]
+            if not used or any((*key, column) in indexed for column in used):
+                continue
+            proposals.append(proposal(*key, used[:1], f'filter in {query}',
+                                      rows))
+    return proposals
+
+
+def propose(conn, schemas, plans, min_rows=MIN_ROWS):
+    """All index proposals for the schemas, without duplicates."""
+    seen = set()
+    proposals = []
+    for item in (unindexed_foreign_keys(conn, schemas)
+                 + filter_columns(conn, schemas, plans, min_rows)):
+        key = (item['schema'], item['table'], tuple(item['columns']))
+        if key not in seen:
+            seen.add(key)
+            proposals.append(item)
+    return proposals
+
+
+def create_statement(item):
+    return pgsql.SQL(
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON {}.{} ({})"
+    ).format(
+        pgsql.Identifier(item['index']),
+        pgsql.Identifier(item['schema']),
+        pgsql.Identifier(item['table']),
+        pgsql.SQL(', ').join(pgsql.Identifier(c) for c in item['columns']),
+    )
+
+
+def analyze(conn, schemas):
+    """ANALYZE every table in the schemas."""
+    with conn.cursor() as cursor:
+        cursor.execute(TABLE_INFO_SQL, (schemas,))
+        for schema, table, _, _ in cursor.fetchall():
+            cursor.execute(pgsql.SQL("ANALYZE {}.{}").format(
+                pgsql.Identifier(schema), pgsql.Identifier(table)))
+
+
+def time_queries(conn, schemas, repeat=3):
+    """
+    ({"schema.name": timing}, {"schema.name": plan}) for the canonical queries.
+
+    Each query runs repeat times under EXPLAIN (ANALYZE, BUFFERS); the
+    timing holds the median execution time and the buffer counts of the
+    last run, whose plan is returned as well.
+    """
+    timings = {}
+    plans = {}
+    with conn.cursor() as cursor:
+        for schema, name, query in iter_queries(schemas):
+            runs = []
+            for _ in range(repeat):
+                cursor.execute('EXPLAIN (ANALYZE, BUFFERS, VERBOSE, FORMAT JSON) '
+                               + query)
+                runs.append(cursor.fetchone()[0][0])
+            plan = plans[f'{schema}.{name}'] = runs[-1]['Plan']
+            timings[f'{schema}.{name}'] = {
+                'execution_ms': statistics.median(
+                    run['Execution Time'] for run in runs),
+                'planning_ms': statistics.median(
+                    run['Planning Time'] for run in runs),
+                'shared_hit': plan.get('Shared Hit Blocks', 0),
+                'shared_read': plan.get('Shared Read Blocks', 0),
+                'seq_scans': sum(node['Node Type'] == 'Seq Scan'
+                                 for node in _plan_nodes(plan)),
+            }
+    return timings, plans
+
+
+def print_timings(before, after=None):
+    print(f"\n{'query':<36} {'before ms':>10} {'buffers':>9}"
+          + (f" {'after ms':>10} {'buffers':>9} {'speedup':>8}" if after else ""))
+    for key, old in before.items():
+        line = (f"{key:<36} {old['execution_ms']:>10.2f} "
+                f"{old['shared_hit'] + old['shared_read']:>9}")
+        if after:
+            new = after[key]
+            speedup = old['execution_ms'] / max(new['execution_ms'], 0.001)
+            line += (f" {new['execution_ms']:>10.2f} "
+                     f"{new['shared_hit'] + new['shared_read']:>9} "
+                     f"{speedup:>7.1f}x")
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Propose (and optionally create) missing indexes")
+    parser.add_argument('--schema', action='append',
+                        help='schema to check (repeatable, default: all)')
+    parser.add_argument('--apply', action='store_true',
+                        help='create the proposed indexes and re-time')
+    parser.add_argument('--min-rows', type=int, default=MIN_ROWS,
+                        help=f'smallest table for filter indexes '
+                             f'(default: {MIN_ROWS:,})')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='EXPLAIN ANALYZE runs per query (default: 3)')
+    parser.add_argument('--json', metavar='PATH',
+                        help='write proposals and timings as JSON')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    try:
+        conn = db.connect(options=db.MAINTENANCE_OPTIONS,
+                          **db.overrides_from_args(args))
+    except psycopg2.Error as e:
+        print(f"❌ Could not connect: {e}")
+        return 1
+    conn.autocommit = True
+
+    try:
+        schemas = args.schema or list_schemas(conn)
+        print(f"🔍 Checking schemas: {', '.join(schemas)}")
+
+        print("📊 Running ANALYZE...")
+        analyze(conn, schemas)
+
+        print("⏱️ Timing canonical queries...")
+        before, plans = time_queries(conn, schemas, args.repeat)
+        after = None
+        proposals = propose(conn, schemas, plans, args.min_rows)
+
+        if proposals:
+            print(f"\n💡 {len(proposals)} index(es) proposed:")
+            for item in proposals:
+                print(f"   -- {item['reason']} ({item['rows']:,} rows)")
+                print(f"   {create_statement(item).as_string(conn)};")
+        else:
+            print("\n✅ No missing indexes found")
+
+        if args.apply and proposals:
+            print(f"\n🔨 Creating {len(proposals)} index(es)...")
+            with conn.cursor() as cursor:
+                for item in proposals:
+                    cursor.execute(create_statement(item))
+                    print(f"   ✅ {item['schema']}.{item['index']}")
+            analyze(conn, schemas)
+            after, _ = time_queries(conn, schemas, args.repeat)
+
+        print_timings(before, after)
+
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as handle:
+                json.dump({'schemas': schemas, 'proposals': proposals,
+                           'applied': bool(args.apply and proposals),
+                           'before': before, 'after': after},
+                          handle, indent=2)
+            print(f"\n📝 Report written to {args.json}")
+    except psycopg2.Error as e:
+        print(f"❌ Advisor failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
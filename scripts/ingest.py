@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Chunked ingestion of raw CSV drops from data/raw into data/processed.
+
+Each CSV is streamed in fixed-size chunks, so memory use depends on the
+chunk size rather than the file size:
+
+- column dtypes are decided once from a sample of the file (low
+  cardinality text such as department becomes a categorical) and applied
+  to every chunk; --dtype overrides them
+- running aggregates (count/mean/min/max of numeric columns, value counts
+  of categorical columns) are updated chunk by chunk
+- every chunk is written as a typed, compressed Parquet part file to
+  data/processed/<name>/, optionally hive-partitioned with --partition-by
+- data/processed/_manifest.json records the SHA-256 of every ingested
+  file, and files whose content has not changed are skipped
+
+Usage:
+    python scripts/ingest.py                      # every CSV in data/raw
+    python scripts/ingest.py data/raw/sample.csv  # one file
+    python scripts/ingest.py --dtype zip=string --partition-by department
+    python scripts/ingest.py --force              # ignore the manifest
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DIR = os.path.join(REPO_DIR, 'data', 'raw')
+PROCESSED_DIR = os.path.join(REPO_DIR, 'data', 'processed')
+MANIFEST_NAME = '_manifest.json'
+SUMMARY_NAME = '_summary.json'
+
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 50_000
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+COMPRESSION = 'zstd'
+
+# Columns we always want typed a particular way, whatever the sample says
+DEFAULT_DTYPES = {
+    'department': 'category',
+}
+
+HASH_BLOCK = 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def infer_dtypes(path, sample_rows=SAMPLE_ROWS, overrides=None):
+    """
+    Decide column dtypes from the first sample_rows rows of a CSV.
+
+    Integers become nullable Int64 (a later chunk may contain blanks),
+    booleans become nullable boolean, and text becomes a categorical when
+    few of its values are distinct, otherwise a string column.
+    """
+    sample = pd.read_csv(path, nrows=sample_rows)
+    dtypes = {}
+    for column in sample.columns:
+        series = sample[column]
+        if pd.api.types.is_bool_dtype(series):
+            dtypes[column] = 'boolean'
+        elif pd.api.types.is_integer_dtype(series):
+            dtypes[column] = 'Int64'
+        elif pd.api.types.is_float_dtype(series):
+            # All-blank sample columns read as float; treat them as text
+            dtypes[column] = 'float64' if series.notna().any() else 'string'
+        else:
+            distinct = series.nunique(dropna=True)
+            ratio = distinct / max(len(series), 1)
+            dtypes[column] = 'category' if ratio <= CATEGORY_RATIO else 'string'
+
+    for column, dtype in {**DEFAULT_DTYPES, **(overrides or {})}.items():
+        if column in dtypes:
+            dtypes[column] = dtype
+    return dtypes
+
+
+class RunningStats:
+    """Aggregates that are updated one chunk at a time."""
+
+    def __init__(self):
+        self.rows = 0
+        self.numeric = {}
+        self.counts = {}
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for column in chunk.columns:
+            series = chunk[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                counts = self.counts.setdefault(column, {})
+                for value, count in series.value_counts().items():
+                    counts[value] = counts.get(value, 0) + int(count)
+            elif (pd.api.types.is_numeric_dtype(series)
+                  and not pd.api.types.is_bool_dtype(series)):
+                values = series.dropna()
+                if values.empty:
+                    continue
+                stats = self.numeric.setdefault(
+                    column, {'count': 0, 'sum': 0.0,
+                             'min': None, 'max': None})
+                stats['count'] += len(values)
+                stats['sum'] += float(values.sum())
+                low, high = float(values.min()), float(values.max())
+                stats['min'] = low if stats['min'] is None else min(stats['min'], low)
+                stats['max'] = high if stats['max'] is None else max(stats['max'], high)
+
+    def mean(self, column):
+        stats = self.numeric.get(column)
+        if not stats or not stats['count']:
+            return None
+        return stats['sum'] / stats['count']
+
+    def summary(self):
+        numeric = {column: {**stats, 'mean': self.mean(column)}
+                   for column, stats in self.numeric.items()}
+        counts = {column: dict(sorted(values.items(),
+                                      key=lambda item: -item[1]))
+                  for column, values in self.counts.items()}
+        return {'rows': self.rows, 'numeric': numeric, 'counts': counts}
+
+
+def read_chunks(path, dtypes=None, chunksize=CHUNK_ROWS):
+    """Yield DataFrame chunks of a CSV with the given (or inferred) dtypes."""
+    if dtypes is None:
+        dtypes = infer_dtypes(path)
+    yield from pd.read_csv(path, dtype=dtypes, chunksize=chunksize)
+
+
+def scan_csv(path, dtypes=None, chunksize=CHUNK_ROWS):
+    """Compute RunningStats for a CSV without keeping it in memory."""
+    stats = RunningStats()
+    for chunk in read_chunks(path, dtypes, chunksize):
+        stats.update(chunk)
+    return stats
+
+
+def write_part(chunk, output_dir, index, partition_by=None,
+               compression=COMPRESSION):
+    """Write one chunk as Parquet, hive-partitioned if partition_by is set."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    # Every chunk's categories are its own, so pandas picks the index width
+    # per chunk (int8 for a few values, int16 for hundreds); one fixed width
+    # keeps the parts' schemas mergeable when the directory is read back
+    schema = pa.schema([
+        field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ], metadata=table.schema.metadata)
+    table = table.cast(schema)
+    if partition_by:
+        pq.write_to_dataset(
+            table, output_dir, partition_cols=partition_by,
+            basename_template=f'part-{index:05d}-{{i}}.parquet',
+            compression=compression,
+        )
+    else:
+        pq.write_table(table,
+                       os.path.join(output_dir, f'part-{index:05d}.parquet'),
+                       compression=compression)
+
+
+def load_manifest(processed_dir=PROCESSED_DIR):
+    try:
+        with open(os.path.join(processed_dir, MANIFEST_NAME),
+                  encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, processed_dir=PROCESSED_DIR):
+    path = os.path.join(processed_dir, MANIFEST_NAME)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True, default=str)
+    os.replace(temp_path, path)
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Content hash of a file, reusing the manifest hash if size and mtime match.
+
+    Hashing a multi-GB drop is much cheaper than parsing it, but still not
+    free, so an untouched file is not even re-read.
+    """
+    info = os.stat(path)
+    if (previous and previous.get('size') == info.st_size
+            and previous.get('mtime_ns') == info.st_mtime_ns):
+        return previous['sha256'], info
+    return file_sha256(path), info
+
+
+def ingest_file(path, processed_dir=PROCESSED_DIR, manifest=None,
+                dtype_overrides=None, chunksize=CHUNK_ROWS,
+                partition_by=None, force=False):
+    """
+    Ingest one CSV into processed_dir/<name>/.
+
+    Returns the manifest entry, with 'skipped' set to True when the file
+    was already ingested with the same content. The new output is built
+    in a temporary directory and swapped in only when complete.
+    """
+    manifest = {} if manifest is None else manifest
+    name = os.path.splitext(os.path.basename(path))[0]
+    output_dir = os.path.join(processed_dir, name)
+    previous = manifest.get(name)
+
+    sha256, info = file_fingerprint(path, None if force else previous)
+    if (not force and previous and previous.get('sha256') == sha256
+            and previous.get('partition_by') == partition_by
+            and os.path.isdir(output_dir)):
+        return {**previous, 'skipped': True}
+
+    started = time.perf_counter()
+    dtypes = infer_dtypes(path, overrides=dtype_overrides)
+    temp_dir = os.path.join(processed_dir, f'.{name}.tmp')
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+
+    stats = RunningStats()
+    parts = 0
+    try:
+        for parts, chunk in enumerate(read_chunks(path, dtypes, chunksize), 1):
+            stats.update(chunk)
+            write_part(chunk, temp_dir, parts, partition_by)
+        summary = stats.summary()
+        with open(os.path.join(temp_dir, SUMMARY_NAME), 'w',
+                  encoding='utf-8') as handle:
+            json.dump(summary, handle, indent=2, default=str)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(temp_dir, output_dir)
+
+    entry = {
+        'source': os.path.relpath(path, REPO_DIR),
+        'output': os.path.relpath(output_dir, REPO_DIR),
+        'sha256': sha256,
+        'size': info.st_size,
+        'mtime_ns': info.st_mtime_ns,
+        'rows': stats.rows,
+        'parts': parts,
+        'dtypes': dtypes,
+        'partition_by': partition_by,
+        'summary': summary,
+        'seconds': round(time.perf_counter() - started, 3),
+        'ingested_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    manifest[name] = entry
+    return {**entry, 'skipped': False}
+
+
+def find_raw_files(raw_dir=RAW_DIR):
+    """Every CSV under raw_dir, in sorted order."""
+    found = []
+    for root, _, files in os.walk(raw_dir):
+        found.extend(os.path.join(root, f) for f in files
+                     if f.lower().endswith('.csv'))
+    return sorted(found)
+
+
+def print_entry(entry):
+    name = os.path.basename(entry['output'])
+    if entry['skipped']:
+        print(f"💤 {name}: unchanged, skipped")
+        return
+    print(f"✅ {name}: {entry['rows']:,} rows in {entry['parts']} part(s) "
+          f"({entry['seconds']:.2f}s)")
+    for column, stats in entry['summary']['numeric'].items():
+        if stats['mean'] is not None:
+            print(f"   {column}: mean {stats['mean']:,.2f} "
+                  f"(min {stats['min']:,.2f}, max {stats['max']:,.2f})")
+    for column, counts in entry['summary']['counts'].items():
+        top = ', '.join(f"{value} ({count:,})"
+                        for value, count in list(counts.items())[:5])
+        more = f" and {len(counts) - 5} more" if len(counts) > 5 else ""
+        print(f"   {column}: {top}{more}")
+
+
+def parse_dtype(value):
+    column, sep, dtype = value.partition('=')
+    if not sep or not column or not dtype:
+        raise argparse.ArgumentTypeError(
+            f"expected COLUMN=DTYPE, got {value!r}")
+    return column, dtype
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ingest raw CSV files into typed Parquet")
+    parser.add_argument('files', nargs='*',
+                        help='CSV files to ingest (default: all of data/raw)')
+    parser.add_argument('--output', default=PROCESSED_DIR,
+                        help='processed data directory (default: data/processed)')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_ROWS,
+                        help=f'rows per chunk (default: {CHUNK_ROWS:,})')
+    parser.add_argument('--dtype', type=parse_dtype, action='append',
+                        default=[], metavar='COLUMN=DTYPE',
+                        help='override the inferred dtype of a column')
+    parser.add_argument('--partition-by', action='append', metavar='COLUMN',
+                        help='hive-partition the Parquet output by a column')
+    parser.add_argument('--force', action='store_true',
+                        help='re-ingest files even if they are unchanged')
+    args = parser.parse_args(argv)
+
+    files = args.files or find_raw_files()
+    if not files:
+        print(f"⚠️  No CSV files found in {RAW_DIR}")
+        return 0
+
+    os.makedirs(args.output, exist_ok=True)
+    manifest = load_manifest(args.output)
+    failed = 0
+    for path in files:
+        try:
+            entry = ingest_file(path, args.output, manifest,
+                                dtype_overrides=dict(args.dtype),
+                                chunksize=args.chunksize,
+                                partition_by=args.partition_by,
+                                force=args.force)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"❌ {os.path.basename(path)}: {e}")
+            failed += 1
+            continue
+        print_entry(entry)
+        # Saved after every file so an interrupted run keeps its progress
+        save_manifest(manifest, args.output)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Tiered Python package installation, with lazy installs on first import.
+
+requirements.txt is split into tiers under requirements/:
+
+- core: what nearly every session uses (Jupyter, pandas, plotting,
+  scikit-learn, the database drivers); installed when the container starts
+- ml: tensorflow and keras, several hundred MB most sessions never touch
+- extras: web frameworks, linters, test tools and other occasional packages
+
+Only core is installed at start. The other tiers are installed on first
+import: enable() appends an import hook to sys.meta_path, and when a
+notebook, the REPL or a script imports a package of the ml or extras tier
+that is missing, the hook installs it (with the constraint from its tier
+file) and the import carries on. Imports made by libraries themselves
+(optional-dependency probes) are left alone. post-start.sh turns the hook
+on for every Python process of the user with a .pth file.
+
+Installs go through a local wheelhouse keyed by a hash of the tier file,
+the Python version and the platform: wheels are downloaded or built once
+with `pip wheel`, and later installs run with --no-index from it, so a
+restart or rebuild with the same requirements does not go to PyPI. A
+tier whose hash matches its install stamp is skipped outright, which keeps
+`install core` at container start down to a file read. The cache lives in
+/workspaces/.cache/data-management-classroom, which survives container
+rebuilds, so a rebuild reinstalls core offline from the wheelhouse instead
+of downloading and building it again (CLASSROOM_CACHE_DIR overrides it;
+without a writable /workspaces it falls back to
+~/.cache/data-management-classroom).
+
+Set CLASSROOM_LAZY_INSTALL=0 to switch the hook off for a process.
+
+Commands:
+    install TIER...   install tiers (core, ml, extras or all)
+    wheels TIER...    only fill the wheelhouse (prefetch in the background)
+    enable / disable  add or remove the import hook (.pth file)
+    status            tiers, their cache state and installed versions
+
+Usage:
+    python scripts/lazy_install.py install core
+    python scripts/lazy_install.py wheels ml extras
+    python scripts/lazy_install.py enable
+    python scripts/lazy_install.py status
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIREMENTS_DIR = os.path.join(REPO_ROOT, 'requirements')
+TIERS = ['core', 'ml', 'extras']
+LAZY_TIERS = ['ml', 'extras']
+
+# /workspaces is the volume a Codespace or dev container keeps across
+# rebuilds; the home directory and site-packages are recreated
+PERSISTENT_CACHE_DIR = '/workspaces/.cache/data-management-classroom'
+
+
+def default_cache_dir():
+    if os.environ.get('CLASSROOM_CACHE_DIR'):
+        return os.environ['CLASSROOM_CACHE_DIR']
+    if os.access('/workspaces', os.W_OK):
+        return PERSISTENT_CACHE_DIR
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+        'data-management-classroom')
+
+
+CACHE_DIR = default_cache_dir()
+WHEELHOUSE_DIR = os.path.join(CACHE_DIR, 'wheelhouse')
+PTH_NAME = 'classroom-lazy-install.pth'
+STAMP_NAME = 'classroom-tiers.json'
+
+# Distribution name -> import name, where they differ beyond - and _
+IMPORT_NAMES = {
+    'scikit-learn': 'sklearn',
+    'psycopg2-binary': 'psycopg2',
+    'python-dotenv': 'dotenv',
+    'pyyaml': 'yaml',
+}
+
+
+def tier_file(tier):
+    return os.path.join(REQUIREMENTS_DIR, f'{tier}.txt')
+
+
+def requirements(tier):
+    """[(distribution name, requirement line)] of a tier file."""
+    import re
+
+    entries = []
+    with open(tier_file(tier), encoding='utf-8') as handle:
+        for line in handle:
+            line = line.split('#', 1)[0].strip()
+            if not line or line.startswith('-'):
+                continue
+            name = re.match(r'[A-Za-z0-9._-]+', line).group(0)
+            entries.append((name.lower(), line))
+    return entries
+
+
+def import_name(distribution):
+    return IMPORT_NAMES.get(distribution, distribution.replace('-', '_'))
+
+
+def tier_key(tier):
+    """Hash of the tier file, the Python version and the platform."""
+    import hashlib
+    import sysconfig
+
+    digest = hashlib.sha256()
+    with open(tier_file(tier), 'rb') as handle:
+        digest.update(handle.read())
+    digest.update(f'{sys.version_info[:2]} {sysconfig.get_platform()}'.encode())
+    return digest.hexdigest()[:16]
+
+
+def in_virtualenv():
+    return sys.prefix != sys.base_prefix
+
+
+def site_dir():
+    """Where pip installs go: the user site-packages outside a virtualenv."""
+    if in_virtualenv():
+        import sysconfig
+        return sysconfig.get_path('purelib')
+    import site
+    return site.getusersitepackages()
+
+
+def pip(*args):
+    """Run pip in this interpreter; True on success."""
+    import subprocess
+
+    command = [sys.executable, '-m', 'pip', *args,
+               '--disable-pip-version-check']
+    return subprocess.run(command).returncode == 0
+
+
+def install_args():
+    return ['install', '--quiet'] + ([] if in_virtualenv() else ['--user'])
+
+
+def wheelhouse(tier):
+    return os.path.join(WHEELHOUSE_DIR, f'{tier}-{tier_key(tier)}')
+
+
+def wheelhouse_ready(tier):
+    return os.path.exists(os.path.join(wheelhouse(tier), '.complete'))
+
+
+def build_wheelhouse(tier):
+    """Download or build the wheels of a tier once; True when ready."""
+    import shutil
+
+    target = wheelhouse(tier)
+    if wheelhouse_ready(tier):
+        return True
+    partial = f'{target}.partial-{os.getpid()}'
+    os.makedirs(partial, exist_ok=True)
+    if not pip('wheel', '--quiet', '--wheel-dir', partial,
+               '-r', tier_file(tier)):
+        shutil.rmtree(partial, ignore_errors=True)
+        return False
+    open(os.path.join(partial, '.complete'), 'w').close()
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(partial, target)
+    # Wheelhouses of older requirement versions are dead weight
+    for name in os.listdir(WHEELHOUSE_DIR):
+        if name.startswith(f'{tier}-') and name != os.path.basename(target):
+            shutil.rmtree(os.path.join(WHEELHOUSE_DIR, name), ignore_errors=True)
+    return True
+
+
+def read_stamps():
+    import json
+
+    try:
+        with open(os.path.join(site_dir(), STAMP_NAME), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_stamp(tier):
+    import json
+
+    stamps = read_stamps()
+    stamps[tier] = tier_key(tier)
+    os.makedirs(site_dir(), exist_ok=True)
+    with open(os.path.join(site_dir(), STAMP_NAME), 'w', encoding='utf-8') as handle:
+        json.dump(stamps, handle, indent=2)
+
+
+def install_tier(tier, force=False):
+    """
+    Install a tier from its wheelhouse; (status, detail).
+
+    The stamp lives next to the installed packages, so it disappears with
+    them when the container is rebuilt.
+    """
+    if not force and read_stamps().get(tier) == tier_key(tier):
+        return 'current', 'up to date'
+    if build_wheelhouse(tier) and pip(
+            *install_args(), '--no-index', '--find-links', wheelhouse(tier),
+            '-r', tier_file(tier)):
+        detail = 'installed from the wheelhouse'
+    elif pip(*install_args(), '-r', tier_file(tier)):
+        detail = 'installed from the package index'
+    else:
+        return 'failed', 'pip install failed'
+    write_stamp(tier)
+    return 'installed', detail
+
+
+def install_requirement(tier, line):
+    """Install one requirement of a tier, offline when the wheelhouse is ready."""
+    if wheelhouse_ready(tier) and pip(
+            *install_args(), '--no-index', '--find-links', wheelhouse(tier),
+            line):
+        return True
+    return pip(*install_args(), line)
+
+
+class LazyInstaller:
+    """
+    Last entry on sys.meta_path: installs missing packages of the lazy
+    tiers when user code imports them.
+
+    A plain class rather than importlib.abc.MetaPathFinder: it is imported
+    by every interpreter through the .pth file, and importlib.abc alone
+    costs ~30 ms of startup.
+    """
+
+    def __init__(self):
+        self._packages = None
+        self._attempted = set()
+
+    def packages(self):
+        """{import name: (tier, requirement line)} of the lazy tiers."""
+        if self._packages is None:
+            self._packages = {}
+            for tier in LAZY_TIERS:
+                try:
+                    entries = requirements(tier)
+                except OSError:
+                    continue
+                for distribution, line in entries:
+                    self._packages[import_name(distribution)] = (tier, line)
+        return self._packages
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or fullname in self._attempted:
+            return None
+        if os.environ.get('CLASSROOM_LAZY_INSTALL', '1') == '0':
+            return None
+        entry = self.packages().get(fullname)
+        if entry is None or not imported_by_user():
+            return None
+        self._attempted.add(fullname)
+        tier, line = entry
+        print(f"📦 {fullname} is in the '{tier}' tier and not installed yet; "
+              f"installing {line} (one time)...", file=sys.stderr)
+        if not install_requirement(tier, line):
+            print(f"❌ Installing {line} failed", file=sys.stderr)
+            return None
+        import importlib.util
+        importlib.invalidate_caches()
+        import site
+        if not in_virtualenv() and site.getusersitepackages() not in sys.path:
+            site.addsitedir(site.getusersitepackages())
+        return importlib.util.find_spec(fullname)
+
+
+def imported_by_user():
+    """Whether the import statement runs in __main__ (notebook, REPL, script)."""
+    frame = sys._getframe(2)
+    while frame is not None and (
+            frame.f_code.co_filename.startswith('<frozen importlib')
+            or frame.f_code.co_filename == __file__):
+        frame = frame.f_back
+    return frame is not None and frame.f_globals.get('__name__') == '__main__'
+
+
+def enable():
+    """Append the import hook to sys.meta_path (once per process)."""
+    if not any(isinstance(finder, LazyInstaller) for finder in sys.meta_path):
+        sys.meta_path.append(LazyInstaller())
+
+
+def pth_path():
+    return os.path.join(site_dir(), PTH_NAME)
+
+
+def write_pth():
+    """
+    A .pth file that enables the hook at interpreter start.
+
+    The scripts directory is only on sys.path while the hook is imported,
+    so helper modules like db or query don't shadow anything.
+    """
+    scripts = os.path.dirname(os.path.abspath(__file__))
+    os.makedirs(site_dir(), exist_ok=True)
+    with open(pth_path(), 'w', encoding='utf-8') as handle:
+        handle.write(
+            f"import sys; sys.path.insert(0, {scripts!r}); "
+            f"import lazy_install; lazy_install.enable(); "
+            f"sys.path.remove({scripts!r})\n")
+    return pth_path()
+
+
+def parse_tiers(names):
+    tiers = []
+    for name in names:
+        for tier in (TIERS if name == 'all' else [name]):
+            if tier not in tiers:
+                tiers.append(tier)
+    return tiers
+
+
+def print_status():
+    from importlib import metadata
+
+    stamps = read_stamps()
+    hook = 'enabled' if os.path.exists(pth_path()) else 'disabled'
+    print(f"📦 Package tiers (lazy install hook {hook}, cache {CACHE_DIR})")
+    for tier in TIERS:
+        key = tier_key(tier)
+        state = 'installed' if stamps.get(tier) == key else (
+            'lazy' if tier in LAZY_TIERS else 'not installed')
+        wheels = 'wheelhouse ready' if wheelhouse_ready(tier) else 'no wheelhouse'
+        print(f"\n   {tier} [{key}] {state}, {wheels}")
+        for distribution, line in requirements(tier):
+            try:
+                version = metadata.version(distribution)
+            except metadata.PackageNotFoundError:
+                version = None
+            icon = '✅' if version else ('💤' if tier in LAZY_TIERS else '❌')
+            print(f"      {icon} {line:<28} {version or 'not installed'}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Tiered package installs with lazy installs on first import")
+    commands = parser.add_subparsers(dest='command', required=True)
+    tier_choices = TIERS + ['all']
+    install_parser = commands.add_parser('install', help='install tiers')
+    install_parser.add_argument('tiers', nargs='+', choices=tier_choices)
+    install_parser.add_argument('--force', action='store_true',
+                                help='reinstall even if the stamp matches')
+    wheels_parser = commands.add_parser('wheels', help='only fill the wheelhouse')
+    wheels_parser.add_argument('tiers', nargs='+', choices=tier_choices)
+    commands.add_parser('enable', help='enable the import hook')
+    commands.add_parser('disable', help='disable the import hook')
+    commands.add_parser('status', help='show tiers and installed packages')
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        print_status()
+        return 0
+    if args.command == 'enable':
+        print(f"✅ Lazy install hook enabled ({write_pth()})")
+        return 0
+    if args.command == 'disable':
+        if os.path.exists(pth_path()):
+            os.remove(pth_path())
+        print("✅ Lazy install hook disabled")
+        return 0
+
+    failed = 0
+    for tier in parse_tiers(args.tiers):
+        if args.command == 'wheels':
+            ready = build_wheelhouse(tier)
+            failed += not ready
+            print(f"   {'✅' if ready else '❌'} {tier}: "
+                  f"{'wheelhouse ready' if ready else 'pip wheel failed'} "
+                  f"({wheelhouse(tier)})")
+            continue
+        status, detail = install_tier(tier, args.force)
+        failed += status == 'failed'
+        icon = {'current': '⏭️', 'installed': '✅', 'failed': '❌'}[status]
+        print(f"   {icon} {tier}: {detail}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
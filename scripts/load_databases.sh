@@ -17,7 +17,11 @@ DB_USER="student"
 DB_NAME="student_db"
 DB_HOST="localhost"
 DB_PORT="5432"
-DATABASES_DIR="/workspaces/data-managment/databases"
+SCRIPTS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+DATABASES_DIR="$(dirname "$SCRIPTS_DIR")/databases"
+
+# Loads and checks are timed as telemetry spans
+source "$SCRIPTS_DIR/telemetry.sh"
 
 # Function to print colored output
 print_status() {
@@ -50,10 +54,13 @@ check_postgresql() {
 # Function to check database connection
 check_connection() {
     print_status "Testing database connection..."
+    telemetry_start "check connection"
     if psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME -c "SELECT 1;" > /dev/null 2>&1; then
+        telemetry_end "check connection"
         print_success "Database connection successful"
         return 0
     else
+        telemetry_end "check connection" error
         print_error "Cannot connect to database"
         return 1
     fi
@@ -72,10 +79,13 @@ load_database() {
     fi
     
     # Load the database
+    telemetry_start "load $db_name"
     if psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME -f "$db_file" > /tmp/db_load.log 2>&1; then
+        telemetry_end "load $db_name"
         print_success "$db_name database loaded successfully"
         return 0
     else
+        telemetry_end "load $db_name" error
         print_error "Failed to load $db_name database"
         echo "Error details:"
         cat /tmp/db_load.log
@@ -83,6 +93,18 @@ load_database() {
     fi
 }
 
+# Function to load all databases with the parallel COPY-based loader
+bulk_load_databases() {
+    print_status "Bulk loading all databases (parallel COPY)..."
+    PGHOST=$DB_HOST PGPORT=$DB_PORT PGUSER=$DB_USER PGDATABASE=$DB_NAME SAMPLE_DBNAME=$DB_NAME \
+        telemetry_span "bulk load" python3 "$SCRIPTS_DIR/bulk_load.py" --databases-dir "$DATABASES_DIR" "$@"
+}
+
+# Function to check if the bulk loader can run here
+bulk_loader_available() {
+    [ -f "$SCRIPTS_DIR/bulk_load.py" ] && python3 -c "import psycopg2" > /dev/null 2>&1
+}
+
 # Function to list available databases
 list_databases() {
     print_status "Available sample databases:"
@@ -143,10 +165,24 @@ show_tables() {
     fi
 }
 
+# Function to check if the concurrent verifier can run here
+verifier_available() {
+    [ -f "$SCRIPTS_DIR/verify_schemas.py" ] && python3 -c "import asyncpg, psycopg2" > /dev/null 2>&1
+}
+
 # Function to run a quick test
 test_databases() {
     print_status "Testing loaded databases..."
     
+    # All schemas, tables and foreign keys in one concurrent pass
+    if verifier_available; then
+        PGHOST=$DB_HOST PGPORT=$DB_PORT PGUSER=$DB_USER PGDATABASE=$DB_NAME SAMPLE_DBNAME=$DB_NAME \
+            python3 "$SCRIPTS_DIR/verify_schemas.py" --databases-dir "$DATABASES_DIR" && return 0
+        print_warning "Some schemas did not verify"
+        return 1
+    fi
+    print_warning "asyncpg not available, probing each schema with psql"
+    
     # Test sample database
     if psql -h $DB_HOST -p $DB_PORT -U $DB_USER -d $DB_NAME -c "SELECT COUNT(*) FROM students;" > /dev/null 2>&1; then
         print_success "Sample database is working"
@@ -203,7 +239,10 @@ main() {
             echo "  help              - Show this help message"
             echo "  list              - List available databases"
             echo "  load [db_name]    - Load a specific database"
-            echo "  load-all          - Load all databases"
+            echo "  load-all          - Load all databases (parallel COPY loader if available)"
+            echo "  load-all-serial   - Load all databases one file at a time with psql"
+            echo "  snapshot          - Snapshot the loaded databases for fast restores"
+            echo "  restore           - Restore the databases from the latest snapshot"
             echo "  schemas           - Show database schemas"
             echo "  tables [schema]   - Show tables (optionally in specific schema)"
             echo "  test              - Test loaded databases"
@@ -246,6 +285,25 @@ main() {
                 exit 1
             fi
             
+            if bulk_loader_available; then
+                if ! bulk_load_databases; then
+                    print_warning "Some databases reported errors during bulk load"
+                fi
+                echo ""
+                print_status "Running quick test..."
+                telemetry_span "test databases" test_databases || true
+            else
+                print_warning "psycopg2 not available, falling back to serial psql load"
+                "$0" load-all-serial
+            fi
+            ;;
+        "load-all-serial")
+            check_postgresql
+            if ! check_connection; then
+                print_error "Cannot connect to database. Please check your setup."
+                exit 1
+            fi
+            
             # Load databases in order
             databases=("sample" "northwind" "adventureworks" "worldwideimporters" "chinook" "sakila" "hr_employees")
             
@@ -272,7 +330,13 @@ main() {
             print_success "Database loading completed!"
             echo ""
             print_status "Running quick test..."
-            test_databases
+            telemetry_span "test databases" test_databases || true
+            ;;
+        "snapshot")
+            python3 "$SCRIPTS_DIR/snapshot.py" create --dump --dbname "$DB_NAME"
+            ;;
+        "restore")
+            python3 "$SCRIPTS_DIR/snapshot.py" restore --dbname "$DB_NAME"
             ;;
         "schemas")
             check_postgresql
@@ -296,7 +360,7 @@ main() {
                 print_error "Cannot connect to database. Please check your setup."
                 exit 1
             fi
-            test_databases
+            telemetry_span "test databases" test_databases
             ;;
         "status")
             check_postgresql
@@ -308,6 +372,15 @@ main() {
             exit 1
             ;;
     esac
+
+    case "${1:-help}" in
+        load*)
+            echo ""
+            print_status "Timings:"
+            telemetry_summary
+            ;;
+    esac
+    telemetry_export
 }
 
 # Run main function with all arguments
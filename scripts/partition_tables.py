@@ -0,0 +1,689 @@
+#!/usr/bin/env python3
+"""
+Time-range partitioning migration for the large fact tables.
+
+The fact tables of the sample schemas are plain heap tables, so a query
+for one month of rentals reads every block once they hold millions of
+rows. This tool converts them to declaratively partitioned tables, one
+partition per month (or year) of their event date:
+
+- the partitioned copy is created next to the original (LIKE, so
+  defaults, CHECK constraints and statistics targets come along) with a
+  partition for every period holding data, a few empty future periods
+  and a DEFAULT partition for anything else
+- rows are copied one partition (period) at a time, each batch in its own
+  transaction; indexes, the primary key and outgoing foreign keys are
+  built after the copy, on the partitioned table, so every partition gets
+  its own index
+- the swap is one short transaction: under an EXCLUSIVE lock it checks
+  that the copy has the same rows as the original (count and a checksum
+  of every row, so updates made during the copy are caught too), drops
+  and recreates the views that read the table (the dashboard views,
+  recursively), moves the owned sequences, grants and owner over, and
+  renames the new table into place
+- date-filtered queries (latest month, latest quarter by day, last week)
+  are timed with EXPLAIN (ANALYZE, BUFFERS) before and after, showing how
+  many partitions each one still reads
+
+PostgreSQL requires the partition column in every primary key and unique
+constraint of a partitioned table, so the primary key becomes (id, date).
+Foreign keys from other tables that reference the old key alone cannot
+exist on a partitioned table; they are dropped and listed in the output
+(verify_schemas.py reports them as waived).
+
+Reloading a schema from databases/*.sql recreates plain tables; run the
+migration again afterwards.
+
+Usage:
+    python scripts/partition_tables.py plan
+    python scripts/partition_tables.py migrate --table sakila.rental
+    python scripts/partition_tables.py migrate --interval year --keep-old
+    python scripts/partition_tables.py benchmark
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from datetime import date, datetime
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import db
+from benchmark import BENCHMARK_DIR
+
+# Fact tables and the event date they are partitioned by
+TABLES = {
+    'sakila.rental': 'rental_date',
+    'sakila.payment': 'payment_date',
+    'chinook.invoice': 'invoice_date',
+    'adventureworks.sales_order_header': 'order_date',
+    'northwind.orders': 'order_date',
+    'wwi.orders': 'order_date',
+    'wwi.invoices': 'invoice_date',
+}
+
+INTERVALS = ('month', 'year')
+# Empty partitions created past the latest date, for new rows
+FUTURE_PERIODS = 3
+REPEAT = 5
+# The partitioned table while it is being filled
+BUILD_SUFFIX = '__partitioned'
+# The original table, with --keep-old
+OLD_SUFFIX = '_unpartitioned'
+
+INDEX_DEF = re.compile(
+    r'^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?\S+ (USING .*)$')
+
+TABLE_SQL = """
+    SELECT c.oid, c.relkind, pg_get_userbyid(c.relowner),
+           format_type(a.atttypid, a.atttypmod), a.attnotnull
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attname = %s
+                            AND NOT a.attisdropped
+    WHERE n.nspname = %s AND c.relname = %s
+"""
+
+# Primary key and unique constraints (these own their index)
+KEY_CONSTRAINTS_SQL = """
+    SELECT conname, pg_get_constraintdef(oid), conindid
+    FROM pg_constraint
+    WHERE conrelid = %s AND contype IN ('p', 'u')
+"""
+
+INDEXES_SQL = """
+    SELECT c.relname, pg_get_indexdef(i.indexrelid)
+    FROM pg_index i
+    JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE i.indrelid = %s AND i.indexrelid <> ALL(%s)
+"""
+
+# (constraint, definition, referencing table, outgoing); a foreign key
+# of the table to itself counts as incoming
+FOREIGN_KEYS_SQL = """
+    SELECT con.conname, pg_get_constraintdef(con.oid),
+           con.conrelid::regclass::text, con.confrelid <> %s
+    FROM pg_constraint con
+    WHERE con.contype = 'f' AND (con.conrelid = %s OR con.confrelid = %s)
+    ORDER BY con.conname
+"""
+
+OWNED_SEQUENCES_SQL = """
+    SELECT s.oid::regclass::text, a.attname
+    FROM pg_depend d
+    JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+    JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+    WHERE d.refobjid = %s AND d.deptype IN ('a', 'i')
+"""
+
+IDENTITY_COLUMNS_SQL = """
+    SELECT attname FROM pg_attribute
+    WHERE attrelid = %s AND attidentity <> '' AND NOT attisdropped
+"""
+
+GRANTS_SQL = """
+    SELECT CASE WHEN a.grantee = 0 THEN 'PUBLIC'
+                ELSE a.grantee::regrole::text END,
+           a.privilege_type
+    FROM pg_class c, aclexplode(c.relacl) a
+    WHERE c.oid = %s AND a.grantee <> c.relowner
+"""
+
+# Views and materialized views reading the table, directly or through
+# other views, with the depth of the dependency
+DEPENDENT_VIEWS_SQL = """
+    WITH RECURSIVE deps(oid, depth) AS (
+        SELECT r.ev_class, 1
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = %s
+          AND r.ev_class <> %s
+        UNION
+        SELECT r.ev_class, deps.depth + 1
+        FROM deps
+        JOIN pg_depend d ON d.refobjid = deps.oid
+                        AND d.classid = 'pg_rewrite'::regclass
+        JOIN pg_rewrite r ON r.oid = d.objid
+        WHERE r.ev_class <> deps.oid
+    )
+    SELECT c.oid, n.nspname, c.relname, c.relkind, pg_get_viewdef(c.oid),
+           c.reloptions, pg_get_userbyid(c.relowner), max(deps.depth)
+    FROM deps
+    JOIN pg_class c ON c.oid = deps.oid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    GROUP BY c.oid, n.nspname, c.relname, c.relkind, c.reloptions, c.relowner
+    ORDER BY max(deps.depth), n.nspname, c.relname
+"""
+
+# Order-independent fingerprint of a table's contents: the row count and
+# the sum of a 64-bit hash of every row (its text form; the copy has the
+# same columns in the same order)
+CHECKSUM_SQL = pgsql.SQL(
+    "SELECT count(*) || ':' || coalesce(sum(('x' || left(md5(t::text), 16))"
+    "::bit(64)::bigint::numeric), 0) FROM {} t")
+
+EXPLAIN_SQL = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+
+
+class MigrationError(Exception):
+    """A table can't be migrated (as it is now)."""
+
+
+def split_name(name):
+    schema, _, table = name.partition('.')
+    return schema, table
+
+
+def _truncate(name, suffix):
+    """name + suffix within PostgreSQL's 63-byte identifier limit."""
+    return name[:63 - len(suffix)] + suffix
+
+
+def periods(first, last, interval, future=FUTURE_PERIODS):
+    """[(label, start, end)] covering first..last plus future periods."""
+    start = date(first.year, first.month if interval == 'month' else 1, 1)
+    bounds = []
+    extra = 0
+    while True:
+        if interval == 'month':
+            end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+            label = f'y{start.year}m{start.month:02d}'
+        else:
+            end = date(start.year + 1, 1, 1)
+            label = f'y{start.year}'
+        bounds.append((label, start, end))
+        if end > last:
+            extra += 1
+            if extra > future:
+                break
+        start = end
+    return bounds
+
+
+def table_info(cursor, schema, table, column):
+    cursor.execute(TABLE_SQL, (column, schema, table))
+    row = cursor.fetchone()
+    if not row:
+        raise MigrationError(f"{schema}.{table} does not exist")
+    oid, kind, owner, column_type, not_null = row
+    if column_type is None:
+        raise MigrationError(f"{schema}.{table} has no column {column}")
+    if not column_type.startswith(('date', 'timestamp')):
+        raise MigrationError(f"{schema}.{table}.{column} is {column_type}, "
+                             f"not a date or timestamp")
+    name = pgsql.Identifier(schema, table)
+    cursor.execute(pgsql.SQL("SELECT min({0})::date, max({0})::date, "
+                             "greatest(c.reltuples, 0)::bigint "
+                             "FROM {1}, pg_class c WHERE c.oid = %s "
+                             "GROUP BY c.reltuples")
+                   .format(pgsql.Identifier(column), name), (oid,))
+    first, last, estimate = cursor.fetchone() or (None, None, 0)
+    return {'oid': oid, 'kind': kind, 'owner': owner, 'type': column_type,
+            'first': first, 'last': last, 'estimate': estimate}
+
+
+def _with_column(definition, column):
+    """Add column to the column list of 'PRIMARY KEY (...)'-style SQL."""
+    start = definition.index('(')
+    depth = 0
+    for i in range(start, len(definition)):
+        depth += {'(': 1, ')': -1}.get(definition[i], 0)
+        if depth == 0:
+            columns = [c.strip() for c in definition[start + 1:i].split(',')]
+            if column in columns:
+                return definition
+            return f'{definition[:i]}, {column}{definition[i:]}'
+    raise MigrationError(f"can't parse {definition}")
+
+
+def plan_table(cursor, schema, table, column, interval, future=FUTURE_PERIODS):
+    """Everything the migration of one table will create, move or drop."""
+    info = table_info(cursor, schema, table, column)
+    if info['kind'] == 'p':
+        return {**info, 'partitioned': True}
+    if info['first'] is None:
+        today = date.today()
+        info['first'] = info['last'] = today
+    key_column = pgsql.Identifier(column).as_string(cursor)
+
+    cursor.execute(KEY_CONSTRAINTS_SQL, (info['oid'],))
+    constraints = [(name, _with_column(definition, key_column), index)
+                   for name, definition, index in cursor.fetchall()]
+    cursor.execute(INDEXES_SQL, (info['oid'], [c[2] for c in constraints]))
+    indexes = []
+    for name, definition in cursor.fetchall():
+        match = INDEX_DEF.match(definition)
+        if not match:
+            raise MigrationError(f"can't recreate index {name}: {definition}")
+        unique, _, rest = match.groups()
+        if unique:
+            rest = _with_column(rest, key_column)
+        indexes.append((name, unique is not None, rest))
+
+    cursor.execute(FOREIGN_KEYS_SQL, (info['oid'],) * 3)
+    outgoing, incoming = [], []
+    for name, definition, owner_table, is_outgoing in cursor.fetchall():
+        if is_outgoing:
+            outgoing.append((name, definition))
+        else:
+            incoming.append((owner_table, name, definition))
+
+    cursor.execute(OWNED_SEQUENCES_SQL, (info['oid'],))
+    sequences = cursor.fetchall()
+    cursor.execute(IDENTITY_COLUMNS_SQL, (info['oid'],))
+    identity = [row[0] for row in cursor.fetchall()]
+    cursor.execute(DEPENDENT_VIEWS_SQL, (info['oid'], info['oid']))
+    views = cursor.fetchall()
+    return {
+        **info,
+        'partitioned': False,
+        'periods': periods(info['first'], info['last'], interval, future),
+        'constraints': constraints,
+        'indexes': indexes,
+        'outgoing': outgoing,
+        'incoming': incoming,
+        'sequences': sequences,
+        'identity': identity,
+        'views': views,
+    }
+
+
+def _run(cursor, statement, *args):
+    cursor.execute(statement, args or None)
+
+
+def build(conn, schema, table, column, plan):
+    """Create and fill the partitioned copy; returns {label: rows}."""
+    old = pgsql.Identifier(schema, table)
+    new_name = _truncate(table, BUILD_SUFFIX)
+    new = pgsql.Identifier(schema, new_name)
+    key = pgsql.Identifier(column)
+    with conn.cursor() as cursor:
+        _run(cursor, pgsql.SQL("DROP TABLE IF EXISTS {}").format(new))
+        _run(cursor, pgsql.SQL(
+            "CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS "
+            "INCLUDING GENERATED INCLUDING IDENTITY INCLUDING STATISTICS "
+            "INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ({})")
+            .format(new, old, key))
+        for label, start, end in plan['periods']:
+            _run(cursor, pgsql.SQL(
+                "CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)")
+                .format(pgsql.Identifier(schema, _truncate(table, f'_{label}')),
+                        new), start, end)
+        _run(cursor, pgsql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(
+            pgsql.Identifier(schema, _truncate(table, '_default')), new))
+    conn.commit()
+
+    # One transaction per period, so a large table never holds one huge
+    # transaction open and progress is visible
+    copied = {}
+    first = plan['periods'][0][1]
+    last = plan['periods'][-1][2]
+    batches = [(label, pgsql.SQL("{0} >= %s AND {0} < %s").format(key),
+                (start, end)) for label, start, end in plan['periods']]
+    batches.append(('default', pgsql.SQL("{0} < %s OR {0} >= %s OR {0} IS NULL")
+                    .format(key), (first, last)))
+    for label, condition, params in batches:
+        started = time.perf_counter()
+        with conn.cursor() as cursor:
+            cursor.execute(pgsql.SQL(
+                "INSERT INTO {} OVERRIDING SYSTEM VALUE SELECT * FROM {} WHERE {}")
+                .format(new, old, condition), params)
+            copied[label] = cursor.rowcount
+        conn.commit()
+        if copied[label]:
+            print(f"      {label:<10} {copied[label]:>12,} rows "
+                  f"({time.perf_counter() - started:.2f}s)")
+    return copied
+
+
+def build_indexes(conn, schema, table, plan):
+    """Keys, indexes and outgoing foreign keys on the partitioned copy."""
+    new = pgsql.Identifier(schema, _truncate(table, BUILD_SUFFIX))
+    with conn.cursor() as cursor:
+        for name, definition, _ in plan['constraints']:
+            _run(cursor, pgsql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                new, pgsql.Identifier(_truncate(name, BUILD_SUFFIX)),
+                pgsql.SQL(definition)))
+        for name, unique, rest in plan['indexes']:
+            _run(cursor, pgsql.SQL("CREATE {}INDEX {} ON {} {}").format(
+                pgsql.SQL('UNIQUE ' if unique else ''),
+                pgsql.Identifier(_truncate(name, BUILD_SUFFIX)), new,
+                pgsql.SQL(rest)))
+        for name, definition in plan['outgoing']:
+            _run(cursor, pgsql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                new, pgsql.Identifier(name), pgsql.SQL(definition)))
+    conn.commit()
+
+
+def _grants(cursor, oid, target):
+    cursor.execute(GRANTS_SQL, (oid,))
+    for grantee, privilege in cursor.fetchall():
+        _run(cursor, pgsql.SQL("GRANT {} ON {} TO {}").format(
+            pgsql.SQL(privilege), target, pgsql.SQL(grantee)))
+
+
+def swap(conn, schema, table, plan, keep_old=False):
+    """Put the partitioned table in place of the original, in one transaction."""
+    old = pgsql.Identifier(schema, table)
+    new_name = _truncate(table, BUILD_SUFFIX)
+    new = pgsql.Identifier(schema, new_name)
+    with conn.cursor() as cursor:
+        # Reads go on; writes wait until the swap commits
+        _run(cursor, pgsql.SQL("LOCK TABLE {} IN EXCLUSIVE MODE").format(old))
+        # The copy ran without a lock, so compare contents, not just counts:
+        # an UPDATE (or a DELETE and INSERT) during the copy keeps the count
+        _run(cursor, pgsql.SQL("SELECT ({0}), ({1})").format(
+            CHECKSUM_SQL.format(old), CHECKSUM_SQL.format(new)))
+        before, after = cursor.fetchone()
+        if before != after:
+            raise MigrationError(f"{schema}.{table} changed during the copy; "
+                                 f"run the migration again")
+
+        # Dependent views: definitions, then drop them deepest first
+        views = []
+        for oid, view_schema, view, kind, definition, options, owner, _ \
+                in plan['views']:
+            cursor.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+                           "WHERE indrelid = %s", (oid,))
+            indexes = [row[0] for row in cursor.fetchall()]
+            cursor.execute(GRANTS_SQL, (oid,))
+            views.append((view_schema, view, kind, definition, options, owner,
+                          indexes, cursor.fetchall()))
+        for view_schema, view, kind, *_ in reversed(views):
+            _run(cursor, pgsql.SQL("DROP {} {}").format(
+                pgsql.SQL('MATERIALIZED VIEW' if kind == 'm' else 'VIEW'),
+                pgsql.Identifier(view_schema, view)))
+
+        for owner_table, name, _ in plan['incoming']:
+            _run(cursor, pgsql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                pgsql.SQL(owner_table), pgsql.Identifier(name)))
+        for sequence, _ in plan['sequences']:
+            _run(cursor, pgsql.SQL("ALTER SEQUENCE {} OWNED BY NONE").format(
+                pgsql.SQL(sequence)))
+
+        _run(cursor, "SELECT current_user")
+        current_user = cursor.fetchone()[0]
+        if keep_old:
+            # Free the index names for the new table
+            cursor.execute("SELECT c.relname FROM pg_index i JOIN pg_class c "
+                           "ON c.oid = i.indexrelid WHERE i.indrelid = %s",
+                           (plan['oid'],))
+            for (index,) in cursor.fetchall():
+                _run(cursor, pgsql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                    pgsql.Identifier(schema, index),
+                    pgsql.Identifier(_truncate(index, OLD_SUFFIX))))
+            _run(cursor, pgsql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                old, pgsql.Identifier(_truncate(table, OLD_SUFFIX))))
+        else:
+            _run(cursor, pgsql.SQL("DROP TABLE {}").format(old))
+
+        _run(cursor, pgsql.SQL("ALTER TABLE {} RENAME TO {}").format(
+            new, pgsql.Identifier(table)))
+        for name, _, _ in plan['constraints']:
+            _run(cursor, pgsql.SQL("ALTER TABLE {} RENAME CONSTRAINT {} TO {}")
+                 .format(old, pgsql.Identifier(_truncate(name, BUILD_SUFFIX)),
+                         pgsql.Identifier(name)))
+        for name, _, _ in plan['indexes']:
+            _run(cursor, pgsql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                pgsql.Identifier(schema, _truncate(name, BUILD_SUFFIX)),
+                pgsql.Identifier(name)))
+        for sequence, column in plan['sequences']:
+            _run(cursor, pgsql.SQL("ALTER SEQUENCE {} OWNED BY {}.{}").format(
+                pgsql.SQL(sequence), old, pgsql.Identifier(column)))
+        for column in plan['identity']:
+            _run(cursor, pgsql.SQL(
+                "SELECT setval(pg_get_serial_sequence(%s, %s), "
+                "coalesce(max({}), 0) + 1, false) FROM {}").format(
+                    pgsql.Identifier(column), old),
+                 old.as_string(cursor), column)
+
+        if plan['owner'] != current_user:
+            cursor.execute("SELECT inhrelid::regclass::text FROM pg_inherits "
+                           "WHERE inhparent = %s::regclass",
+                           (old.as_string(cursor),))
+            for target in [old] + [pgsql.SQL(row[0]) for row in cursor.fetchall()]:
+                _run(cursor, pgsql.SQL("ALTER TABLE {} OWNER TO {}").format(
+                    target, pgsql.Identifier(plan['owner'])))
+        _grants(cursor, plan['oid'], old)
+
+        for (view_schema, view, kind, definition, options, owner, indexes,
+             grants) in views:
+            target = pgsql.Identifier(view_schema, view)
+            with_options = (pgsql.SQL(' WITH ({})').format(
+                pgsql.SQL(', ').join(pgsql.SQL(o) for o in options))
+                if options else pgsql.SQL(''))
+            _run(cursor, pgsql.SQL("CREATE {} {}{} AS {}").format(
+                pgsql.SQL('MATERIALIZED VIEW' if kind == 'm' else 'VIEW'),
+                target, with_options,
+                pgsql.SQL(definition.rstrip().rstrip(';'))))
+            for index in indexes:
+                _run(cursor, index)
+            if owner != current_user:
+                _run(cursor, pgsql.SQL("ALTER {} {} OWNER TO {}").format(
+                    pgsql.SQL('MATERIALIZED VIEW' if kind == 'm' else 'VIEW'),
+                    target, pgsql.Identifier(owner)))
+            for grantee, privilege in grants:
+                _run(cursor, pgsql.SQL("GRANT {} ON {} TO {}").format(
+                    pgsql.SQL(privilege), target, pgsql.SQL(grantee)))
+    conn.commit()
+    with conn.cursor() as cursor:
+        _run(cursor, pgsql.SQL("ANALYZE {}").format(old))
+    conn.commit()
+
+
+def pruning_queries(cursor, schema, table, column):
+    """
+    {name: sql} of typical date-filtered queries on a table.
+
+    The bounds are literals (the latest month with data), so the planner
+    can prune partitions; last_week uses a subquery and shows pruning at
+    execution time instead.
+    """
+    name = pgsql.Identifier(schema, table)
+    key = pgsql.Identifier(column)
+    cursor.execute(pgsql.SQL("SELECT date_trunc('month', max({}))::date FROM {}")
+                   .format(key, name))
+    month = cursor.fetchone()[0] or date.today().replace(day=1)
+    next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    quarter = date(month.year - (month.month <= 2),
+                   (month.month - 3) % 12 + 1, 1)
+    queries = {
+        'month_count': pgsql.SQL(
+            "SELECT count(*) FROM {1} WHERE {0} >= %s AND {0} < %s"),
+        'quarter_by_day': pgsql.SQL(
+            "SELECT date_trunc('day', {0}) AS day, count(*) FROM {1} "
+            "WHERE {0} >= %s AND {0} < %s GROUP BY 1 ORDER BY 1"),
+        'last_week': pgsql.SQL(
+            "SELECT * FROM {1} WHERE {0} >= (SELECT max({0}) FROM {1}) "
+            "- INTERVAL '7 days'"),
+    }
+    bounds = {'month_count': (month, next_month),
+              'quarter_by_day': (quarter, next_month),
+              'last_week': None}
+    return {key_name: cursor.mogrify(query.format(key, name),
+                                     bounds[key_name]).decode()
+            for key_name, query in queries.items()}
+
+
+def _scans(plan):
+    """(relations scanned, subplans pruned at run time) of a JSON plan."""
+    relations = set()
+    removed = 0
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if 'Relation Name' in node and node.get('Actual Loops', 1):
+            relations.add(node['Relation Name'])
+        removed += node.get('Subplans Removed', 0)
+        stack.extend(node.get('Plans', []))
+    return len(relations), removed
+
+
+def time_pruning(conn, queries, repeat=REPEAT):
+    """{name: timing} of EXPLAIN (ANALYZE, BUFFERS) runs of each query."""
+    timings = {}
+    with conn.cursor() as cursor:
+        for name, query in queries.items():
+            runs = []
+            for _ in range(repeat):
+                cursor.execute(EXPLAIN_SQL + query)
+                runs.append(cursor.fetchone()[0][0])
+            plan = runs[-1]['Plan']
+            scanned, removed = _scans(plan)
+            timings[name] = {
+                'execution_ms': statistics.median(
+                    run['Execution Time'] for run in runs),
+                'planning_ms': statistics.median(
+                    run['Planning Time'] for run in runs),
+                'buffers': (plan.get('Shared Hit Blocks', 0)
+                            + plan.get('Shared Read Blocks', 0)),
+                'relations_scanned': scanned,
+                'subplans_removed': removed,
+            }
+        conn.rollback()
+    return timings
+
+
+def print_pruning(table, before, after=None):
+    for name, old in before.items():
+        line = (f"   {table + '.' + name:<48} {old['execution_ms']:>9.2f} ms "
+                f"{old['buffers']:>8} buf {old['relations_scanned']:>3} rel")
+        if after:
+            new = after[name]
+            speedup = old['execution_ms'] / max(new['execution_ms'], 0.001)
+            line += (f"  ->  {new['execution_ms']:>9.2f} ms "
+                     f"{new['buffers']:>8} buf {new['relations_scanned']:>3} rel"
+                     f" {speedup:>6.1f}x")
+        print(line)
+
+
+def print_plan(name, column, plan):
+    if plan['partitioned']:
+        print(f"   ✅ {name}: already partitioned")
+        return
+    labels = plan['periods']
+    print(f"   📋 {name} by {column} ({plan['type']}): ~{plan['estimate']:,} "
+          f"rows, {plan['first']} to {plan['last']}")
+    print(f"      {len(labels)} partitions {labels[0][0]}..{labels[-1][0]} "
+          f"+ default")
+    for constraint, definition, _ in plan['constraints']:
+        print(f"      🔑 {constraint}: {definition}")
+    print(f"      {len(plan['indexes'])} index(es), "
+          f"{len(plan['outgoing'])} foreign key(s) rebuilt per partition")
+    for view in plan['views']:
+        print(f"      👁️ recreates {view[1]}.{view[2]}")
+    for owner_table, constraint, definition in plan['incoming']:
+        print(f"      ⚠️ drops {owner_table}.{constraint} ({definition}): "
+              f"a partitioned table can't be referenced without its date")
+
+
+def save_results(results):
+    directory = os.path.join(BENCHMARK_DIR, 'results')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, f"partitioning-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(results, handle, indent=2, default=str)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Partition the large fact tables by date")
+    parser.add_argument('command', choices=['plan', 'migrate', 'benchmark'])
+    parser.add_argument('--table', action='append', choices=sorted(TABLES),
+                        help='table to migrate (repeatable, default: all)')
+    parser.add_argument('--interval', choices=INTERVALS, default='month',
+                        help='partition size (default: month)')
+    parser.add_argument('--future', type=int, default=FUTURE_PERIODS,
+                        help=f'empty partitions after the latest date '
+                             f'(default: {FUTURE_PERIODS})')
+    parser.add_argument('--keep-old', action='store_true',
+                        help=f'keep the original as <table>{OLD_SUFFIX}')
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f'EXPLAIN ANALYZE runs per query (default: {REPEAT})')
+    parser.add_argument('--no-benchmark', action='store_true',
+                        help="migrate: don't time the date-filtered queries")
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    try:
+        conn = db.connect(options=db.MAINTENANCE_OPTIONS,
+                          **db.overrides_from_args(args))
+    except psycopg2.Error as e:
+        print(f"❌ Could not connect: {e}")
+        return 1
+
+    names = args.table or list(TABLES)
+    results = {}
+    failed = []
+    try:
+        for name in names:
+            schema, table = split_name(name)
+            column = TABLES[name]
+            try:
+                with conn.cursor() as cursor:
+                    plan = plan_table(cursor, schema, table, column,
+                                      args.interval, args.future)
+                    queries = pruning_queries(cursor, schema, table, column)
+                conn.rollback()
+                if args.command == 'plan':
+                    print_plan(name, column, plan)
+                    continue
+                if args.command == 'benchmark':
+                    timings = time_pruning(conn, queries, args.repeat)
+                    print_pruning(name, timings)
+                    results[name] = {'partitioned': plan['partitioned'],
+                                     'queries': queries, 'timings': timings}
+                    continue
+                if plan['partitioned']:
+                    print(f"   ✅ {name}: already partitioned")
+                    continue
+
+                print_plan(name, column, plan)
+                started = time.perf_counter()
+                before = (None if args.no_benchmark
+                          else time_pruning(conn, queries, args.repeat))
+                print("   📦 Copying...")
+                copied = build(conn, schema, table, column, plan)
+                print("   🔨 Building indexes and keys...")
+                build_indexes(conn, schema, table, plan)
+                print("   🔁 Swapping...")
+                swap(conn, schema, table, plan, args.keep_old)
+                elapsed = time.perf_counter() - started
+                print(f"   ✅ {name}: {sum(copied.values()):,} rows in "
+                      f"{len(plan['periods']) + 1} partitions ({elapsed:.1f}s)")
+                results[name] = {
+                    'column': column,
+                    'interval': args.interval,
+                    'rows': copied,
+                    'seconds': round(elapsed, 3),
+                    'dropped_foreign_keys': [f'{t}.{c}'
+                                             for t, c, _ in plan['incoming']],
+                    'recreated_views': [f'{v[1]}.{v[2]}' for v in plan['views']],
+                    'queries': queries,
+                }
+                if before is not None:
+                    after = time_pruning(conn, queries, args.repeat)
+                    print_pruning(name, before, after)
+                    results[name].update(before=before, after=after)
+            except (MigrationError, psycopg2.Error) as e:
+                conn.rollback()
+                failed.append(name)
+                print(f"   ❌ {name}: {str(e).strip()}")
+    finally:
+        conn.close()
+
+    if results and args.command != 'plan':
+        print(f"\n📝 Results written to {os.path.relpath(save_results(results))}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Per-student database provisioning for hosted deployments.
+
+Every student gets a login role and a private database (<role>_db) that
+is a clone of one template holding all sample schemas:
+
+1. the template is built once from the snapshot tooling (snapshot.py):
+   restored from a pg_dump snapshot if there is one, otherwise loaded
+   from databases/*.sql
+2. students are provisioned concurrently by a bounded pool of workers;
+   each one creates the role (with the per-role limits of governor.py),
+   clones the template with CREATE DATABASE ... TEMPLATE, hands the
+   sample objects to the role and locks the database to its owner
+
+Re-runs are idempotent: existing roles keep their passwords and existing
+databases are left alone (use --reset to re-clone them). teardown drops
+the databases and roles again. Passwords of newly created roles are
+written to a CSV file readable only by you as soon as each role exists,
+so a student whose clone fails is not left with an unknown password.
+
+Needs a superuser connection (or a role with CREATEROLE and CREATEDB that
+may SET ROLE to the student roles), e.g. PGUSER=postgres.
+
+Usage:
+    python scripts/provision_students.py create --count 200 --jobs 8
+    python scripts/provision_students.py create --roster roster.txt
+    python scripts/provision_students.py status --count 200
+    python scripts/provision_students.py teardown --count 200
+"""
+
+import argparse
+import csv
+import os
+import re
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import db
+import governor
+import snapshot
+
+BASE_DBNAME = 'classroom_base'
+PREFIX = 'student'
+JOBS = 4
+CREDENTIALS_FILE = 'student_credentials.csv'
+
+ROLE_NAME = re.compile(r'^[a-z_][a-z0-9_]{0,59}$')
+
+# Objects in the sample schemas, so they can be handed to the student
+OWNED_OBJECTS_SQL = """
+    SELECT 'SCHEMA', quote_ident(nspname)
+    FROM pg_namespace
+    WHERE nspname NOT LIKE 'pg\\_%%' AND nspname <> 'information_schema'
+      AND nspname <> 'public'
+    UNION ALL
+    SELECT CASE c.relkind WHEN 'v' THEN 'VIEW'
+                          WHEN 'm' THEN 'MATERIALIZED VIEW'
+                          WHEN 'S' THEN 'SEQUENCE'
+                          ELSE 'TABLE' END,
+           quote_ident(n.nspname) || '.' || quote_ident(c.relname)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE c.relkind IN ('r', 'p', 'v', 'm', 'S', 'f')
+      AND n.nspname NOT LIKE 'pg\\_%%' AND n.nspname <> 'information_schema'
+      -- sequences owned by a column follow their table
+      AND NOT (c.relkind = 'S' AND EXISTS (
+          SELECT 1 FROM pg_depend d
+          WHERE d.objid = c.oid AND d.classid = 'pg_class'::regclass
+            AND d.deptype IN ('a', 'i')))
+    UNION ALL
+    SELECT 'ROUTINE', p.oid::regprocedure::text
+    FROM pg_proc p
+    JOIN pg_namespace n ON n.oid = p.pronamespace
+    WHERE n.nspname NOT LIKE 'pg\\_%%' AND n.nspname <> 'information_schema'
+"""
+
+
+def student_names(count=None, prefix=PREFIX, roster=None):
+    """Role names from a roster file (one per line) or prefix + number."""
+    if roster:
+        with open(roster, encoding='utf-8') as handle:
+            names = [line.split(',')[0].strip().lower() for line in handle]
+        names = [name for name in names if name and not name.startswith('#')]
+    else:
+        width = max(3, len(str(count)))
+        names = [f'{prefix}{i:0{width}d}' for i in range(1, count + 1)]
+    invalid = [name for name in names if not ROLE_NAME.match(name)]
+    if invalid:
+        raise ValueError(f"invalid role names: {', '.join(invalid[:5])}")
+    return list(dict.fromkeys(names))
+
+
+def database_for(name):
+    return f'{name}_db'
+
+
+def ensure_template(conn, params, checksum):
+    """
+    Make sure <base>_template matches databases/*.sql.
+
+    Returns how it was obtained: 'existing', 'dump' or 'sql'.
+    """
+    template = snapshot.template_name(BASE_DBNAME)
+    if snapshot.database_stamp(conn, template) == checksum:
+        return 'existing'
+    source = snapshot.restore(conn, params, BASE_DBNAME, checksum)
+    if source is None:
+        snapshot.drop_database(conn, BASE_DBNAME)
+        snapshot.load_from_sql(conn, params, BASE_DBNAME, checksum)
+        snapshot.create_template(conn, BASE_DBNAME, checksum)
+        source = 'sql'
+    # Only the template is needed from here on
+    snapshot.drop_database(conn, BASE_DBNAME)
+    return source
+
+
+class Provisioner:
+    """Provisions students with one maintenance connection per worker."""
+
+    def __init__(self, params, checksum, reset=False,
+                 credentials=CREDENTIALS_FILE):
+        self.params = params
+        self.checksum = checksum
+        self.reset = reset
+        self.credentials = credentials
+        self.template = snapshot.template_name(BASE_DBNAME)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = snapshot.maintenance_connection(self.params)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+    def ensure_role(self, conn, name):
+        """
+        Create the login role; returns its password if it is new.
+
+        The governor's limits are (re)applied to new and existing roles.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_roles WHERE rolname = %s", (name,))
+            password = None
+            if not cursor.fetchone():
+                password = secrets.token_urlsafe(12)
+                cursor.execute(
+                    pgsql.SQL("CREATE ROLE {} LOGIN PASSWORD %s").format(
+                        pgsql.Identifier(name)), (password,))
+            governor.apply_limits(cursor, name)
+            return password
+
+    def hand_over(self, dbname, name):
+        """Give the student every sample object and lock the database."""
+        conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT,
+                                options=db.MAINTENANCE_OPTIONS,
+                                **{**self.params, 'dbname': dbname})
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(OWNED_OBJECTS_SQL)
+                statements = [
+                    pgsql.SQL("ALTER {} {} OWNER TO {}").format(
+                        pgsql.SQL(kind), pgsql.SQL(identity),
+                        pgsql.Identifier(name))
+                    for kind, identity in cursor.fetchall()
+                ]
+                if statements:
+                    cursor.execute(pgsql.SQL('; ').join(statements))
+            conn.commit()
+        finally:
+            conn.close()
+
+        with self.connection().cursor() as cursor:
+            cursor.execute(pgsql.SQL(
+                "REVOKE ALL ON DATABASE {db} FROM PUBLIC; "
+                "GRANT ALL ON DATABASE {db} TO {role}"
+            ).format(db=pgsql.Identifier(dbname), role=pgsql.Identifier(name)))
+
+    def provision(self, name):
+        """Create one student; returns (name, status, password, seconds)."""
+        started = time.perf_counter()
+        conn = self.connection()
+        dbname = database_for(name)
+        password = self.ensure_role(conn, name)
+        if password:
+            # A re-run finds the role and can't recover its password
+            with self._lock:
+                write_credentials(self.credentials, {name: password})
+        stamp = snapshot.database_stamp(conn, dbname)
+        if stamp is not None and not self.reset:
+            status = 'exists' if stamp == self.checksum else 'stale'
+        else:
+            # Stamped only once handed over, so a half-done clone reads as stale
+            snapshot.clone_database(conn, self.template, dbname, '',
+                                    owner=name)
+            self.hand_over(dbname, name)
+            snapshot.stamp_database(conn, dbname, self.checksum)
+            status = 'reset' if stamp is not None else 'created'
+        return name, status, password, time.perf_counter() - started
+
+    def teardown(self, name):
+        """Drop one student's database and role."""
+        started = time.perf_counter()
+        conn = self.connection()
+        snapshot.drop_database(conn, database_for(name))
+        with conn.cursor() as cursor:
+            cursor.execute(pgsql.SQL("DROP ROLE IF EXISTS {}").format(
+                pgsql.Identifier(name)))
+        return name, 'dropped', None, time.perf_counter() - started
+
+
+def run_pool(task, names, jobs):
+    """Run task(name) for every student; yields results as they finish."""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(task, name): name for name in names}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except psycopg2.Error as e:
+                yield futures[future], 'failed', str(e).strip(), 0.0
+
+
+def write_credentials(path, credentials, dbname_for=database_for):
+    """Append new student credentials to a CSV only the owner can read."""
+    exists = os.path.exists(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    with os.fdopen(fd, 'a', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        if not exists:
+            writer.writerow(['username', 'password', 'database'])
+        for name, password in sorted(credentials.items()):
+            writer.writerow([name, password, dbname_for(name)])
+
+
+def print_status(conn, names, checksum):
+    counts = {}
+    for name in names:
+        stamp = snapshot.database_stamp(conn, database_for(name))
+        state = ('missing' if stamp is None
+                 else 'up to date' if stamp == checksum else 'stale')
+        counts[state] = counts.get(state, 0) + 1
+    template = snapshot.template_name(BASE_DBNAME)
+    template_stamp = snapshot.database_stamp(conn, template)
+    print(f"📦 Template {template}: "
+          f"{'✅ up to date' if template_stamp == checksum else '⚠️ missing or stale'}")
+    for state, count in sorted(counts.items()):
+        print(f"   {count:>5} student database(s) {state}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Provision per-student databases from a template")
+    parser.add_argument('command', choices=['create', 'status', 'teardown'])
+    parser.add_argument('--count', '-n', type=int,
+                        help='number of students (named <prefix>001...)')
+    parser.add_argument('--prefix', default=PREFIX,
+                        help=f'role name prefix with --count (default: {PREFIX})')
+    parser.add_argument('--roster', metavar='FILE',
+                        help='file with one role name per line (first CSV column)')
+    parser.add_argument('--jobs', '-j', type=int, default=JOBS,
+                        help=f'students provisioned at once (default: {JOBS})')
+    parser.add_argument('--reset', action='store_true',
+                        help='re-clone databases that already exist')
+    parser.add_argument('--credentials', default=CREDENTIALS_FILE,
+                        help=f'CSV for new passwords (default: {CREDENTIALS_FILE})')
+    parser.add_argument('--drop-template', action='store_true',
+                        help='teardown: also drop the template database')
+    db.add_connection_args(parser)
+    args = parser.parse_args(argv)
+
+    if not args.count and not args.roster:
+        parser.error("give --count or --roster")
+    try:
+        names = student_names(args.count, args.prefix, args.roster)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    try:
+        params = db.params_from_args(args)
+        conn = snapshot.maintenance_connection(params)
+    except psycopg2.Error as e:
+        print(f"❌ Cannot connect to database: {e}")
+        return 1
+
+    checksum = snapshot.sql_checksum()
+    try:
+        if args.command == 'status':
+            print_status(conn, names, checksum)
+            return 0
+        if args.command == 'create':
+            started = time.perf_counter()
+            source = ensure_template(conn, params, checksum)
+            print(f"📦 Template ready ({source}, "
+                  f"{time.perf_counter() - started:.1f}s)")
+    except (psycopg2.Error, OSError, subprocess.CalledProcessError,
+            snapshot.LoadFailed) as e:
+        print(f"❌ Template setup failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    provisioner = Provisioner(params, checksum, reset=args.reset,
+                              credentials=args.credentials)
+    task = provisioner.provision if args.command == 'create' else provisioner.teardown
+    verb = 'Provisioning' if args.command == 'create' else 'Tearing down'
+    print(f"🚀 {verb} {len(names)} student(s) with {args.jobs} worker(s)...")
+
+    started = time.perf_counter()
+    counts = {}
+    new_passwords = 0
+    try:
+        for name, status, detail, seconds in run_pool(task, names, args.jobs):
+            counts[status] = counts.get(status, 0) + 1
+            if status == 'failed':
+                print(f"   ❌ {name}: {detail}")
+            elif status == 'stale':
+                print(f"   ⚠️ {name}: database predates the current SQL "
+                      f"files (use --reset to re-clone)")
+            if detail and status != 'failed':
+                new_passwords += 1
+    finally:
+        provisioner.close()
+    elapsed = time.perf_counter() - started
+
+    if new_passwords:
+        print(f"🔑 {new_passwords} new password(s) written to "
+              f"{args.credentials}")
+
+    if args.command == 'teardown' and args.drop_template:
+        conn = snapshot.maintenance_connection(params)
+        try:
+            snapshot.drop_database(conn, snapshot.template_name(BASE_DBNAME))
+        finally:
+            conn.close()
+        print("🧹 Template dropped")
+
+    summary = ', '.join(f'{count} {status}'
+                        for status, count in sorted(counts.items()))
+    print(f"📊 {summary} in {elapsed:.1f}s "
+          f"({len(names) / max(elapsed, 1e-9):.1f} students/s)")
+    return 1 if counts.get('failed') else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
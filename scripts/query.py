@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Shared query helpers for scripts and notebooks.
+
+pd.read_sql() fetches the whole result into client memory before building
+a DataFrame. These helpers use a named (server-side) psycopg2 cursor
+instead, so PostgreSQL keeps the result and rows come over in batches of
+itersize:
+
+- stream_query() yields one DataFrame (or Arrow RecordBatch) per batch
+- preview() wraps plain queries in a LIMIT (so the planner picks a
+  fast-start plan) and stops after the first rows, so SELECT * on a big
+  table returns immediately
+- read_query() builds a single DataFrame from the streamed batches, with
+  compact=True in the tightest dtypes for the column types (compact.py)
+
+Usage:
+    from query import preview, stream_query
+
+    preview("SELECT * FROM sakila.rental")
+    for chunk in stream_query("SELECT * FROM chinook.invoice_line",
+                              itersize=50_000):
+        ...
+"""
+
+import argparse
+import itertools
+import sys
+from contextlib import ExitStack
+
+import pandas as pd
+import psycopg2
+
+import db
+
+DEFAULT_ITERSIZE = 10_000
+PREVIEW_ROWS = 10
+
+_cursor_ids = itertools.count(1)
+
+
+# PostgreSQL type OIDs -> pyarrow type names, so every batch of a stream
+# gets the same schema even when a column is all NULL in the first batch
+ARROW_TYPES = {
+    16: 'bool_',
+    17: 'binary',
+    20: 'int64',
+    21: 'int16',
+    23: 'int32',
+    25: 'string',
+    700: 'float32',
+    701: 'float64',
+    1042: 'string',
+    1043: 'string',
+    1082: 'date32',
+    1700: 'float64',
+}
+TIMESTAMP_OIDS = {1114: None, 1184: 'UTC'}
+
+
+def arrow_type(type_code):
+    """pyarrow type for a PostgreSQL type OID (None if not in ARROW_TYPES)."""
+    import pyarrow as pa
+
+    if type_code in TIMESTAMP_OIDS:
+        return pa.timestamp('us', tz=TIMESTAMP_OIDS[type_code])
+    if type_code in ARROW_TYPES:
+        return getattr(pa, ARROW_TYPES[type_code])()
+    return None
+
+
+def _record_batch(rows, description):
+    """
+    Build a RecordBatch, typed from the cursor description where possible.
+
+    NUMERIC becomes float64 (Arrow decimals need a fixed scale); types not
+    in ARROW_TYPES are inferred from the values.
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for i, column in enumerate(description):
+        values = [row[i] for row in rows]
+        type_ = arrow_type(column.type_code)
+        if column.type_code == 1700:
+            values = [None if v is None else float(v) for v in values]
+        arrays.append(pa.array(values, type=type_))
+    return pa.RecordBatch.from_arrays(
+        arrays, names=[column.name for column in description])
+
+
+def stream_query(sql, params=None, itersize=DEFAULT_ITERSIZE, max_rows=None,
+                 arrow=False, conn=None, **overrides):
+    """
+    Run a query through a server-side cursor and yield it in chunks.
+
+    Each chunk holds at most itersize rows, so memory use is bounded by
+    itersize no matter how large the result is. Fetching stops after
+    max_rows rows, or as soon as the caller stops iterating; the cursor is
+    closed either way. With arrow=True, pyarrow RecordBatches are yielded
+    instead of DataFrames. An empty result yields one empty chunk so the
+    column names are still available.
+
+    Uses conn if given (it must not be in autocommit mode, because server
+    side cursors live inside a transaction), otherwise a pooled connection
+    from db.get_conn(**overrides).
+    """
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(db.get_conn(**overrides))
+        cursor = conn.cursor(name=f'stream_{next(_cursor_ids)}')
+        cursor.itersize = itersize
+        try:
+            cursor.execute(sql, params)
+            fetched = 0
+            while True:
+                size = itersize
+                if max_rows is not None:
+                    size = min(size, max_rows - fetched)
+                rows = cursor.fetchmany(size) if size > 0 else []
+                description = cursor.description or []
+                if rows or not fetched:
+                    if arrow:
+                        yield _record_batch(rows, description)
+                    else:
+                        yield pd.DataFrame.from_records(
+                            rows, columns=[column.name for column in description])
+                fetched += len(rows)
+                if len(rows) < size or size == 0:
+                    break
+        finally:
+            if not cursor.closed and not conn.closed:
+                cursor.close()
+
+
+def read_query(sql, params=None, itersize=DEFAULT_ITERSIZE, max_rows=None,
+               conn=None, engine='postgres', compact=False, categories=None,
+               sample_rows=None, report=False, **overrides):
+    """
+    Run a query through a server-side cursor and return one DataFrame.
+
+    engine='duckdb' runs it in-process over the Parquet export instead
+    (see columnar.py); the server is not contacted at all.
+
+    compact=True picks the tightest dtypes from the column types of the
+    result (categoricals for low-cardinality text, pyarrow strings,
+    downcast nullable integers; see compact.py), and report=True also
+    prints the memory saved. categories and sample_rows are passed on to
+    compact.arrow_to_frame().
+    """
+    if engine == 'duckdb':
+        import columnar
+
+        df = columnar.read_query(sql, params)
+        df = df if max_rows is None else df.head(max_rows)
+        if compact:
+            import compact as compact_module
+
+            df = compact_module.compact_frame(
+                df, categories, compact_module.SAMPLE_ROWS
+                if sample_rows is None else sample_rows)
+        return df
+    if compact:
+        return _read_compact(sql, params, itersize, max_rows, conn,
+                             categories, sample_rows, report, overrides)
+    chunks = list(stream_query(sql, params, itersize=itersize,
+                               max_rows=max_rows, conn=conn, **overrides))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _read_compact(sql, params, itersize, max_rows, conn, categories,
+                  sample_rows, report, overrides):
+    """read_query(compact=True): compact dtypes from the Arrow batches."""
+    import compact
+
+    batches = []
+    before = pd.Series(dtype='int64')
+    for batch in stream_query(sql, params, itersize=itersize,
+                              max_rows=max_rows, arrow=True, conn=conn,
+                              **overrides):
+        if report:
+            before = before.add(compact.default_memory(batch), fill_value=0)
+        batches.append(batch)
+    df = compact.arrow_to_frame(
+        batches, categories,
+        compact.SAMPLE_ROWS if sample_rows is None else sample_rows)
+    if report:
+        compact.print_memory_report(before, df)
+    return df
+
+
+def read_arrow(sql, params=None, itersize=DEFAULT_ITERSIZE, max_rows=None,
+               conn=None, **overrides):
+    """Run a query through a server-side cursor and return a pyarrow Table."""
+    import pyarrow as pa
+
+    batches = list(stream_query(sql, params, itersize=itersize,
+                                max_rows=max_rows, arrow=True, conn=conn,
+                                **overrides))
+    return pa.Table.from_batches(batches)
+
+
+def cached_query(sql, params=None, refresh=False, conn=None, cache=None,
+                 **overrides):
+    """
+    read_query() with results cached on disk (see query_cache.py).
+
+    A repeated query is served from the cache until a table in one of the
+    schemas it reads changes. refresh=True always re-runs the query and
+    replaces the cached result.
+    """
+    import query_cache
+
+    cache = cache or query_cache.ResultCache()
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(db.get_conn(**overrides))
+        key = query_cache.cache_key(conn, sql, params)
+        if key is not None and not refresh:
+            df = cache.get(key)
+            if df is not None:
+                return df
+        df = read_query(sql, params, conn=conn)
+    if key is not None:
+        cache.put(key, df)
+    return df
+
+
+def limit_query(sql, rows):
+    """
+    Wrap a single SELECT/WITH/VALUES/TABLE statement in a LIMIT.
+
+    Other statements (and anything the check is unsure about) come back
+    unchanged; stream_query()'s max_rows still caps what is fetched.
+    """
+    import query_cache
+
+    normalized = query_cache.normalize_sql(sql)
+    if not query_cache.is_read_only(normalized) or ';' in normalized:
+        return sql
+    body = sql.strip()
+    while body.endswith(';'):
+        body = body[:-1].rstrip()
+    # A semicolon followed by a comment would still end the subquery
+    tokens = [match.group() for match in query_cache.SQL_TOKENS.finditer(body)
+              if match.lastgroup not in ('comment', 'space')]
+    if tokens and tokens[-1].endswith(';'):
+        return sql
+    return f'SELECT * FROM (\n{body}\n) AS preview LIMIT {int(rows)}'
+
+
+def preview(sql, params=None, rows=PREVIEW_ROWS, conn=None, engine='postgres',
+            **overrides):
+    """
+    First rows of a query, fetched without running it to completion.
+
+    Plain queries run with a LIMIT on the server (see limit_query()).
+    """
+    return read_query(limit_query(sql, rows), params, itersize=rows,
+                      max_rows=rows, conn=conn, engine=engine, **overrides)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Preview or stream a query with a server-side cursor")
+    parser.add_argument('sql', help='query to run')
+    parser.add_argument('--rows', type=int, default=PREVIEW_ROWS,
+                        help=f'rows to show (default: {PREVIEW_ROWS})')
+    parser.add_argument('--all', action='store_true',
+                        help='stream the whole result and report its size')
+    parser.add_argument('--itersize', type=int, default=DEFAULT_ITERSIZE,
+                        help=f'rows per fetch (default: {DEFAULT_ITERSIZE:,})')
+    parser.add_argument('--compact', action='store_true',
+                        help='read the whole result with compact dtypes and '
+                             'report the memory saved')
+    parser.add_argument('--engine', choices=('postgres', 'duckdb'),
+                        default='postgres',
+                        help='duckdb runs the preview over the Parquet export')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+    overrides = db.overrides_from_args(args)
+
+    try:
+        if args.compact:
+            df = read_query(args.sql, itersize=args.itersize,
+                            engine=args.engine, compact=True,
+                            report=args.engine == 'postgres', **overrides)
+            print(df.head(args.rows).to_string(index=False))
+            return 0
+        if not args.all:
+            print(preview(args.sql, rows=args.rows, engine=args.engine,
+                          **overrides).to_string(index=False))
+            return 0
+        rows = chunks = 0
+        for chunk in stream_query(args.sql, itersize=args.itersize,
+                                  **overrides):
+            if not chunks:
+                print(chunk.head(args.rows).to_string(index=False))
+            rows += len(chunk)
+            chunks += 1
+        print(f"\n✅ {rows:,} rows streamed in {chunks} chunk(s)")
+        return 0
+    except psycopg2.Error as e:
+        print(f"❌ Query failed: {e}")
+        return 1
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of query results for notebook workloads.
+
+Results are stored as Parquet files under
+~/.cache/data-management-classroom/query-cache/ and looked up by a key
+made of:
+
+- the database (host, port, dbname)
+- the normalized SQL text (comments dropped, whitespace collapsed,
+  keywords lower-cased outside of quotes) and its parameters
+- a change token for every schema the query reads: a hash of each
+  table's insert/update/delete counters in pg_stat_all_tables, its
+  relfilenode (which TRUNCATE, VACUUM FULL and rewriting ALTERs replace)
+  and its column definitions. Views are followed to the schemas of the
+  tables they read, so a cached dashboard query is invalidated when the
+  sample data changes.
+
+Any write or schema change to a referenced table therefore produces a new
+key, and the old entry simply ages out. Only statements that just read
+are cached: a WITH holding an INSERT/UPDATE/DELETE/MERGE, or a
+SELECT ... INTO, is not. Neither are queries whose result depends on
+more than the tables: volatile functions (random(), clock_timestamp(),
+nextval(), ...), the current time (now(), current_date, ...) and the
+system catalogs and statistics views (pg_catalog, pg_stat_*,
+information_schema). Entries are evicted least recently used first once
+the cache grows past QUERY_CACHE_MAX_MB (default 512).
+
+PostgreSQL publishes the statistics counters of a session in batches
+(at most once a second, and within about ten seconds once the session is
+idle), so a change committed a moment ago can still read as cached. Pass
+refresh=True to bypass the cache right after writing.
+
+Usage:
+    from query import cached_query
+
+    df = cached_query("SELECT * FROM dashboard.sample_queries")
+
+    python scripts/query_cache.py            # show cache size
+    python scripts/query_cache.py --clear    # empty the cache
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+import db
+
+CACHE_DIR = os.environ.get(
+    'QUERY_CACHE_DIR',
+    os.path.join(os.path.dirname(db.CACHE_FILE), 'query-cache')
+)
+MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+SQL_TOKENS = re.compile(r"""
+      (?P<string>'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<space>\s+)
+    | (?P<other>[^'"\s/-]+|.)
+""", re.VERBOSE | re.DOTALL)
+CACHEABLE = re.compile(r'^\(*\s*(select|with|values|table)\b')
+CALL = re.compile(r'("(?:[^"]|"")*"|[a-z_][a-z0-9_$]*)\s*\(')
+WORD = re.compile(r'[a-z_][a-z0-9_$]*')
+# Keywords that make a SELECT/WITH write: data-modifying CTEs and SELECT INTO
+MODIFYING_WORDS = {'insert', 'update', 'delete', 'merge', 'into'}
+
+# Stable functions and keywords that still change from one transaction to
+# the next; volatile functions are looked up in pg_proc
+TIME_FUNCTIONS = {
+    'now', 'current_date', 'current_time', 'current_timestamp', 'localtime',
+    'localtimestamp', 'transaction_timestamp', 'statement_timestamp',
+}
+CATALOG_SCHEMAS = {'pg_catalog', 'information_schema'}
+
+# Per-schema change token: counters, relfilenode and column definitions of
+# every table, so TRUNCATE and DDL also change it
+SCHEMA_TOKENS_SQL = """
+    SELECT n.nspname,
+           md5(string_agg(
+               c.oid || ':' || coalesce(pg_relation_filenode(c.oid), 0)
+               || ':' || coalesce(s.n_tup_ins, 0)
+               || ':' || coalesce(s.n_tup_upd, 0)
+               || ':' || coalesce(s.n_tup_del, 0)
+               || ':' || coalesce(
+                   (SELECT md5(string_agg(a.attname || ':'
+                                          || format_type(a.atttypid, a.atttypmod),
+                                          ',' ORDER BY a.attnum))
+                    FROM pg_attribute a
+                    WHERE a.attrelid = c.oid AND a.attnum > 0
+                      AND NOT a.attisdropped), ''),
+               ',' ORDER BY c.oid))
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_stat_all_tables s ON s.relid = c.oid
+    WHERE c.relkind IN ('r', 'p', 'm', 'v')
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname !~ '^pg_'
+    GROUP BY n.nspname
+"""
+VOLATILE_SQL = """
+    SELECT DISTINCT proname FROM pg_proc
+    WHERE provolatile = 'v' AND proname = ANY(%s)
+"""
+VIEW_DEPENDENCIES_SQL = """
+    SELECT DISTINCT vn.nspname, tn.nspname
+    FROM pg_rewrite r
+    JOIN pg_class v ON v.oid = r.ev_class
+    JOIN pg_namespace vn ON vn.oid = v.relnamespace
+    JOIN pg_depend d ON d.objid = r.oid
+                    AND d.classid = 'pg_rewrite'::regclass
+                    AND d.refclassid = 'pg_class'::regclass
+    JOIN pg_class t ON t.oid = d.refobjid
+    JOIN pg_namespace tn ON tn.oid = t.relnamespace
+    WHERE vn.nspname <> tn.nspname
+      AND tn.nspname NOT IN ('pg_catalog', 'information_schema')
+"""
+
+
+def normalize_sql(sql):
+    """Canonical form of a query, so formatting changes still hit the cache."""
+    parts = []
+    for match in SQL_TOKENS.finditer(sql):
+        kind = match.lastgroup
+        if kind in ('comment', 'space'):
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        elif kind == 'other':
+            parts.append(match.group().lower())
+        else:
+            parts.append(match.group())
+    return ''.join(parts).strip().rstrip(';').strip()
+
+
+def _code(normalized):
+    """The normalized query with string literals blanked out."""
+    return ''.join("''" if match.lastgroup == 'string' else match.group()
+                   for match in SQL_TOKENS.finditer(normalized))
+
+
+def is_read_only(normalized):
+    """True for a normalized SELECT/WITH/VALUES/TABLE that writes nothing."""
+    if not CACHEABLE.match(normalized):
+        return False
+    return not set(WORD.findall(_code(normalized))) & MODIFYING_WORDS
+
+
+def uncacheable_reason(conn, normalized):
+    """
+    Why a read-only query must not be cached, or None.
+
+    Its result depends on more than the tables it reads if it calls a
+    volatile function or reads the time or the system catalogs.
+    """
+    code = _code(normalized)
+    words = set(WORD.findall(code))
+    if words & TIME_FUNCTIONS:
+        return f"reads the current time ({min(words & TIME_FUNCTIONS)})"
+    catalog = sorted(word for word in words
+                     if word in CATALOG_SCHEMAS or word.startswith('pg_'))
+    if catalog:
+        return f"reads the system catalogs ({catalog[0]})"
+    calls = sorted({name.strip('"').replace('""', '"')
+                    for name in CALL.findall(code)})
+    if calls:
+        with conn.cursor() as cursor:
+            cursor.execute(VOLATILE_SQL, (calls,))
+            volatile = sorted(row[0] for row in cursor.fetchall())
+        if volatile:
+            return f"calls volatile {volatile[0]}()"
+    return None
+
+
+def referenced_schemas(normalized, schemas):
+    """Schemas named as a qualifier (schema.table) in a normalized query."""
+    found = set()
+    for schema in schemas:
+        pattern = r'(?<![\w."])"?%s"?\s*\.' % re.escape(schema.lower())
+        if re.search(pattern, normalized):
+            found.add(schema)
+    return found
+
+
+def schema_tokens(conn, normalized):
+    """{schema: token} for every schema the query can read."""
+    with conn.cursor() as cursor:
+        cursor.execute(SCHEMA_TOKENS_SQL)
+        tokens = dict(cursor.fetchall())
+        cursor.execute(VIEW_DEPENDENCIES_SQL)
+        edges = cursor.fetchall()
+        cursor.execute("SELECT unnest(current_schemas(false))")
+        search_path = [row[0] for row in cursor.fetchall()]
+
+    pending = referenced_schemas(normalized, tokens) | set(search_path)
+    schemas = set()
+    while pending:
+        schema = pending.pop()
+        schemas.add(schema)
+        pending.update(target for source, target in edges
+                       if source == schema and target not in schemas)
+    return {schema: tokens.get(schema, '') for schema in sorted(schemas)}
+
+
+def cache_key(conn, sql, params=None):
+    """
+    Cache key for a query, or None if the query should not be cached.
+
+    Only read-only statements (SELECT, WITH, VALUES, TABLE) that read
+    nothing but tables are cached (see is_read_only() and
+    uncacheable_reason()).
+    """
+    normalized = normalize_sql(sql)
+    if not is_read_only(normalized):
+        return None
+    if uncacheable_reason(conn, normalized):
+        return None
+    info = conn.info
+    payload = json.dumps({
+        'database': [info.host, info.port, info.dbname],
+        'sql': normalized,
+        'params': params,
+        'schemas': schema_tokens(conn, normalized),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Parquet files in a directory, evicted least recently used first."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.directory, f'{key}.parquet')
+
+    def get(self, key):
+        """Cached DataFrame for key, or None."""
+        import pandas as pd
+
+        path = self.path(key)
+        try:
+            df = pd.read_parquet(path)
+            # mtime doubles as the last-used time for LRU eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return df
+
+    def put(self, key, df):
+        """Store df under key; returns False if it cannot be stored."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            df.to_parquet(temp_path, index=False)
+            os.replace(temp_path, path)
+        except (OSError, ValueError, TypeError, NotImplementedError,
+                ImportError):
+            # Columns pyarrow cannot represent (e.g. mixed-type objects)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+        self.evict()
+        return True
+
+    def entries(self):
+        """[(mtime, size, path), ...] for every cached result."""
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return found
+        for name in names:
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            found.append((info.st_mtime, info.st_size, path))
+        return found
+
+    def evict(self):
+        """Remove least recently used entries until under max_bytes."""
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the query result cache")
+    parser.add_argument('--clear', action='store_true',
+                        help='remove every cached result')
+    args = parser.parse_args(argv)
+
+    cache = ResultCache()
+    if args.clear:
+        cache.clear()
+        print(f"🧹 Cleared {cache.directory}")
+        return 0
+
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"📦 {cache.directory}")
+    print(f"   {len(entries)} cached result(s), {total / 1024 / 1024:.1f} MB "
+          f"of {cache.max_bytes / 1024 / 1024:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
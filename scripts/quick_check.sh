@@ -3,30 +3,42 @@
 echo "🎯 Data Management Classroom - Quick Environment Check"
 echo "===================================================="
 
+# Each check is timed as a telemetry span (see telemetry.sh)
+source "$(dirname "$0")/telemetry.sh"
+
 # Check if PostgreSQL is running and accessible
 echo "🗄️ Database Status:"
+telemetry_start "database"
+database_outcome=ok
 if pg_isready -h localhost -p 5432 >/dev/null 2>&1; then
     echo "  ✅ PostgreSQL is running"
     if psql -h localhost -U vscode -d vscode -c "SELECT 'Connected successfully!';" >/dev/null 2>&1; then
         echo "  ✅ Database connection working"
     else
         echo "  ⚠️ Cannot connect to database"
+        database_outcome=warning
     fi
 else
     echo "  ❌ PostgreSQL is not running"
     echo "  💡 Run: sudo service postgresql start"
+    database_outcome=error
 fi
+telemetry_end "database" "$database_outcome"
 
 # Check Python packages
 echo ""
 echo "🐍 Python Environment:"
+telemetry_start "python packages"
+packages_outcome=ok
 for pkg in pandas numpy psycopg2 matplotlib seaborn sklearn sqlalchemy; do
     if python3 -c "import $pkg" >/dev/null 2>&1; then
         echo "  ✅ $pkg"
     else
         echo "  ❌ $pkg (run: pip install --user $pkg)"
+        packages_outcome=error
     fi
 done
+telemetry_end "python packages" "$packages_outcome"
 
 # Check VS Code Python extension
 echo ""
@@ -50,5 +62,7 @@ fi
 
 echo ""
 echo "🏁 Quick check complete!"
+telemetry_summary
+telemetry_export
 echo "💡 For detailed testing, run: python3 scripts/test_setup.py"
 echo "🚀 Try the quick start: python3 scripts/quickstart.py"
@@ -4,53 +4,53 @@ Quick Start Guide for Data Management Classroom
 This script demonstrates basic database and data analysis operations.
 """
 
-import pandas as pd
-import psycopg2
+import os
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from db import get_conn
+from ingest import RAW_DIR, scan_csv
+from query import read_query
+
 def test_database_connection():
     """Test and demonstrate database connection"""
     try:
-        # Connect to PostgreSQL
-        conn = psycopg2.connect(
-            host="localhost",
-            database="vscode",
-            user="vscode"
-        )
-        
-        print("✅ Connected to PostgreSQL successfully!")
-        
-        # Create a sample table
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS employees (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(100),
-                department VARCHAR(50),
-                salary INTEGER
-            );
-        """)
+        # Borrow a pooled connection (credentials resolved by scripts/db.py)
+        with get_conn() as conn:
+            print("✅ Connected to PostgreSQL successfully!")
+            
+            # Create a sample table
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS employees (
+                    id SERIAL PRIMARY KEY,
+                    name VARCHAR(100),
+                    department VARCHAR(50),
+                    salary INTEGER
+                );
+            """)
+            
+            # Insert sample data
+            cursor.execute("""
+                INSERT INTO employees (name, department, salary) 
+                VALUES 
+                    ('Alice Johnson', 'Engineering', 75000),
+                    ('Bob Smith', 'Marketing', 65000),
+                    ('Carol Davis', 'Engineering', 85000)
+                ON CONFLICT DO NOTHING;
+            """)
+            
+            conn.commit()
+            print("✅ Sample database table created!")
+            
+            # Query and display data (compact dtypes: department becomes
+            # a categorical, the integers shrink to the smallest type)
+            df = read_query("SELECT * FROM employees", conn=conn,
+                            compact=True)
+            print("\n📊 Employee Data:")
+            print(df)
         
-        # Insert sample data
-        cursor.execute("""
-            INSERT INTO employees (name, department, salary) 
-            VALUES 
-                ('Alice Johnson', 'Engineering', 75000),
-                ('Bob Smith', 'Marketing', 65000),
-                ('Carol Davis', 'Engineering', 85000)
-            ON CONFLICT DO NOTHING;
-        """)
-        
-        conn.commit()
-        print("✅ Sample database table created!")
-        
-        # Query and display data
-        df = pd.read_sql("SELECT * FROM employees", conn)
-        print("\n📊 Employee Data:")
-        print(df)
-        
-        conn.close()
         return df
         
     except Exception as e:
@@ -60,14 +60,14 @@ def test_database_connection():
 def analyze_sample_data():
     """Analyze the sample CSV file"""
     try:
-        # Load sample CSV
-        df = pd.read_csv('/workspaces/data-management-classroom/data/raw/sample.csv')
+        # Stream the CSV in chunks so large raw drops don't exhaust memory
+        stats = scan_csv(os.path.join(RAW_DIR, 'sample.csv'))
         print("\n📈 Sample Data Analysis:")
-        print(f"Dataset shape: {df.shape}")
-        print(f"Average salary: ${df['salary'].mean():,.2f}")
-        print(f"Departments: {', '.join(df['department'].unique())}")
+        print(f"Rows: {stats.rows}")
+        print(f"Average salary: ${stats.mean('salary'):,.2f}")
+        print(f"Departments: {', '.join(stats.counts['department'])}")
         
-        return df
+        return stats
         
     except Exception as e:
         print(f"❌ Data analysis error: {e}")
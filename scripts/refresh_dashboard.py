@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Refresh scheduler for the materialized dashboard views.
+
+Calls dashboard.refresh_dashboard() on an interval. The function compares
+the current change token of the sample schemas (row counters plus
+relfilenodes, so a TRUNCATE counts too) with the one recorded at the last
+refresh and only runs REFRESH MATERIALIZED VIEW CONCURRENTLY when the
+data actually changed, so readers are never blocked and idle periods cost
+a single catalog query.
+
+Usage:
+    python scripts/refresh_dashboard.py --once           # refresh if stale
+    python scripts/refresh_dashboard.py --once --force   # always refresh
+    python scripts/refresh_dashboard.py --interval 300   # run forever
+"""
+
+import argparse
+import sys
+import time
+
+import psycopg2
+
+import db
+
+
+def refresh(conn, force=False):
+    """Refresh stale dashboard views and return [(view_name, ms), ...]."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT view_name, duration_ms "
+                       "FROM dashboard.refresh_dashboard(%s)", (force,))
+        refreshed = cursor.fetchall()
+    conn.commit()
+    return refreshed
+
+
+def run_once(conn, force=False):
+    """Run one refresh pass and print what happened."""
+    started = time.perf_counter()
+    refreshed = refresh(conn, force)
+    elapsed = (time.perf_counter() - started) * 1000
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    if refreshed:
+        for view_name, duration_ms in refreshed:
+            print(f"{stamp} ✅ Refreshed dashboard.{view_name} "
+                  f"in {float(duration_ms):.1f} ms")
+    else:
+        print(f"{stamp} 💤 Dashboard up to date ({elapsed:.1f} ms check)")
+    return refreshed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Refresh the materialized dashboard views")
+    parser.add_argument('--interval', type=float, default=300,
+                        help='seconds between checks (default: 300)')
+    parser.add_argument('--once', action='store_true',
+                        help='run a single check and exit')
+    parser.add_argument('--force', action='store_true',
+                        help='refresh even if no data changed')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+    overrides = db.overrides_from_args(args)
+
+    try:
+        if args.once:
+            with db.get_conn(**overrides) as conn:
+                run_once(conn, args.force)
+            return 0
+        print(f"🔄 Refreshing dashboard every {args.interval:g}s "
+              f"(Ctrl+C to stop)")
+        while True:
+            try:
+                with db.get_conn(**overrides) as conn:
+                    run_once(conn, args.force)
+            except psycopg2.Error as e:
+                print(f"❌ Refresh failed: {e}")
+            time.sleep(args.interval)
+    except psycopg2.Error as e:
+        print(f"❌ Database error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+        return 0
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,16 @@
 #!/bin/bash
 echo "🗄️ Setting up PostgreSQL for Codespace environment..."
 
+# Each step is timed as a telemetry span (see telemetry.sh)
+source "$(dirname "$0")/telemetry.sh"
+
 # Start PostgreSQL if not running
 echo "🚀 Starting PostgreSQL service..."
-sudo service postgresql start
+telemetry_span "start postgres" sudo service postgresql start
 
 # Configure trust authentication if not already done
 echo "🔧 Configuring PostgreSQL for passwordless local access..."
+telemetry_start "configure auth"
 if [ -f /etc/postgresql/*/main/pg_hba.conf ]; then
     PG_HBA=$(find /etc/postgresql -name pg_hba.conf | head -1)
     if ! grep -q "# Local connections without password for dev environment" "$PG_HBA"; then
@@ -18,13 +22,23 @@ if [ -f /etc/postgresql/*/main/pg_hba.conf ]; then
         echo "✅ PostgreSQL trust authentication already configured"
     fi
 fi
+telemetry_end "configure auth"
 
-# Wait for it to be ready
-sleep 3
+# Wait for it to be ready (pg_isready returns as soon as it accepts connections)
+telemetry_start "wait for postgres"
+for attempt in $(seq 1 30); do
+    pg_isready -h localhost -q && break
+    sleep 0.5
+done
+if pg_isready -h localhost -q; then
+    telemetry_end "wait for postgres"
+else
+    telemetry_end "wait for postgres" timeout
+fi
 
 # Create student user and database using psql directly (no sudo -u needed with trust auth)
 echo "👤 Creating student user and database..."
-psql -h localhost -U postgres -d postgres << 'DBEOF' || echo "⚠️ Database setup may need manual configuration"
+telemetry_span "create roles" psql -h localhost -U postgres -d postgres << 'DBEOF' || echo "⚠️ Database setup may need manual configuration"
 -- Create student user if it doesn't exist
 DO $$
 BEGIN
@@ -62,8 +76,33 @@ $$;
 \q
 DBEOF
 
+# Per-role statement/idle timeouts and memory limits (see governor.py)
+echo "🚦 Applying query limits to the student roles..."
+telemetry_start "query limits"
+# pipefail so a failing governor.py counts, ON_ERROR_STOP so a failing statement does
+if (set -o pipefail
+    python3 "$(dirname "$0")/governor.py" apply --sql \
+        | psql -q -v ON_ERROR_STOP=1 -h localhost -U postgres -d postgres); then
+    telemetry_end "query limits"
+else
+    telemetry_end "query limits" error
+    echo "⚠️ Query limits could not be applied"
+fi
+
+# Restore the sample databases from a snapshot (seconds), or load them
+# from databases/*.sql once and snapshot the result for next time
+if python3 -c "import psycopg2" 2>/dev/null; then
+    echo "📦 Restoring sample databases..."
+    telemetry_span "restore samples" python3 "$(dirname "$0")/snapshot.py" ensure \
+        || echo "⚠️ Sample databases could not be restored"
+fi
+
 echo "✅ Database setup completed successfully!"
 echo ""
+echo "⏱️ Setup steps:"
+telemetry_summary
+telemetry_export
+echo ""
 echo "📊 Connection details:"
 echo "   Host: localhost"
 echo "   Port: 5432"
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Snapshot and restore of the fully loaded sample database.
+
+Replaying databases/*.sql takes minutes; copying a database that is
+already loaded takes seconds. Two kinds of snapshot are kept:
+
+- a template database (<dbname>_template) inside the cluster; restoring
+  or resetting a database is a CREATE DATABASE ... TEMPLATE file copy
+- a pg_dump directory-format dump under
+  ~/.cache/data-management-classroom/snapshots/, restored with parallel
+  pg_restore -j when the cluster itself was rebuilt and the template is gone
+
+Both are stamped with a checksum of databases/*.sql, so a snapshot is
+only used while it matches the SQL files. Loaded databases get the same
+stamp as their COMMENT.
+
+Commands:
+    status            show the checksum and which snapshots are fresh
+    create [--dump]   snapshot the loaded database (run right after loading)
+    restore           recreate the database from the freshest snapshot
+    ensure            for container start: restore if the database is
+                      missing, or load it from SQL and snapshot it
+    clone NAME        create (or reset) database NAME from the template
+
+Usage:
+    python scripts/snapshot.py create --dump
+    python scripts/snapshot.py ensure
+    python scripts/snapshot.py clone alice_db
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import bulk_load
+import db
+
+SNAPSHOT_DIR = os.environ.get(
+    'SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(db.CACHE_FILE), 'snapshots')
+)
+STAMP_PREFIX = 'snapshot:'
+MAINTENANCE_DBNAME = 'postgres'
+JOBS = min(os.cpu_count() or 1, 8)
+
+
+class LoadFailed(Exception):
+    """Some databases/*.sql files did not load cleanly."""
+
+
+def sql_checksum(databases_dir=bulk_load.DATABASES_DIR):
+    """SHA-256 over the names and contents of databases/*.sql."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(databases_dir, '*.sql'))):
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+
+def template_name(dbname):
+    return f'{dbname}_template'
+
+
+def dump_path(checksum):
+    return os.path.join(SNAPSHOT_DIR, checksum[:16])
+
+
+def maintenance_connection(params):
+    """Autocommit connection to the maintenance database (for CREATE DATABASE)."""
+    conn = psycopg2.connect(connect_timeout=db.CONNECT_TIMEOUT,
+                            options=db.MAINTENANCE_OPTIONS,
+                            **{**params, 'dbname': MAINTENANCE_DBNAME})
+    conn.autocommit = True
+    return conn
+
+
+def database_stamp(conn, dbname):
+    """Checksum stamped on a database, '' if unstamped, None if missing."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT coalesce(shobj_description(oid, 'pg_database'), '')
+            FROM pg_database WHERE datname = %s
+        """, (dbname,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    comment = row[0]
+    return comment[len(STAMP_PREFIX):] if comment.startswith(STAMP_PREFIX) else ''
+
+
+def stamp_database(conn, dbname, checksum):
+    with conn.cursor() as cursor:
+        cursor.execute(pgsql.SQL("COMMENT ON DATABASE {} IS %s").format(
+            pgsql.Identifier(dbname)), (STAMP_PREFIX + checksum,))
+
+
+def drop_database(conn, dbname):
+    """Drop a database, disconnecting anyone still using it."""
+    if database_stamp(conn, dbname) is None:
+        return
+    with conn.cursor() as cursor:
+        # Templates have to be turned back into plain databases first
+        cursor.execute(pgsql.SQL("ALTER DATABASE {} IS_TEMPLATE false").format(
+            pgsql.Identifier(dbname)))
+        cursor.execute("""
+            SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+            WHERE datname = %s AND pid <> pg_backend_pid()
+        """, (dbname,))
+        cursor.execute(pgsql.SQL("DROP DATABASE {}").format(
+            pgsql.Identifier(dbname)))
+
+
+def clone_database(conn, source, target, checksum, owner=None):
+    """Create (or replace) target as a file copy of source."""
+    drop_database(conn, target)
+    statement = pgsql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+        pgsql.Identifier(target), pgsql.Identifier(source))
+    if owner:
+        statement += pgsql.SQL(" OWNER {}").format(pgsql.Identifier(owner))
+    with conn.cursor() as cursor:
+        # Copying requires that nobody is connected to the source
+        cursor.execute("""
+            SELECT pg_terminate_backend(pid) FROM pg_stat_activity
+            WHERE datname = %s AND pid <> pg_backend_pid()
+        """, (source,))
+        cursor.execute(statement)
+    stamp_database(conn, target, checksum)
+
+
+def create_template(conn, dbname, checksum):
+    """Snapshot dbname into its template database."""
+    template = template_name(dbname)
+    clone_database(conn, dbname, template, checksum)
+    with conn.cursor() as cursor:
+        # A template nobody can connect to cannot drift from the snapshot
+        cursor.execute(pgsql.SQL(
+            "ALTER DATABASE {} WITH IS_TEMPLATE true ALLOW_CONNECTIONS false"
+        ).format(pgsql.Identifier(template)))
+
+
+def pg_env(params):
+    """Environment for pg_dump/pg_restore with the resolved credentials."""
+    env = dict(os.environ)
+    for var, key in db.ENV_PARAMS.items():
+        if params.get(key):
+            env[var] = str(params[key])
+    return env
+
+
+def create_dump(params, dbname, checksum, jobs=JOBS):
+    """pg_dump -Fd -j of dbname into the snapshot directory."""
+    path = dump_path(checksum)
+    temp_path = path + '.tmp'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    subprocess.run(['pg_dump', '-Fd', '-j', str(jobs), '-f', temp_path,
+                    '-d', dbname], env=pg_env(params), check=True)
+    with open(os.path.join(temp_path, 'snapshot.json'), 'w',
+              encoding='utf-8') as handle:
+        json.dump({'checksum': checksum, 'dbname': dbname,
+                   'created': time.strftime('%Y-%m-%dT%H:%M:%S')}, handle)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+    # Only the newest dump is useful; older ones match stale SQL files
+    for other in glob.glob(os.path.join(SNAPSHOT_DIR, '*')):
+        if other != path:
+            shutil.rmtree(other, ignore_errors=True)
+    return path
+
+
+def restore_dump(conn, params, dbname, checksum, jobs=JOBS):
+    """Recreate dbname from the dump with parallel pg_restore."""
+    drop_database(conn, dbname)
+    with conn.cursor() as cursor:
+        cursor.execute(pgsql.SQL("CREATE DATABASE {}").format(
+            pgsql.Identifier(dbname)))
+    subprocess.run(['pg_restore', '-j', str(jobs), '--no-owner',
+                    '-d', dbname, dump_path(checksum)],
+                   env=pg_env(params), check=True)
+    stamp_database(conn, dbname, checksum)
+
+
+def dump_is_fresh(checksum):
+    return os.path.exists(os.path.join(dump_path(checksum), 'snapshot.json'))
+
+
+def restore(conn, params, dbname, checksum, jobs=JOBS):
+    """
+    Recreate dbname from the freshest snapshot.
+
+    Returns 'template', 'dump', or None when no snapshot matches the
+    current SQL files. A dump restore also rebuilds the template, so the
+    next reset is a plain clone.
+    """
+    if database_stamp(conn, template_name(dbname)) == checksum:
+        clone_database(conn, template_name(dbname), dbname, checksum)
+        return 'template'
+    if dump_is_fresh(checksum):
+        restore_dump(conn, params, dbname, checksum, jobs)
+        create_template(conn, dbname, checksum)
+        return 'dump'
+    return None
+
+
+def load_from_sql(conn, params, dbname, checksum, jobs=None):
+    """
+    Create dbname and load every databases/*.sql file into it.
+
+    Raises LoadFailed when a file is missing or reported errors; a
+    database created here is dropped again rather than stamped, so the
+    next ensure loads it from scratch.
+    """
+    created = database_stamp(conn, dbname) is None
+    if created:
+        with conn.cursor() as cursor:
+            cursor.execute(pgsql.SQL("CREATE DATABASE {}").format(
+                pgsql.Identifier(dbname)))
+    names = bulk_load.INDEPENDENT_DATABASES + bulk_load.DEPENDENT_DATABASES
+    results, missing = bulk_load.bulk_load(names, {**params, 'dbname': dbname},
+                                           jobs)
+    failed = [result['name'] for result in results if result['errors']]
+    if failed or missing:
+        if created:
+            drop_database(conn, dbname)
+        raise LoadFailed(f"{', '.join(failed + missing)} did not load")
+    stamp_database(conn, dbname, checksum)
+    return results, missing
+
+
+def print_status(conn, dbname, checksum):
+    stamp = database_stamp(conn, dbname)
+    template_stamp = database_stamp(conn, template_name(dbname))
+
+    def describe(value):
+        if value is None:
+            return "missing"
+        if value == checksum:
+            return "✅ up to date"
+        return "⚠️ stale" if value else "⚠️ not stamped"
+
+    print(f"🔑 databases/*.sql checksum: {checksum[:16]}")
+    print(f"   {dbname}: {describe(stamp)}")
+    print(f"   {template_name(dbname)}: {describe(template_stamp)}")
+    print(f"   dump {dump_path(checksum)}: "
+          f"{'✅ up to date' if dump_is_fresh(checksum) else 'missing'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Snapshot and restore the loaded sample database")
+    parser.add_argument('command',
+                        choices=['status', 'create', 'restore', 'ensure',
+                                 'clone'])
+    parser.add_argument('name', nargs='?',
+                        help='database to create with clone')
+    parser.add_argument('--dump', action='store_true',
+                        help='create: also write a pg_dump snapshot')
+    parser.add_argument('--jobs', '-j', type=int, default=JOBS,
+                        help=f'parallel pg_dump/pg_restore jobs '
+                             f'(default: {JOBS})')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    dbname = args.dbname
+    try:
+        params = db.params_from_args(args)
+        conn = maintenance_connection(params)
+    except psycopg2.Error as e:
+        print(f"❌ Cannot connect to database: {e}")
+        return 1
+
+    checksum = sql_checksum()
+    started = time.perf_counter()
+    try:
+        if args.command == 'status':
+            print_status(conn, dbname, checksum)
+            return 0
+
+        if args.command == 'create':
+            if database_stamp(conn, dbname) is None:
+                print(f"❌ Database {dbname} does not exist")
+                return 1
+            stamp_database(conn, dbname, checksum)
+            create_template(conn, dbname, checksum)
+            print(f"✅ Template {template_name(dbname)} created")
+            if args.dump:
+                path = create_dump(params, dbname, checksum, args.jobs)
+                print(f"✅ Dump written to {path}")
+
+        elif args.command == 'restore':
+            source = restore(conn, params, dbname, checksum, args.jobs)
+            if source is None:
+                print("❌ No snapshot matches databases/*.sql; load the "
+                      "databases and run 'snapshot.py create' first")
+                return 2
+            print(f"✅ {dbname} restored from {source}")
+
+        elif args.command == 'clone':
+            if not args.name:
+                parser.error("clone needs the name of the database to create")
+            if database_stamp(conn, template_name(dbname)) != checksum:
+                print(f"❌ {template_name(dbname)} is missing or stale; run "
+                      f"'snapshot.py restore' or 'create' first")
+                return 2
+            clone_database(conn, template_name(dbname), args.name, checksum)
+            print(f"✅ {args.name} cloned from {template_name(dbname)}")
+
+        elif args.command == 'ensure':
+            stamp = database_stamp(conn, dbname)
+            if stamp == checksum:
+                print(f"✅ {dbname} is up to date")
+                if database_stamp(conn, template_name(dbname)) != checksum:
+                    create_template(conn, dbname, checksum)
+                    print(f"✅ Template {template_name(dbname)} created")
+            elif stamp is not None:
+                # Never replace a database someone may have worked in
+                print(f"⚠️ {dbname} exists but does not match databases/*.sql")
+                print("💡 Run 'python scripts/snapshot.py restore' to reset it")
+            else:
+                source = restore(conn, params, dbname, checksum, args.jobs)
+                if source:
+                    print(f"✅ {dbname} restored from {source}")
+                else:
+                    print(f"📦 No snapshot yet, loading {dbname} from SQL...")
+                    load_from_sql(conn, params, dbname, checksum)
+                    create_template(conn, dbname, checksum)
+                    create_dump(params, dbname, checksum, args.jobs)
+                    print(f"✅ {dbname} loaded and snapshotted")
+    except (psycopg2.Error, subprocess.CalledProcessError, OSError,
+            LoadFailed) as e:
+        print(f"❌ Snapshot {args.command} failed: {e}")
+        return 1
+    finally:
+        conn.close()
+
+    print(f"⏱️ Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Query profiling for notebooks: a %%sql cell magic and the API behind it.
+
+pd.read_sql() gives a DataFrame and nothing else, so a slow query in a
+notebook is a mystery. profile_query() runs the query through the shared
+helpers (db.py connections, query.read_query()) and records
+
+- wall time, rows, columns and the size of the result in memory
+- optionally the EXPLAIN (ANALYZE, BUFFERS) plan, summarized as one line
+  per plan node with warnings for large sequential scans, row estimates
+  that are off by EST_FACTOR or more, and sorts or hashes spilling to disk
+
+Every profile is kept in the session history (session_report() ranks this
+kernel's queries), and hot_queries() / user_report() roll up
+pg_stat_statements across every session on the server, so instructors can
+see which workloads cost the most.
+
+pg_stat_statements has to be preloaded (shared_preload_libraries, then a
+restart) and created in the database; `python scripts/sql_profile.py
+setup` checks both. Other users' query texts are only visible to
+superusers and members of pg_read_all_stats.
+
+Usage in a notebook:
+    %load_ext sql_profile
+
+    %%sql --explain
+    SELECT * FROM sakila.rental WHERE rental_date >= '2005-08-01'
+
+    %%sql rentals
+    SELECT ...                     # stores the DataFrame in `rentals`
+
+    %sql_report                    # this session's queries, slowest first
+
+From Python:
+    from sql_profile import profile_query, hot_queries
+    profile = profile_query("SELECT ...", explain=True)
+    print(profile.report())
+    hot_queries(limit=10)
+
+From the shell:
+    python scripts/sql_profile.py explain "SELECT ..."
+    python scripts/sql_profile.py hot --limit 20
+    python scripts/sql_profile.py users
+"""
+
+import argparse
+import json
+import sys
+import time
+from contextlib import ExitStack
+
+import pandas as pd
+import psycopg2
+
+import db
+import query
+import query_cache
+
+# Row estimates off by this factor (either way) are flagged
+EST_FACTOR = 10
+# Sequential scans reading fewer rows than this are not worth a warning
+SEQ_SCAN_ROWS = 10_000
+HISTORY_SIZE = 500
+HOT_LIMIT = 20
+PLAN_LINES = 25
+
+EXPLAIN_SQL = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) "
+
+# pg_stat_statements renamed total_time & co. in PostgreSQL 13
+STATEMENT_COLUMNS = {
+    True: ('total_exec_time', 'mean_exec_time'),
+    False: ('total_time', 'mean_time'),
+}
+
+HOT_QUERIES_SQL = """
+    SELECT pg_get_userbyid(s.userid) AS username,
+           d.datname AS database,
+           s.calls,
+           round(s.{total}::numeric, 1) AS total_ms,
+           round(s.{mean}::numeric, 2) AS mean_ms,
+           s.rows,
+           s.shared_blks_hit + s.shared_blks_read AS buffers,
+           round(100.0 * s.shared_blks_hit
+                 / nullif(s.shared_blks_hit + s.shared_blks_read, 0), 1)
+               AS hit_pct,
+           s.temp_blks_written,
+           round((100.0 * s.{total} / sum(s.{total}) OVER ())::numeric, 1)
+               AS pct_of_total,
+           left(regexp_replace(s.query, '\\s+', ' ', 'g'), %(width)s) AS query
+    FROM pg_stat_statements s
+    LEFT JOIN pg_database d ON d.oid = s.dbid
+    WHERE (%(user)s::text IS NULL OR pg_get_userbyid(s.userid) = %(user)s)
+    ORDER BY s.{total} DESC
+    LIMIT %(limit)s
+"""
+
+USER_REPORT_SQL = """
+    WITH ranked AS (
+        SELECT s.*, row_number() OVER (PARTITION BY s.userid
+                                       ORDER BY s.{total} DESC) AS rank
+        FROM pg_stat_statements s
+    )
+    SELECT pg_get_userbyid(userid) AS username,
+           count(*) AS statements,
+           sum(calls) AS calls,
+           round(sum({total})::numeric, 1) AS total_ms,
+           round((100.0 * sum({total}) / sum(sum({total})) OVER ())::numeric, 1)
+               AS pct_of_total,
+           sum(rows) AS rows,
+           sum(temp_blks_written) AS temp_blks_written,
+           left(regexp_replace(max(query) FILTER (WHERE rank = 1), '\\s+', ' ',
+                               'g'), %(width)s) AS top_query
+    FROM ranked
+    GROUP BY userid
+    ORDER BY sum({total}) DESC
+"""
+
+_history = []
+
+
+class StatementsUnavailable(RuntimeError):
+    """pg_stat_statements is not preloaded or not created."""
+
+
+class QueryProfile:
+    """One profiled query: result, timings and (optionally) its plan."""
+
+    def __init__(self, sql, df, seconds, rows, plan=None):
+        self.sql = sql
+        self.df = df
+        self.seconds = seconds
+        self.rows = rows
+        self.bytes = (int(df.memory_usage(deep=True).sum())
+                      if df is not None else 0)
+        self.plan = plan
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    @property
+    def warnings(self):
+        return plan_warnings(self.plan['Plan']) if self.plan else []
+
+    def to_dict(self):
+        """JSON-serializable summary (without the result rows)."""
+        summary = {
+            'sql': self.sql,
+            'started_at': self.started_at,
+            'seconds': round(self.seconds, 4),
+            'rows': self.rows,
+            'columns': 0 if self.df is None else len(self.df.columns),
+            'bytes': self.bytes,
+            'warnings': self.warnings,
+        }
+        if self.plan:
+            summary.update(planning_ms=self.plan.get('Planning Time'),
+                           execution_ms=self.plan.get('Execution Time'))
+        return summary
+
+    def report(self, max_lines=PLAN_LINES):
+        """Timing line, plan summary and warnings as text."""
+        lines = [f"⏱️ {self.seconds * 1000:,.1f} ms, {self.rows:,} rows, "
+                 f"{_size(self.bytes)}"]
+        if self.plan:
+            lines.append(f"   planning {self.plan['Planning Time']:.2f} ms, "
+                         f"execution {self.plan['Execution Time']:.2f} ms")
+            lines += summarize_plan(self.plan['Plan'], max_lines)
+        lines += [f"⚠️ {warning}" for warning in self.warnings]
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return (f"<QueryProfile {self.seconds * 1000:.1f} ms, {self.rows} rows, "
+                f"{len(self.warnings)} warning(s)>")
+
+
+def _size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:,.0f} {unit}" if unit == 'B' else f"{size:,.1f} {unit}"
+        size /= 1024
+    return f"{size:,.1f} GB"
+
+
+def _actual_rows(node):
+    return node.get('Actual Rows', 0) * node.get('Actual Loops', 1)
+
+
+def _walk(node, depth=0):
+    yield node, depth
+    for child in node.get('Plans', []):
+        yield from _walk(child, depth + 1)
+
+
+def _label(node):
+    label = node['Node Type']
+    if 'Relation Name' in node:
+        label += f" on {node['Relation Name']}"
+    if 'Index Name' in node:
+        label += f" using {node['Index Name']}"
+    return label
+
+
+def _misestimated(actual, estimated):
+    """True if the estimate is EST_FACTOR off on a non-trivial row count."""
+    if max(actual, estimated) < 100:
+        return False
+    return max(actual, 1) / max(estimated, 1) >= EST_FACTOR \
+        or max(estimated, 1) / max(actual, 1) >= EST_FACTOR
+
+
+def plan_warnings(plan):
+    """Warnings for one JSON plan tree (the 'Plan' of EXPLAIN FORMAT JSON)."""
+    warnings = []
+    for node, _ in _walk(plan):
+        loops = node.get('Actual Loops', 1)
+        actual = _actual_rows(node)
+        estimated = node.get('Plan Rows', 0) * loops
+        read = actual + node.get('Rows Removed by Filter', 0) * loops
+        if node['Node Type'] == 'Seq Scan' and read >= SEQ_SCAN_ROWS:
+            warning = f"{_label(node)} read {read:,} rows"
+            if node.get('Filter'):
+                warning += (f", kept {actual:,} ({node['Filter']}); an index "
+                            f"may help")
+            warnings.append(warning)
+        if loops and _misestimated(actual, estimated):
+            warnings.append(f"{_label(node)}: estimated {estimated:,.0f} rows, "
+                            f"got {actual:,} (stale statistics? run ANALYZE)")
+        if node.get('Sort Space Type') == 'Disk' or (
+                node.get('Temp Written Blocks', 0)
+                and node['Node Type'] in ('Sort', 'Hash', 'Aggregate')):
+            warnings.append(f"{_label(node)} spilled to disk; more work_mem "
+                            f"or fewer rows would keep it in memory")
+    return warnings
+
+
+def summarize_plan(plan, max_lines=PLAN_LINES):
+    """One indented line per plan node: rows, estimate, time, buffers."""
+    lines = []
+    for node, depth in _walk(plan):
+        if len(lines) == max_lines:
+            lines.append("   ...")
+            break
+        actual = _actual_rows(node)
+        buffers = node.get('Shared Hit Blocks', 0) + node.get('Shared Read Blocks', 0)
+        line = (f"   {'  ' * depth}{'-> ' if depth else ''}{_label(node)}  "
+                f"rows {actual:,} (est {node.get('Plan Rows', 0):,})  "
+                f"{node.get('Actual Total Time', 0):,.2f} ms")
+        if buffers:
+            line += f"  {buffers:,} buf"
+        lines.append(line)
+    return lines
+
+
+def _is_query(sql):
+    normalized = query_cache.normalize_sql(sql)
+    return query_cache.is_read_only(normalized) and ';' not in normalized
+
+
+def profile_query(sql, params=None, explain=False, max_rows=None, conn=None,
+                  compact=False, **overrides):
+    """
+    Run sql and return a QueryProfile (the DataFrame is profile.df).
+
+    explain=True first runs EXPLAIN (ANALYZE, BUFFERS) in a transaction
+    that is rolled back, so data-modifying statements are not applied
+    twice; the plan's timings then come from that extra run. compact=True
+    builds the DataFrame with compact dtypes (see compact.py). Other
+    statements than queries are run (and committed) on a plain cursor.
+    Uses conn if given, otherwise a pooled connection from
+    db.get_conn(**overrides).
+    """
+    plan = None
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(db.get_conn(**overrides))
+        if explain:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(EXPLAIN_SQL + sql, params)
+                    plan = cursor.fetchone()[0][0]
+            finally:
+                conn.rollback()
+
+        started = time.perf_counter()
+        if _is_query(sql):
+            df = query.read_query(sql, params, max_rows=max_rows, conn=conn,
+                                  compact=compact)
+            conn.rollback()
+            rows = len(df)
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                df = None
+                if cursor.description:
+                    df = pd.DataFrame.from_records(
+                        cursor.fetchall(),
+                        columns=[column.name for column in cursor.description])
+                rows = cursor.rowcount
+            conn.commit()
+        seconds = time.perf_counter() - started
+
+    profile = QueryProfile(sql, df, seconds, rows, plan)
+    _history.append(profile)
+    del _history[:-HISTORY_SIZE]
+    return profile
+
+
+def history():
+    """The profiles of this session, oldest first."""
+    return list(_history)
+
+
+def session_report(profiles=None):
+    """This session's queries grouped by normalized text, slowest first."""
+    profiles = _history if profiles is None else profiles
+    columns = ['query', 'calls', 'total_ms', 'mean_ms', 'max_ms', 'rows',
+               'bytes', 'warnings']
+    groups = {}
+    for profile in profiles:
+        key = query_cache.normalize_sql(profile.sql)
+        entry = groups.setdefault(key, {
+            'query': ' '.join(profile.sql.split())[:120], 'calls': 0,
+            'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'bytes': 0,
+            'warnings': 0})
+        milliseconds = profile.seconds * 1000
+        entry['calls'] += 1
+        entry['total_ms'] += milliseconds
+        entry['max_ms'] = max(entry['max_ms'], milliseconds)
+        entry['rows'] += max(profile.rows, 0)
+        entry['bytes'] += profile.bytes
+        entry['warnings'] = max(entry['warnings'], len(profile.warnings))
+    for entry in groups.values():
+        entry['mean_ms'] = entry['total_ms'] / entry['calls']
+    df = pd.DataFrame(list(groups.values()), columns=columns)
+    return df.sort_values('total_ms', ascending=False, ignore_index=True).round(2)
+
+
+def _statements_query(conn, template):
+    """template with the pg_stat_statements columns of this server."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension "
+                       "WHERE extname = 'pg_stat_statements'")
+        if not cursor.fetchone():
+            raise StatementsUnavailable(
+                "pg_stat_statements is not created in this database "
+                "(python scripts/sql_profile.py setup)")
+    total, mean = STATEMENT_COLUMNS[conn.server_version >= 130000]
+    return template.format(total=total, mean=mean)
+
+
+def _statements_frame(sql, params, conn=None, **overrides):
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(db.get_conn(**overrides))
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(_statements_query(conn, sql), params)
+                columns = [column.name for column in cursor.description]
+                df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+        except psycopg2.Error as e:
+            # object_not_in_prerequisite_state: created but not preloaded
+            if e.pgcode != '55000':
+                raise
+            raise StatementsUnavailable(
+                "pg_stat_statements is not in shared_preload_libraries "
+                "(python scripts/sql_profile.py setup)") from e
+        finally:
+            conn.rollback()
+    return df
+
+
+def hot_queries(limit=HOT_LIMIT, user=None, width=200, conn=None,
+                **overrides):
+    """
+    The statements with the most total execution time on the server.
+
+    One row per statement and user, with calls, total and mean time,
+    rows, buffers and cache hit rate, temp blocks written and share of
+    all statement time; user limits the list to one role.
+    """
+    return _statements_frame(HOT_QUERIES_SQL, {
+        'limit': limit, 'user': user, 'width': width}, conn=conn, **overrides)
+
+
+def user_report(width=120, conn=None, **overrides):
+    """pg_stat_statements rolled up per user, most expensive first."""
+    return _statements_frame(USER_REPORT_SQL, {'width': width}, conn=conn,
+                             **overrides)
+
+
+def reset_statements(conn=None, **overrides):
+    """Empty pg_stat_statements (superuser, or granted EXECUTE)."""
+    with ExitStack() as stack:
+        if conn is None:
+            conn = stack.enter_context(db.get_conn(**overrides))
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_stat_statements_reset()")
+        conn.commit()
+
+
+# IPython extension ------------------------------------------------------
+
+def _magic_parser():
+    parser = argparse.ArgumentParser(prog='%%sql', add_help=False)
+    parser.add_argument('variable', nargs='?',
+                        help='store the DataFrame in this variable')
+    parser.add_argument('--explain', '-e', action='store_true',
+                        help='also capture EXPLAIN (ANALYZE, BUFFERS)')
+    parser.add_argument('--max-rows', type=int)
+    parser.add_argument('--compact', '-c', action='store_true',
+                        help='compact dtypes (categoricals, small integers)')
+    parser.add_argument('--quiet', '-q', action='store_true',
+                        help="don't print the profile")
+    parser.add_argument('--profile', metavar='NAME',
+                        help='store the QueryProfile in this variable')
+    db.add_connection_args(parser)
+    return parser
+
+
+def sql_magic(line, cell, user_ns=None):
+    """%%sql [variable] [--explain] [--compact] [--max-rows N] [--profile NAME]"""
+    args = _magic_parser().parse_args(line.split())
+    profile = profile_query(cell, explain=args.explain, max_rows=args.max_rows,
+                            compact=args.compact,
+                            **db.overrides_from_args(args))
+    if user_ns is not None:
+        if args.variable:
+            user_ns[args.variable] = profile.df
+        if args.profile:
+            user_ns[args.profile] = profile
+    if not args.quiet:
+        print(profile.report())
+    return None if args.variable else profile.df
+
+
+def load_ipython_extension(ipython):
+    """%load_ext sql_profile: registers %%sql and %sql_report."""
+
+    def cell_magic(line, cell):
+        try:
+            return sql_magic(line, cell, ipython.user_ns)
+        except psycopg2.Error as e:
+            print(f"❌ {str(e).strip()}")
+        except SystemExit:
+            _magic_parser().print_usage()
+
+    def report_magic(line):
+        if line.strip() == 'users':
+            return user_report()
+        if line.strip() == 'hot':
+            return hot_queries()
+        return session_report()
+
+    ipython.register_magic_function(cell_magic, 'cell', 'sql')
+    ipython.register_magic_function(report_magic, 'line', 'sql_report')
+
+
+# Command line -----------------------------------------------------------
+
+def setup(conn):
+    """Check (and create) pg_stat_statements; False if not possible."""
+    with conn.cursor() as cursor:
+        cursor.execute("SHOW shared_preload_libraries")
+        libraries = cursor.fetchone()[0]
+        if 'pg_stat_statements' not in libraries:
+            print(f"❌ shared_preload_libraries is '{libraries}'; "
+                  f"as a superuser run")
+            print("   ALTER SYSTEM SET shared_preload_libraries = "
+                  "'pg_stat_statements';")
+            print("   and restart PostgreSQL (sudo service postgresql restart)")
+            return False
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+        conn.commit()
+    print("✅ pg_stat_statements is collecting statistics")
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Profile queries and report the hot ones")
+    parser.add_argument('command',
+                        choices=['explain', 'hot', 'users', 'setup', 'reset'])
+    parser.add_argument('sql', nargs='?', help='query to profile (explain)')
+    parser.add_argument('--user', help='hot: only statements of this role')
+    parser.add_argument('--limit', type=int, default=HOT_LIMIT,
+                        help=f'hot: statements to list (default: {HOT_LIMIT})')
+    parser.add_argument('--json', action='store_true',
+                        help='print the result as JSON')
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+    overrides = db.overrides_from_args(args)
+
+    try:
+        if args.command == 'setup':
+            conn = db.connect(**overrides)
+            try:
+                return 0 if setup(conn) else 1
+            finally:
+                conn.close()
+        if args.command == 'reset':
+            reset_statements(**overrides)
+            print("✅ pg_stat_statements reset")
+            return 0
+        if args.command == 'explain':
+            if not args.sql:
+                parser.error('explain needs a query')
+            profile = profile_query(args.sql, explain=True, **overrides)
+            if args.json:
+                print(json.dumps({**profile.to_dict(), 'plan': profile.plan},
+                                 indent=2, default=str))
+            else:
+                print(profile.report(max_lines=100))
+            return 0
+        if args.command == 'hot':
+            df = hot_queries(args.limit, args.user, **overrides)
+        else:
+            df = user_report(**overrides)
+        if args.json:
+            print(df.to_json(orient='records', indent=2))
+        elif df.empty:
+            print("ℹ️ No statements recorded yet")
+        else:
+            print(df.to_string(index=False))
+        return 0
+    except StatementsUnavailable as e:
+        print(f"❌ {e}")
+        return 1
+    except psycopg2.Error as e:
+        print(f"❌ Query failed: {str(e).strip()}")
+        return 1
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Structured timing telemetry for the setup and health-check scripts.
+
+Every timed step is a span, appended as one JSON line to the telemetry log
+(~/.cache/data-management-classroom/telemetry.jsonl, or
+CLASSROOM_TELEMETRY_FILE):
+
+    {"ts": "2025-01-30T09:12:03.412+00:00", "run": "1738228323-4121",
+     "host": "codespace-abc", "script": "post-start.sh", "span": "database",
+     "duration_ms": 2310, "outcome": "ok"}
+
+- bash scripts source telemetry.sh and wrap steps in telemetry_span (or
+  telemetry_start/telemetry_end); it writes the same lines without
+  starting Python
+- Python scripts use span() as a context manager, or record() for
+  durations they measured themselves
+- all spans of one container start share a run id: the first script
+  exports CLASSROOM_RUN_ID and everything it starts inherits it
+
+`report` ranks the slowest spans across runs; logs from many containers
+can be passed together (files or directories of *.jsonl). `prometheus`
+writes a node_exporter textfile (classroom_telemetry.prom) with the last
+duration, a duration summary and the failure count of every span; the
+bash helpers refresh it after each script when
+CLASSROOM_PROMETHEUS_TEXTFILE_DIR is set.
+
+Usage:
+    from telemetry import span
+
+    with span('load sakila', script='bulk_load.py', rows=16044):
+        ...
+
+    python scripts/telemetry.py report
+    python scripts/telemetry.py report logs/ --by max --top 10 --since 7
+    python scripts/telemetry.py record "docker pull" --ms 5400 --outcome ok
+    python scripts/telemetry.py prometheus --textfile-dir /var/lib/node_exporter
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+CACHE_DIR = os.environ.get('CLASSROOM_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'data-management-classroom')
+TELEMETRY_FILE = os.environ.get('CLASSROOM_TELEMETRY_FILE') or os.path.join(
+    CACHE_DIR, 'telemetry.jsonl')
+TEXTFILE_NAME = 'classroom_telemetry.prom'
+OUTCOMES = ('ok', 'warning', 'error', 'timeout', 'skipped')
+RANK_BY = ('p50', 'p95', 'max', 'total')
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def run_id():
+    """The run id shared by every span of one start, set on first use."""
+    if not os.environ.get('CLASSROOM_RUN_ID'):
+        os.environ['CLASSROOM_RUN_ID'] = f'{int(time.time())}-{os.getpid()}'
+    return os.environ['CLASSROOM_RUN_ID']
+
+
+def host():
+    return os.environ.get('CODESPACE_NAME') or socket.gethostname()
+
+
+def script_name():
+    return os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+
+
+def record(name, duration_ms, outcome='ok', script=None, started=None,
+           path=None, **attrs):
+    """Append one span; telemetry never makes the caller fail."""
+    if started is None:
+        started = time.time() - duration_ms / 1000
+    entry = {
+        'ts': datetime.fromtimestamp(started, timezone.utc)
+                      .isoformat(timespec='milliseconds'),
+        'run': run_id(),
+        'host': host(),
+        'script': script or script_name(),
+        'span': name,
+        'duration_ms': round(duration_ms, 1),
+        'outcome': outcome,
+    }
+    if attrs:
+        entry['attrs'] = attrs
+    path = path or TELEMETRY_FILE
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One write() of one line: concurrent writers don't interleave
+        with open(path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(entry, default=str) + '\n')
+    except OSError:
+        pass
+    return entry
+
+
+@contextmanager
+def span(name, script=None, **attrs):
+    """
+    Time the block as a span. The outcome is 'error' if it raises; the
+    yielded dict can set another outcome or add attributes.
+    """
+    state = {'outcome': 'ok', 'attrs': dict(attrs)}
+    started = time.time()
+    clock = time.perf_counter()
+    try:
+        yield state
+    except BaseException:
+        state['outcome'] = 'error'
+        raise
+    finally:
+        record(name, (time.perf_counter() - clock) * 1000, state['outcome'],
+               script=script, started=started, **state['attrs'])
+
+
+def log_files(paths):
+    """The telemetry logs named by files or directories (of *.jsonl)."""
+    files = []
+    for path in paths or [TELEMETRY_FILE]:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '**', '*.jsonl'),
+                                          recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def read_spans(paths=None, since=None):
+    """Spans from the logs, skipping lines that don't parse."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=since)
+              if since else None)
+    for path in log_files(paths):
+        try:
+            handle = open(path, encoding='utf-8')
+        except OSError:
+            continue
+        with handle:
+            for line in handle:
+                try:
+                    entry = json.loads(line)
+                    if cutoff and datetime.fromisoformat(entry['ts']) < cutoff:
+                        continue
+                    float(entry['duration_ms'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                yield entry
+
+
+def percentile(values, fraction):
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def aggregate(spans):
+    """
+    {(script, span): stats} over all runs.
+
+    Stats hold runs, hosts, failures (outcome error or timeout), p50/p95/max
+    and total in ms, the last duration and when it ran.
+    """
+    groups = {}
+    for entry in spans:
+        key = (entry.get('script', '?'), entry['span'])
+        groups.setdefault(key, []).append(entry)
+    stats = {}
+    for key, entries in groups.items():
+        durations = [float(entry['duration_ms']) for entry in entries]
+        last = max(entries, key=lambda entry: entry['ts'])
+        stats[key] = {
+            'runs': len(entries),
+            'hosts': len({entry.get('host') for entry in entries}),
+            'failures': sum(entry.get('outcome') in ('error', 'timeout')
+                            for entry in entries),
+            'p50': percentile(durations, 0.5),
+            'p95': percentile(durations, 0.95),
+            'max': max(durations),
+            'total': sum(durations),
+            'last': float(last['duration_ms']),
+            'last_ts': last['ts'],
+            'durations': durations,
+        }
+    return stats
+
+
+def ranked(stats, by='p95', top=None, script=None):
+    rows = [(key, value) for key, value in stats.items()
+            if script is None or key[0] == script]
+    rows.sort(key=lambda item: item[1][by], reverse=True)
+    return rows[:top] if top else rows
+
+
+def print_report(rows, by, runs):
+    if not rows:
+        print("   (no spans recorded)")
+        return
+    # A script's 'total' span already covers its phases: leave it out of
+    # the shares, or every phase would show about half its real share
+    phases_total = sum(value['total'] for (_, name), value in rows
+                       if name != 'total') or 1
+    print(f"   {'script':<22} {'span':<26} {'runs':>5} {'fail':>5} "
+          f"{'p50':>9} {'p95':>9} {'max':>9} {'share':>6}")
+    for (script, name), value in rows:
+        marker = '⚠️' if value['failures'] else '  '
+        share = ('' if name == 'total'
+                 else f"{value['total'] / phases_total:.1%}")
+        print(f"   {script[:22]:<22} {name[:26]:<26} {value['runs']:>5} "
+              f"{value['failures']:>5} {value['p50'] / 1000:>8.2f}s "
+              f"{value['p95'] / 1000:>8.2f}s {value['max'] / 1000:>8.2f}s "
+              f"{share:>6} {marker}")
+    print(f"\n   ranked by {by} over {runs} run(s)")
+
+
+def label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(stats):
+    """The stats in the Prometheus text exposition format."""
+    lines = [
+        '# HELP classroom_span_last_duration_seconds Duration of the most '
+        'recent run of a setup/check span.',
+        '# TYPE classroom_span_last_duration_seconds gauge',
+    ]
+    metrics = {'last': [], 'summary': [], 'failures': [], 'timestamp': []}
+    for (script, name), value in sorted(stats.items()):
+        labels = f'script="{label(script)}",span="{label(name)}"'
+        metrics['last'].append(
+            f'classroom_span_last_duration_seconds{{{labels}}} '
+            f'{value["last"] / 1000:.3f}')
+        for quantile in QUANTILES:
+            metrics['summary'].append(
+                f'classroom_span_duration_seconds{{{labels},'
+                f'quantile="{quantile}"}} '
+                f'{percentile(value["durations"], quantile) / 1000:.3f}')
+        metrics['summary'].append(
+            f'classroom_span_duration_seconds_sum{{{labels}}} '
+            f'{value["total"] / 1000:.3f}')
+        metrics['summary'].append(
+            f'classroom_span_duration_seconds_count{{{labels}}} {value["runs"]}')
+        metrics['failures'].append(
+            f'classroom_span_failures_total{{{labels}}} {value["failures"]}')
+        metrics['timestamp'].append(
+            f'classroom_span_last_run_timestamp_seconds{{{labels}}} '
+            f'{datetime.fromisoformat(value["last_ts"]).timestamp():.0f}')
+    lines += metrics['last']
+    lines += ['# HELP classroom_span_duration_seconds Span durations in the '
+              'telemetry log.',
+              '# TYPE classroom_span_duration_seconds summary']
+    lines += metrics['summary']
+    lines += ['# HELP classroom_span_failures_total Span runs that ended in '
+              'an error or timeout.',
+              '# TYPE classroom_span_failures_total counter']
+    lines += metrics['failures']
+    lines += ['# HELP classroom_span_last_run_timestamp_seconds When the span '
+              'last ran.',
+              '# TYPE classroom_span_last_run_timestamp_seconds gauge']
+    lines += metrics['timestamp']
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(stats, directory):
+    """
+    Write classroom_telemetry.prom atomically (node_exporter must never
+    read a half-written file).
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, TEXTFILE_NAME)
+    partial = f'{path}.{os.getpid()}.tmp'
+    with open(partial, 'w', encoding='utf-8') as handle:
+        handle.write(prometheus_text(stats))
+    os.replace(partial, path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Timing telemetry for the setup and check scripts")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='append one span')
+    record_parser.add_argument('span')
+    record_parser.add_argument('--ms', type=float, required=True,
+                               help='duration in milliseconds')
+    record_parser.add_argument('--outcome', choices=OUTCOMES, default='ok')
+    record_parser.add_argument('--script', help='script the span belongs to')
+
+    report_parser = commands.add_parser('report', help='rank the slowest spans')
+    prom_parser = commands.add_parser('prometheus',
+                                      help='write a node_exporter textfile')
+    for sub in (report_parser, prom_parser):
+        sub.add_argument('logs', nargs='*',
+                         help=f'telemetry logs or directories '
+                              f'(default: {TELEMETRY_FILE})')
+        sub.add_argument('--since', type=float, metavar='DAYS',
+                         help='only spans from the last DAYS days')
+    report_parser.add_argument('--by', choices=RANK_BY, default='p95',
+                               help='ranking statistic (default: p95)')
+    report_parser.add_argument('--top', type=int, default=20,
+                               help='spans to show (default: 20, 0 for all)')
+    report_parser.add_argument('--script', help='only spans of this script')
+    report_parser.add_argument('--json', action='store_true',
+                               help='print the ranking as JSON')
+    prom_parser.add_argument(
+        '--textfile-dir',
+        default=os.environ.get('CLASSROOM_PROMETHEUS_TEXTFILE_DIR'),
+        help='node_exporter --collector.textfile.directory '
+             '(default: $CLASSROOM_PROMETHEUS_TEXTFILE_DIR)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record(args.span, args.ms, args.outcome, script=args.script)
+        return 0
+
+    spans = list(read_spans(args.logs, args.since))
+    stats = aggregate(spans)
+
+    if args.command == 'prometheus':
+        if not args.textfile_dir:
+            print("❌ No --textfile-dir (or CLASSROOM_PROMETHEUS_TEXTFILE_DIR)")
+            return 1
+        path = write_textfile(stats, args.textfile_dir)
+        print(f"✅ {len(stats)} spans exported to {path}")
+        return 0
+
+    rows = ranked(stats, args.by, args.top, args.script)
+    if args.json:
+        print(json.dumps([
+            {'script': script, 'span': name,
+             **{key: value[key] for key in
+                ('runs', 'hosts', 'failures', 'p50', 'p95', 'max', 'total')}}
+            for (script, name), value in rows], indent=2))
+        return 0
+    runs = len({(entry.get('host'), entry.get('run')) for entry in spans})
+    hosts = len({entry.get('host') for entry in spans})
+    print(f"⏱️ Slowest spans ({len(spans):,} spans, {hosts} host(s))")
+    print_report(rows, args.by, runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/bin/bash
+
+# Span timing for the bash setup and check scripts (see telemetry.py).
+#
+# Source it, then time steps as spans; each span is one JSON line in the
+# telemetry log, in the same format telemetry.py writes:
+#
+#   source "$SCRIPTS_DIR/telemetry.sh"
+#   telemetry_span "start postgres" sudo service postgresql start
+#
+#   telemetry_start "python packages"
+#   ...
+#   telemetry_end "python packages" [outcome]   # default: ok
+#
+# telemetry_span returns the command's status (outcome error when it
+# fails); the helpers are safe under set -e. telemetry_export refreshes
+# the Prometheus textfile when CLASSROOM_PROMETHEUS_TEXTFILE_DIR is set;
+# telemetry_summary prints the spans of this script.
+
+TELEMETRY_CACHE_DIR="${CLASSROOM_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/data-management-classroom}"
+TELEMETRY_FILE="${CLASSROOM_TELEMETRY_FILE:-$TELEMETRY_CACHE_DIR/telemetry.jsonl}"
+TELEMETRY_SCRIPT="${TELEMETRY_SCRIPT:-$(basename "$0")}"
+TELEMETRY_HOST="${CODESPACE_NAME:-$(hostname 2>/dev/null || echo unknown)}"
+TELEMETRY_PY="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/telemetry.py"
+# Everything started from here shares the run id
+export CLASSROOM_RUN_ID="${CLASSROOM_RUN_ID:-$(date +%s)-$$}"
+mkdir -p "$(dirname "$TELEMETRY_FILE")" 2>/dev/null || true
+
+_TELEMETRY_T0=$(date +%s%N)
+declare -A _TELEMETRY_STARTS
+_TELEMETRY_NAMES=()
+_TELEMETRY_MS=()
+_TELEMETRY_OUTCOMES=()
+
+_telemetry_json() {
+    local value="${1//\\/\\\\}"
+    value="${value//\"/\\\"}"
+    printf '"%s"' "$value"
+}
+
+# Append a span: telemetry_record NAME MILLISECONDS [OUTCOME] [START_NS]
+telemetry_record() {
+    local name="$1" ms="$2" outcome="${3:-ok}" start_ns="${4:-}"
+    local ts
+    if [ -n "$start_ns" ]; then
+        ts=$(date -u -d "@$((start_ns / 1000000000)).$(printf '%09d' $((start_ns % 1000000000)))" +%Y-%m-%dT%H:%M:%S.%3N+00:00)
+    else
+        ts=$(date -u +%Y-%m-%dT%H:%M:%S.%3N+00:00)
+    fi
+    _TELEMETRY_NAMES+=("$name")
+    _TELEMETRY_MS+=("$ms")
+    _TELEMETRY_OUTCOMES+=("$outcome")
+    printf '{"ts": "%s", "run": %s, "host": %s, "script": %s, "span": %s, "duration_ms": %s, "outcome": "%s"}\n' \
+        "$ts" "$(_telemetry_json "$CLASSROOM_RUN_ID")" "$(_telemetry_json "$TELEMETRY_HOST")" \
+        "$(_telemetry_json "$TELEMETRY_SCRIPT")" "$(_telemetry_json "$name")" \
+        "$ms" "$outcome" >> "$TELEMETRY_FILE" 2>/dev/null
+    return 0
+}
+
+telemetry_start() {
+    _TELEMETRY_STARTS["$1"]=$(date +%s%N)
+}
+
+telemetry_end() {
+    local name="$1" outcome="${2:-ok}"
+    local start="${_TELEMETRY_STARTS[$name]:-}"
+    [ -z "$start" ] && return 0
+    unset "_TELEMETRY_STARTS[$name]"
+    telemetry_record "$name" $(( ($(date +%s%N) - start) / 1000000 )) "$outcome" "$start"
+}
+
+# Run a command as a span: telemetry_span NAME COMMAND [ARGS...]
+telemetry_span() {
+    local name="$1"
+    shift
+    telemetry_start "$name"
+    # Written so that scripts running with set -e still record the failure
+    local status=0
+    "$@" || status=$?
+    if [ $status -eq 0 ]; then
+        telemetry_end "$name" ok
+    else
+        telemetry_end "$name" error
+    fi
+    return $status
+}
+
+# Print this script's spans, and the wall time since it sourced this file
+telemetry_summary() {
+    local i icon
+    local total=$(( ($(date +%s%N) - _TELEMETRY_T0) / 1000000 ))
+    for i in "${!_TELEMETRY_NAMES[@]}"; do
+        icon="✅"
+        [ "${_TELEMETRY_OUTCOMES[$i]}" != "ok" ] && icon="⚠️"
+        printf '   %s %-26s %5d.%ds\n' "$icon" "${_TELEMETRY_NAMES[$i]}" \
+            $(( _TELEMETRY_MS[i] / 1000 )) $(( _TELEMETRY_MS[i] % 1000 / 100 ))
+    done
+    printf '   %-29s %5d.%ds\n' "total" $(( total / 1000 )) $(( total % 1000 / 100 ))
+}
+
+# Refresh the node_exporter textfile, if one is configured
+telemetry_export() {
+    if [ -n "$CLASSROOM_PROMETHEUS_TEXTFILE_DIR" ] && command -v python3 &> /dev/null; then
+        python3 "$TELEMETRY_PY" prometheus >/dev/null 2>&1 || true
+    fi
+    return 0
+}
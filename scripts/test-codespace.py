@@ -45,16 +45,9 @@ def test_postgresql():
 def test_database_connection():
     """Test if we can connect to the database"""
     try:
-        import psycopg2
-        conn = psycopg2.connect(
-            host="localhost",
-            database="postgres", 
-            user="student",
-            password="student_password",
-            port="5432",
-            connect_timeout=3
-        )
-        conn.close()
+        from db import get_conn
+        with get_conn() as conn:
+            conn.cursor().execute("SELECT 1;")
         print("✅ Database connection working")
         return True
     except Exception as e:
@@ -15,27 +15,18 @@ def test_python():
         return False
 
 def test_r():
-    try:
-        result = subprocess.run(['R', '--version'], capture_output=True, timeout=5)
-        if result.returncode == 0:
-            print("✅ R installed")
-            # Test if essential packages are available
-            try:
-                r_test = subprocess.run(['R', '--slave', '-e', 'library(DBI); library(RPostgreSQL)'], 
-                                      capture_output=True, timeout=10)
-                if r_test.returncode == 0:
-                    print("✅ R essential packages available")
-                else:
-                    print("⚠️ R packages may need installation")
-            except:
-                print("⚠️ R package test failed")
-            return True
-        else:
-            print("❌ R issue")
-            return False
-    except:
+    from verify_packages import check_r_packages
+    # One R start-up checks both essential packages
+    status = check_r_packages(['DBI', 'RPostgreSQL'], timeout=15)
+    if status is None:
         print("❌ R not found")
         return False
+    print("✅ R installed")
+    if all(status.values()):
+        print("✅ R essential packages available")
+    else:
+        print("⚠️ R packages may need installation")
+    return True
 
 def test_postgresql():
     try:
@@ -53,16 +44,9 @@ def test_postgresql():
 def test_database_connection():
     """Test if we can connect to the database"""
     try:
-        import psycopg2
-        conn = psycopg2.connect(
-            host="localhost",
-            database="postgres", 
-            user="student",
-            password="student_password",
-            port="5432",
-            connect_timeout=3
-        )
-        conn.close()
+        from db import get_conn
+        with get_conn() as conn:
+            conn.cursor().execute("SELECT 1;")
         print("✅ Database connection working")
         return True
     except:
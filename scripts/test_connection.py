@@ -5,58 +5,57 @@ import sys
 import subprocess
 import time
 
+import db
+
 def test_connection():
-    """Test database connection with multiple credential attempts"""
+    """
+    Test database connection with multiple credential attempts.
+
+    The attempts run in parallel when asyncpg is installed (the first one
+    to connect wins), otherwise one after another. Returns the working
+    connection parameters, or None.
+    """
+    
+    def report(name, error, seconds=None):
+        timing = f" ({seconds:.2f}s)" if seconds is not None else ""
+        print(f"🔍 Trying: {name}{timing}")
+        if error is not None:
+            print(f"❌ {name} failed: {error}")
     
-    # Connection attempts to try
-    attempts = [
-        {
-            "name": "Codespace setup (student with password)",
-            "params": {
-                "host": "localhost",
-                "database": "postgres",
-                "user": "student", 
-                "password": "student_password",
-                "port": "5432",
-                "connect_timeout": 5
-            }
-        },
-        {
-            "name": "Local setup (student without password)",
-            "params": {
-                "host": "localhost",
-                "database": "postgres",
-                "user": "student",
-                "port": "5432",
-                "connect_timeout": 5
-            }
-        },
-        {
-            "name": "Current user authentication",
-            "params": {
-                "database": "postgres",
-                "user": "vscode",
-                "port": "5432",
-                "connect_timeout": 5
-            }
-        }
-    ]
+    try:
+        import asyncio
+        import verify_schemas
+    except ImportError:
+        verify_schemas = None
     
-    for attempt in attempts:
+    if verify_schemas is not None:
+        async def race():
+            attempt, conn = await verify_schemas.connect_first(on_attempt=report)
+            try:
+                version = await conn.fetchval("SELECT version();")
+            finally:
+                await conn.close()
+            return attempt, version
         try:
-            print(f"🔍 Trying: {attempt['name']}")
-            conn = psycopg2.connect(**attempt['params'])
-            cursor = conn.cursor()
-            cursor.execute("SELECT version();")
-            version = cursor.fetchone()
-            print(f"✅ Connected via {attempt['name']}: {version[0]}")
-            cursor.close()
-            conn.close()
-            return True
-        except Exception as e:
-            print(f"❌ {attempt['name']} failed: {e}")
+            attempt, version = asyncio.run(race())
+        except verify_schemas.CONNECT_ERRORS:
+            return None
+        print(f"✅ Connected via {attempt['name']}: {version}")
+        return attempt['params']
+    
+    # Probe the credential list from scripts/db.py (fresh, not cached)
+    try:
+        name, params = db.resolve_credentials(refresh=True, on_attempt=report)
+    except psycopg2.Error:
+        return None
     
-    return False
+    with db.get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version();")
+        version = cursor.fetchone()
+        print(f"✅ Connected via {name}: {version[0]}")
+        cursor.close()
+    return params
 
 def check_postgres_service():
     """Check if PostgreSQL service is running"""
@@ -81,13 +80,14 @@ if __name__ == "__main__":
             pass
     
     # Test the connection
-    if test_connection():
+    params = test_connection()
+    if params:
         print("\n🎉 Database connection successful!")
         print("\n📊 Connection details:")
-        print("   Host: localhost")
-        print("   Database: postgres")
-        print("   Username: student")
-        print("   Password: student_password")
+        print(f"   Host: {params.get('host', 'local socket')}")
+        print(f"   Database: {params.get('dbname')}")
+        print(f"   Username: {params.get('user')}")
+        print(f"   Password: {params.get('password', '(none)')}")
         sys.exit(0)
     else:
         print("\n❌ Database connection failed")
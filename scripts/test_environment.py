@@ -4,9 +4,19 @@ Data Management Classroom - Environment Test Script
 Tests all major components of the development environment
 """
 
+import argparse
+import io
+import json
 import sys
 import subprocess
 import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import telemetry
+
+DEFAULT_DEADLINE = float(os.environ.get('HEALTH_CHECK_DEADLINE', '20'))
 
 def test_section(name):
     """Print a test section header"""
@@ -47,38 +57,33 @@ def test_database():
     test_section("Database Connectivity")
     
     try:
-        import psycopg2
+        from db import get_conn, resolve_credentials
         
         # Test connection
-        conn = psycopg2.connect(
-            host="localhost",
-            database="vscode",
-            user="vscode"
-        )
-        
-        cursor = conn.cursor()
-        cursor.execute("SELECT version();")
-        version = cursor.fetchone()[0]
-        print(f"  ✅ PostgreSQL Connection: {version.split(',')[0]}")
-        
-        # Test basic operations
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS test_table (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        
-        cursor.execute("INSERT INTO test_table (name) VALUES (%s);", ("test_data",))
-        cursor.execute("SELECT COUNT(*) FROM test_table;")
-        count = cursor.fetchone()[0]
-        print(f"  ✅ Database Operations: {count} records in test table")
-        
-        # Clean up
-        cursor.execute("DROP TABLE IF EXISTS test_table;")
-        conn.commit()
-        conn.close()
+        name, _ = resolve_credentials()
+        print(f"  ✅ Credentials: {name}")
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version();")
+            version = cursor.fetchone()[0]
+            print(f"  ✅ PostgreSQL Connection: {version.split(',')[0]}")
+            
+            # Test basic operations
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS test_table (
+                    id SERIAL PRIMARY KEY,
+                    name VARCHAR(100),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            
+            cursor.execute("INSERT INTO test_table (name) VALUES (%s);", ("test_data",))
+            cursor.execute("SELECT COUNT(*) FROM test_table;")
+            count = cursor.fetchone()[0]
+            print(f"  ✅ Database Operations: {count} records in test table")
+            
+            # Clean up
+            cursor.execute("DROP TABLE IF EXISTS test_table;")
         
         return True
         
@@ -124,6 +129,24 @@ def test_jupyter():
         print(f"  ❌ Jupyter Error: {e}")
         return False
 
+def test_r_packages():
+    """Test R and its database packages with a single R invocation"""
+    test_section("R Environment")
+    
+    from verify_packages import check_r_packages
+    packages = ['DBI', 'RPostgreSQL', 'dplyr', 'ggplot2']
+    status = check_r_packages(packages, timeout=15)
+    if status is None:
+        print("  ❌ R not available")
+        return False
+    
+    for package in packages:
+        if status[package]:
+            print(f"  ✅ {package}")
+        else:
+            print(f"  ❌ {package} (not installed)")
+    return all(status.values())
+
 def test_data_science_basics():
     """Test basic data science operations"""
     test_section("Data Science Operations")
@@ -178,48 +201,165 @@ def test_workspace_structure():
     
     return success_count >= len(expected_dirs) * 0.8  # 80% success rate
 
-def main():
+class _ThreadOutput(io.TextIOBase):
+    """Route print() from each check thread into its own buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (buffer or self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+def run_checks(tests, deadline=DEFAULT_DEADLINE):
+    """
+    Run all checks concurrently and stop waiting once the deadline passes.
+    
+    Returns one result dict per check, in the order given, with its
+    status (pass/fail/error/timeout), duration and captured output.
+    """
+    output = _ThreadOutput(sys.stdout)
+    results = [{'name': name, 'status': 'timeout', 'seconds': None,
+                'started': None, 'output': ''} for name, _ in tests]
+    started = time.perf_counter()
+    
+    def worker(result, test_func):
+        buffer = io.StringIO()
+        output.local.buffer = buffer
+        result['started'] = time.time()
+        check_started = time.perf_counter()
+        try:
+            result['status'] = 'pass' if test_func() else 'fail'
+        except Exception as e:
+            print(f"  ❌ {result['name']} Test Failed: {e}")
+            result['status'] = 'error'
+        result['seconds'] = round(time.perf_counter() - check_started, 3)
+        result['output'] = buffer.getvalue()
+    
+    real_stdout, sys.stdout = sys.stdout, output
+    try:
+        # Daemon threads so a hung check can't keep the process alive
+        threads = [threading.Thread(target=worker, args=(result, func),
+                                    daemon=True)
+                   for result, (_, func) in zip(results, tests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(max(0, deadline - (time.perf_counter() - started)))
+    finally:
+        # Checks still running past the deadline keep printing into their
+        # own buffers, which are discarded; the router stays in place so
+        # their output can't reach the report (e.g. --json -), and the
+        # main thread writes through it to the real stdout
+        if not any(thread.is_alive() for thread in threads):
+            sys.stdout = real_stdout
+    
+    # Copies, so a late check can't change a result that is being reported
+    results = [dict(result) for result in results]
+    for result, thread in zip(results, threads):
+        if thread.is_alive():
+            result.update(status='timeout', seconds=None, output='')
+    return results
+
+# Check status -> telemetry span outcome
+OUTCOMES = {'pass': 'ok', 'fail': 'error', 'error': 'error',
+            'timeout': 'timeout'}
+
+def record_spans(results, deadline, elapsed):
+    """Log every check, and the whole run, as telemetry spans"""
+    for result in results:
+        seconds = (result['seconds'] if result['seconds'] is not None
+                   else deadline)
+        telemetry.record(result['name'], seconds * 1000,
+                         OUTCOMES[result['status']],
+                         started=result['started'])
+    passed = all(result['status'] == 'pass' for result in results)
+    telemetry.record('total', elapsed * 1000, 'ok' if passed else 'warning')
+
+def write_json_report(results, path, deadline, elapsed):
+    """Write machine-readable timings for every check"""
+    report = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'deadline_seconds': deadline,
+        'total_seconds': round(elapsed, 3),
+        'checks': [{key: result[key] for key in ('name', 'status', 'seconds')}
+                   for result in results],
+    }
+    if path == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+
+def main(argv=None):
     """Run all tests"""
-    print("🔬 Data Management Classroom - Environment Test")
-    print("=" * 50)
+    parser = argparse.ArgumentParser(description="Environment health check")
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE,
+                        help='overall time budget in seconds')
+    parser.add_argument('--json', metavar='PATH',
+                        help="write per-check timings as JSON ('-' for stdout)")
+    args = parser.parse_args(argv)
+    
+    # Keep stdout clean for the JSON report when it goes there
+    human = sys.stderr if args.json == '-' else sys.stdout
     
     tests = [
         ("Python Packages", test_imports),
         ("Database", test_database),
         ("Environment", test_environment),
         ("Jupyter", test_jupyter),
+        ("R Packages", test_r_packages),
         ("Data Science", test_data_science_basics),
         ("Workspace", test_workspace_structure)
     ]
     
-    results = {}
-    for test_name, test_func in tests:
-        try:
-            results[test_name] = test_func()
-        except Exception as e:
-            print(f"  ❌ {test_name} Test Failed: {e}")
-            results[test_name] = False
+    print("🔬 Data Management Classroom - Environment Test", file=human)
+    print("=" * 50, file=human)
+    
+    started = time.perf_counter()
+    results = run_checks(tests, args.deadline)
+    elapsed = time.perf_counter() - started
+    record_spans(results, args.deadline, elapsed)
+    
+    for result in results:
+        human.write(result['output'])
+        if result['status'] == 'timeout':
+            print(f"\n⏱️ {result['name']} did not finish within "
+                  f"{args.deadline:g}s", file=human)
     
     # Summary
-    print("\n📋 Test Summary")
-    print("=" * 20)
-    passed = sum(1 for result in results.values() if result)
+    print("\n📋 Test Summary", file=human)
+    print("=" * 20, file=human)
+    passed = sum(1 for result in results if result['status'] == 'pass')
     total = len(results)
     
-    for test_name, result in results.items():
-        status = "✅ PASS" if result else "❌ FAIL"
-        print(f"  {status} {test_name}")
+    for result in results:
+        status = "✅ PASS" if result['status'] == 'pass' else "❌ FAIL"
+        if result['status'] == 'timeout':
+            status = "⏱️ TIMEOUT"
+        timing = (f" ({result['seconds']:.2f}s)"
+                  if result['seconds'] is not None else "")
+        print(f"  {status} {result['name']}{timing}", file=human)
+    
+    print(f"\n🏁 Overall Result: {passed}/{total} tests passed "
+          f"in {elapsed:.2f}s", file=human)
     
-    print(f"\n🏁 Overall Result: {passed}/{total} tests passed")
+    if args.json:
+        write_json_report(results, args.json, args.deadline, elapsed)
     
     if passed == total:
-        print("🎉 All tests passed! Environment is ready for data science work.")
+        print("🎉 All tests passed! Environment is ready for data science work.", file=human)
         return 0
     elif passed >= total * 0.7:
-        print("⚠️ Most tests passed. Environment is mostly functional.")
+        print("⚠️ Most tests passed. Environment is mostly functional.", file=human)
         return 0
     else:
-        print("🚨 Multiple test failures. Environment needs attention.")
+        print("🚨 Multiple test failures. Environment needs attention.", file=human)
         return 1
 
 if __name__ == "__main__":
@@ -0,0 +1,606 @@
+#!/usr/bin/env python3
+"""
+Sampled, parallel data-quality validation of the loaded sample schemas.
+
+Expectations are derived from the DDL in databases/*.sql rather than
+written by hand, and named after the great-expectations expectation types
+they correspond to:
+
+- expect_column_values_to_not_be_null for NOT NULL and primary key columns
+- expect_foreign_key_values_to_exist for every foreign key (inline,
+  table-level or added by ALTER TABLE)
+- expect_rows_to_satisfy_check for CHECK constraints
+- expect_column_values_to_be_between for a column bounded by the row it
+  references: employees.salary must lie between min_salary and max_salary
+  of its hr.jobs row (any <column> next to a foreign key to a table with
+  min_<column> / max_<column> columns)
+- expect_column_pair_values_a_to_be_greater_than_b for min_/max_,
+  start_/end_ and _from/_to column pairs of one table
+
+Instead of pulling rows into a DataFrame, every table is checked with one
+query that counts the failing rows of all its expectations in a single
+pass, so only counts leave the server:
+
+- sample (default): tables larger than SAMPLE_ROWS are read through
+  TABLESAMPLE SYSTEM (a few percent of their pages); smaller tables in full
+- incremental: only rows whose integer primary key is above the watermark
+  of the last run are checked (the first run samples, then sets the
+  watermark); tables without such a key are sampled
+- full: every row
+
+Tables are validated in parallel on pooled connections. A table whose
+expectations all passed is skipped on the next run until its
+insert/update/delete counters in pg_stat_user_tables (or those of a table
+it references) change; results are kept in
+~/.cache/data-management-classroom/validation.json.
+
+Counts found in a sample are extrapolated to the whole table, so a
+sampled run can miss rare problems; run with --mode full (for one schema)
+to be certain.
+
+Usage:
+    python scripts/validate_data.py
+    python scripts/validate_data.py --schema hr --mode full
+    python scripts/validate_data.py --mode incremental --jobs 4
+    python scripts/validate_data.py --list            # derived expectations
+    python scripts/validate_data.py --json -          # JSON on stdout
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import psycopg2
+from psycopg2 import sql as pgsql
+
+import bulk_load
+import db
+
+STATE_FILE = os.path.join(os.path.dirname(db.CACHE_FILE), 'validation.json')
+MODES = ('sample', 'incremental', 'full')
+SAMPLE_ROWS = 10_000
+JOBS = db.POOL_MAX
+
+# Column pairs whose first value may not exceed the second
+COLUMN_PAIRS = [
+    (re.compile(r'^min_(\w+)$'), 'max_{}'),
+    (re.compile(r'^start_(\w+)$'), 'end_{}'),
+    (re.compile(r'^(\w+)_from$'), '{}_to'),
+]
+INTEGER_TYPES = {'smallint', 'integer', 'int', 'int2', 'int4', 'int8',
+                 'bigint', 'serial', 'bigserial', 'smallserial'}
+
+CREATE_SCHEMA = re.compile(
+    r'^CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+ALTER_TABLE = re.compile(
+    r'^ALTER\s+TABLE\s+(?:ONLY\s+)?(\w+(?:\.\w+)?)', re.IGNORECASE)
+FOREIGN_KEY = re.compile(
+    r'FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+(\w+(?:\.\w+)?)'
+    r'\s*(?:\(([^)]*)\))?', re.IGNORECASE)
+PRIMARY_KEY = re.compile(r'PRIMARY\s+KEY\s*\(([^)]*)\)', re.IGNORECASE)
+CHECK = re.compile(r'\bCHECK\s*\(', re.IGNORECASE)
+NOT_NULL = re.compile(r'\bNOT\s+NULL\b', re.IGNORECASE)
+INLINE_PRIMARY_KEY = re.compile(r'\bPRIMARY\s+KEY\b', re.IGNORECASE)
+COLUMN_TYPE = re.compile(r'^(\w+)', re.IGNORECASE)
+TABLE_CONSTRAINT = ('CONSTRAINT', 'PRIMARY', 'FOREIGN', 'UNIQUE', 'CHECK',
+                    'EXCLUDE')
+
+# Change counters and size per table (partitioned tables summed over
+# their partitions)
+TABLE_STATS_SQL = """
+    SELECT n.nspname, c.relname,
+           c.oid::text || ':' || coalesce(sum(s.n_tup_ins + s.n_tup_upd
+                                              + s.n_tup_del)::bigint, 0),
+           coalesce(sum(CASE WHEN l.reltuples >= 0 THEN l.reltuples::bigint
+                             ELSE s.n_live_tup END)::bigint, 0)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL pg_partition_tree(c.oid) tree
+    JOIN pg_class l ON l.oid = tree.relid AND tree.isleaf
+    LEFT JOIN pg_stat_user_tables s ON s.relid = l.oid
+    WHERE c.relkind IN ('r', 'p') AND NOT c.relispartition
+      AND n.nspname = ANY(%s)
+    GROUP BY n.nspname, c.relname, c.oid
+"""
+
+
+def _name(qualified):
+    return qualified.strip().strip('"').lower().split('.')[-1]
+
+
+def _columns(text):
+    return [_name(column) for column in text.split(',') if column.strip()]
+
+
+def _parenthesized(text, start):
+    """The text inside the parenthesis opening at text[start]."""
+    depth = 0
+    for i in range(start, len(text)):
+        depth += {'(': 1, ')': -1}.get(text[i], 0)
+        if depth == 0:
+            return text[start + 1:i]
+    raise ValueError(f"unbalanced parentheses in {text!r}")
+
+
+def _checks(text):
+    return [_parenthesized(text, match.end() - 1).strip()
+            for match in CHECK.finditer(text)]
+
+
+def _elements(statement):
+    """Top-level elements (columns and constraints) of a CREATE TABLE."""
+    match = bulk_load.CREATE_TABLE.match(statement)
+    body = _parenthesized(statement, match.end() - 1)
+    elements, depth, current = [], 0, []
+    for char in body:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == ',' and depth == 0:
+            elements.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    elements.append(''.join(current).strip())
+    return [element for element in elements if element]
+
+
+def parse_table(statement):
+    """{'columns', 'not_null', 'primary_key', 'checks', 'foreign_keys'}."""
+    table = {'columns': {}, 'not_null': [], 'primary_key': [], 'checks': [],
+             'foreign_keys': []}
+    rewritten, inline = bulk_load.strip_inline_references(statement)
+    for element in _elements(rewritten):
+        words = element.split()
+        if words[0].upper() in TABLE_CONSTRAINT:
+            match = PRIMARY_KEY.search(element)
+            if match and words[0].upper() in ('PRIMARY', 'CONSTRAINT'):
+                table['primary_key'] = _columns(match.group(1))
+            table['checks'] += _checks(element)
+            continue
+        column = _name(words[0])
+        rest = element[len(words[0]):].strip()
+        type_match = COLUMN_TYPE.match(rest)
+        table['columns'][column] = type_match.group(1).lower() if type_match \
+            else ''
+        if INLINE_PRIMARY_KEY.search(rest):
+            table['primary_key'] = [column]
+        if NOT_NULL.search(rest) or INLINE_PRIMARY_KEY.search(rest):
+            table['not_null'].append(column)
+        table['checks'] += _checks(rest)
+    for text in [rewritten] + inline:
+        table['foreign_keys'] += _foreign_keys(text)
+    for column in table['primary_key']:
+        if column not in table['not_null']:
+            table['not_null'].append(column)
+    return table
+
+
+def _foreign_keys(text):
+    return [(_columns(match.group(1)), _name(match.group(2)),
+             _columns(match.group(3)) if match.group(3) else None)
+            for match in FOREIGN_KEY.finditer(text)]
+
+
+def parse_ddl(databases_dir=bulk_load.DATABASES_DIR):
+    """{(schema, table): parse_table()} for databases/*.sql."""
+    tables = {}
+    for path in sorted(glob.glob(os.path.join(databases_dir, '*.sql'))):
+        with open(path, encoding='utf-8') as handle:
+            statements = bulk_load.split_statements(handle.read())
+        schema = 'public'
+        for statement in statements:
+            match = CREATE_SCHEMA.match(statement)
+            if match:
+                schema = match.group(1).lower()
+                continue
+            match = bulk_load.CREATE_TABLE.match(statement)
+            if match:
+                tables[(schema, _name(match.group(1)))] = parse_table(statement)
+                continue
+            match = ALTER_TABLE.match(statement)
+            if match and (schema, _name(match.group(1))) in tables:
+                table = tables[(schema, _name(match.group(1)))]
+                table['foreign_keys'] += _foreign_keys(statement)
+                table['checks'] += _checks(statement)
+    return tables
+
+
+def derive_expectations(tables):
+    """{(schema, table): [expectation dict]} from parse_ddl()."""
+    expectations = {}
+    for (schema, name), table in tables.items():
+        found = expectations.setdefault((schema, name), [])
+        for column in table['not_null']:
+            found.append({'expectation': 'expect_column_values_to_not_be_null',
+                          'column': column})
+        for check in table['checks']:
+            found.append({'expectation': 'expect_rows_to_satisfy_check',
+                          'check': check})
+        for columns, referenced, ref_columns in table['foreign_keys']:
+            target = tables.get((schema, referenced))
+            if target is None:
+                continue
+            ref_columns = ref_columns or target['primary_key']
+            if len(ref_columns) != len(columns):
+                continue
+            found.append({'expectation': 'expect_foreign_key_values_to_exist',
+                          'columns': columns, 'referenced': referenced,
+                          'referenced_columns': ref_columns})
+            for column in table['columns']:
+                low, high = f'min_{column}', f'max_{column}'
+                if column not in columns and low in target['columns'] \
+                        and high in target['columns']:
+                    found.append({
+                        'expectation': 'expect_column_values_to_be_between',
+                        'column': column, 'referenced': referenced,
+                        'columns': columns, 'referenced_columns': ref_columns,
+                        'min_column': low, 'max_column': high})
+        for column in table['columns']:
+            for pattern, high in COLUMN_PAIRS:
+                match = pattern.match(column)
+                if match and high.format(match.group(1)) in table['columns']:
+                    found.append({
+                        'expectation':
+                            'expect_column_pair_values_a_to_be_greater_than_b',
+                        'column_a': high.format(match.group(1)),
+                        'column_b': column, 'or_equal': True})
+    return expectations
+
+
+def describe(expectation):
+    """Short human-readable form of an expectation."""
+    kind = expectation['expectation']
+    if kind == 'expect_column_values_to_not_be_null':
+        return f"{expectation['column']} not null"
+    if kind == 'expect_rows_to_satisfy_check':
+        return f"CHECK ({expectation['check']})"
+    if kind == 'expect_foreign_key_values_to_exist':
+        return (f"{', '.join(expectation['columns'])} -> "
+                f"{expectation['referenced']}"
+                f"({', '.join(expectation['referenced_columns'])})")
+    if kind == 'expect_column_values_to_be_between':
+        return (f"{expectation['column']} between "
+                f"{expectation['referenced']}.{expectation['min_column']} and "
+                f"{expectation['max_column']}")
+    return f"{expectation['column_b']} <= {expectation['column_a']}"
+
+
+def _join(columns, ref_columns):
+    return pgsql.SQL(' AND ').join(
+        pgsql.SQL('r.{} = t.{}').format(pgsql.Identifier(ref),
+                                        pgsql.Identifier(column))
+        for column, ref in zip(columns, ref_columns))
+
+
+def failure_condition(schema, expectation):
+    """SQL condition that is true for a row of t failing the expectation."""
+    kind = expectation['expectation']
+    if kind == 'expect_column_values_to_not_be_null':
+        return pgsql.SQL('t.{} IS NULL').format(
+            pgsql.Identifier(expectation['column']))
+    if kind == 'expect_rows_to_satisfy_check':
+        # A CHECK passes when its expression is NULL, so only false fails
+        return pgsql.SQL('({}) IS FALSE').format(pgsql.SQL(expectation['check']))
+    referenced = pgsql.Identifier(schema, expectation.get('referenced', ''))
+    if kind == 'expect_foreign_key_values_to_exist':
+        present = pgsql.SQL(' AND ').join(
+            pgsql.SQL('t.{} IS NOT NULL').format(pgsql.Identifier(column))
+            for column in expectation['columns'])
+        return pgsql.SQL('{} AND NOT EXISTS (SELECT 1 FROM {} r WHERE {})').format(
+            present, referenced,
+            _join(expectation['columns'], expectation['referenced_columns']))
+    if kind == 'expect_column_values_to_be_between':
+        return pgsql.SQL(
+            'EXISTS (SELECT 1 FROM {0} r WHERE {1} AND '
+            '(t.{2} < r.{3} OR t.{2} > r.{4}))').format(
+                referenced,
+                _join(expectation['columns'], expectation['referenced_columns']),
+                pgsql.Identifier(expectation['column']),
+                pgsql.Identifier(expectation['min_column']),
+                pgsql.Identifier(expectation['max_column']))
+    return pgsql.SQL('t.{} > t.{}').format(
+        pgsql.Identifier(expectation['column_b']),
+        pgsql.Identifier(expectation['column_a']))
+
+
+def watermark_column(table):
+    """The single integer primary key column of a table, or None."""
+    key = table['primary_key']
+    if len(key) == 1 and table['columns'].get(key[0]) in INTEGER_TYPES:
+        return key[0]
+    return None
+
+
+def build_query(schema, name, expectations, sample_percent=None,
+                method='SYSTEM', seed=None, watermark=None):
+    """
+    (query, params) counting the rows read and the failures per expectation.
+
+    With a watermark (column, value) only rows above it are read, and the
+    largest key of the table is returned as well (the next watermark).
+    """
+    columns = [pgsql.SQL('count(*)')]
+    columns += [pgsql.SQL('count(*) FILTER (WHERE {})').format(
+        failure_condition(schema, expectation)) for expectation in expectations]
+    params = []
+    source = pgsql.SQL('{} AS t').format(pgsql.Identifier(schema, name))
+    if sample_percent is not None:
+        source = pgsql.SQL('{} TABLESAMPLE {} (%s){} AS t').format(
+            pgsql.Identifier(schema, name), pgsql.SQL(method),
+            pgsql.SQL(' REPEATABLE (%s)') if seed is not None else pgsql.SQL(''))
+        params += [sample_percent] + ([seed] if seed is not None else [])
+    where = pgsql.SQL('')
+    if watermark is not None:
+        column, value = watermark
+        columns.append(pgsql.SQL('(SELECT max({}) FROM {})').format(
+            pgsql.Identifier(column), pgsql.Identifier(schema, name)))
+        if value is not None:
+            where = pgsql.SQL(' WHERE t.{} > %s').format(pgsql.Identifier(column))
+            params.append(value)
+    return (pgsql.SQL('SELECT {} FROM {}{}').format(
+        pgsql.SQL(', ').join(columns), source, where), params)
+
+
+def _fingerprint(expectations, mode):
+    payload = json.dumps({'mode': mode, 'expectations': expectations},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(state, handle, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def validate_table(schema, name, table, expectations, estimate, mode,
+                   sample_rows=SAMPLE_ROWS, method='SYSTEM', seed=None,
+                   previous=None, **overrides):
+    """Run one table's expectations; returns its result dict."""
+    previous = previous or {}
+    key = watermark_column(table) if mode == 'incremental' else None
+    watermark = (key, previous.get('watermark')) if key else None
+    sample_percent = None
+    if mode != 'full' and estimate > sample_rows and not (
+            watermark and watermark[1] is not None):
+        sample_percent = round(max(100.0 * sample_rows / estimate, 0.01), 4)
+
+    query, params = build_query(schema, name, expectations, sample_percent,
+                                method, seed, watermark)
+    started = time.perf_counter()
+    with db.get_conn(**overrides) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            row = cursor.fetchone()
+    rows_read, counts = row[0], row[1:1 + len(expectations)]
+
+    scale = estimate / rows_read if sample_percent and rows_read else 1
+    failures = [{**expectation, 'description': describe(expectation),
+                 'failed_rows': failed,
+                 'estimated_failed_rows': round(failed * scale)}
+                for expectation, failed in zip(expectations, counts) if failed]
+    result = {
+        'table': f'{schema}.{name}',
+        'rows_checked': rows_read,
+        'rows_estimate': estimate,
+        'sample_percent': sample_percent,
+        'expectations': len(expectations),
+        'failures': failures,
+        'passed': not failures,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    if key:
+        # Failing rows are checked again next time
+        result['watermark'] = (row[-1] if not failures and row[-1] is not None
+                               else previous.get('watermark'))
+        result['watermark_column'] = key
+        result['incremental_from'] = watermark[1]
+    return result
+
+
+def validate(schemas=None, tables=None, mode='sample', sample_rows=SAMPLE_ROWS,
+             method='SYSTEM', seed=None, jobs=JOBS, use_cache=True,
+             databases_dir=bulk_load.DATABASES_DIR, state_file=STATE_FILE,
+             on_result=None, **overrides):
+    """
+    Validate the loaded tables; returns {schema.table: result}.
+
+    Cached tables come back with 'cached': True. on_result(result) is
+    called as each table finishes.
+    """
+    parsed = parse_ddl(databases_dir)
+    expectations = derive_expectations(parsed)
+    selected = [key for key in sorted(expectations)
+                if expectations[key]
+                and (not schemas or key[0] in schemas)
+                and (not tables or '.'.join(key) in tables)]
+
+    with db.get_conn(**overrides) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(TABLE_STATS_SQL,
+                           (sorted({schema for schema, _ in selected}),))
+            stats = {(schema, name): (token, int(estimate))
+                     for schema, name, token, estimate in cursor.fetchall()}
+        info = conn.info
+        database = f'{info.host}:{info.port}/{info.dbname}'
+
+    state = load_state(state_file)
+    cache = state.setdefault(database, {})
+    results = {}
+    pending = []
+    for schema, name in selected:
+        qualified = f'{schema}.{name}'
+        if (schema, name) not in stats:
+            results[qualified] = {'table': qualified, 'missing': True,
+                                  'passed': False}
+            continue
+        referenced = sorted({expectation['referenced']
+                             for expectation in expectations[(schema, name)]
+                             if 'referenced' in expectation})
+        token = '|'.join(stats.get((schema, table), ('',))[0]
+                         for table in [name] + referenced)
+        fingerprint = _fingerprint(expectations[(schema, name)], mode)
+        previous = cache.get(qualified, {})
+        if previous.get('fingerprint') != fingerprint:
+            previous = {}
+        if use_cache and previous.get('passed') \
+                and previous.get('token') == token:
+            results[qualified] = {**previous['result'], 'cached': True}
+            continue
+        pending.append((schema, name, token, fingerprint, previous))
+
+    def run(item):
+        schema, name, token, fingerprint, previous = item
+        try:
+            result = validate_table(
+                schema, name, parsed[(schema, name)],
+                expectations[(schema, name)], stats[(schema, name)][1], mode,
+                sample_rows, method, seed, previous.get('result'), **overrides)
+        except psycopg2.Error as e:
+            result = {'table': f'{schema}.{name}', 'passed': False,
+                      'error': str(e).strip()}
+        if on_result:
+            on_result(result)
+        return schema, name, token, fingerprint, result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(jobs, db.POOL_MAX))) as pool:
+        for schema, name, token, fingerprint, result in pool.map(run, pending):
+            qualified = f'{schema}.{name}'
+            results[qualified] = result
+            if 'error' not in result:
+                cache[qualified] = {'token': token, 'fingerprint': fingerprint,
+                                    'passed': result['passed'],
+                                    'result': result}
+    save_state(state, state_file)
+    return dict(sorted(results.items()))
+
+
+def print_result(result, out=sys.stdout):
+    table = result['table']
+    if result.get('missing'):
+        print(f"   ⚠️ {table:<40} not loaded", file=out)
+        return
+    if 'error' in result:
+        print(f"   ❌ {table:<40} {result['error']}", file=out)
+        return
+    icon = "✅" if result['passed'] else "❌"
+    if result.get('cached'):
+        print(f"   {icon} {table:<40} unchanged since the last run (cached)",
+              file=out)
+        return
+    if result['sample_percent'] is not None:
+        scope = (f"{result['rows_checked']:,} sampled rows "
+                 f"({result['sample_percent']}% of ~{result['rows_estimate']:,})")
+    elif result.get('incremental_from') is not None:
+        scope = (f"{result['rows_checked']:,} new rows "
+                 f"({result['watermark_column']} > {result['incremental_from']})")
+    else:
+        scope = f"{result['rows_checked']:,} rows"
+    print(f"   {icon} {table:<40} {result['expectations']} expectations, "
+          f"{scope} ({result['seconds']:.2f}s)", file=out)
+    for failure in result['failures']:
+        extrapolated = ''
+        if failure['estimated_failed_rows'] != failure['failed_rows']:
+            extrapolated = f" (~{failure['estimated_failed_rows']:,} in the table)"
+        print(f"      ⚠️ {failure['description']}: "
+              f"{failure['failed_rows']:,} failing rows{extrapolated}",
+              file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Validate the loaded sample data against expectations "
+                    "derived from databases/*.sql")
+    parser.add_argument('--schema', action='append',
+                        help='schema to validate (repeatable, default: all)')
+    parser.add_argument('--table', action='append', metavar='SCHEMA.TABLE',
+                        help='table to validate (repeatable)')
+    parser.add_argument('--mode', choices=MODES, default='sample',
+                        help='sample (default), incremental or full')
+    parser.add_argument('--sample-rows', type=int, default=SAMPLE_ROWS,
+                        help=f'rows to sample per table (default: '
+                             f'{SAMPLE_ROWS:,})')
+    parser.add_argument('--method', choices=('SYSTEM', 'BERNOULLI'),
+                        default='SYSTEM',
+                        help='TABLESAMPLE method: pages (SYSTEM, default) '
+                             'or rows (BERNOULLI, reads the whole table)')
+    parser.add_argument('--seed', type=float,
+                        help='REPEATABLE seed, for the same sample every run')
+    parser.add_argument('--jobs', '-j', type=int, default=JOBS,
+                        help=f'tables validated in parallel (default: {JOBS})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='validate tables that passed and are unchanged')
+    parser.add_argument('--list', action='store_true',
+                        help='list the derived expectations and exit')
+    parser.add_argument('--json', metavar='PATH',
+                        help="write the results as JSON ('-' for stdout)")
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    if args.list:
+        expectations = derive_expectations(parse_ddl())
+        for (schema, name), found in sorted(expectations.items()):
+            if found and (not args.schema or schema in args.schema):
+                print(f"📋 {schema}.{name}")
+                for expectation in found:
+                    print(f"   {expectation['expectation']}: "
+                          f"{describe(expectation)}")
+        return 0
+
+    out = sys.stderr if args.json == '-' else sys.stdout
+    print(f"🔍 Validating ({args.mode})", file=out)
+    started = time.perf_counter()
+    try:
+        results = validate(args.schema, args.table, args.mode,
+                           args.sample_rows, args.method, args.seed, args.jobs,
+                           not args.no_cache,
+                           on_result=lambda result: print_result(result, out),
+                           **db.overrides_from_args(args))
+    except psycopg2.Error as e:
+        print(f"❌ Could not connect: {e}", file=out)
+        return 1
+    finally:
+        db.close_all()
+
+    for result in results.values():
+        if result.get('cached') or result.get('missing'):
+            print_result(result, out)
+    failed = [table for table, result in results.items()
+              if not result['passed'] and not result.get('missing')]
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"\n❌ {len(failed)} of {len(results)} tables failed "
+              f"({elapsed:.2f}s)", file=out)
+    else:
+        print(f"\n🎉 All {len(results)} tables passed ({elapsed:.2f}s)", file=out)
+
+    if args.json:
+        report = {'timestamp': datetime.now(timezone.utc).isoformat(),
+                  'mode': args.mode, 'ok': not failed, 'tables': results}
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2, default=str)
+            print()
+        else:
+            with open(args.json, 'w', encoding='utf-8') as handle:
+                json.dump(report, handle, indent=2, default=str)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
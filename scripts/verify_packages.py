@@ -2,10 +2,75 @@
 """
 Comprehensive package verification script for data science classroom.
 This script checks if all required Python packages are properly installed.
+
+By default packages are only located (find_spec + installed metadata), so
+the check is fast and nothing heavy gets imported. Pass --import to really
+import every package, in parallel fresh interpreters, and see which ones
+are slow to import (--report writes the timings as JSON).
 """
 
+import argparse
 import importlib
+import importlib.metadata
+import importlib.util
+import json
 import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Python packages to check
+PYTHON_PACKAGES = [
+    ('jupyter', 'jupyter'),
+    ('jupyterlab', 'jupyterlab'),
+    ('notebook', 'notebook'),
+    ('ipywidgets', 'ipywidgets'),
+    ('pandas', 'pandas'),
+    ('numpy', 'numpy'),
+    ('scipy', 'scipy'),
+    ('pyarrow', 'pyarrow'),
+    ('duckdb', 'duckdb'),
+    ('matplotlib', 'matplotlib'),
+    ('seaborn', 'seaborn'),
+    ('plotly', 'plotly'),
+    ('bokeh', 'bokeh'),
+    ('scikit-learn', 'sklearn'),
+    ('tensorflow', 'tensorflow'),
+    ('keras', 'keras'),
+    ('sqlalchemy', 'sqlalchemy'),
+    ('psycopg2-binary', 'psycopg2'),
+    ('asyncpg', 'asyncpg'),
+    ('pymongo', 'pymongo'),
+    ('streamlit', 'streamlit'),
+    ('fastapi', 'fastapi'),
+    ('requests', 'requests'),
+    ('great-expectations', 'great_expectations'),
+    ('pytest', 'pytest'),
+    ('black', 'black'),
+    ('flake8', 'flake8'),
+    ('statsmodels', 'statsmodels'),
+    ('pingouin', 'pingouin'),
+    ('tqdm', 'tqdm'),
+    ('python-dotenv', 'dotenv'),
+    ('pyyaml', 'yaml'),
+    ('openpyxl', 'openpyxl'),
+    ('xlsxwriter', 'xlsxwriter'),
+]
+
+# R packages to check
+R_PACKAGES = [
+    'DBI',
+    'RPostgreSQL',
+    'dplyr',
+    'tidyr',
+    'readr',
+    'readxl',
+    'ggplot2',
+    'plotly',
+    'broom',
+    'modelr',
+    'lubridate',
+    'stringr'
+]
 
 
 def check_python_package(package_name, import_name=None):
@@ -22,106 +87,210 @@ def check_python_package(package_name, import_name=None):
         return False
 
 
-def check_r_package(package_name):
-    """Check if an R package is installed."""
+def find_python_package(package_name, import_name=None):
+    """
+    Check if a Python package is installed without importing it.
+
+    Uses importlib.util.find_spec to locate the module and
+    importlib.metadata for the installed version, so heavy packages such
+    as tensorflow are never initialised. Returns the version string (or
+    "unknown"), or None if the package is missing.
+    """
+    if import_name is None:
+        import_name = package_name
+
+    try:
+        spec = importlib.util.find_spec(import_name)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return None
+    try:
+        return importlib.metadata.version(package_name)
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def profile_import(import_name, timeout=120):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Returns a dict with ok, the cumulative import time of the module in
+    seconds and the five slowest modules it pulled in (by self time).
+    """
     try:
-        cmd = [
-            'R', '--slave', '--vanilla', '-e',
-            f'if(require("{package_name}", quietly=TRUE)) '
-            f'cat("SUCCESS") else cat("FAILED")'
-        ]
         result = subprocess.run(
-            cmd, capture_output=True, text=True, timeout=30, check=False
+            [sys.executable, '-X', 'importtime', '-c', f'import {import_name}'],
+            capture_output=True, text=True, timeout=timeout, check=False
         )
+    except subprocess.TimeoutExpired:
+        return {'ok': False, 'seconds': None, 'slowest': [],
+                'error': f'timed out after {timeout}s'}
 
-        if 'SUCCESS' in result.stdout:
-            print(f"✅ {package_name} (R)")
-            return True
-        else:
-            print(f"❌ {package_name} (R) - Not installed")
-            return False
+    modules = []
+    cumulative = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        fields = [field.strip() for field in line[12:].split('|')]
+        if not fields[0].isdigit():
+            continue
+        self_us, total_us, name = int(fields[0]), int(fields[1]), fields[2]
+        modules.append((self_us, name))
+        if name == import_name:
+            cumulative = total_us
+
+    slowest = [{'module': name, 'self_seconds': self_us / 1e6}
+               for self_us, name in sorted(modules, reverse=True)[:5]]
+    error = None
+    if result.returncode != 0:
+        error = (result.stderr.strip().splitlines() or ['import failed'])[-1]
+    return {
+        'ok': result.returncode == 0,
+        'seconds': cumulative / 1e6 if cumulative is not None else None,
+        'slowest': slowest,
+        'error': error,
+    }
+
+
+def check_r_packages(package_names, timeout=60):
+    """
+    Check several R packages with a single R invocation.
+
+    Returns a dict of package name -> bool, or None if R itself could not
+    be run. Starting R once instead of once per package saves most of the
+    time on a cold container.
+    """
+    names = ', '.join(f'"{name}"' for name in package_names)
+    script = (
+        f'for (p in c({names})) '
+        f'cat(p, if (requireNamespace(p, quietly=TRUE)) "SUCCESS" '
+        f'else "FAILED", "\\n")'
+    )
+    try:
+        result = subprocess.run(
+            ['R', '--slave', '--vanilla', '-e', script],
+            capture_output=True, text=True, timeout=timeout, check=False
+        )
     except (subprocess.TimeoutExpired, subprocess.SubprocessError,
-            FileNotFoundError) as e:
-        print(f"❌ {package_name} (R) - Error checking: {e}")
+            FileNotFoundError):
+        return None
+
+    status = dict.fromkeys(package_names, False)
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] in status:
+            status[parts[0]] = parts[1] == 'SUCCESS'
+    return status
+
+
+def check_r_package(package_name):
+    """Check if an R package is installed."""
+    status = check_r_packages([package_name], timeout=30)
+    if status is None:
+        print(f"❌ {package_name} (R) - Error checking: R not available")
         return False
+    if status[package_name]:
+        print(f"✅ {package_name} (R)")
+        return True
+    print(f"❌ {package_name} (R) - Not installed")
+    return False
+
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verify the classroom Python and R packages")
+    parser.add_argument('--import', dest='do_import', action='store_true',
+                        help='really import every package (in parallel, '
+                             'one fresh interpreter each) and time it')
+    parser.add_argument('--jobs', '-j', type=int, default=8,
+                        help='parallel imports with --import (default: 8)')
+    parser.add_argument('--report', metavar='PATH',
+                        help='write the per-package results as JSON')
+    parser.add_argument('--skip-r', action='store_true',
+                        help='skip the R package checks')
+    args = parser.parse_args(argv)
 
-def main():
     print("🔍 Verifying Data Science Environment Packages")
     print("=" * 50)
 
-    # Python packages to check
-    python_packages = [
-        ('jupyter', 'jupyter'),
-        ('jupyterlab', 'jupyterlab'),
-        ('notebook', 'notebook'),
-        ('ipywidgets', 'ipywidgets'),
-        ('pandas', 'pandas'),
-        ('numpy', 'numpy'),
-        ('scipy', 'scipy'),
-        ('matplotlib', 'matplotlib'),
-        ('seaborn', 'seaborn'),
-        ('plotly', 'plotly'),
-        ('bokeh', 'bokeh'),
-        ('scikit-learn', 'sklearn'),
-        ('tensorflow', 'tensorflow'),
-        ('keras', 'keras'),
-        ('sqlalchemy', 'sqlalchemy'),
-        ('psycopg2-binary', 'psycopg2'),
-        ('pymongo', 'pymongo'),
-        ('streamlit', 'streamlit'),
-        ('fastapi', 'fastapi'),
-        ('requests', 'requests'),
-        ('great-expectations', 'great_expectations'),
-        ('pytest', 'pytest'),
-        ('black', 'black'),
-        ('flake8', 'flake8'),
-        ('statsmodels', 'statsmodels'),
-        ('pingouin', 'pingouin'),
-        ('tqdm', 'tqdm'),
-        ('python-dotenv', 'dotenv'),
-        ('pyyaml', 'yaml'),
-        ('openpyxl', 'openpyxl'),
-        ('xlsxwriter', 'xlsxwriter'),
-    ]
-
-    # R packages to check
-    r_packages = [
-        'DBI',
-        'RPostgreSQL',
-        'dplyr',
-        'tidyr',
-        'readr',
-        'readxl',
-        'ggplot2',
-        'plotly',
-        'broom',
-        'modelr',
-        'lubridate',
-        'stringr'
-    ]
-
     print("\n📦 Python Packages:")
     print("-" * 20)
     python_success = 0
-    for package_name, import_name in python_packages:
-        if check_python_package(package_name, import_name):
+    report = {'python': [], 'r': []}
+
+    versions = {package_name: find_python_package(package_name, import_name)
+                for package_name, import_name in PYTHON_PACKAGES}
+    profiles = {}
+    if args.do_import:
+        installed = [(p, i) for p, i in PYTHON_PACKAGES if versions[p]]
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            results = pool.map(lambda item: profile_import(item[1]), installed)
+            profiles = dict(zip((p for p, _ in installed), results))
+
+    for package_name, import_name in PYTHON_PACKAGES:
+        version = versions[package_name]
+        entry = {'package': package_name, 'module': import_name,
+                 'installed': version is not None, 'version': version}
+        profile = profiles.get(package_name)
+        if profile is not None:
+            entry.update(import_ok=profile['ok'],
+                         import_seconds=profile['seconds'],
+                         slowest_modules=profile['slowest'])
+        report['python'].append(entry)
+
+        if version is None:
+            print(f"❌ {package_name} - Not installed")
+        elif profile is not None and not profile['ok']:
+            print(f"❌ {package_name} {version} - Import failed: "
+                  f"{profile['error']}")
+        elif profile is not None:
+            seconds = profile['seconds'] or 0.0
+            print(f"✅ {package_name} {version} ({seconds:.2f}s to import)")
+            python_success += 1
+        else:
+            print(f"✅ {package_name} {version}")
             python_success += 1
 
-    print(f"\nPython packages: {python_success}/{len(python_packages)} "
+    print(f"\nPython packages: {python_success}/{len(PYTHON_PACKAGES)} "
           f"installed")
 
-    print("\n📊 R Packages:")
-    print("-" * 20)
+    if profiles:
+        timed = sorted(((entry['import_seconds'], entry['package'])
+                        for entry in report['python']
+                        if entry.get('import_seconds') is not None),
+                       reverse=True)
+        print("\n⏱️ Slowest imports:")
+        for seconds, package_name in timed[:5]:
+            print(f"   {package_name}: {seconds:.2f}s")
+
     r_success = 0
-    for package_name in r_packages:
-        if check_r_package(package_name):
-            r_success += 1
+    if not args.skip_r:
+        print("\n📊 R Packages:")
+        print("-" * 20)
+        r_status = check_r_packages(R_PACKAGES)
+        if r_status is None:
+            print("❌ R not available - skipping R package checks")
+            r_status = {}
+        for package_name in R_PACKAGES:
+            report['r'].append({'package': package_name,
+                                'installed': bool(r_status.get(package_name))})
+            if r_status.get(package_name):
+                print(f"✅ {package_name} (R)")
+                r_success += 1
+            elif r_status:
+                print(f"❌ {package_name} (R) - Not installed")
+
+        print(f"\nR packages: {r_success}/{len(R_PACKAGES)} installed")
 
-    print(f"\nR packages: {r_success}/{len(r_packages)} installed")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        print(f"\n📝 Report written to {args.report}")
 
     print("\n" + "=" * 50)
-    total_packages = len(python_packages) + len(r_packages)
+    total_packages = len(PYTHON_PACKAGES) + (0 if args.skip_r
+                                             else len(R_PACKAGES))
     total_success = python_success + r_success
 
     if total_success == total_packages:
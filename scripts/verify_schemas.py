@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Concurrent verification of the loaded sample schemas.
+
+Replaces the serial psql probes of load_databases.sh (one process and one
+connection per schema) with a single asyncio run:
+
+- the credential variants of db.py are tried in parallel and the first
+  one that connects wins, so a dead variant costs nothing while another
+  one works
+- the expected tables, views and foreign keys are read from
+  databases/*.sql and compared with the catalog in two queries
+- the probe table of every schema (and with --count-all, every table) is
+  counted concurrently over a small asyncpg pool
+
+so the whole check takes about one round trip plus the slowest COUNT(*).
+
+Usage:
+    python scripts/verify_schemas.py
+    python scripts/verify_schemas.py --schema sakila --count-all
+    python scripts/verify_schemas.py --json -          # JSON on stdout
+
+    import asyncio, verify_schemas
+    report = asyncio.run(verify_schemas.verify())
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+
+import asyncpg
+
+import bulk_load
+import db
+
+POOL_SIZE = int(os.environ.get('VERIFY_POOL_SIZE', '4'))
+TIMEOUT = float(os.environ.get('VERIFY_TIMEOUT', '30'))
+
+# Table counted in every schema (the ones load_databases.sh checked)
+PROBES = {
+    'public': 'students',
+    'northwind': 'products',
+    'adventureworks': 'product',
+    'wwi': 'customers',
+    'chinook': 'artist',
+    'sakila': 'film',
+    'hr': 'employees',
+    'dashboard': 'database_inventory',
+}
+
+CONNECT_ERRORS = (asyncpg.PostgresError, asyncpg.InterfaceError, OSError,
+                  asyncio.TimeoutError)
+
+CREATE_SCHEMA = re.compile(
+    r'^CREATE\s+SCHEMA\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)', re.IGNORECASE)
+CREATE_VIEW = re.compile(
+    r'^CREATE\s+(?:OR\s+REPLACE\s+)?(MATERIALIZED\s+)?VIEW\s+'
+    r'(?:IF\s+NOT\s+EXISTS\s+)?(\w+(?:\.\w+)?)', re.IGNORECASE)
+ALTER_TABLE = re.compile(
+    r'^ALTER\s+TABLE\s+(?:ONLY\s+)?(\w+(?:\.\w+)?)', re.IGNORECASE)
+FOREIGN_KEY = re.compile(
+    r'FOREIGN\s+KEY\s*\(([^)]*)\)\s*REFERENCES\s+(\w+(?:\.\w+)?)',
+    re.IGNORECASE)
+
+RELATIONS_SQL = """
+    SELECT n.nspname, c.relname, c.relkind
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = ANY($1::text[])
+      AND c.relkind IN ('r', 'p', 'v', 'm')
+      AND NOT c.relispartition
+"""
+
+# Constraints cloned onto partitions have a parent; only the original counts
+FOREIGN_KEYS_SQL = """
+    SELECT n.nspname, c.relname, rc.relname,
+           array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_constraint con
+    JOIN pg_class c ON c.oid = con.conrelid
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_class rc ON rc.oid = con.confrelid
+    CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    WHERE con.contype = 'f' AND con.conparentid = 0
+      AND n.nspname = ANY($1::text[])
+    GROUP BY con.oid, n.nspname, c.relname, rc.relname
+"""
+
+
+def _name(qualified):
+    return qualified.lower().split('.')[-1]
+
+
+def _foreign_keys(table, statement):
+    return {(table, tuple(column.strip().lower()
+                          for column in match.group(1).split(',')),
+             _name(match.group(2)))
+            for match in FOREIGN_KEY.finditer(statement)}
+
+
+def expected_objects(databases_dir=bulk_load.DATABASES_DIR):
+    """
+    {schema: {'tables', 'views', 'foreign_keys'}} defined by databases/*.sql.
+
+    Foreign keys are (table, columns, referenced table) tuples, whether
+    they are declared inline, as table constraints or by ALTER TABLE.
+    """
+    expected = {}
+    for path in sorted(glob.glob(os.path.join(databases_dir, '*.sql'))):
+        with open(path, encoding='utf-8') as handle:
+            statements = bulk_load.split_statements(handle.read())
+        schema = 'public'
+        for statement in statements:
+            match = CREATE_SCHEMA.match(statement)
+            if match:
+                schema = match.group(1).lower()
+                continue
+            objects = expected.setdefault(
+                schema, {'tables': set(), 'views': set(),
+                         'foreign_keys': set()})
+            match = bulk_load.CREATE_TABLE.match(statement)
+            if match:
+                table = _name(match.group(1))
+                objects['tables'].add(table)
+                rewritten, inline = bulk_load.strip_inline_references(statement)
+                for fk in [rewritten] + inline:
+                    objects['foreign_keys'] |= _foreign_keys(table, fk)
+                continue
+            match = CREATE_VIEW.match(statement)
+            if match:
+                objects['views'].add(_name(match.group(2)))
+                continue
+            match = ALTER_TABLE.match(statement)
+            if match:
+                objects['foreign_keys'] |= _foreign_keys(
+                    _name(match.group(1)), statement)
+    return {schema: objects for schema, objects in expected.items()
+            if objects['tables'] or objects['views']}
+
+
+def _asyncpg_params(params):
+    """db.py (libpq-style) parameters as asyncpg.connect() arguments."""
+    names = {'dbname': 'database'}
+    converted = {names.get(key, key): value for key, value in params.items()}
+    if converted.get('port'):
+        converted['port'] = int(converted['port'])
+    return converted
+
+
+async def _try_connect(attempt):
+    return await asyncpg.connect(timeout=db.CONNECT_TIMEOUT,
+                                 **_asyncpg_params(attempt['params']))
+
+
+async def connect_first(attempts=None, on_attempt=None, **overrides):
+    """
+    Try every credential variant at once; return (attempt, connection).
+
+    attempts defaults to db.credential_attempts(), with any non-empty
+    overrides (dbname, host, ...) applied to each. on_attempt(name, error,
+    seconds) is called as attempts finish, error=None for the winner; the
+    attempts still pending then are cancelled. Raises the last error if
+    none connects.
+    """
+    overrides = {key: value for key, value in overrides.items() if value}
+    attempts = [{'name': attempt['name'],
+                 'params': {**attempt['params'], **overrides}}
+                for attempt in (attempts or db.credential_attempts())]
+    started = time.perf_counter()
+    pending = {asyncio.ensure_future(_try_connect(attempt)): attempt
+               for attempt in attempts}
+    last_error = None
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                attempt = pending.pop(task)
+                try:
+                    conn = task.result()
+                except CONNECT_ERRORS as e:
+                    last_error = e
+                    if on_attempt:
+                        on_attempt(attempt['name'], e,
+                                   time.perf_counter() - started)
+                    continue
+                if on_attempt:
+                    on_attempt(attempt['name'], None,
+                               time.perf_counter() - started)
+                # Another attempt may have connected in the same instant
+                for other in done - {task}:
+                    if not other.cancelled() and other.exception() is None:
+                        await other.result().close()
+                return attempt, conn
+    finally:
+        for task in pending:
+            task.cancel()
+    raise last_error or asyncpg.InterfaceError("No credentials to try")
+
+
+async def _catalog(conn, schemas):
+    relations = await conn.fetch(RELATIONS_SQL, schemas)
+    foreign_keys = await conn.fetch(FOREIGN_KEYS_SQL, schemas)
+    return relations, foreign_keys
+
+
+async def _count(pool, schema, table):
+    started = time.perf_counter()
+    try:
+        rows = await pool.fetchval(
+            f'SELECT count(*) FROM "{schema}"."{table}"')
+        error = None
+    except asyncpg.PostgresError as e:
+        rows, error = None, str(e).strip()
+    return schema, table, rows, error, time.perf_counter() - started
+
+
+def compare(expected, relations, foreign_keys):
+    """
+    Per-schema missing tables, views and foreign keys.
+
+    Foreign keys to a partitioned table (see partition_tables.py) can't
+    exist without its partition column, so they are listed as waived
+    instead of missing.
+    """
+    found = {}
+    partitioned = set()
+    for schema, name, kind in relations:
+        group = 'views' if kind in ('v', 'm') else 'tables'
+        found.setdefault(schema, {'tables': set(), 'views': set()})
+        found[schema][group].add(name)
+        if kind == 'p':
+            partitioned.add((schema, name))
+    found_keys = {}
+    for schema, table, referenced, columns in foreign_keys:
+        found_keys.setdefault(schema, set()).add(
+            (table, tuple(columns), referenced))
+
+    results = {}
+    for schema, objects in expected.items():
+        present = found.get(schema, {'tables': set(), 'views': set()})
+        missing_keys = objects['foreign_keys'] - found_keys.get(schema, set())
+        waived_keys = {key for key in missing_keys
+                       if (schema, key[2]) in partitioned}
+        results[schema] = {
+            'present': schema in found,
+            'tables': len(objects['tables']),
+            'views': len(objects['views']),
+            'foreign_keys': len(objects['foreign_keys']),
+            'missing_tables': sorted(objects['tables'] - present['tables']),
+            'missing_views': sorted(objects['views'] - present['views']),
+            'missing_foreign_keys': sorted(
+                f'{table}({", ".join(columns)}) -> {referenced}'
+                for table, columns, referenced in missing_keys - waived_keys),
+            'waived_foreign_keys': sorted(
+                f'{table}({", ".join(columns)}) -> {referenced}'
+                for table, columns, referenced in waived_keys),
+        }
+    return results
+
+
+async def verify(schemas=None, count_all=False, pool_size=POOL_SIZE,
+                 databases_dir=bulk_load.DATABASES_DIR, on_attempt=None,
+                 **overrides):
+    """
+    Verify the sample schemas; return the report as a dict.
+
+    overrides (host, port, user, dbname) apply to every credential
+    variant; dbname defaults to the sample database.
+    """
+    started = time.perf_counter()
+    expected = expected_objects(databases_dir)
+    unknown = []
+    if schemas:
+        unknown = [schema for schema in schemas if schema not in expected]
+        expected = {schema: expected[schema] for schema in schemas
+                    if schema in expected}
+    overrides.setdefault('dbname', db.SAMPLE_DBNAME)
+    attempt, conn = await connect_first(on_attempt=on_attempt, **overrides)
+    connected = time.perf_counter() - started
+
+    params = _asyncpg_params({**attempt['params'],
+                              **{k: v for k, v in overrides.items() if v}})
+    pool = await asyncpg.create_pool(min_size=1, max_size=pool_size,
+                                     timeout=db.CONNECT_TIMEOUT, **params)
+    try:
+        targets = []
+        for schema, objects in expected.items():
+            if count_all:
+                targets += [(schema, table) for table in sorted(objects['tables'])]
+            elif schema in PROBES:
+                targets.append((schema, PROBES[schema]))
+        # The catalog queries run on the probing connection while the
+        # counts run on the pool
+        (relations, foreign_keys), counted = await asyncio.gather(
+            _catalog(conn, list(expected)),
+            asyncio.gather(*(_count(pool, schema, table)
+                             for schema, table in targets)))
+    finally:
+        await conn.close()
+        await pool.close()
+
+    results = compare(expected, relations, foreign_keys)
+    for schema, table, rows, error, seconds in counted:
+        entry = results[schema].setdefault('row_counts', {})
+        entry[table] = rows
+        if error:
+            results[schema].setdefault('errors', {})[table] = error
+    for result in results.values():
+        result.setdefault('row_counts', {})
+        result['ok'] = (result['present'] and not result['missing_tables']
+                        and not result['missing_views']
+                        and not result['missing_foreign_keys']
+                        and not result.get('errors')
+                        and all(result['row_counts'].values()))
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'credentials': attempt['name'],
+        'dbname': params.get('database'),
+        'connect_seconds': round(connected, 3),
+        'total_seconds': round(time.perf_counter() - started, 3),
+        # Nothing to compare against (a wrong --databases-dir) is a failure
+        'ok': bool(results) and not unknown
+              and all(result['ok'] for result in results.values()),
+        'databases_dir': databases_dir,
+        'unknown_schemas': unknown,
+        'schemas': results,
+    }
+
+
+def print_report(report, out=sys.stdout):
+    print(f"🔌 Connected via {report['credentials']} to {report['dbname']} "
+          f"in {report['connect_seconds']:.2f}s", file=out)
+    for schema, result in report['schemas'].items():
+        icon = "✅" if result['ok'] else "❌"
+        if not result['present']:
+            print(f"   {icon} {schema:<16} not loaded", file=out)
+            continue
+        counts = ', '.join(f"{table} {rows:,}" if rows is not None
+                           else f"{table} ?"
+                           for table, rows in result['row_counts'].items())
+        print(f"   {icon} {schema:<16} {result['tables']} tables, "
+              f"{result['views']} views, {result['foreign_keys']} FKs"
+              f"{' - ' + counts if counts else ''}", file=out)
+        for key, label in (('missing_tables', 'missing table'),
+                           ('missing_views', 'missing view'),
+                           ('missing_foreign_keys', 'missing FK')):
+            for name in result[key]:
+                print(f"      ⚠️ {label}: {name}", file=out)
+        for name in result['waived_foreign_keys']:
+            print(f"      ℹ️ FK to a partitioned table not enforced: {name}",
+                  file=out)
+        for table, error in result.get('errors', {}).items():
+            print(f"      ⚠️ {table}: {error}", file=out)
+        for table, rows in result['row_counts'].items():
+            if rows == 0:
+                print(f"      ⚠️ {table} is empty", file=out)
+    for schema in report['unknown_schemas']:
+        print(f"   ❌ {schema:<16} not defined in {report['databases_dir']}",
+              file=out)
+    if not report['schemas'] and not report['unknown_schemas']:
+        print(f"   ❌ no schemas defined in {report['databases_dir']}", file=out)
+    print(f"\n{'🎉 All schemas verified' if report['ok'] else '❌ Verification failed'}"
+          f" in {report['total_seconds']:.2f}s", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Verify the loaded sample schemas concurrently")
+    parser.add_argument('--schema', action='append',
+                        help='schema to verify (repeatable, default: all '
+                             'defined in databases/*.sql)')
+    parser.add_argument('--count-all', action='store_true',
+                        help='count every table, not just one per schema')
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE,
+                        help=f'connections for the counts (default: {POOL_SIZE})')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT,
+                        help=f'overall time budget in seconds (default: {TIMEOUT:g})')
+    parser.add_argument('--databases-dir', default=bulk_load.DATABASES_DIR)
+    parser.add_argument('--json', metavar='PATH',
+                        help="write the report as JSON ('-' for stdout)")
+    db.add_connection_args(parser, default_dbname=db.SAMPLE_DBNAME)
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the JSON report when it goes there
+    human = sys.stderr if args.json == '-' else sys.stdout
+
+    def report_attempt(name, error, seconds):
+        if error is not None:
+            print(f"   ❌ {name}: {str(error).strip()} ({seconds:.2f}s)",
+                  file=human)
+
+    print("🔍 Verifying sample schemas", file=human)
+    try:
+        report = asyncio.run(asyncio.wait_for(
+            verify(args.schema, args.count_all, args.pool_size,
+                   args.databases_dir, report_attempt,
+                   **db.overrides_from_args(args)),
+            args.timeout))
+    except asyncio.TimeoutError:
+        print(f"❌ Verification did not finish within {args.timeout:g}s",
+              file=human)
+        return 1
+    except CONNECT_ERRORS as e:
+        print(f"❌ Cannot connect to database: {e}", file=human)
+        return 1
+
+    print_report(report, human)
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    return 0 if report['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
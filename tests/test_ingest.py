@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+
+import ingest
+
+pytest.importorskip('pyarrow')
+
+
+def write_departments_csv(path):
+    # The first chunk has 3 departments, the second 500 distinct values
+    departments = (['Sales', 'IT', 'HR'] * 167)[:500] + [f'D{i}' for i in range(500)]
+    pd.DataFrame({'id': range(1000), 'department': departments}).to_csv(
+        path, index=False)
+    return departments
+
+
+@pytest.mark.parametrize('partition_by', [None, ['site']])
+def test_categorical_chunks_read_back_as_one_dataset(tmp_path, partition_by):
+    source = tmp_path / 'employees.csv'
+    departments = write_departments_csv(source)
+    if partition_by:
+        df = pd.read_csv(source)
+        df['site'] = ['north', 'south'] * 500
+        df.to_csv(source, index=False)
+
+    entry = ingest.ingest_file(str(source), processed_dir=str(tmp_path / 'out'),
+                               chunksize=500, partition_by=partition_by)
+
+    assert entry['dtypes']['department'] == 'category'
+    assert entry['parts'] == 2
+    df = pd.read_parquet(tmp_path / 'out' / 'employees')
+    assert len(df) == 1000
+    assert isinstance(df['department'].dtype, pd.CategoricalDtype)
+    assert sorted(df['department'].astype(str)) == sorted(departments)
@@ -0,0 +1,30 @@
+import csv
+
+import psycopg2
+import pytest
+
+import provision_students
+import snapshot
+
+
+def test_password_is_recorded_before_the_clone(tmp_path, monkeypatch):
+    credentials = tmp_path / 'credentials.csv'
+    provisioner = provision_students.Provisioner({}, 'abc',
+                                                 credentials=str(credentials))
+    monkeypatch.setattr(provisioner, 'connection', lambda: None)
+    monkeypatch.setattr(provisioner, 'ensure_role',
+                        lambda conn, name: 'secret')
+    monkeypatch.setattr(snapshot, 'database_stamp', lambda conn, dbname: None)
+
+    def clone_database(*args, **kwargs):
+        raise psycopg2.OperationalError('source database is being accessed')
+
+    monkeypatch.setattr(snapshot, 'clone_database', clone_database)
+
+    with pytest.raises(psycopg2.OperationalError):
+        provisioner.provision('student001')
+
+    with open(credentials, newline='', encoding='utf-8') as handle:
+        rows = list(csv.reader(handle))
+    assert rows == [['username', 'password', 'database'],
+                    ['student001', 'secret', 'student001_db']]
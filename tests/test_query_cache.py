@@ -0,0 +1,29 @@
+import pytest
+
+import query
+import query_cache
+
+
+@pytest.mark.parametrize('sql', [
+    "WITH moved AS (DELETE FROM library.loans RETURNING *) SELECT * FROM moved",
+    "with t as (insert into s.t values (1) returning id) select id from t",
+    "WITH u AS (UPDATE s.t SET x = 1 RETURNING x) SELECT count(*) FROM u",
+    "WITH m AS (MERGE INTO s.t USING s.u ON true WHEN MATCHED THEN DELETE) "
+    "SELECT 1",
+    "SELECT * INTO backup FROM library.books",
+])
+def test_writing_statements_are_not_cached(sql):
+    assert not query_cache.is_read_only(query_cache.normalize_sql(sql))
+    # Rejected before the connection is needed
+    assert query_cache.cache_key(None, sql) is None
+    assert query.limit_query(sql, 10) == sql
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT * FROM library.books WHERE note = 'insert into, delete'",
+    "WITH recent AS (SELECT * FROM library.loans) SELECT count(*) FROM recent",
+    "VALUES (1), (2)",
+])
+def test_reading_statements_are_read_only(sql):
+    assert query_cache.is_read_only(query_cache.normalize_sql(sql))
+    assert query.limit_query(sql, 10) != sql
@@ -0,0 +1,59 @@
+import pytest
+
+import bulk_load
+import snapshot
+
+
+class FakeConn:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.executed.append(query)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(snapshot, 'database_stamp', lambda conn, dbname: None)
+    monkeypatch.setattr(snapshot, 'stamp_database',
+                        lambda conn, dbname, checksum: calls.append('stamp'))
+    monkeypatch.setattr(snapshot, 'drop_database',
+                        lambda conn, dbname: calls.append('drop'))
+    return calls
+
+
+def fake_bulk_load(results, missing):
+    return lambda names, params, jobs: (results, missing)
+
+
+def test_clean_load_is_stamped(monkeypatch, calls):
+    results = [{'name': 'library', 'rows': 10, 'errors': [], 'seconds': 0.1}]
+    monkeypatch.setattr(bulk_load, 'bulk_load', fake_bulk_load(results, []))
+
+    assert snapshot.load_from_sql(FakeConn(), {}, 'student_db', 'abc') \
+        == (results, [])
+    assert calls == ['stamp']
+
+
+@pytest.mark.parametrize('errors, missing', [(['syntax error'], []),
+                                             ([], ['hospital'])])
+def test_failed_load_is_dropped_not_stamped(monkeypatch, calls, errors,
+                                            missing):
+    results = [{'name': 'library', 'rows': 0, 'errors': errors,
+                'seconds': 0.1}]
+    monkeypatch.setattr(bulk_load, 'bulk_load',
+                        fake_bulk_load(results, missing))
+
+    with pytest.raises(snapshot.LoadFailed):
+        snapshot.load_from_sql(FakeConn(), {}, 'student_db', 'abc')
+    assert calls == ['drop']
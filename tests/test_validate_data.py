@@ -0,0 +1,92 @@
+import contextlib
+import json
+from decimal import Decimal
+
+import db
+import validate_data
+
+DDL = """
+CREATE TABLE customers (
+    customer_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+"""
+
+
+class FakeCursor:
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if query is validate_data.TABLE_STATS_SQL:
+            # sum() over bigint counters comes back from psycopg2 as Decimal
+            # unless the query casts it
+            self.rows = [('public', 'customers', '16384:42', self.estimate)]
+        else:
+            # rows read, one count per expectation (customer_id, name)
+            self.rows = [(10_123, 0, 3)]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+
+class FakeConn:
+    def __init__(self, estimate):
+        self.estimate = estimate
+        self.info = type('Info', (), {'host': 'localhost', 'port': 5432,
+                                      'dbname': 'student_db'})()
+
+    def cursor(self):
+        return FakeCursor(self.estimate)
+
+
+def run_validate(tmp_path, monkeypatch, estimate):
+    databases = tmp_path / 'databases'
+    databases.mkdir()
+    (databases / 'customers.sql').write_text(DDL, encoding='utf-8')
+
+    @contextlib.contextmanager
+    def get_conn(**overrides):
+        yield FakeConn(estimate)
+
+    monkeypatch.setattr(db, 'get_conn', get_conn)
+    state_file = tmp_path / 'validation.json'
+    results = validate_data.validate(databases_dir=str(databases),
+                                     state_file=str(state_file), jobs=1)
+    return results, state_file
+
+
+def test_sampled_validation_with_numeric_estimate_saves_state(tmp_path,
+                                                              monkeypatch):
+    results, state_file = run_validate(tmp_path, monkeypatch, Decimal('50000'))
+
+    result = results['public.customers']
+    assert result['rows_estimate'] == 50_000
+    assert result['sample_percent'] == 20.0
+    assert not result['passed']
+    [failure] = result['failures']
+    assert failure['column'] == 'name'
+    assert failure['failed_rows'] == 3
+    assert failure['estimated_failed_rows'] == 15
+
+    state = json.loads(state_file.read_text(encoding='utf-8'))
+    cached = state['localhost:5432/student_db']['public.customers']
+    assert cached['token'] == '16384:42'
+    assert cached['result']['rows_estimate'] == 50_000
+
+
+def test_small_table_is_read_in_full(tmp_path, monkeypatch):
+    results, _ = run_validate(tmp_path, monkeypatch, 8_000)
+
+    assert results['public.customers']['sample_percent'] is None
+    assert results['public.customers']['rows_checked'] == 10_123